@@ -6,7 +6,7 @@ All components should be installed before running this
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
+from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
 import subprocess
 import sys
 import os
@@ -226,6 +226,27 @@ class FlightToolSimple:
         self.rolling_max_entry = ttk.Entry(self.rolling_frame, textvariable=self.rolling_max_var, width=8, state="disabled")
         self.rolling_max_entry.grid(row=0, column=3, padx=5)
         
+        # Schedule - rounds with breaks, or continuous loads at a steady hourly pace
+        tk.Label(self.rolling_frame, text="Schedule:").grid(row=0, column=4, sticky=tk.W, padx=(15,0))
+        self.rolling_schedule_var = tk.StringVar(value="rounds")
+        self.rolling_schedule_combo = ttk.Combobox(self.rolling_frame, textvariable=self.rolling_schedule_var, width=10,
+                                                   state="disabled", values=["rounds", "continuous"])
+        self.rolling_schedule_combo.grid(row=0, column=5, padx=5)
+        
+        # Airline coalescing - one page load per route/dates instead of one per airline
+        tk.Label(settings_frame, text="Airline coalescing:").grid(row=0, column=4, sticky=tk.W, padx=(20,0))
+        self.coalescing_var = tk.StringVar(value="off")
+        ttk.Combobox(settings_frame, textvariable=self.coalescing_var, width=12, state="readonly",
+                     values=["off", "unfiltered", "multi_filter"]).grid(row=0, column=5, padx=5)
+        
+        # Date search - flexible loads cover a +/- 3 day block of the date grid,
+        # oneway scrapes N outbound + M return legs instead of the N x M grid,
+        # adaptive samples the grid and refines around the cheapest cells
+        tk.Label(settings_frame, text="Date search:").grid(row=1, column=4, sticky=tk.W, padx=(20,0))
+        self.date_search_var = tk.StringVar(value="exact")
+        ttk.Combobox(settings_frame, textvariable=self.date_search_var, width=12, state="readonly",
+                     values=["exact", "flexible", "oneway", "adaptive"]).grid(row=1, column=5, padx=5, pady=(5,0))
+        
         # Control buttons
         control_frame = ttk.LabelFrame(main_container, text="Control", padding="10")
         control_frame.grid(row=5, column=0, columnspan=5, sticky="ew", pady=(0, 10))
@@ -314,6 +335,18 @@ class FlightToolSimple:
         ttk.Button(source_frame, text="Browse", command=self.browse_source_dir).pack(side=tk.RIGHT, padx=5)
         ttk.Button(source_frame, text="Quick: rolling_mode", command=self.quick_rolling_mode).pack(side=tk.RIGHT, padx=5)
         
+        # Filtry shardow (page_layout = sharded): puste - wszystkie
+        shard_frame = ttk.LabelFrame(main_container, text="Shards (sharded layout, empty = all)", padding="10")
+        shard_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.shard_day_var = tk.StringVar()
+        self.shard_route_var = tk.StringVar()
+        self.shard_airline_var = tk.StringVar()
+        for label, variable in (("Day (YYYY-MM-DD):", self.shard_day_var), ("Route (WAW_ICN):", self.shard_route_var),
+                                ("Airline:", self.shard_airline_var)):
+            ttk.Label(shard_frame, text=label).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Entry(shard_frame, textvariable=variable, width=14).pack(side=tk.LEFT, padx=(0, 15))
+        
         # Control buttons
         control_frame = ttk.LabelFrame(main_container, text="Control", padding="10")
         control_frame.pack(fill=tk.X, pady=(0, 10))
@@ -390,6 +423,11 @@ class FlightToolSimple:
                         variable=self.url_rolling_var).grid(
             row=0, column=6, sticky=tk.W, padx=(20, 0))
 
+        self.url_coalesce_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Łącz linie (jedno ładowanie na trasę i daty)",
+                        variable=self.url_coalesce_var).grid(
+            row=1, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+
         # Control
         control_frame = ttk.LabelFrame(main_container, text="Control", padding="10")
         control_frame.grid(row=2, column=0, sticky="ew", pady=(0, 10))
@@ -408,6 +446,9 @@ class FlightToolSimple:
         ttk.Button(btn_frame, text="Sprawdź raz (--once)",
                    command=self.run_url_watcher_once).pack(side=tk.LEFT, padx=20)
 
+        ttk.Button(btn_frame, text="Priorytet: sprawdź teraz",
+                   command=self.submit_priority_check).pack(side=tk.LEFT, padx=5)
+
         # Log
         log_frame = ttk.LabelFrame(main_container, text="Log", padding="10")
         log_frame.grid(row=3, column=0, sticky="nsew", pady=(0, 0))
@@ -426,7 +467,11 @@ class FlightToolSimple:
             config_path = os.path.join(project_root, "config", "url_watchlist.json")
 
             import json
-            config = {
+            config = {}
+            if os.path.exists(config_path):
+                with open(config_path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            config.update({
                 "urls": urls,
                 "check_interval_minutes": int(self.url_interval_var.get() or 60),
                 "delay_between_urls_seconds": [
@@ -434,7 +479,8 @@ class FlightToolSimple:
                     int(self.url_delay_max_var.get() or 35),
                 ],
                 "rolling_mode": self.url_rolling_var.get(),
-            }
+                "coalesce_airlines": self.url_coalesce_var.get(),
+            })
             with open(config_path, "w", encoding="utf-8") as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
 
@@ -467,6 +513,7 @@ class FlightToolSimple:
             self.url_delay_min_var.set(str(delay[0]))
             self.url_delay_max_var.set(str(delay[1]))
             self.url_rolling_var.set(config.get("rolling_mode", True))
+            self.url_coalesce_var.set(config.get("coalesce_airlines", False))
 
             self.url_watcher_log.insert(tk.END, f"Wczytano {len(urls)} URLi\n")
             self.url_watcher_log.see(tk.END)
@@ -528,6 +575,49 @@ class FlightToolSimple:
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def submit_priority_check(self):
+        """Zgłoś URL albo lot (np. WAW ICN 2026-10-24 2026-11-12) do priority lane działającego schedulera."""
+        target = simpledialog.askstring(
+            "Priorytet",
+            "URL Kayak albo lot: ORIGIN DEST WYLOT [POWRÓT]\n"
+            "Sprawdzi go najbliższy wolny slot działającego scrapera.",
+            parent=self.root)
+        if not target or not target.strip():
+            return
+
+        target = target.strip()
+        if target.startswith("http"):
+            args = ["submit", target]
+        else:
+            args = ["flight"] + target.split()
+        cmd = [sys.executable, "src/priority_lane.py"] + args + ["--wait", "900"]
+
+        def worker():
+            try:
+                project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    bufsize=1,
+                    universal_newlines=True,
+                    cwd=project_root,
+                )
+                for line in process.stdout:
+                    self.root.after(0, lambda l=line: self.url_watcher_log.insert(tk.END, f"[PRIORYTET] {l}"))
+                    self.root.after(0, lambda: self.url_watcher_log.see(tk.END))
+                process.wait()
+                if process.returncode == 0:
+                    self.root.after(0, lambda: self.status_var.set("Priorytet: wynik gotowy"))
+                else:
+                    self.root.after(0, lambda: self.status_var.set("Priorytet: brak wyniku"))
+            except Exception as e:
+                self.root.after(0, lambda: self.url_watcher_log.insert(tk.END, f"Błąd: {e}\n"))
+
+        self.status_var.set("Priorytet: zgłoszono, czekam na wolny slot...")
+        threading.Thread(target=worker, daemon=True).start()
+
     def stop_url_watcher(self):
         """Zatrzymaj URL Watcher."""
         if self.url_watcher_process:
@@ -571,9 +661,11 @@ class FlightToolSimple:
         if self.rolling_var.get():
             self.rolling_min_entry.config(state="normal")
             self.rolling_max_entry.config(state="normal")
+            self.rolling_schedule_combo.config(state="readonly")
         else:
             self.rolling_min_entry.config(state="disabled")
             self.rolling_max_entry.config(state="disabled")
+            self.rolling_schedule_combo.config(state="disabled")
     
     def select_all_airlines(self):
         """Select all airlines"""
@@ -625,28 +717,36 @@ class FlightToolSimple:
                 messagebox.showwarning("Warning", "Select at least one airline")
                 return
             
-            config = {
-                "scraping_config": {
-                    "origin": self.origin_var.get().upper().strip(),
-                    "destination": self.dest_var.get().upper().strip(),
-                    "earliest_departure": self.dep_start_var.get().strip(),
-                    "latest_return": self.ret_end_var.get().strip(),
-                    "departure_start": self.dep_start_var.get().strip(),
-                    "departure_end": self.dep_end_var.get().strip(),
-                    "return_start": self.ret_start_var.get().strip(),
-                    "return_end": self.ret_end_var.get().strip(),
-                    "min_days": int(self.min_days_var.get()),
-                    "max_days": int(self.max_days_var.get()),
-                    "passengers": int(self.passengers_var.get()),
-                    "selected_airlines": selected_airlines,
-                    "delay_between_requests": [int(self.delay_min_var.get()), int(self.delay_max_var.get())],
-                    "rolling_mode": self.rolling_var.get(),
-                    "rolling_break_minutes": [int(self.rolling_min_var.get()), int(self.rolling_max_var.get())] if self.rolling_var.get() else [45, 90]
-                }
-            }
-            
             project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             config_path = os.path.join(project_root, "config", "config_extended.json")
+            
+            # Keep sections and keys the GUI does not edit (airlines_config, advanced options)
+            config = {}
+            if os.path.exists(config_path):
+                with open(config_path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            
+            config.setdefault("scraping_config", {}).update({
+                "origin": self.origin_var.get().upper().strip(),
+                "destination": self.dest_var.get().upper().strip(),
+                "earliest_departure": self.dep_start_var.get().strip(),
+                "latest_return": self.ret_end_var.get().strip(),
+                "departure_start": self.dep_start_var.get().strip(),
+                "departure_end": self.dep_end_var.get().strip(),
+                "return_start": self.ret_start_var.get().strip(),
+                "return_end": self.ret_end_var.get().strip(),
+                "min_days": int(self.min_days_var.get()),
+                "max_days": int(self.max_days_var.get()),
+                "passengers": int(self.passengers_var.get()),
+                "selected_airlines": selected_airlines,
+                "delay_between_requests": [int(self.delay_min_var.get()), int(self.delay_max_var.get())],
+                "rolling_mode": self.rolling_var.get(),
+                "rolling_break_minutes": [int(self.rolling_min_var.get()), int(self.rolling_max_var.get())] if self.rolling_var.get() else [45, 90],
+                "rolling_schedule": self.rolling_schedule_var.get(),
+                "airline_coalescing": self.coalescing_var.get(),
+                "date_search": self.date_search_var.get()
+            })
+            
             with open(config_path, "w", encoding="utf-8") as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
             
@@ -701,6 +801,10 @@ class FlightToolSimple:
                 rolling_break = scraping_config.get("rolling_break_minutes", [45, 90])
                 self.rolling_min_var.set(str(rolling_break[0]))
                 self.rolling_max_var.set(str(rolling_break[1]))
+                self.rolling_schedule_var.set(scraping_config.get("rolling_schedule", "rounds"))
+                
+                self.coalescing_var.set(scraping_config.get("airline_coalescing", "off"))
+                self.date_search_var.set(scraping_config.get("date_search", "exact"))
             
             self.extended_log.insert(tk.END, f"OK Configuration loaded from {filename}\n")
             self.extended_log.see(tk.END)
@@ -838,16 +942,38 @@ class FlightToolSimple:
             return
         
         try:
-            txt_files = [f for f in os.listdir(source_dir) if f.endswith('.txt')]
+            from page_shards import is_sharded, shard_days, shard_routes
+            from segment_store import list_session_refs
             
             self.extractor_log.delete(1.0, tk.END)
             self.extractor_log.insert(tk.END, f"Directory: {source_dir}\n")
-            self.extractor_log.insert(tk.END, f"Found {len(txt_files)} .txt files\n\n")
             
-            # Show first 10 files
-            for i, filename in enumerate(txt_files[:10]):
-                file_size = os.path.getsize(os.path.join(source_dir, filename))
-                self.extractor_log.insert(tk.END, f"  {i+1:2d}. {filename} ({file_size} bytes)\n")
+            filters = self.shard_filters()
+            if is_sharded(source_dir):
+                days = shard_days(source_dir)
+                self.extractor_log.insert(tk.END, f"Sharded: {len(shard_routes(source_dir))} routes, "
+                                                  f"days {days[0] if days else '-'}..{days[-1] if days else '-'}\n")
+                if not filters and days:
+                    # Bez filtra podglad tylko ostatniego dnia - bez przechodzenia calej historii
+                    filters = {"days": [days[-1]]}
+                if filters:
+                    self.extractor_log.insert(tk.END, f"Shards: {', '.join(f'{key}={value[0]}' for key, value in filters.items())}\n")
+            
+            txt_files = list_session_refs(source_dir, **filters)
+            in_segments = len([ref for ref in txt_files if ref.offset is not None])
+            
+            self.extractor_log.insert(tk.END, f"Found {len(txt_files)} pages (.txt / .txt.gz / .txt.zst, {in_segments} in segments)\n\n")
+            
+            # Show first 10 pages (compressed files and segment records are read transparently)
+            for i, ref in enumerate(txt_files[:10]):
+                file_size = ref.stored_bytes
+                try:
+                    text = ref.read()
+                    flight = next((line[8:] for line in text.splitlines()[:10] if line.startswith("Flight: ")), "")
+                    details = f"{file_size} bytes, {len(text)} chars" + (f", {flight}" if flight else "")
+                except Exception as e:
+                    details = f"{file_size} bytes, unreadable: {e}"
+                self.extractor_log.insert(tk.END, f"  {i+1:2d}. {ref.name} ({details})\n")
             
             if len(txt_files) > 10:
                 self.extractor_log.insert(tk.END, f"  ... and {len(txt_files)-10} more files\n")
@@ -874,7 +1000,17 @@ class FlightToolSimple:
         else:
             source_dir_quoted = source_dir
 
-        self.run_script_with_output(f"src/simple_kayak_extractor.py {source_dir_quoted}", self.extractor_log, "Data Extraction", "extractor")
+        # Wybrane shardy (page_layout = sharded) - ekstraktor czyta tylko je
+        filters = self.shard_filters()
+        shard_args = "".join(f" --{option} {filters[key][0]}"
+                             for key, option in (("days", "day"), ("routes", "route"), ("airlines", "airline")) if key in filters)
+        self.run_script_with_output(f"src/simple_kayak_extractor.py {source_dir_quoted}{shard_args}", self.extractor_log, "Data Extraction", "extractor")
+    
+    def shard_filters(self) -> dict:
+        """Filtry shardow z pol zakladki (tylko wypelnione)"""
+        values = {"days": self.shard_day_var.get().strip(), "routes": self.shard_route_var.get().strip().upper(),
+                  "airlines": self.shard_airline_var.get().strip()}
+        return {key: [value] for key, value in values.items() if value}
     
     # Test Methods
     def quick_chromedriver_test(self):
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive Grid - adaptacyjne szukanie najtanszej kombinacji dat
+Zamiast ladowac kazda komorke siatki (dzien wylotu x dlugosc pobytu):
+1. rzadka probka rownomiernie rozlozona po siatce,
+2. szacunek ceny pozostalych komorek z najblizszych probek (IDW),
+3. dalsze ladowania tam, gdzie szacunek jest najnizszy lub najmniej pewny,
+4. stop po zbieznosci najlepszej ceny albo po wyczerpaniu budzetu.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Ilu najblizszych probek uzywa szacunek ceny komorki
+NEIGHBOURS = 6
+
+
+def _normal_cdf(z: float) -> float:
+    return 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
+
+
+def _spread_pick(values: List[int], count: int) -> List[int]:
+    """count wartosci rownomiernie z posortowanej listy (z zachowaniem srodka przedzialow)"""
+    step = len(values) / count
+    return [values[min(len(values) - 1, int(step * i + step / 2))] for i in range(count)]
+
+
+@dataclass
+class Estimate:
+    """Szacunek ceny komorki: srednia i niepewnosc (odchylenie)"""
+    price: float
+    sigma: float
+
+
+@dataclass
+class AdaptiveGridSearch:
+    """Stan przeszukiwania jednej siatki.
+
+    coords: klucz komorki -> (x, y), np. (dzien od poczatku okna, dlugosc pobytu)
+    budget: maksymalna liczba ladowan stron
+    """
+    coords: Dict[Hashable, Tuple[int, int]]
+    budget: int
+    initial_fraction: float = 0.35
+    patience: int = 4
+    tolerance: float = 0.01
+    kappa: float = 1.0
+    prices: Dict[Hashable, Optional[float]] = field(default_factory=dict)
+    history: List[float] = field(default_factory=list)
+    stop_reason: Optional[str] = None
+
+    def __post_init__(self):
+        self.budget = max(1, min(self.budget, len(self.coords)))
+        self._initial = self._initial_sample()
+        self._noise = None
+
+    # ------------------------------------------------------------------
+    # Probka startowa
+    # ------------------------------------------------------------------
+
+    def _initial_sample(self) -> List[Hashable]:
+        """Komorki rozlozone rownomiernie po obu osiach (liczba punktow na osi proporcjonalna do jej dlugosci)"""
+        target = max(1, min(self.budget, int(self.budget * self.initial_fraction)))
+        xs = sorted({x for x, _ in self.coords.values()})
+        ys = sorted({y for _, y in self.coords.values()})
+
+        ky = max(1, min(len(ys), round(math.sqrt(target * len(ys) / len(xs)))))
+        kx = max(1, min(len(xs), target // ky))
+        self.length_scale = max(len(xs) / kx, len(ys) / ky, 1.0)
+
+        x_points = {_spread_pick(xs, kx)[i] for i in range(kx)}
+        y_points = {_spread_pick(ys, ky)[i] for i in range(ky)}
+        picked = [key for key, (x, y) in self.coords.items() if x in x_points and y in y_points]
+        return picked or [next(iter(self.coords))]
+
+    # ------------------------------------------------------------------
+    # Model powierzchni cen
+    # ------------------------------------------------------------------
+
+    @property
+    def observed(self) -> Dict[Hashable, float]:
+        return {key: price for key, price in self.prices.items() if price is not None}
+
+    @staticmethod
+    def _spread(values: List[float]) -> float:
+        """Odchylenie cen probek (min. 1% sredniej, 5% gdy jest tylko jedna probka)"""
+        mean = sum(values) / len(values)
+        if len(values) < 2:
+            return 0.05 * mean
+        variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+        return max(math.sqrt(variance), 0.01 * mean)
+
+    def _nearest(self, key: Hashable, observed: Dict[Hashable, float]) -> List[Tuple[float, float]]:
+        x, y = self.coords[key]
+        return sorted(
+            (math.hypot(x - self.coords[k][0], y - self.coords[k][1]), price)
+            for k, price in observed.items() if k != key
+        )[:NEIGHBOURS]
+
+    @staticmethod
+    def _idw(nearest: List[Tuple[float, float]]) -> float:
+        weights = [1.0 / (d * d) for d, _ in nearest]
+        return sum(w * p for w, (_, p) in zip(weights, nearest)) / sum(weights)
+
+    def _estimate_noise(self, observed: Dict[Hashable, float]) -> float:
+        """Blad szacunku sprawdzony na probkach (leave-one-out), min. tolerance * cena"""
+        floor = self.tolerance * min(observed.values())
+        if len(observed) < 3:
+            return floor
+        errors = [price - self._idw(self._nearest(key, observed)) for key, price in observed.items()]
+        return max(floor, math.sqrt(sum(e * e for e in errors) / len(errors)))
+
+    def estimate(self, key: Hashable) -> Optional[Estimate]:
+        """Szacunek ceny komorki z NEIGHBOURS najblizszych probek (odwrotnosc kwadratu odleglosci)"""
+        observed = self.observed
+        if not observed:
+            return None
+        if key in observed:
+            return Estimate(observed[key], 0.0)
+
+        nearest = self._nearest(key, observed)
+        price = self._idw(nearest)
+        # Niepewnosc: zmiennosc cen w sasiedztwie rosnaca z odlegloscia od najblizszej
+        # probki plus blad szacunku zmierzony na samych probkach
+        trend = self._spread([p for _, p in nearest]) * min(1.0, nearest[0][0] / self.length_scale)
+        noise = self._noise if self._noise is not None else self.tolerance * price
+        return Estimate(price, math.hypot(trend, noise))
+
+    # ------------------------------------------------------------------
+    # Petla przeszukiwania
+    # ------------------------------------------------------------------
+
+    def best(self) -> Optional[Tuple[Hashable, float]]:
+        observed = self.observed
+        if not observed:
+            return None
+        key = min(observed, key=observed.get)
+        return key, observed[key]
+
+    def record(self, key: Hashable, price: Optional[float]):
+        """Zapisuje wynik ladowania (None - brak ceny / blad)"""
+        self.prices[key] = price
+        best = self.best()
+        if best:
+            self.history.append(best[1])
+            self._noise = self._estimate_noise(self.observed)
+
+    def _converged(self) -> bool:
+        """Najlepsza cena nie poprawila sie o wiecej niz tolerance przez patience ladowan
+        i zadna nieodwiedzona komorka nie obiecuje ceny ponizej najlepszej."""
+        if len(self.history) <= self.patience:
+            return False
+        before, now = self.history[-self.patience - 1], self.history[-1]
+        if before - now > self.tolerance * before:
+            return False
+        best_price = now
+        for key in self.coords:
+            if key in self.prices:
+                continue
+            estimate = self.estimate(key)
+            if estimate.price - self.kappa * estimate.sigma < best_price:
+                return False
+        return True
+
+    def next_cell(self) -> Optional[Hashable]:
+        """Nastepna komorka do zaladowania albo None gdy koniec (stop_reason)"""
+        if len(self.prices) >= self.budget:
+            self.stop_reason = "budget"
+            return None
+        if len(self.prices) >= len(self.coords):
+            self.stop_reason = "exhausted"
+            return None
+
+        for key in self._initial:
+            if key not in self.prices:
+                return key
+
+        if not self.observed:
+            # Cala probka bez cen - nie ma czego dopracowywac
+            self.stop_reason = "no_prices"
+            return None
+
+        if self._converged():
+            self.stop_reason = "converged"
+            return None
+
+        # Dolna granica przedzialu ufnosci - tanie albo niepewne komorki wygrywaja
+        candidates = []
+        for key in self.coords:
+            if key in self.prices:
+                continue
+            estimate = self.estimate(key)
+            candidates.append((estimate.price - self.kappa * estimate.sigma, key))
+        return min(candidates, key=lambda item: item[0])[1]
+
+    def confidence(self) -> float:
+        """Szacowane prawdopodobienstwo, ze zadna nieodwiedzona komorka nie jest tansza od najlepszej.
+
+        Sasiednie komorki maja skorelowane ceny, wiec komorki w promieniu
+        length_scale liczone sa jak jedna (wykladnik 1/liczba sasiadow).
+        """
+        best = self.best()
+        if not best:
+            return 0.0
+        unvisited = [key for key in self.coords if key not in self.prices]
+        probability = 1.0
+        for key in unvisited:
+            estimate = self.estimate(key)
+            if estimate.sigma <= 0:
+                p_not_cheaper = 1.0 if estimate.price >= best[1] else 0.0
+            else:
+                p_not_cheaper = 1.0 - _normal_cdf((best[1] - estimate.price) / estimate.sigma)
+            x, y = self.coords[key]
+            cluster = sum(1 for other in unvisited
+                          if math.hypot(x - self.coords[other][0], y - self.coords[other][1]) <= self.length_scale)
+            probability *= p_not_cheaper ** (1.0 / cluster)
+        return probability
+
+    def summary(self) -> dict:
+        best = self.best()
+        return {
+            "grid_cells": len(self.coords),
+            "budget": self.budget,
+            "page_loads": len(self.prices),
+            "initial_sample": len(self._initial),
+            "stop_reason": self.stop_reason,
+            "best_cell": list(best[0]) if best and isinstance(best[0], tuple) else (best[0] if best else None),
+            "best_price": best[1] if best else None,
+            "confidence": round(self.confidence(), 3)
+        }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flight List - wczytywanie listy lotow z Excela dla kayak_excel_scraper
+Walidacja i normalizacja dat dzialaja na calych kolumnach (pandas), a nie
+wiersz po wierszu. Skompilowana lista (poprawne loty + raport walidacji)
+trafia do cache na dysku - klucz to sciezka, mtime i rozmiar pliku oraz
+ustawienia, od ktorych zalezy wynik (linie, grupy lotnisk, preflight, dzien).
+Niezmieniony arkusz w kolejnej rundzie rolling mode wczytuje sie z cache.
+
+Duze arkusze (powyzej streaming_mb) czytane sa strumieniowo przez openpyxl
+w trybie read-only - tylko potrzebne kolumny, bez modelu calego skoroszytu.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+import pandas as pd
+
+from preflight import Preflight, PreflightReport
+from request_planner import airport_param, resolve_airports
+
+REQUIRED_COLUMNS = ['Lotnisko wylotu', 'Lotnisko docelowe', 'Filtr linii', 'Data wylotu', 'Data powrotu']
+
+CACHE_DIR = "output/.cache/flight_lists"
+# Zmiana formatu skompilowanej listy uniewaznia stare pliki cache
+CACHE_VERSION = 1
+
+# Arkusze wieksze niz tyle MB czytane strumieniowo (read-only)
+STREAMING_MB = 5
+
+# Ile przykladowych wierszy logowac dla kazdej reguly walidacji
+LOG_EXAMPLES = 5
+
+
+@dataclass
+class CompiledFlights:
+    """Poprawne loty w kolumnach (wiersz Excela, lotniska, linia, daty, dni) i raport walidacji"""
+    rows: List[int] = field(default_factory=list)
+    origins: List[str] = field(default_factory=list)
+    destinations: List[str] = field(default_factory=list)
+    airline_keys: List[str] = field(default_factory=list)
+    departures: List[str] = field(default_factory=list)
+    returns: List[str] = field(default_factory=list)
+    durations: List[int] = field(default_factory=list)
+    total_rows: int = 0
+    report: Optional[PreflightReport] = None
+    cached: bool = False
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows, "origins": self.origins, "destinations": self.destinations,
+            "airline_keys": self.airline_keys, "departures": self.departures, "returns": self.returns,
+            "durations": self.durations, "total_rows": self.total_rows,
+            "report": self.report.describe() if self.report else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompiledFlights":
+        report = PreflightReport.from_describe(data["report"]) if data.get("report") else None
+        return cls(data["rows"], data["origins"], data["destinations"], data["airline_keys"],
+                   data["departures"], data["returns"], data["durations"], data["total_rows"], report, cached=True)
+
+
+# ---------------------------------------------------------------------------
+# Odczyt arkusza
+# ---------------------------------------------------------------------------
+
+def read_flight_sheet(path: str, streaming_mb: float = STREAMING_MB) -> pd.DataFrame:
+    """Wymagane kolumny arkusza; duze pliki .xlsx strumieniowo (openpyxl read-only)"""
+    if path.lower().endswith((".xlsx", ".xlsm")) and os.path.getsize(path) > streaming_mb * 1024 * 1024:
+        return _read_streaming(path)
+    df = pd.read_excel(path)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Brakujace kolumny w Excel: {missing_columns}")
+    return df[REQUIRED_COLUMNS]
+
+
+def _read_streaming(path: str) -> pd.DataFrame:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else "" for value in next(rows, ())]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+        if missing_columns:
+            raise ValueError(f"Brakujace kolumny w Excel: {missing_columns}")
+
+        positions = [header.index(col) for col in REQUIRED_COLUMNS]
+        columns = {col: [] for col in REQUIRED_COLUMNS}
+        for values in rows:
+            if not any(v is not None for v in values):
+                # Pusty wiersz - zachowany, zeby numery wierszy zgadzaly sie z Excelem
+                values = ()
+            for col, position in zip(REQUIRED_COLUMNS, positions):
+                columns[col].append(values[position] if position < len(values) else None)
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame(columns)
+    # Koncowe puste wiersze (formatowanie arkusza) nie sa lotami
+    filled = df.notna().any(axis=1).to_numpy().nonzero()[0]
+    return df.iloc[:filled[-1] + 1] if len(filled) else df.iloc[:0]
+
+
+# ---------------------------------------------------------------------------
+# Kompilacja (walidacja kolumnowa)
+# ---------------------------------------------------------------------------
+
+def normalize_dates(series: pd.Series) -> pd.Series:
+    """Daty z komorek (datetime Excela albo tekst RRRR-MM-DD) jako datetime64; reszta -> NaT"""
+    text = series.astype(str).str.strip().str[:10]
+    return pd.to_datetime(text, format="%Y-%m-%d", errors="coerce")
+
+
+def _resolve_column(values: pd.Series, airport_groups: dict) -> pd.Series:
+    """Lotnisko / lista / nazwa grupy -> parametr Kayak; liczone raz na unikalna wartosc"""
+    resolved = {}
+    for value in values.unique():
+        try:
+            resolved[value] = airport_param(resolve_airports(value, airport_groups))
+        except ValueError:
+            resolved[value] = None
+    return values.map(resolved)
+
+
+def compile_flights(df: pd.DataFrame, airlines: dict, airport_groups: dict,
+                    preflight: Preflight, logger=None) -> CompiledFlights:
+    """Walidacja i normalizacja calych kolumn; reguly jak Preflight.check_flight"""
+    total = len(df)
+    excel_rows = pd.Series(range(2, total + 2), index=df.index)
+
+    missing = df[REQUIRED_COLUMNS].isna().any(axis=1)
+
+    origin = _resolve_column(df['Lotnisko wylotu'].astype(str).str.strip().str.upper(), airport_groups)
+    destination = _resolve_column(df['Lotnisko docelowe'].astype(str).str.strip().str.upper(), airport_groups)
+    airport_format = ~missing & (origin.isna() | destination.isna())
+
+    departure = normalize_dates(df['Data wylotu'])
+    return_day = normalize_dates(df['Data powrotu'])
+    checked = ~missing & ~airport_format
+    date_format = checked & (departure.isna() | return_day.isna())
+    checked &= ~date_format
+
+    airline_key = df['Filtr linii'].astype(str).str.strip()
+
+    # Lotniska z indeksu IATA - raz na unikalna pare tras
+    route = origin.fillna("") + ">" + destination.fillna("")
+    route_issues = {key: preflight.check_route(key.split(">")[0].split(","), key.split(">")[1].split(","))
+                    for key in route[checked].unique()}
+    route_rules = {key: {issue.rule for issue in issues} for key, issues in route_issues.items()}
+
+    masks = {"missing_fields": missing, "airport_format": airport_format, "date_format": date_format}
+    for rule in ("unknown_airport", "same_airport"):
+        masks[rule] = checked & route.isin([key for key, rules in route_rules.items() if rule in rules])
+    masks.update({rule: checked & mask for rule, mask in preflight.date_rule_masks(departure, return_day).items()})
+    masks["unknown_airline"] = checked & ~airline_key.isin(list(airlines))
+
+    flag_rules = set() if preflight.unknown_airport_drops else {"unknown_airport"}
+    dropped = pd.Series(False, index=df.index)
+    flagged = pd.Series(False, index=df.index)
+    for rule, mask in masks.items():
+        if rule in flag_rules:
+            flagged |= mask
+        else:
+            dropped |= mask
+    flagged &= ~dropped
+
+    report = PreflightReport()
+    report.checked = total
+    report.dropped_jobs = int(dropped.sum())
+    report.flagged_jobs = int(flagged.sum())
+    for rule, mask in masks.items():
+        if int((mask & dropped).sum()):
+            report.dropped[rule] = int((mask & dropped).sum())
+        if int((mask & flagged).sum()):
+            report.flagged[rule] = int((mask & flagged).sum())
+
+    if logger:
+        for rule, mask in masks.items():
+            count = int(mask.sum())
+            if count:
+                examples = ", ".join(str(row) for row in excel_rows[mask].head(LOG_EXAMPLES))
+                action = "oznaczono" if rule in flag_rules else "pomijam"
+                logger.warning(f"Walidacja {rule}: {count} wierszy (np. {examples}), {action}")
+
+    keep = ~dropped
+    return CompiledFlights(
+        rows=excel_rows[keep].tolist(),
+        origins=origin[keep].tolist(),
+        destinations=destination[keep].tolist(),
+        airline_keys=airline_key[keep].tolist(),
+        departures=departure[keep].dt.strftime("%Y-%m-%d").tolist(),
+        returns=return_day[keep].dt.strftime("%Y-%m-%d").tolist(),
+        durations=[int(days) for days in (return_day[keep] - departure[keep]).dt.days],
+        total_rows=total,
+        report=report
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def cache_key(path: str, airlines: dict, airport_groups: dict, preflight_cfg: Optional[dict],
+              today: Optional[date] = None) -> str:
+    """Klucz cache: plik (sciezka, mtime, rozmiar) + ustawienia wplywajace na wynik + dzien (daty w przeszlosci)"""
+    stat = os.stat(path)
+    fingerprint = [CACHE_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+                   sorted(airlines), airport_groups, preflight_cfg or {}, (today or date.today()).isoformat()]
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    name = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}.json")
+
+
+def load_flight_list(path: str, airlines: dict, airport_groups: Optional[dict] = None,
+                     preflight_cfg: Optional[dict] = None, streaming_mb: float = STREAMING_MB,
+                     cache_dir: Optional[str] = CACHE_DIR, logger=None) -> CompiledFlights:
+    """Skompilowana lista lotow - z cache, jesli plik i ustawienia sie nie zmienily"""
+    airport_groups = airport_groups or {}
+    key = cache_key(path, airlines, airport_groups, preflight_cfg)
+    cache_path = _cache_path(path, cache_dir) if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return CompiledFlights.from_dict(cached["flights"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    df = read_flight_sheet(path, streaming_mb)
+    if logger:
+        logger.info(f"Wczytano Excel: {len(df)} wierszy")
+    compiled = compile_flights(df, airlines, airport_groups, Preflight.from_config(preflight_cfg), logger)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "source": os.path.abspath(path), "compiled_at": datetime.now().isoformat(),
+                       "flights": compiled.to_dict()}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return compiled
+
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Freshness - pomijanie kombinacji sprawdzonych niedawno (rolling mode)
+Przed runda dla kazdej kombinacji (trasa, linia, daty) sprawdzany jest
+ostatni udany wynik; jesli jest mlodszy niz dopuszczalny wiek, kombinacja
+nie jest ladowana w tej rundzie.
+
+Konfiguracja (scraping_config.freshness):
+    "max_age_minutes": 120,                     - domyslny wiek (0 = wylaczone)
+    "routes": {"WAW-AKL": 240},                 - wiek per trasa (origin-destination)
+    "departure_distance": [[14, 60], [60, 180]] - [do ilu dni przed wylotem, minuty]
+Kolejnosc: trasa, potem odleglosc do wylotu, potem max_age_minutes.
+"""
+
+import glob
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from request_planner import RequestSequence, SubsetRequests
+from session_log import read_records, result_logs
+
+# Format znacznika czasu wynikow (TextResult.timestamp)
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+# Kombinacja: (origin, destination, airline_key, wylot, powrot)
+ComboKey = Tuple[str, str, str, str, str]
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class FreshnessPolicy:
+    """Dopuszczalny wiek wyniku w minutach (0/None - zawsze ladowac)"""
+    max_age_minutes: float = 0
+    routes: Dict[str, float] = field(default_factory=dict)
+    departure_distance: List[Tuple[int, float]] = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> "FreshnessPolicy":
+        cfg = cfg or {}
+        return cls(
+            max_age_minutes=cfg.get("max_age_minutes") or 0,
+            routes=dict(cfg.get("routes") or {}),
+            departure_distance=sorted((int(days), minutes) for days, minutes in cfg.get("departure_distance") or [])
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_age_minutes or any(self.routes.values())
+                    or any(minutes for _, minutes in self.departure_distance))
+
+    def max_age(self, route: str, departure: date, today: date) -> Optional[timedelta]:
+        """Dopuszczalny wiek wyniku dla trasy i daty wylotu (None - brak limitu, zawsze ladowac)"""
+        minutes = self.routes.get(route)
+        if minutes is None:
+            days_left = (departure - today).days
+            minutes = next((m for days, m in self.departure_distance if days_left <= days), self.max_age_minutes)
+        return timedelta(minutes=minutes) if minutes else None
+
+
+class FreshnessIndex:
+    """Czas ostatniego udanego wyniku per kombinacja"""
+
+    def __init__(self):
+        self.latest: Dict[ComboKey, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self.latest)
+
+    @staticmethod
+    def key(fields) -> ComboKey:
+        """Klucz z pol zapytania ((origin, destination), airline_key, wylot, powrot, pasazerowie)"""
+        (origin, destination), airline_key, departure, return_day, _ = fields
+        return origin, destination, airline_key, str(departure), str(return_day)
+
+    def record(self, key: ComboKey, when: datetime):
+        if when and (key not in self.latest or when > self.latest[key]):
+            self.latest[key] = when
+
+    def mean_age_minutes(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Sredni wiek ostatnich udanych wynikow (ile minut ma typowa znana cena)"""
+        if not self.latest:
+            return None
+        now = now or datetime.now()
+        return round(sum((now - when).total_seconds() for when in self.latest.values()) / len(self.latest) / 60, 1)
+
+    def add_results(self, requests: RequestSequence, results: Iterable):
+        """Udane wyniki zapytan z sekwencji (request_id >= 0)"""
+        for result in results:
+            request_id = getattr(result.request, "request_id", -1)
+            if result.success and request_id >= 0:
+                self.record(self.key(requests._fields(request_id)), parse_timestamp(result.timestamp))
+
+    def load_summaries(self, folder: str) -> int:
+        """Wczytuje udane wyniki z logow rund (round_*_results.jsonl, takze przerwanych) i starszych
+        round_*_summary.json (blok requests + results); zwraca liczbe plikow"""
+        loaded = 0
+        for path in result_logs(folder):
+            for record in read_records(path):
+                if record.get("type") == "result" and record.get("success") and record.get("combo"):
+                    self.record(tuple(record["combo"]), parse_timestamp(record.get("timestamp")))
+            loaded += 1
+
+        for path in glob.glob(os.path.join(folder, "round_*_summary.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if "results_log" in summary:
+                continue  # wyniki juz wczytane z logu
+            described = summary.get("requests") or {}
+            rows = described.get("rows", {})
+            airlines, routes = described.get("airlines", []), described.get("routes", [])
+            for record in summary.get("results", []):
+                row = rows.get(str(record.get("request_id")))
+                if not record.get("success") or not row:
+                    continue
+                airline, route, departure, return_day, _ = row
+                origin, destination = routes[route].rsplit("-", 1)
+                self.record((origin, destination, airlines[airline], departure, return_day),
+                            parse_timestamp(record.get("timestamp")))
+            loaded += 1
+        return loaded
+
+    def filter(self, requests: RequestSequence, policy: FreshnessPolicy,
+               now: Optional[datetime] = None) -> Tuple[RequestSequence, int]:
+        """Zapytania bez swiezego wyniku (kolejnosc bez zmian) i liczba pominietych"""
+        now = now or datetime.now()
+        keep = []
+        for index in range(len(requests)):
+            request_id = requests._id_at(index)
+            fields = requests._fields(request_id)
+            scraped = self.latest.get(self.key(fields))
+            if scraped:
+                max_age = policy.max_age(f"{fields[0][0]}-{fields[0][1]}", fields[2], now.date())
+                if max_age and now - scraped < max_age:
+                    continue
+            keep.append(request_id)
+        return SubsetRequests(requests, keep), len(requests) - len(keep)
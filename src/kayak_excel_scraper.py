@@ -13,8 +13,8 @@ import pandas as pd
 import sys
 import signal
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 import logging
 
 # Selenium imports
@@ -24,6 +24,19 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
 
+from flight_list import STREAMING_MB, load_flight_list
+from freshness import FreshnessIndex, FreshnessPolicy
+from load_budget import LoadBudget
+from page_dump import PageDumper
+from price_store import DB_PATH, PriceStore
+from retention import start_retention
+from session_log import LoggedResults, ResultLog, rebuild_summary
+from pacing import PacingClock, default_loads_per_hour
+from priority_lane import has_pending, serve_next
+from offer_cards import cheapest_per_airport, detect_airport, find_offer_cards
+from request_planner import airport_label, RequestTable
+from results_expander import expand_results
+
 @dataclass
 class FlightTarget:
     """Konkretny lot do sprawdzenia"""
@@ -47,6 +60,7 @@ class ScrapingRequest:
     airline_name: str
     airline_filter: str
     passengers: int
+    request_id: int = -1  # wiersz w RequestTable
 
 @dataclass 
 class TextResult:
@@ -59,6 +73,15 @@ class TextResult:
     text_path: Optional[str]
     page_title: Optional[str]
     text_length: int
+    origin_airport: Optional[str] = None
+    destination_airport: Optional[str] = None
+    airport_prices: Optional[Dict[str, float]] = None
+    price_per_person: Optional[float] = None
+    total_price: Optional[float] = None
+    offers_captured: int = 0
+    page_seconds: float = 0.0
+    expand_seconds: float = 0.0
+    expand_clicks: int = 0
 
 class SimpleDriver:
     """Prosta klasa driver"""
@@ -98,6 +121,14 @@ class KayakExcelScraper:
         self.session_dir = None
         self.logger = self._setup_logger()
         self.stop_rolling = False
+        # Czas ostatniego udanego wyniku per kombinacja (rolling mode)
+        self.freshness = FreshnessIndex()
+        # Zegar tempa w trybie ciaglym
+        self.pacing = None
+        # Udzial w dziennej puli ladowan (config/load_budget.json)
+        self.budget = LoadBudget("excel", logger=self.logger)
+        # Wynik walidacji ostatnio wczytanej listy lotow (do podsumowan)
+        self.preflight_report = None
         
         # Handler dla Ctrl+C w trybie rolling
         if self.rolling_mode:
@@ -106,6 +137,13 @@ class KayakExcelScraper:
         # Wczytaj konfiguracje
         self.config = self._load_config()
         self.airlines = self.config["airlines"]
+        # Zapis zrzutow stron (page_compression) ze statystykami per sesja
+        self.page_dump = PageDumper.from_config(self.config.get("scraping_config", {}), logger=self.logger)
+        # Log wynikow biezacej sesji / rundy (JSONL, rekord dopisywany po kazdym wyniku)
+        self.result_log = None
+        # Historia cen w SQLite (price_history_db, null = wylaczona) - zapis partiami
+        db_path = self.config.get("scraping_config", {}).get("price_history_db", DB_PATH)
+        self.price_store = PriceStore(db_path, logger=self.logger) if db_path else None
         
         if self.rolling_mode:
             self._create_rolling_folder()
@@ -136,12 +174,42 @@ class KayakExcelScraper:
             "_comment_rolling": "rolling_break_minutes - przerwa miedzy rundami w trybie rolling (minuty)",
             "_comment_excel_file": "Plik Excel powinien miec kolumny: 'Lotnisko wylotu', 'Lotnisko docelowe', 'Filtr linii', 'Data wylotu', 'Data powrotu'",
             "_comment_excel_example": "Przyklad: WAW | ICN | Turkish | 2025-10-22 | 2025-11-10",
+            "_comment_airport_groups": "Lotnisko w Excel moze byc lista 'WAW,WMI,KRK' albo nazwa grupy z airport_groups - jedno wyszukiwanie dla calej grupy",
+            "_comment_rolling_schedule": "rolling_schedule - rounds: runda + przerwa, continuous: zapytania w kolko w rownym tempie loads_per_hour (null = tyle co w trybie rund), podsumowanie co summary_interval_minutes",
+            "_comment_freshness": "freshness - rolling mode pomija loty z udanym wynikiem mlodszym niz: routes {'WAW-ICN': minuty}, potem departure_distance [[dni do wylotu, minuty], ...], potem max_age_minutes (0 = zawsze sprawdzaj)",
+            "_comment_preflight": "preflight - walidacja wierszy przed uruchomieniem przegladarki: lotniska z wbudowanego indeksu IATA (+ extra_airports; unknown_airport: drop albo flag), daty (wylot nie w przeszlosci, powrot nie przed wylotem), linia z airlines",
+            "_comment_excel_cache": "Skompilowana lista lotow jest w output/.cache (klucz: plik, mtime, rozmiar), arkusze wieksze niz excel_streaming_mb MB czytane strumieniowo (read-only)",
+            "_comment_expand": "expand_max_offers - klikanie 'Pokaz wiecej wynikow' az strona pokaze tyle ofert (0 = wylaczone), expand_time_budget - limit czasu rozwijania w sekundach",
+            "_comment_page_compression": "page_compression - zapis stron: none (.txt, domyslnie), gzip (.txt.gz), zstd (.txt.zst, wymaga pakietu zstandard), page_compression_level - poziom kompresji (null = domyslny)",
+            "_comment_page_store": "page_store - files: plik na strone, segments: strony dopisywane do segmentow seg_*.seg z indeksem .idx (nowy segment po segment_max_mb MB albo o polnocy); import starych folderow: python src/segment_store.py import <folder>",
+            "_comment_retention": "retention - rolling mode w tle: strony starsze niz keep_raw_days dni (0 = wylaczone) zostaja tylko jako nowe minimum ceny albo strona bez ceny, w paczkach bundle_*.seg (bundle_compression, bundle_max_mb); pages_per_run stron na przejscie, idle_minutes przerwy gdy nie ma starych stron; recznie: python src/retention.py run output/kayak_excel_data --keep-days 30 --all",
+            "_comment_page_layout": "page_layout - flat: strony w folderze sesji (jak dotad), sharded: podfoldery trasa / dzien / linia (WAW_ICN/2026-10-19/Turkish/), ekstraktor czyta wybrane shardy: --day 2026-10-19 --route WAW_ICN --airline Turkish; logi i podsumowania zostaja w folderze sesji",
+            "_comment_price_history": "price_history_db - baza historii cen SQLite (kazdy wynik z cena, zapis partiami; null = wylaczona), zapytania: python src/price_store.py cheapest WAW ICN --stay 20 --days 30",
             
             "scraping_config": {
                 "passengers": 2,
                 "delay_between_requests": [20, 35],
                 "randomize_order": True,
-                "rolling_break_minutes": [30, 60]
+                "rolling_break_minutes": [30, 60],
+                "rolling_schedule": "rounds",
+                "loads_per_hour": None,
+                "summary_interval_minutes": 30,
+                "freshness": {"max_age_minutes": 0, "routes": {}, "departure_distance": []},
+                "preflight": {"extra_airports": [], "unknown_airport": "drop", "max_days_ahead": 361},
+                "excel_streaming_mb": 5,
+                "expand_max_offers": 0,
+                "expand_time_budget": 20,
+                "page_compression": "none",
+                "page_compression_level": None,
+                "page_store": "files",
+                "segment_max_mb": 256,
+                "page_layout": "flat",
+                "price_history_db": DB_PATH,
+                "retention": {"keep_raw_days": 0, "pages_per_run": 500, "bundle_compression": "gzip", "bundle_max_mb": 256, "idle_minutes": 60},
+                "airport_groups": {
+                    "WARSZAWA": ["WAW", "WMI"],
+                    "POLSKA": ["WAW", "WMI", "KRK", "GDN"]
+                }
             },
             
             "_comment_airlines": "Mapowanie nazw linii na filtry Kayak",
@@ -221,7 +289,11 @@ class KayakExcelScraper:
         print("Edytuj plik i uruchom ponownie")
     
     def load_flights_from_excel(self) -> List[FlightTarget]:
-        """Wczytuje loty z pliku Excel"""
+        """Wczytuje loty z pliku Excel.
+
+        Walidacja dziala na kolumnach (flight_list), a skompilowana lista jest
+        w cache na dysku - niezmieniony plik w kolejnej rundzie wczytuje sie od razu.
+        """
         try:
             # Sprawdz czy plik istnieje
             if not os.path.exists(self.flights_file):
@@ -229,72 +301,30 @@ class KayakExcelScraper:
                 self._create_sample_excel()
                 raise FileNotFoundError(f"Utworzono przykladowy plik {self.flights_file}")
             
-            # Wczytaj Excel
-            df = pd.read_excel(self.flights_file)
-            self.logger.info(f"Wczytano Excel: {len(df)} wierszy")
-            
-            # Sprawdz kolumny
-            required_columns = ['Lotnisko wylotu', 'Lotnisko docelowe', 'Filtr linii', 'Data wylotu', 'Data powrotu']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                self.logger.error(f"Brakujace kolumny: {missing_columns}")
-                self.logger.error(f"Wymagane kolumny: {required_columns}")
-                raise ValueError(f"Brakujace kolumny w Excel: {missing_columns}")
+            scraping_config = self.config["scraping_config"]
+            started = time.monotonic()
+            compiled = load_flight_list(
+                self.flights_file, self.airlines,
+                airport_groups=scraping_config.get("airport_groups", {}),
+                preflight_cfg=scraping_config.get("preflight"),
+                streaming_mb=scraping_config.get("excel_streaming_mb", STREAMING_MB),
+                logger=self.logger
+            )
+            source = "cache" if compiled.cached else "arkusz"
+            self.logger.info(f"Lista lotow ({source}): {compiled.total_rows} wierszy w {time.monotonic() - started:.2f}s")
             
             # Konwertuj na FlightTarget
-            flights = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Wyczysc dane
-                    origin = str(row['Lotnisko wylotu']).strip().upper()
-                    destination = str(row['Lotnisko docelowe']).strip().upper()
-                    airline_key = str(row['Filtr linii']).strip()
-                    
-                    # Sprawdz czy dane sa kompletne
-                    if pd.isna(row['Data wylotu']) or pd.isna(row['Data powrotu']) or pd.isna(row['Lotnisko wylotu']) or pd.isna(row['Lotnisko docelowe']):
-                        self.logger.warning(f"Wiersz {index+2}: Puste pola, pomijam")
-                        continue
-                    
-                    # Walidacja kodow lotnisk (3 znaki)
-                    if len(origin) != 3 or len(destination) != 3:
-                        self.logger.warning(f"Wiersz {index+2}: Nieprawidlowe kody lotnisk '{origin}'-'{destination}', pomijam")
-                        continue
-                    
-                    # Konwertuj daty
-                    # Obsluga roznych formatow dat
-                    if isinstance(row['Data wylotu'], str):
-                        dep_date = row['Data wylotu']
-                    else:
-                        dep_date = row['Data wylotu'].strftime('%Y-%m-%d')
-                    
-                    if isinstance(row['Data powrotu'], str):
-                        ret_date = row['Data powrotu']
-                    else:
-                        ret_date = row['Data powrotu'].strftime('%Y-%m-%d')
-                    
-                    # Sprawdz czy linia istnieje w config
-                    if airline_key not in self.airlines:
-                        self.logger.warning(f"Wiersz {index+2}: Nieznana linia '{airline_key}', pomijam")
-                        continue
-                    
-                    flight = FlightTarget(
-                        origin_airport=origin,
-                        destination_airport=destination,
-                        airline_key=airline_key,
-                        departure_date=dep_date,
-                        return_date=ret_date
-                    )
-                    
-                    flights.append(flight)
-                    self.logger.debug(f"Lot: {origin}-{destination} {airline_key} {dep_date}-{ret_date} ({flight.duration_days} dni)")
-                    
-                except Exception as e:
-                    self.logger.warning(f"Blad wiersza {index+2}: {e}")
-                    continue
-            
+            flights = [
+                FlightTarget(origin_airport=origin, destination_airport=destination, airline_key=airline_key,
+                             departure_date=departure, return_date=return_day, duration_days=days)
+                for origin, destination, airline_key, departure, return_day, days in zip(
+                    compiled.origins, compiled.destinations, compiled.airline_keys,
+                    compiled.departures, compiled.returns, compiled.durations)
+            ]
+            
+            self.preflight_report = compiled.report
             self.logger.info(f"Zaladowano {len(flights)} lotow z Excel")
+            self.logger.info(compiled.report.log_line())
             
             # Pokaz statystyki
             airline_counts = {}
@@ -320,9 +350,13 @@ class KayakExcelScraper:
             self.logger.error(f"Blad wczytywania Excel: {e}")
             raise
     
-    def generate_requests(self, flights: List[FlightTarget]) -> List[ScrapingRequest]:
-        """Generuje zapytania na podstawie listy lotow"""
-        requests = []
+    def generate_requests(self, flights: List[FlightTarget]) -> RequestTable:
+        """Generuje zapytania na podstawie listy lotow.
+
+        Zapytania trafiaja do kolumnowej tabeli (RequestTable) - obiekt
+        ScrapingRequest powstaje dopiero przy odczycie.
+        """
+        requests = RequestTable(self._request_view)
         passengers = self.config["scraping_config"]["passengers"]
         
         for flight in flights:
@@ -330,24 +364,80 @@ class KayakExcelScraper:
                 self.logger.warning(f"Pomijam nieznana linie: {flight.airline_key}")
                 continue
             
-            airline_data = self.airlines[flight.airline_key]
-            
-            request = ScrapingRequest(
-                target=flight,
-                airline_name=airline_data['name'],
-                airline_filter=airline_data['filter'],
-                passengers=passengers
-            )
-            requests.append(request)
+            requests.add(flight.origin_airport, flight.destination_airport, flight.airline_key,
+                         flight.departure_date, flight.return_date, passengers)
         
         # Randomizacja kolejnosci (jesli wlaczona)
         if self.config["scraping_config"].get("randomize_order", True):
-            random.shuffle(requests)
+            requests.shuffle()
             self.logger.info("Losowa kolejnosc zapytan")
         
         self.logger.info(f"{len(requests)} zapytan do wykonania")
         return requests
     
+    def _request_view(self, request_id: int, route: tuple, airline_key: str, departure, return_day, passengers: int) -> ScrapingRequest:
+        """Obiekt zapytania z wiersza RequestTable"""
+        airline_data = self.airlines[airline_key]
+        return ScrapingRequest(
+            target=FlightTarget(
+                origin_airport=route[0],
+                destination_airport=route[1],
+                airline_key=airline_key,
+                departure_date=departure.isoformat(),
+                return_date=return_day.isoformat(),
+                duration_days=(return_day - departure).days
+            ),
+            airline_name=airline_data['name'],
+            airline_filter=airline_data['filter'],
+            passengers=passengers,
+            request_id=request_id
+        )
+    
+    def _wait_slot(self):
+        """Losowe opoznienie miedzy zapytaniami (delay_between_requests), w trybie ciaglym zegar tempa"""
+        if self.stop_rolling:
+            return
+        if not self.rolling_mode and self.budget.remaining() == 0:
+            return  # budzet na dzis wyczerpany - kolejne zapytania nie zaladuja strony
+        if self.pacing:
+            self.pacing.wait(lambda: self.stop_rolling)
+            return
+        delay_range = self.config["scraping_config"]["delay_between_requests"]
+        delay = random.uniform(delay_range[0], delay_range[1])
+        self.logger.info(f"Opoznienie: {delay:.1f}s")
+        time.sleep(delay)
+    
+    def _draw_budget(self) -> bool:
+        """Ladowanie z dziennego udzialu; w rolling mode czeka na nowa pule, w pojedynczej sesji odmawia"""
+        if self.rolling_mode:
+            return self.budget.wait_for_draw(lambda: self.stop_rolling)
+        return self.budget.draw()
+    
+    def _pause_between_loads(self):
+        """Czekanie na slot przed kolejnym ladowaniem; slot najpierw dostaja zgloszenia z priority lane"""
+        self._wait_slot()
+        self._serve_priority()
+    
+    def _serve_priority(self):
+        """Obsluguje zgloszenia z priority lane - kazde zajmuje jeden slot przegladarki"""
+        while not self.stop_rolling and serve_next(self._fetch_url_text, "excel", logger=self.logger):
+            self._wait_slot()
+    
+    def _fetch_url_text(self, url: str) -> str:
+        """Tekst strony dowolnego URLa (priority lane)"""
+        self.budget.record_priority()
+        driver = SimpleDriver.create_driver()
+        try:
+            driver.set_page_load_timeout(45)
+            driver.get(url)
+            time.sleep(12 + random.uniform(3, 8))
+            return driver.find_element(By.TAG_NAME, "body").text
+        finally:
+            try:
+                driver.quit()
+            except:
+                pass
+    
     def scrape_text_only(self, request: ScrapingRequest, round_number: int = None) -> TextResult:
         """Glowna funkcja scrapingu"""
         driver = None
@@ -355,13 +445,16 @@ class KayakExcelScraper:
         
         # Nazwa pliku z kodami lotnisk + linia + daty + timestamp
         if round_number:
-            base_name = f"R{round_number:03d}_{request.target.origin_airport}_{request.target.destination_airport}_{request.target.airline_key}_{request.target.departure_date}_{request.target.return_date}_{timestamp}"
+            base_name = f"R{round_number:03d}_{airport_label(request.target.origin_airport)}_{airport_label(request.target.destination_airport)}_{request.target.airline_key}_{request.target.departure_date}_{request.target.return_date}_{timestamp}"
         else:
-            base_name = f"{request.target.origin_airport}_{request.target.destination_airport}_{request.target.airline_key}_{request.target.departure_date}_{request.target.return_date}_{timestamp}"
+            base_name = f"{airport_label(request.target.origin_airport)}_{airport_label(request.target.destination_airport)}_{request.target.airline_key}_{request.target.departure_date}_{request.target.return_date}_{timestamp}"
         
         try:
             self.logger.info(f"{request.airline_name} | {request.target.origin_airport}-{request.target.destination_airport} | {request.target.departure_date}-{request.target.return_date} ({request.target.duration_days}d)")
             
+            if not self._draw_budget():
+                raise RuntimeError("Dzienny budzet ladowan wyczerpany")
+            
             # Utworz driver
             driver = SimpleDriver.create_driver()
             driver.set_page_load_timeout(45)
@@ -375,6 +468,7 @@ class KayakExcelScraper:
             
             # Otworz strone
             self.logger.info(f"Otwieram strone...")
+            page_started = time.monotonic()
             driver.get(url)
             
             # DLUGIE CZEKANIE - 12s + losowy skladnik
@@ -382,13 +476,18 @@ class KayakExcelScraper:
             self.logger.info(f"Czekam {wait_time:.1f}s...")
             time.sleep(wait_time)
             
+            # Rozwin liste wynikow ("Pokaz wiecej wynikow") przed kopiowaniem tekstu
+            scraping_config = self.config.get("scraping_config", {})
+            expansion = expand_results(driver, scraping_config.get("expand_max_offers", 0), scraping_config.get("expand_time_budget", 20), logger=self.logger)
+            
             # Pobierz dane
             page_title = driver.title
             body = driver.find_element(By.TAG_NAME, "body")
             page_text = body.text
+            page_seconds = round(time.monotonic() - page_started, 2)
             
-            # Przygotuj pelny tekst
-            full_text = f"""URL: {url}
+            # Przygotuj naglowek
+            header = f"""URL: {url}
 Title: {page_title}
 Timestamp: {timestamp}
 Round: {round_number if round_number else "Single"}
@@ -398,17 +497,31 @@ Duration: {request.target.duration_days} days
 Airline Filter: {request.airline_filter}
 {'='*80}
 
-{page_text}
 """
             
-            # Zapisz do pliku
-            text_path = os.path.join(self.session_dir, f"{base_name}.txt")
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(full_text)
+            # Zapisz do pliku (strumieniowo, z kompresja z configu)
+            text_path = self.page_dump.write(self.session_dir, base_name, (header, page_text, "\n"),
+                                             route=f"{airport_label(request.target.origin_airport)}_{airport_label(request.target.destination_airport)}",
+                                             airline=request.target.airline_key)
             
             text_length = len(page_text)
             self.logger.info(f"Zapisano: {text_length} znakow - {os.path.basename(text_path)}")
             
+            # Grupa lotnisk - przypisz oferty do faktycznych lotnisk
+            origin_codes = request.target.origin_airport.split(",")
+            destination_codes = request.target.destination_airport.split(",")
+            cards = find_offer_cards(page_text)
+            card = min(cards, key=lambda c: c.total_price) if cards else None
+            self.budget.observe(f"{request.target.origin_airport}-{request.target.destination_airport}-{request.target.airline_key}-{request.target.departure_date}-{request.target.return_date}",
+                                card.total_price if card else None, request.target.departure_date)
+            self.logger.info(f"Ofert na stronie: {len(cards)} (strona {page_seconds:.1f}s, rozwijanie {expansion.seconds:.1f}s)")
+            airport_prices = None
+            if len(origin_codes) > 1 or len(destination_codes) > 1:
+                per_airport = cheapest_per_airport(cards, origin_codes, destination_codes)
+                airport_prices = {route: c.total_price for route, c in sorted(per_airport.items(), key=lambda item: item[1].total_price)}
+                for route, price in airport_prices.items():
+                    self.logger.info(f"   {route}: {price:,.0f} PLN lacznie")
+            
             return TextResult(
                 request=request,
                 timestamp=timestamp,
@@ -417,7 +530,16 @@ Airline Filter: {request.airline_filter}
                 error_message=None,
                 text_path=text_path,
                 page_title=page_title,
-                text_length=text_length
+                text_length=text_length,
+                origin_airport=detect_airport(card.text, origin_codes) if card else None,
+                destination_airport=detect_airport(card.text, destination_codes) if card else None,
+                airport_prices=airport_prices,
+                price_per_person=card.price_per_person if card else None,
+                total_price=card.total_price if card else None,
+                offers_captured=len(cards),
+                page_seconds=page_seconds,
+                expand_seconds=expansion.seconds,
+                expand_clicks=expansion.clicks
             )
             
         except Exception as e:
@@ -441,20 +563,59 @@ Airline Filter: {request.airline_filter}
                 except:
                     pass
     
+    def _open_result_log(self, name: str, **meta):
+        """Nowy log wynikow (session / round_NNN) - poprzedni zamykany"""
+        if self.result_log:
+            self.result_log.close()
+            self.page_dump.close()
+        self.result_log = ResultLog(self.session_dir, name, self.config, **meta)
+    
+    def _log_result(self, result: TextResult):
+        target = result.request.target
+        if self.result_log:
+            combo = (target.origin_airport, target.destination_airport, target.airline_key, target.departure_date, target.return_date)
+            self.result_log.add(result, target.airline_key, combo if result.request.request_id >= 0 else None)
+        if self.price_store:
+            self.price_store.add_result("excel", result, target.origin_airport, target.destination_airport,
+                                        target.airline_key, target.departure_date, target.return_date)
+    
+    def _results(self) -> LoggedResults:
+        """Lista wynikow dopisujaca kazdy wynik do biezacego logu"""
+        return LoggedResults(self._log_result)
+    
+    def _finish_result_log(self, name: str, results: List[TextResult]) -> dict:
+        """Zamyka log i sklada z niego podsumowanie (bez logu - log z listy wynikow)"""
+        if self.result_log is None:
+            self._open_result_log(name)
+            for result in results:
+                self._log_result(result)
+        self.result_log.close()
+        # Segmenty stron sesji / rundy domkniete razem z logiem (indeks zapisany na dysk)
+        self.page_dump.close()
+        path, self.result_log = self.result_log.path, None
+        if self.price_store:
+            self.price_store.flush()
+        return rebuild_summary(path)
+    
     def save_session_summary(self, flights: List[FlightTarget], requests: List[ScrapingRequest], results: List[TextResult]):
         """Zapisz podsumowanie sesji"""
         try:
+            stream = self._finish_result_log("session", results)
             summary = {
                 "session_timestamp": datetime.now().isoformat(),
                 "flights_file": self.flights_file,
-                "config_used": self.config,
+                "config_hash": stream["config_hash"],
                 "total_flights_in_excel": len(flights),
                 "total_requests": len(requests),
-                "successful": len([r for r in results if r.success]),
-                "failed": len([r for r in results if not r.success]),
-                "airlines_processed": list(set([r.request.target.airline_key for r in results])),
-                "total_text_length": sum([r.text_length for r in results if r.success]),
-                "results": [asdict(res) for res in results]
+                "successful": stream["successful"],
+                "failed": stream["failed"],
+                "airlines_processed": stream["airlines"],
+                "total_text_length": stream["total_text_length"],
+                "capture": stream["capture"],
+                "page_dump": self.page_dump.take_stats(),
+                "preflight": self.preflight_report.describe() if self.preflight_report else None,
+                "results_count": stream["results_count"],
+                "results_log": stream["results_log"]
             }
             
             summary_path = os.path.join(self.session_dir, "session_summary.json")
@@ -466,20 +627,39 @@ Airline Filter: {request.airline_filter}
         except Exception as e:
             self.logger.error(f"Blad zapisu podsumowania: {e}")
     
-    def save_round_summary(self, round_number: int, flights: List[FlightTarget], requests: List[ScrapingRequest], results: List[TextResult]):
+    def _skip_fresh(self, requests) -> tuple:
+        """Pomija loty ze swiezym udanym wynikiem (scraping_config.freshness) - zwraca (zapytania, raport albo None)"""
+        policy = FreshnessPolicy.from_config(self.config["scraping_config"].get("freshness"))
+        if not policy.enabled:
+            return requests, None
+        total = len(requests)
+        requests, skipped = self.freshness.filter(requests, policy)
+        self.logger.info(f"Swieze wyniki: pominieto {skipped}/{total} zapytan, do sprawdzenia {len(requests)}")
+        return requests, {"combinations": total, "skipped_fresh": skipped, "scraped": len(requests)}
+    
+    def save_round_summary(self, round_number: int, flights: List[FlightTarget], requests: List[ScrapingRequest], results: List[TextResult],
+                           freshness: dict = None, schedule: dict = None):
         """Zapisz podsumowanie rundy"""
         try:
+            stream = self._finish_result_log(f"round_{round_number:03d}", results)
             summary = {
                 "round_number": round_number,
                 "round_timestamp": datetime.now().isoformat(),
                 "flights_file": self.flights_file,
+                "config_hash": stream["config_hash"],
                 "total_flights_in_excel": len(flights),
                 "total_requests": len(requests),
-                "successful": len([r for r in results if r.success]),
-                "failed": len([r for r in results if not r.success]),
-                "airlines_processed": list(set([r.request.target.airline_key for r in results])),
-                "total_text_length": sum([r.text_length for r in results if r.success]),
-                "results": [asdict(res) for res in results]
+                "freshness": freshness,
+                "schedule": schedule,
+                "successful": stream["successful"],
+                "failed": stream["failed"],
+                "airlines_processed": stream["airlines"],
+                "total_text_length": stream["total_text_length"],
+                "capture": stream["capture"],
+                "page_dump": self.page_dump.take_stats(),
+                "preflight": self.preflight_report.describe() if self.preflight_report else None,
+                "results_count": stream["results_count"],
+                "results_log": stream["results_log"]
             }
             
             summary_path = os.path.join(self.session_dir, f"round_{round_number:03d}_summary.json")
@@ -516,8 +696,8 @@ Airline Filter: {request.airline_filter}
                 self.logger.error("Brak zapytan do wykonania!")
                 return
             
-            results = []
-            delay_range = self.config["scraping_config"]["delay_between_requests"]
+            self._open_result_log("session")
+            results = self._results()
             
             for i, request in enumerate(requests, 1):
                 self.logger.info(f"\n[{i}/{len(requests)}] {request.target.origin_airport}-{request.target.destination_airport} | {request.airline_name} | {request.target.departure_date}-{request.target.return_date}")
@@ -532,11 +712,9 @@ Airline Filter: {request.airline_filter}
                 
                 self.logger.info(f"Progress: {successful} sukces | {failed} bledy | {len(requests)-i} pozostalo")
                 
-                # Opoznienie miedzy zapytaniami
+                # Opoznienie miedzy zapytaniami + zgloszenia priorytetowe
                 if i < len(requests):
-                    delay = random.uniform(delay_range[0], delay_range[1])
-                    self.logger.info(f"Opoznienie: {delay:.1f}s")
-                    time.sleep(delay)
+                    self._pause_between_loads()
             
             # Zapisz podsumowanie
             self.save_session_summary(flights, requests, results)
@@ -579,6 +757,18 @@ Airline Filter: {request.airline_filter}
         total_failed = 0
         start_time = datetime.now()
         
+        if FreshnessPolicy.from_config(self.config["scraping_config"].get("freshness")).enabled:
+            files = self.freshness.load_summaries(self.session_dir)
+            self.logger.info(f"Swiezosc wynikow: {len(self.freshness)} kombinacji z {files} podsumowan rund")
+        
+        retention = start_retention(self.output_dir, self.config["scraping_config"].get("retention"), self.logger)
+        if self.config["scraping_config"].get("rolling_schedule", "rounds") == "continuous":
+            try:
+                return self.run_continuous_mode()
+            finally:
+                if retention:
+                    retention.stop()
+        
         try:
             while not self.stop_rolling:
                 self.logger.info(f"\nRUNDA {round_number} - {datetime.now().strftime('%H:%M:%S')}")
@@ -586,7 +776,7 @@ Airline Filter: {request.airline_filter}
                 # Wykonaj jedna runde scrapingu
                 results = self.run_single_round(round_number)
                 
-                if results:
+                if results is not None:
                     successful = len([r for r in results if r.success])
                     failed = len([r for r in results if not r.success])
                     
@@ -612,6 +802,8 @@ Airline Filter: {request.airline_filter}
                     for _ in range(int(break_minutes * 60)):
                         if self.stop_rolling:
                             break
+                        if has_pending():
+                            self._serve_priority()
                         time.sleep(1)
             
             # Podsumowanie koncowe
@@ -629,6 +821,92 @@ Airline Filter: {request.airline_filter}
             
         except Exception as e:
             self.logger.error(f"Blad rolling mode: {e}")
+        
+        if retention:
+            retention.stop()
+    
+    def run_continuous_mode(self):
+        """Rolling bez rund: loty z Excel w kolko w rownym tempie, podsumowania co summary_interval_minutes"""
+        cfg = self.config["scraping_config"]
+        summary_seconds = cfg.get("summary_interval_minutes", 30) * 60
+        
+        window, cycle = 1, 0
+        window_results = []
+        window_started = time.monotonic()
+        total_successful = 0
+        total_failed = 0
+        start_time = datetime.now()
+        
+        def close_window(flights, requests, freshness):
+            nonlocal window, window_results, window_started, total_successful, total_failed
+            total_successful += len([r for r in window_results if r.success])
+            total_failed += len([r for r in window_results if not r.success])
+            schedule = dict(self.pacing.describe(), mode="continuous", cycle=cycle,
+                            window_minutes=round((time.monotonic() - window_started) / 60, 1),
+                            mean_price_age_minutes=self.freshness.mean_age_minutes())
+            self.save_round_summary(window, flights, requests, window_results, freshness, schedule)
+            self.logger.info(f"Okno {window}: {len([r for r in window_results if r.success])} sukces, "
+                             f"{len([r for r in window_results if not r.success])} bledow, sredni wiek cen {schedule['mean_price_age_minutes']} min")
+            window += 1
+            window_results = []
+            window_started = time.monotonic()
+            self._open_result_log(f"round_{window:03d}", window=window)
+        
+        self._open_result_log(f"round_{window:03d}", window=window)
+        
+        try:
+            while not self.stop_rolling:
+                # Excel wczytywany co cykl - zmiany w liscie lotow wchodza bez restartu
+                flights = self.load_flights_from_excel()
+                requests = self.generate_requests(flights) if flights else None
+                if not requests:
+                    self.logger.error("Brak zapytan do wykonania!")
+                    return
+                
+                if self.pacing is None:
+                    loads_per_hour = cfg.get("loads_per_hour") or default_loads_per_hour(
+                        len(requests), cfg["delay_between_requests"], cfg.get("rolling_break_minutes", [30, 60]))
+                    self.pacing = PacingClock(loads_per_hour)
+                    self.logger.info(f"Tryb ciagly: {loads_per_hour:.1f} ladowan/h (co {self.pacing.interval:.0f}s), podsumowanie co {summary_seconds / 60:.0f} min")
+                
+                cycle += 1
+                requests, freshness = self._skip_fresh(requests)
+                self.logger.info(f"\nCYKL {cycle} - {len(requests)} zapytan - {datetime.now().strftime('%H:%M:%S')}")
+                
+                if not requests:
+                    # Wszystko swieze - jeden pusty slot zamiast petli bez czekania
+                    self._pause_between_loads()
+                
+                for i, request in enumerate(requests, 1):
+                    self._pause_between_loads()
+                    if self.stop_rolling:
+                        break
+                    
+                    self.logger.info(f"C{cycle} [{i}/{len(requests)}] {request.target.origin_airport}-{request.target.destination_airport} | {request.airline_name}")
+                    result = self.scrape_text_only(request, window)
+                    self.freshness.add_results(requests, [result])
+                    window_results.append(result)
+                    self._log_result(result)
+                    
+                    if time.monotonic() - window_started >= summary_seconds:
+                        close_window(flights, requests, freshness)
+                
+                if window_results and self.stop_rolling:
+                    close_window(flights, requests, freshness)
+            
+            self.logger.info("\n" + "="*60)
+            self.logger.info("TRYB CIAGLY ZAKONCZONY!")
+            self.logger.info(f"STATYSTYKI KONCOWE:")
+            self.logger.info(f"   Cykle: {cycle}")
+            self.logger.info(f"   Okna podsumowan: {window - 1}")
+            self.logger.info(f"   Sukces: {total_successful}")
+            self.logger.info(f"   Bledy: {total_failed}")
+            self.logger.info(f"   Czas dzialania: {datetime.now() - start_time}")
+            self.logger.info(f"Wszystkie pliki w: {self.session_dir}")
+            self.logger.info("="*60)
+            
+        except Exception as e:
+            self.logger.error(f"Blad trybu ciaglego: {e}")
     
     def run_single_round(self, round_number: int):
         """Wykonuje jedna runde scrapingu"""
@@ -647,8 +925,10 @@ Airline Filter: {request.airline_filter}
                 self.logger.error("Brak zapytan do wykonania!")
                 return None
             
-            results = []
-            delay_range = self.config["scraping_config"]["delay_between_requests"]
+            requests, freshness = self._skip_fresh(requests)
+            
+            self._open_result_log(f"round_{round_number:03d}", round_number=round_number)
+            results = self._results()
             
             for i, request in enumerate(requests, 1):
                 if self.stop_rolling:
@@ -667,13 +947,13 @@ Airline Filter: {request.airline_filter}
                     failed = len([r for r in results if not r.success])
                     self.logger.info(f"R{round_number} Progress: {successful} sukces | {failed} bledy | {len(requests)-i} pozostalo")
                 
-                # Opoznienie miedzy zapytaniami
+                # Opoznienie miedzy zapytaniami + zgloszenia priorytetowe
                 if i < len(requests) and not self.stop_rolling:
-                    delay = random.uniform(delay_range[0], delay_range[1])
-                    time.sleep(delay)
+                    self._pause_between_loads()
             
             # Zapisz podsumowanie rundy
-            self.save_round_summary(round_number, flights, requests, results)
+            self.freshness.add_results(requests, results)
+            self.save_round_summary(round_number, flights, requests, results, freshness)
             
             return results
             
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load Budget - dzienny limit ladowan stron Kayak dzielony miedzy schedulery
+Dzienna pula (config/load_budget.json: daily_page_loads) jest dzielona miedzy
+siatke extended, liste lotow z Excela i watchliste URLi wedlug wag z configu
+i obserwowanej wartosci ladowan:
+    - zmiennosc cen (sredni wzgledny skok ceny tej samej kombinacji),
+    - bliskosc wylotu (lot za kilka dni wart wiecej niz za pol roku).
+value_weight miesza oba podzialy: 0 = tylko wagi, 1 = wagi * wartosc.
+
+Kazdy scheduler pobiera ladowania ze swojego udzialu (draw) i zapisuje
+licznik w output/load_budget/YYYY-MM-DD/<scheduler>.json - kazdy proces
+pisze tylko swoj plik, udzialy liczone sa z wszystkich plikow dnia.
+Ladowania z priority lane sa liczone, ale nigdy nie blokowane.
+
+Uzycie:
+    python src/load_budget.py report [--day YYYY-MM-DD] [--watch SEKUNDY]
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+BUDGET_CONFIG = "config/load_budget.json"
+BUDGET_DIR = "output/load_budget"
+
+CONSUMERS = ("extended", "excel", "url_watcher")
+
+DEFAULT_BUDGET_CONFIG = {
+    "daily_page_loads": 0,
+    "weights": {"extended": 1.0, "excel": 1.0, "url_watcher": 1.0},
+    "value_weight": 0.5
+}
+
+# Sredni wzgledny skok ceny 10% podwaja wartosc ladowania
+VOLATILITY_GAIN = 10.0
+# Bliskosc wylotu: 1 dzis, 0.5 za 30 dni, 0.25 za 90 dni
+CLOSENESS_DAYS = 30.0
+
+
+@dataclass
+class ConsumerLedger:
+    """Licznik dnia jednego schedulera: ladowania i obserwacje cen"""
+    spent: int = 0
+    priority: int = 0
+    observations: int = 0
+    price_changes: int = 0
+    relative_change_sum: float = 0.0
+    closeness_sum: float = 0.0
+
+    @property
+    def volatility(self) -> float:
+        return self.relative_change_sum / self.price_changes if self.price_changes else 0.0
+
+    @property
+    def closeness(self) -> float:
+        return self.closeness_sum / self.observations if self.observations else 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        """Wartosc ladowania (None - brak obserwacji)"""
+        if not self.observations:
+            return None
+        return (1 + VOLATILITY_GAIN * self.volatility) * (1 + self.closeness)
+
+
+def load_budget_config(path: str = BUDGET_CONFIG) -> dict:
+    config = json.loads(json.dumps(DEFAULT_BUDGET_CONFIG))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+    except (OSError, ValueError):
+        return config
+    config.update({k: v for k, v in loaded.items() if not k.startswith("_")})
+    return config
+
+
+def _ledger_path(budget_dir: str, day: str, consumer: str) -> str:
+    return os.path.join(budget_dir, day, f"{consumer}.json")
+
+
+def read_ledger(budget_dir: str, day: str, consumer: str) -> ConsumerLedger:
+    try:
+        with open(_ledger_path(budget_dir, day, consumer), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return ConsumerLedger()
+    return ConsumerLedger(**{k: data[k] for k in asdict(ConsumerLedger()) if k in data})
+
+
+def allocate(quota: int, weights: Dict[str, float], values: Dict[str, Optional[float]],
+             value_weight: float) -> Dict[str, int]:
+    """Podzial puli: (1-a) * udzial wag + a * udzial (waga * wartosc); reszta z zaokraglen do najwiekszych ulamkow.
+
+    Scheduler bez obserwacji dostaje srednia wartosc pozostalych (neutralnie).
+    """
+    consumers = [c for c, w in weights.items() if w > 0]
+    if quota <= 0 or not consumers:
+        return {c: 0 for c in weights}
+
+    known = [v for c, v in values.items() if c in consumers and v is not None]
+    neutral = sum(known) / len(known) if known else 1.0
+    weight_total = sum(weights[c] for c in consumers)
+    valued = {c: weights[c] * (values.get(c) if values.get(c) is not None else neutral) for c in consumers}
+    valued_total = sum(valued.values())
+
+    exact = {c: quota * ((1 - value_weight) * weights[c] / weight_total + value_weight * valued[c] / valued_total)
+             for c in consumers}
+    shares = {c: int(exact[c]) for c in consumers}
+    leftover = quota - sum(shares.values())
+    for c in sorted(consumers, key=lambda c: exact[c] - shares[c], reverse=True)[:leftover]:
+        shares[c] += 1
+    return dict({c: 0 for c in weights}, **shares)
+
+
+def budget_report(config: dict, day: Optional[str] = None, budget_dir: str = BUDGET_DIR) -> dict:
+    """Udzialy, wydane i pozostale ladowania dnia per scheduler"""
+    day = day or date.today().isoformat()
+    previous = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+    weights = dict(config.get("weights") or {})
+    for consumer in CONSUMERS:
+        weights.setdefault(consumer, 0.0)
+
+    ledgers, values = {}, {}
+    for consumer in weights:
+        ledgers[consumer] = read_ledger(budget_dir, day, consumer)
+        # Rano, zanim dzien zbierze obserwacje, wartosc z poprzedniego dnia
+        observed = ledgers[consumer] if ledgers[consumer].observations else read_ledger(budget_dir, previous, consumer)
+        values[consumer] = observed.value
+
+    quota = int(config.get("daily_page_loads") or 0)
+    shares = allocate(quota, weights, values, float(config.get("value_weight", 0.5)))
+    rows = {}
+    for consumer, ledger in ledgers.items():
+        rows[consumer] = {
+            "share": shares[consumer],
+            "spent": ledger.spent,
+            "priority": ledger.priority,
+            "remaining": max(0, shares[consumer] - (ledger.spent - ledger.priority)),
+            "weight": weights[consumer],
+            "value": round(values[consumer], 2) if values[consumer] is not None else None,
+            "volatility": round(ledger.volatility, 4),
+            "closeness": round(ledger.closeness, 3)
+        }
+    return {
+        "day": day,
+        "daily_page_loads": quota,
+        "spent": sum(r["spent"] for r in rows.values()),
+        "consumers": rows
+    }
+
+
+class LoadBudget:
+    """Udzial jednego schedulera w dziennej puli ladowan (daily_page_loads = 0 - bez limitu)"""
+
+    def __init__(self, consumer: str, config: Optional[dict] = None,
+                 budget_dir: str = BUDGET_DIR, logger=None):
+        self.consumer = consumer
+        self.config = config if config is not None else load_budget_config()
+        self.budget_dir = budget_dir
+        self.logger = logger
+        self.day = None
+        self.ledger = ConsumerLedger()
+        # Ostatnia cena per kombinacja - do zmiennosci (w pamieci procesu)
+        self.last_price: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return int(self.config.get("daily_page_loads") or 0) > 0
+
+    def _today(self) -> ConsumerLedger:
+        day = date.today().isoformat()
+        if day != self.day:
+            # Nowy dzien (albo restart procesu) - licznik z pliku dnia
+            self.day = day
+            self.ledger = read_ledger(self.budget_dir, day, self.consumer)
+        return self.ledger
+
+    def _save(self):
+        path = _ledger_path(self.budget_dir, self.day, self.consumer)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(asdict(self.ledger), consumer=self.consumer, updated_at=datetime.now().isoformat()), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def status(self) -> dict:
+        self._today()
+        return budget_report(self.config, self.day, self.budget_dir)["consumers"][self.consumer]
+
+    def remaining(self) -> Optional[int]:
+        """Pozostale ladowania dzis (None - bez limitu)"""
+        return self.status()["remaining"] if self.enabled else None
+
+    def draw(self) -> bool:
+        """Pobiera jedno ladowanie z udzialu; False gdy udzial na dzis wyczerpany"""
+        if not self.enabled:
+            return True
+        status = self.status()
+        if status["remaining"] <= 0:
+            return False
+        self.ledger.spent += 1
+        self._save()
+        if self.logger:
+            self.logger.info(f"Budzet ladowan: {status['spent'] + 1}/{status['share']} (zostalo {status['remaining'] - 1})")
+        return True
+
+    def wait_for_draw(self, should_stop: Callable[[], bool] = lambda: False, poll: float = 60.0) -> bool:
+        """Czeka, az udzial pozwoli na ladowanie (nowy dzien albo przesuniecie udzialow); False po przerwaniu"""
+        if self.draw():
+            return True
+        if self.logger:
+            self.logger.info(f"Budzet ladowan '{self.consumer}' na dzis wyczerpany - czekam na nowa pule")
+        while not should_stop():
+            waited = 0.0
+            while waited < poll and not should_stop():
+                time.sleep(1)
+                waited += 1
+            if self.draw():
+                return True
+        return False
+
+    def record_priority(self):
+        """Ladowanie z priority lane - liczone w wydanych, poza udzialem"""
+        if not self.enabled:
+            return
+        self._today()
+        self.ledger.spent += 1
+        self.ledger.priority += 1
+        self._save()
+
+    def observe(self, key: str, total_price: Optional[float], departure_date):
+        """Obserwacja ceny (do wartosci ladowan): skok wzgledem poprzedniej ceny i bliskosc wylotu"""
+        if not self.enabled or not total_price:
+            return
+        ledger = self._today()
+        previous = self.last_price.get(key)
+        if previous:
+            ledger.price_changes += 1
+            ledger.relative_change_sum += abs(total_price - previous) / previous
+        self.last_price[key] = total_price
+
+        if isinstance(departure_date, str):
+            try:
+                departure_date = date.fromisoformat(departure_date[:10])
+            except ValueError:
+                departure_date = None
+        if isinstance(departure_date, datetime):
+            departure_date = departure_date.date()
+        if departure_date:
+            days = max(0, (departure_date - date.today()).days)
+            ledger.closeness_sum += 1 / (1 + days / CLOSENESS_DAYS)
+        ledger.observations += 1
+        self._save()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def print_report(report: dict):
+    quota = report["daily_page_loads"]
+    print(f"Budzet ladowan {report['day']} - {datetime.now().strftime('%H:%M:%S')}")
+    if not quota:
+        print("Limit wylaczony (daily_page_loads = 0) - liczone tylko wydane ladowania")
+    print(f"{'Scheduler':<12} {'Udzial':>7} {'Wydane':>7} {'Prio':>5} {'Zostalo':>8} {'Waga':>5} {'Wartosc':>8} {'Zmienn.':>8}")
+    for consumer, row in report["consumers"].items():
+        value = f"{row['value']:.2f}" if row["value"] is not None else "-"
+        print(f"{consumer:<12} {row['share']:>7} {row['spent']:>7} {row['priority']:>5} {row['remaining']:>8} "
+              f"{row['weight']:>5.1f} {value:>8} {row['volatility']:>8.1%}")
+    if quota:
+        print(f"Razem: {report['spent']}/{quota} (zostalo {max(0, quota - report['spent'])})")
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if not args or args[0] != "report":
+        print(__doc__)
+        return 1
+
+    day = args[args.index("--day") + 1] if "--day" in args else None
+    watch = float(args[args.index("--watch") + 1]) if "--watch" in args else 0
+    try:
+        while True:
+            print_report(budget_report(load_budget_config(), day))
+            if not watch:
+                return 0
+            time.sleep(watch)
+            print()
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offer Cards - dzielenie tekstu strony Kayak na karty wynikow
+Kazda karta konczy sie para cen "X zl / osoba  Y zl lacznie", a tekst miedzy
+poprzednia cena a biezaca to opis lotu (linie, godziny, przesiadki).
+"""
+
+import re
+from urllib.parse import unquote
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Nazwy linii tak jak Kayak.pl pokazuje je na kartach wynikow (kod IATA -> nazwy)
+AIRLINE_NAMES = {
+    "LO": ("LOT",),
+    "LH": ("Lufthansa",),
+    "KL": ("KLM",),
+    "AF": ("Air France",),
+    "LX": ("SWISS", "Swiss"),
+    "OS": ("Austrian Airlines", "Austrian"),
+    "AY": ("Finnair",),
+    "SK": ("SAS", "Scandinavian Airlines"),
+    "KE": ("Korean Air",),
+    "NH": ("ANA", "All Nippon Airways"),
+    "SQ": ("Singapore Airlines",),
+    "CX": ("Cathay Pacific",),
+    "OZ": ("Asiana Airlines", "Asiana"),
+    "CA": ("Air China",),
+    "TK": ("Turkish Airlines",),
+    "EK": ("Emirates",),
+    "QR": ("Qatar Airways",),
+    "EY": ("Etihad Airways", "Etihad"),
+    "BA": ("British Airways",),
+    "AA": ("American Airlines",),
+    "QF": ("Qantas",),
+    "NZ": ("Air New Zealand",),
+    "UA": ("United Airlines",),
+    "DL": ("Delta",),
+    "AC": ("Air Canada",),
+    "IB": ("Iberia",),
+    "VS": ("Virgin Atlantic",),
+    "MU": ("China Eastern",),
+    "CZ": ("China Southern",),
+    "JL": ("Japan Airlines",),
+    "TG": ("Thai Airways", "Thai"),
+    "MH": ("Malaysia Airlines",),
+    "VN": ("Vietnam Airlines",),
+    "AI": ("Air India",),
+    "SV": ("Saudia",),
+    "GF": ("Gulf Air",),
+    "WY": ("Oman Air",),
+    "FZ": ("flydubai",),
+    "SN": ("Brussels Airlines",),
+    "TP": ("TAP Air Portugal", "TAP"),
+    "AZ": ("ITA Airways",),
+    "EI": ("Aer Lingus",),
+    "HU": ("Hainan Airlines",),
+    "JQ": ("Jetstar",),
+    "VA": ("Virgin Australia",),
+}
+
+# Para cen: "4 512 zł / osoba  9 024 zł łącznie" (spacje tysiecy moga byc \xa0)
+PRICE_PAIR_PATTERN = re.compile(
+    r'(\d{1,3}(?: \d{3})+|\d+)\s*z[łl]\s*/\s*osoba\s+(\d{1,3}(?: \d{3})+|\d+)\s*z[łl]\s*[łl]ącznie',
+    re.IGNORECASE
+)
+
+# Pojedyncza cena w osobnej linii (1 pasazer - Kayak nie pokazuje "łącznie")
+SINGLE_PRICE_PATTERN = re.compile(r'^\s*(\d{1,3}(?: \d{3})+|\d+)\s*z[łl]\s*$', re.MULTILINE)
+
+# Maksymalna dlugosc opisu pierwszej karty (tekst nad pierwsza cena to naglowek strony)
+FIRST_CARD_WINDOW = 1000
+
+
+@dataclass
+class OfferCard:
+    """Jedna karta wyniku: ceny + tekst opisu"""
+    position: int
+    price_per_person: float
+    total_price: float
+    start: int
+    end: int
+    text: str
+
+
+def _to_float(raw: str) -> float:
+    return float(raw.replace(" ", ""))
+
+
+def normalize_text(text: str) -> str:
+    """Zamienia twarde spacje (\\xa0, \\u202f) na zwykle - Kayak uzywa ich w cenach"""
+    return text.replace("\xa0", " ").replace("\u202f", " ")
+
+
+def find_offer_cards(text: str, limit: Optional[int] = None) -> List[OfferCard]:
+    """Dzieli tekst strony na karty wynikow w kolejnosci wyswietlania"""
+    text = normalize_text(text)
+    cards = []
+
+    matches = list(PRICE_PAIR_PATTERN.finditer(text))
+    single = not matches
+    if single:
+        matches = list(SINGLE_PRICE_PATTERN.finditer(text))
+
+    previous_end = None
+    for match in matches:
+        try:
+            per_person = _to_float(match.group(1))
+            total = per_person if single else _to_float(match.group(2))
+        except ValueError:
+            continue
+
+        if not 100 <= per_person <= 200_000:
+            continue
+
+        start = max(0, match.start() - FIRST_CARD_WINDOW) if previous_end is None else previous_end
+        cards.append(OfferCard(
+            position=len(cards) + 1,
+            price_per_person=per_person,
+            total_price=total,
+            start=start,
+            end=match.end(),
+            text=text[start:match.end()]
+        ))
+        previous_end = match.end()
+
+        if limit and len(cards) >= limit:
+            break
+
+    return cards
+
+
+def cheapest_card(text: str) -> Optional[OfferCard]:
+    """Najtansza karta na stronie (przy sort=price_a zwykle pierwsza)"""
+    cards = find_offer_cards(text)
+    if not cards:
+        return None
+    return min(cards, key=lambda c: c.total_price)
+
+
+def detect_airlines(card_text: str) -> List[str]:
+    """Zwraca kody IATA linii, ktorych nazwy wystepuja w tekscie karty"""
+    found = []
+    for code, names in AIRLINE_NAMES.items():
+        for name in names:
+            if re.search(r'(?<![A-Za-z])' + re.escape(name) + r'(?![A-Za-z])', card_text):
+                found.append(code)
+                break
+    return found
+
+
+def detect_airport(card_text: str, codes: List[str]) -> Optional[str]:
+    """Pierwsze lotnisko z `codes` wystepujace w tekscie karty (kod IATA jako osobne slowo).
+
+    Przy wyszukiwaniu kilku lotnisk naraz pierwsze trafienie z grupy wylotu
+    to lotnisko wylotu odcinka tam, z grupy docelowej - lotnisko przylotu.
+    """
+    if len(codes) == 1:
+        return codes[0]
+    match = re.search(r'(?<![A-Z])(' + '|'.join(map(re.escape, codes)) + r')(?![A-Z])', card_text)
+    return match.group(1) if match else None
+
+
+def cheapest_per_airport(cards: List[OfferCard], origin_codes: List[str], destination_codes: List[str]) -> Dict[str, OfferCard]:
+    """Najtansza karta dla kazdej pary lotnisk ("KRK-AKL") z wyszukiwania wielolotniskowego"""
+    best = {}
+    for card in cards:
+        origin = detect_airport(card.text, origin_codes)
+        destination = detect_airport(card.text, destination_codes)
+        if not origin or not destination:
+            continue
+        route = f"{origin}-{destination}"
+        if route not in best or card.total_price < best[route].total_price:
+            best[route] = card
+    return best
+
+
+def parse_filter_codes(airline_filter: str) -> Tuple[List[str], bool]:
+    """Wyciaga kody linii z filtra Kayak.
+
+    "fs=airlines%3DTK%2CMULT%3Bbfc%3D1" -> (["TK"], True)
+    Drugi element mowi, czy filtr dopuszcza polaczenia wielu linii (MULT).
+    """
+    match = re.search(r'airlines=([A-Z0-9,]+)', unquote(airline_filter), re.IGNORECASE)
+    if not match:
+        return [], False
+
+    codes = [c for c in match.group(1).upper().split(",") if c]
+    allows_multi = "MULT" in codes
+    return [c for c in codes if c != "MULT"], allows_multi
+
+
+def build_airlines_filter(codes: List[str], allow_multi: bool = False) -> str:
+    """Buduje filtr Kayak dla kilku linii naraz (odwrotnosc parse_filter_codes)"""
+    all_codes = list(dict.fromkeys(codes))
+    if allow_multi:
+        all_codes.append("MULT")
+    return f"fs=airlines%3D{'%2C'.join(all_codes)}%3Bbfc%3D1"
+
+
+def cheapest_per_airline(cards: List[OfferCard], wanted: Dict[str, bool]) -> Dict[str, OfferCard]:
+    """Przypisuje najtansza karte kazdej linii z `wanted` (kod -> czy dopuszcza MULT).
+
+    Linia bez MULT dostaje tylko karty obslugiwane wylacznie przez nia;
+    linia z MULT dostaje tez karty laczone, w ktorych wystepuje.
+    """
+    best = {}
+    for card in cards:
+        carriers = detect_airlines(card.text)
+        if not carriers:
+            continue
+        for code, allows_multi in wanted.items():
+            if code not in carriers:
+                continue
+            if not allows_multi and len(carriers) > 1:
+                continue
+            if code not in best or card.total_price < best[code].total_price:
+                best[code] = card
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Elastyczne daty (wyszukiwanie z "-flexible-Ndays")
+# ---------------------------------------------------------------------------
+
+POLISH_MONTHS = {
+    "sty": 1, "lut": 2, "mar": 3, "kwi": 4, "maj": 5, "cze": 6,
+    "lip": 7, "sie": 8, "wrz": 9, "paź": 10, "paz": 10, "lis": 11, "gru": 12,
+}
+
+# "24.10", "pt 24.10", "pt, 24 paź", "24 paź"
+DAY_MONTH_PATTERN = re.compile(
+    r'(?<!\d)(\d{1,2})(?:[./](\d{1,2})(?!\d)|\s+(sty|lut|mar|kwi|maj|cze|lip|sie|wrz|pa[źz]|lis|gru)[a-ząćęłńóśźż]*\.?)',
+    re.IGNORECASE
+)
+DATE_LINE_PATTERN = re.compile(r'^(?:[a-ząćęłńóśźż]{2,4}\.?,?\s+)?' + DAY_MONTH_PATTERN.pattern + r'\s*$', re.IGNORECASE)
+MATRIX_PRICE_PATTERN = re.compile(r'^(\d{1,3}(?: \d{3})+|\d+)\s*z[łl]$', re.IGNORECASE)
+MATRIX_EMPTY_CELLS = {"-", "—", "–", "brak"}
+
+
+def _day_month(match) -> Tuple[int, int]:
+    day = int(match.group(1))
+    if match.group(2):
+        return day, int(match.group(2))
+    return day, POLISH_MONTHS[match.group(3).lower()[:3]]
+
+
+def _date_lookup(dates) -> Dict[Tuple[int, int], Any]:
+    return {(d.day, d.month): d for d in dates}
+
+
+def parse_flexible_matrix(text: str, departure_dates, return_dates, passengers: int = 1) -> Dict[Tuple, float]:
+    """Czyta siatke cen elastycznych dat (wiersz naglowka z datami, potem wiersze:
+    data + ceny). Ceny w siatce sa za osobe - zwracamy lacznie (x pasazerowie).
+    Zwraca {(data_wylotu, data_powrotu): cena_lacznie}; pusty slownik gdy brak siatki.
+    """
+    dep_lookup = _date_lookup(departure_dates)
+    ret_lookup = _date_lookup(return_dates)
+    lines = [line.strip() for line in normalize_text(text).splitlines() if line.strip()]
+
+    def as_date(line):
+        match = DATE_LINE_PATTERN.match(line)
+        return _day_month(match) if match else None
+
+    for i in range(len(lines) - 1):
+        first = as_date(lines[i])
+        if first in dep_lookup:
+            # Kolumny to daty wylotu, wiersze - daty powrotu
+            column_lookup, rows, columns_are_departures = dep_lookup, ret_lookup, True
+        elif first in ret_lookup:
+            column_lookup, rows, columns_are_departures = ret_lookup, dep_lookup, False
+        else:
+            continue
+
+        header = []
+        j = i
+        while j < len(lines) and as_date(lines[j]) in column_lookup:
+            header.append(as_date(lines[j]))
+            j += 1
+        if len(header) < 2:
+            continue
+        columns = [column_lookup[h] for h in header]
+
+        prices = {}
+        while j < len(lines):
+            row_key = as_date(lines[j])
+            if row_key not in rows or j + len(columns) >= len(lines):
+                break
+            cells = lines[j + 1:j + 1 + len(columns)]
+            if not all(MATRIX_PRICE_PATTERN.match(c) or c.lower() in MATRIX_EMPTY_CELLS for c in cells):
+                break
+            for column, cell in zip(columns, cells):
+                match = MATRIX_PRICE_PATTERN.match(cell)
+                if not match:
+                    continue
+                dep, ret = (column, rows[row_key]) if columns_are_departures else (rows[row_key], column)
+                prices[(dep, ret)] = _to_float(match.group(1)) * passengers
+            j += 1 + len(columns)
+
+        if prices:
+            return prices
+
+    return {}
+
+
+def parse_flexible_cards(text: str, departure_dates, return_dates) -> Dict[Tuple, float]:
+    """Przypisuje karty wynikow do par dat na podstawie dat w opisie karty.
+    Pierwsza data z okna wylotow to wylot, nastepna z okna powrotow to powrot.
+    """
+    dep_lookup = _date_lookup(departure_dates)
+    ret_lookup = _date_lookup(return_dates)
+    prices = {}
+
+    for card in find_offer_cards(text):
+        dep = ret = None
+        for match in DAY_MONTH_PATTERN.finditer(card.text):
+            key = _day_month(match)
+            if dep is None and key in dep_lookup:
+                dep = dep_lookup[key]
+            elif dep is not None and key in ret_lookup and ret_lookup[key] > dep:
+                ret = ret_lookup[key]
+                break
+        if dep and ret and ((dep, ret) not in prices or card.total_price < prices[(dep, ret)]):
+            prices[(dep, ret)] = card.total_price
+
+    return prices
+
+
+def parse_flexible_prices(text: str, departure_dates, return_dates, passengers: int = 1) -> Dict[Tuple, float]:
+    """Najtansze ceny per para dat ze strony elastycznych dat (siatka, a gdy jej brak - karty)"""
+    prices = parse_flexible_matrix(text, departure_dates, return_dates, passengers)
+    if prices:
+        return prices
+    return parse_flexible_cards(text, departure_dates, return_dates)
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offer Columns - kolumnowe pliki historii ofert do analiz (trendy z wielu miesiecy)
+Oferty z ekstraktora i url_watcher zapisywane sa kolumnami, w partycjach
+trasa / miesiac pobrania:
+
+    output/offer_columns/route=WAW-ICN/month=2026-11/part-20261119_101500-4242-1.parquet
+
+Linie, lotniska, zrodlo i lotniska przesiadek sa kolumnami slownikowymi
+(kody + slownik wartosci), daty, godziny, czasy podrozy i ceny - liczbami
+calkowitymi (dni / minuty / PLN; brak wartosci = -1, w loaderze NA).
+Kazdy zapis dodaje nowa czesc (part-*) - istniejace pliki nie sa zmieniane;
+compact laczy czesci partycji w jedna.
+
+Format czesci:
+    - parquet (pakiet pyarrow; slowniki jako kodowanie slownikowe parquet),
+    - npy bez pyarrow: folder part-*.cols z plikiem .npy na kolumne i dicts.json.
+load_offers czyta tylko partycje z wybranych tras / miesiecy i tylko wybrane
+kolumny (npy przez mmap), kolumny slownikowe wracaja jako pandas Categorical.
+
+Uzycie:
+    python src/offer_columns.py list [--root FOLDER]
+    python src/offer_columns.py load [--route WAW-ICN] [--since 2026-01] [--until 2026-06] [--columns a,b]
+    python src/offer_columns.py compact [--root FOLDER]
+    python src/offer_columns.py import-db [--db output/price_history.sqlite]
+
+import-db to jednorazowe zasilenie z historii cen - wiersze sa dopisywane,
+bez sprawdzania, czy oferta jest juz w plikach kolumnowych.
+"""
+
+import itertools
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from price_store import DB_PATH, duration_minutes, scrape_time, stay_days
+
+try:
+    import pyarrow
+except ImportError:  # parquet jest opcjonalny - bez pyarrow czesci zapisywane jako npy
+    pyarrow = None
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+ROOT = "output/offer_columns"
+ENGINES = ("parquet", "npy")
+MISSING = -1
+
+DICT = "dict"
+LEG_COLUMNS = {
+    "departure_minute": "int16",   # minuta doby (przylot nastepnego dnia: +1440)
+    "arrival_minute": "int16",
+    "travel_minutes": "int16",
+    "flight_minutes": "int16",
+    "stops": "int8",
+    "stop_airports": DICT,         # 'IST' / 'DOH/IST'
+}
+COLUMNS = {
+    "scraped_minute": "int32",     # minuty od 1970-01-01 (czas lokalny pobrania)
+    "source": DICT,
+    "origin": DICT,
+    "destination": DICT,
+    "airline": DICT,
+    "airline_filter": DICT,
+    "departure_day": "int32",      # dni od 1970-01-01
+    "return_day": "int32",
+    "stay_days": "int16",
+    "rank": "int16",               # pozycja oferty na stronie (--top N moze przekroczyc 127)
+    "price_per_person": "int32",   # PLN
+    "total_price": "int32",
+    **{f"out_{name}": kind for name, kind in LEG_COLUMNS.items()},
+    **{f"ret_{name}": kind for name, kind in LEG_COLUMNS.items()},
+}
+
+EPOCH = date(1970, 1, 1)
+
+# Numer czesci wspolny dla wszystkich writerow procesu (kilka ColumnWriter w tej samej sekundzie)
+_PART_SEQUENCE = itertools.count(1)
+
+
+def resolve_engine(engine: Optional[str] = None, logger=None) -> str:
+    """parquet, jesli jest pyarrow (albo wprost wybrany silnik); bez pyarrow - npy"""
+    engine = engine or ("parquet" if pyarrow is not None else "npy")
+    if engine not in ENGINES:
+        raise ValueError(f"Nieznany format kolumn: {engine} (dostepne: {', '.join(ENGINES)})")
+    if engine == "parquet" and pyarrow is None:
+        if logger:
+            logger.warning("Brak pakietu pyarrow (pip install pyarrow) - pliki kolumnowe zapisywane jako npy")
+        return "npy"
+    return engine
+
+
+# ---------------------------------------------------------------------------
+# Wiersze ofert
+# ---------------------------------------------------------------------------
+
+def day_number(value: Optional[str]) -> int:
+    try:
+        return (datetime.strptime(value, "%Y-%m-%d").date() - EPOCH).days
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def clock_minute(value: Optional[str]) -> int:
+    """'06:10' -> 370, '06:10+1' -> 1810; brak -> -1"""
+    match = re.match(r'\s*(\d{1,2}):(\d{2})(?:\+(\d))?', value or "")
+    if not match:
+        return MISSING
+    return int(match.group(1)) * 60 + int(match.group(2)) + int(match.group(3) or 0) * 1440
+
+
+def _price(value) -> int:
+    try:
+        return int(round(float(value))) if value not in (None, "") else MISSING
+    except ValueError:
+        return MISSING
+
+
+def _number(value: Optional[int]) -> int:
+    return MISSING if value is None else value
+
+
+def offer_row(source: str, scraped_at: Optional[str], origin: str, destination: str, airline: Optional[str],
+              airline_filter: Optional[str], departure_date: Optional[str], return_date: Optional[str],
+              price_per_person, total_price, rank: int = 1, legs: Optional[Dict[str, dict]] = None) -> dict:
+    """Wiersz oferty w typach kolumn; legs: {"out"/"ret": {departure_time, arrival_time, minuty, stops}}"""
+    scraped = datetime.strptime(scrape_time(scraped_at), "%Y-%m-%d %H:%M:%S")
+    row = {
+        "scraped_minute": int((scraped - datetime(1970, 1, 1)).total_seconds() // 60),
+        "source": source,
+        "origin": origin or "",
+        "destination": destination or "",
+        "airline": airline or "",
+        "airline_filter": airline_filter or "",
+        "departure_day": day_number(departure_date),
+        "return_day": day_number(return_date),
+        "stay_days": _number(stay_days(departure_date, return_date)),
+        "rank": rank,
+        "price_per_person": _price(price_per_person),
+        "total_price": _price(total_price),
+    }
+    for direction in ("out", "ret"):
+        leg = (legs or {}).get(direction) or {}
+        stops = leg.get("stops") or []
+        row[f"{direction}_departure_minute"] = clock_minute(leg.get("departure_time"))
+        row[f"{direction}_arrival_minute"] = clock_minute(leg.get("arrival_time"))
+        row[f"{direction}_travel_minutes"] = _number(leg.get("travel_minutes"))
+        row[f"{direction}_flight_minutes"] = _number(leg.get("flight_minutes"))
+        row[f"{direction}_stops"] = len(stops) if leg else MISSING
+        row[f"{direction}_stop_airports"] = "/".join(stops)
+    # Partycja: trasa i miesiac pobrania
+    row["_partition"] = (f"{row['origin']}-{row['destination']}", scraped.strftime("%Y-%m"))
+    return row
+
+
+def rows_from_extracted(offers: Iterable, source: str = "extractor") -> List[dict]:
+    """Wiersze z ofert ekstraktora (SimpleOffer); czas pobrania z nazwy pliku strony"""
+    rows = []
+    for offer in offers:
+        stamp = re.search(r'_(\d{8}_\d{6})_\d+\.txt', offer.filename)
+        legs = {}
+        for direction, prefix, times in (("out", "outbound", (offer.departure_time, offer.arrival_time)),
+                                         ("ret", "return", (offer.return_departure_time, offer.return_arrival_time))):
+            travel = getattr(offer, f"total_travel_time_{prefix}")
+            if times[0] or travel:
+                legs[direction] = {
+                    "departure_time": times[0], "arrival_time": times[1], "travel_minutes": duration_minutes(travel),
+                    "flight_minutes": duration_minutes(getattr(offer, f"actual_flight_time_{prefix}")),
+                    "stops": [getattr(offer, f"stop{i}_{prefix}_airport") for i in range(1, 4)
+                              if getattr(offer, f"stop{i}_{prefix}_airport")]}
+        rows.append(offer_row(source, stamp.group(1) if stamp else None, offer.departure_airport,
+                              offer.destination_airport, offer.airlines_outbound, offer.airline_filter,
+                              offer.departure_date, offer.return_date, offer.price_per_person, offer.total_price,
+                              offer.offer_rank, legs))
+    return rows
+
+
+def row_from_watcher(row: dict) -> Optional[dict]:
+    """Wiersz url_watcher z cena (bledy nie sa ofertami - None)"""
+    if row.get("status") != "ok":
+        return None
+    return offer_row("url_watcher", row.get("timestamp"), row.get("origin"), row.get("destination"),
+                     row.get("airline_code"), row.get("airline_code"), row.get("departure_date"),
+                     row.get("return_date"), row.get("price_per_person"), row.get("total_price"))
+
+
+# ---------------------------------------------------------------------------
+# Zapis
+# ---------------------------------------------------------------------------
+
+def partition_dir(root: str, route: str, month: str) -> str:
+    return os.path.join(root, f"route={route}", f"month={month}")
+
+
+class ColumnWriter:
+    """Bufor wierszy; flush() zapisuje jedna nowa czesc na partycje (trasa, miesiac)"""
+
+    def __init__(self, root: str = ROOT, engine: Optional[str] = None, logger=None):
+        self.root = root
+        self.engine = resolve_engine(engine, logger)
+        self.logger = logger
+        self.rows = []
+        self.written = 0
+
+    def add(self, row: Optional[dict]):
+        if row is not None:
+            self.rows.append(row)
+
+    def extend(self, rows: Iterable[Optional[dict]]):
+        for row in rows:
+            self.add(row)
+
+    def flush(self) -> int:
+        rows, self.rows = self.rows, []
+        partitions = {}
+        for row in rows:
+            partitions.setdefault(row["_partition"], []).append(row)
+        for (route, month), part_rows in partitions.items():
+            folder = partition_dir(self.root, route, month)
+            os.makedirs(folder, exist_ok=True)
+            name = f"part-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}-{next(_PART_SEQUENCE)}"
+            write_part(folder, name, {column: [row[column] for row in part_rows] for column in COLUMNS}, self.engine)
+        self.written += len(rows)
+        if self.logger and rows:
+            self.logger.debug(f"Kolumny ofert: {len(rows)} wierszy w {len(partitions)} partycjach")
+        return len(rows)
+
+    def close(self):
+        self.flush()
+
+
+def _frame(columns: Dict[str, Sequence]) -> pd.DataFrame:
+    return pd.DataFrame({
+        column: (pd.Categorical(values) if COLUMNS[column] == DICT
+                 else np.asarray(values, dtype=COLUMNS[column]))
+        for column, values in columns.items()})
+
+
+def write_part(folder: str, name: str, columns: Dict[str, Sequence], engine: str) -> str:
+    """Czesc partycji zapisana obok i podmieniona nazwa - czytelnik nie zobaczy polowy pliku"""
+    if engine == "parquet":
+        path = os.path.join(folder, f"{name}.parquet")
+        _frame(columns).to_parquet(f"{path}.tmp", engine="pyarrow", index=False)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    path = os.path.join(folder, f"{name}.cols")
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path)
+    dictionaries = {}
+    for column, values in columns.items():
+        if COLUMNS[column] == DICT:
+            categorical = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+            dictionaries[column] = [str(value) for value in categorical.categories]
+            np.save(os.path.join(tmp_path, f"{column}.npy"), categorical.codes.astype("int32"))
+        else:
+            np.save(os.path.join(tmp_path, f"{column}.npy"), np.asarray(values, dtype=COLUMNS[column]))
+    with open(os.path.join(tmp_path, "dicts.json"), "w", encoding="utf-8") as f:
+        json.dump(dictionaries, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Odczyt
+# ---------------------------------------------------------------------------
+
+def list_partitions(root: str = ROOT, routes: Optional[Sequence[str]] = None, since: Optional[str] = None,
+                    until: Optional[str] = None) -> List[tuple]:
+    """(trasa, miesiac, folder) pasujacych partycji - wybor po nazwach folderow, bez czytania plikow"""
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for route_name in sorted(os.listdir(root)):
+        route = route_name[len("route="):]
+        if not route_name.startswith("route=") or (routes and route not in routes):
+            continue
+        route_path = os.path.join(root, route_name)
+        for month_name in sorted(os.listdir(route_path)):
+            month = month_name[len("month="):]
+            if not month_name.startswith("month=") or (since and month < since) or (until and month > until):
+                continue
+            partitions.append((route, month, os.path.join(route_path, month_name)))
+    return partitions
+
+
+def _part_bytes(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def list_parts(folder: str) -> List[str]:
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.startswith("part-") and name.endswith((".parquet", ".cols")))
+
+
+def read_part(path: str, columns: Sequence[str]) -> Dict[str, object]:
+    """Wybrane kolumny czesci: numpy (liczby) albo pd.Categorical (slowniki)"""
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path, columns=list(columns), engine="pyarrow")
+        return {column: (frame[column].array if COLUMNS[column] == DICT
+                         else frame[column].to_numpy(dtype=COLUMNS[column])) for column in columns}
+
+    with open(os.path.join(path, "dicts.json"), "r", encoding="utf-8") as f:
+        dictionaries = json.load(f)
+    data = {}
+    for column in columns:
+        values = np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")
+        if COLUMNS[column] == DICT:
+            data[column] = pd.Categorical.from_codes(np.asarray(values), categories=dictionaries[column])
+        else:
+            data[column] = values
+    return data
+
+
+def load_offers(root: str = ROOT, routes: Optional[Sequence[str]] = None, since: Optional[str] = None,
+                until: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+                missing_as_na: bool = True) -> pd.DataFrame:
+    """Oferty z wybranych partycji (trasy, miesiace RRRR-MM od/do) i tylko wybranych kolumn"""
+    columns = list(columns or COLUMNS)
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Nieznane kolumny: {', '.join(unknown)}")
+
+    parts = [path for _route, _month, folder in list_partitions(root, routes, since, until)
+             for path in list_parts(folder)]
+    return _load_parts(parts, columns, missing_as_na)
+
+
+def _load_parts(parts: Sequence[str], columns: Sequence[str], missing_as_na: bool = True) -> pd.DataFrame:
+    pieces = {column: [] for column in columns}
+    for path in parts:
+        for column, values in read_part(path, columns).items():
+            pieces[column].append(values)
+
+    data = {}
+    for column in columns:
+        if COLUMNS[column] == DICT:
+            data[column] = (union_categoricals(pieces[column]) if pieces[column]
+                            else pd.Categorical([], categories=[]))
+            continue
+        values = np.concatenate(pieces[column]) if pieces[column] else np.empty(0, dtype=COLUMNS[column])
+        if missing_as_na:
+            mask = values == MISSING
+            data[column] = pd.arrays.IntegerArray(values, mask) if mask.any() else values
+        else:
+            data[column] = values
+    return pd.DataFrame(data)
+
+
+def compact(root: str = ROOT, engine: Optional[str] = None, logger=None) -> int:
+    """Laczy czesci kazdej partycji w jedna; zwraca liczbe usunietych czesci"""
+    engine = resolve_engine(engine, logger)
+    removed = 0
+    for _route, _month, folder in list_partitions(root):
+        parts = list_parts(folder)
+        if len(parts) < 2:
+            continue
+        # Tylko czesci z tej listy - czesc dopisana w trakcie zostaje na kolejne compact
+        frame = _load_parts(parts, list(COLUMNS), missing_as_na=False)
+        name = f"part-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}-{next(_PART_SEQUENCE)}-compact"
+        write_part(folder, name, {column: frame[column].array if COLUMNS[column] == DICT else frame[column].to_numpy()
+                                  for column in COLUMNS}, engine)
+        for path in parts:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        removed += len(parts)
+    return removed
+
+
+# ---------------------------------------------------------------------------
+# Import z historii cen (SQLite)
+# ---------------------------------------------------------------------------
+
+def import_price_store(db_path: str = DB_PATH, root: str = ROOT, engine: Optional[str] = None) -> int:
+    """Oferty z price_store.py (z odcinkami i przesiadkami) do plikow kolumnowych"""
+    import sqlite3
+
+    db = sqlite3.connect(db_path)
+    legs = {}
+    for offer_id, direction, departure_time, arrival_time, travel, flight in db.execute(
+            "SELECT offer_id, direction, departure_time, arrival_time, travel_minutes, flight_minutes FROM legs"):
+        legs.setdefault(offer_id, {})[direction] = {
+            "departure_time": departure_time, "arrival_time": arrival_time,
+            "travel_minutes": travel, "flight_minutes": flight, "stops": []}
+    for offer_id, direction, airport in db.execute(
+            "SELECT l.offer_id, l.direction, s.airport FROM stops s JOIN legs l ON l.id = s.leg_id "
+            "ORDER BY s.leg_id, s.position"):
+        legs[offer_id][direction]["stops"].append(airport)
+
+    writer = ColumnWriter(root, engine)
+    for row in db.execute(
+            "SELECT o.id, s.source, s.scraped_at, s.origin, s.destination, o.airline, s.airline_filter, "
+            "s.departure_date, s.return_date, o.price_per_person, o.total_price, o.rank "
+            "FROM offers o JOIN searches s ON s.id = o.search_id WHERE o.total_price IS NOT NULL"):
+        writer.add(offer_row(*row[1:], legs=legs.get(row[0])))
+    db.close()
+    return writer.flush()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def main(argv: list) -> int:
+    if not argv or argv[0] not in ("list", "load", "compact", "import-db"):
+        print(__doc__)
+        return 1
+
+    root = _option(argv, "--root", ROOT)
+    if argv[0] == "list":
+        for route, month, folder in list_partitions(root):
+            parts = list_parts(folder)
+            size = sum(_part_bytes(path) for path in parts)
+            print(f"  {route:<16} {month}  {len(parts):>3} czesci  {size / 1024:>10,.0f} KB")
+    elif argv[0] == "load":
+        route = _option(argv, "--route")
+        columns = _option(argv, "--columns")
+        started = time.monotonic()
+        frame = load_offers(root, [route] if route else None, _option(argv, "--since"), _option(argv, "--until"),
+                            columns.split(",") if columns else None)
+        elapsed = time.monotonic() - started
+        print(frame.head(10).to_string())
+        print(f"{len(frame):,} ofert, {len(frame.columns)} kolumn, "
+              f"{frame.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB w pamieci, {elapsed:.2f}s")
+    elif argv[0] == "compact":
+        print(f"Polaczono {compact(root)} czesci")
+    else:
+        started = time.monotonic()
+        count = import_price_store(_option(argv, "--db", DB_PATH), root)
+        print(f"Zapisano {count} ofert w {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
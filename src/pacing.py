@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pacing - rowne tempo ladowan stron w trybie ciaglym
+Zamiast rundy (seria ladowan) i 30-90 minut przerwy: ten sam godzinowy
+budzet ladowan rozlozony rowno w czasie. Zegar wyznacza poczatek kolejnego
+ladowania; czas samego ladowania miesci sie w odstepie, wiec tempo nie
+zalezy od tego, jak dlugo laduje sie strona.
+"""
+
+import random
+import time
+from typing import Callable, Optional, Sequence
+
+# Przyblizony czas jednego ladowania (otwarcie + czekanie na ceny), do szacunku budzetu
+LOAD_SECONDS = 20
+
+
+def default_loads_per_hour(requests_per_round: int, delay_range: Sequence[float],
+                           break_minutes: Sequence[float], load_seconds: float = LOAD_SECONDS) -> float:
+    """Godzinowy budzet ladowan odpowiadajacy trybowi rund (runda + przerwa)"""
+    delay = (delay_range[0] + delay_range[1]) / 2
+    pause = (break_minutes[0] + break_minutes[1]) / 2 * 60
+    cycle_seconds = requests_per_round * (load_seconds + delay) + pause
+    return max(1.0, requests_per_round * 3600 / cycle_seconds)
+
+
+class PacingClock:
+    """Zegar tempa: kolejne ladowanie co 3600/loads_per_hour sekund (+/- jitter).
+
+    Po dluzszym przestoju (np. wolne ladowanie) zegar nie nadrabia zaleglosci
+    seria ladowan - kolejny odstep liczony jest od teraz.
+    """
+
+    def __init__(self, loads_per_hour: float, jitter: float = 0.25):
+        self.loads_per_hour = loads_per_hour
+        self.interval = 3600.0 / loads_per_hour
+        self.jitter = jitter
+        self.next_at: Optional[float] = None
+
+    def wait(self, should_stop: Callable[[], bool] = lambda: False) -> float:
+        """Czeka do nastepnego slotu (w krokach 1s, zeby dalo sie przerwac); zwraca czas czekania"""
+        now = time.monotonic()
+        self.next_at = max(self.next_at or now, now)
+        waited = self.next_at - now
+        while not should_stop():
+            remaining = self.next_at - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(1.0, remaining))
+        self.next_at += self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return waited
+
+    def describe(self) -> dict:
+        return {
+            "loads_per_hour": round(self.loads_per_hour, 1),
+            "interval_seconds": round(self.interval, 1)
+        }
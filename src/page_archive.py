@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Page Archive - archiwum zrzutow stron z deduplikacja fragmentow
+Kolejne zrzuty tego samego wyszukiwania Kayak to w wiekszosci ten sam tekst
+(nawigacja, panele filtrow, stopka) - zmienia sie tylko lista wynikow.
+Archiwum dzieli tekst strony na fragmenty wyznaczane przez tresc (granica po
+linii, ktorej skrot trafia w maske - wstawienie kilku linii nie przesuwa
+reszty granic) i zapisuje kazdy unikalny fragment raz, pod jego sha1:
+
+    output/page_archive/chunks/ab/ab12...   fragment (zlib)
+    output/page_archive/captures/RRRR-MM-DD.jsonl   zrzuty dnia: nazwa + lista fragmentow
+
+Odczyt sklada zrzut z fragmentow i sprawdza sha1 calego tekstu. gc usuwa
+fragmenty, do ktorych nie odwoluje sie zaden zrzut (np. po forget).
+
+Uzycie:
+    python src/page_archive.py add <folder> [--remove]
+    python src/page_archive.py get <nazwa> [--out PLIK]
+    python src/page_archive.py list [--day RRRR-MM-DD]
+    python src/page_archive.py forget --older-than DNI
+    python src/page_archive.py gc
+    python src/page_archive.py stats
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+from page_dump import list_pages, page_stem, read_page_text
+
+ARCHIVE_DIR = "output/page_archive"
+
+# Granica fragmentu po linii ze skrotem & BOUNDARY_MASK == 0 (srednio co 64 linie),
+# ale nie krotszego niz MIN_CHUNK i nie dluzszego niz MAX_CHUNK bajtow
+BOUNDARY_MASK = 63
+MIN_CHUNK = 512
+MAX_CHUNK = 32 * 1024
+
+# gc nie usuwa swiezych fragmentow - zrzut moze byc wlasnie zapisywany
+GC_GRACE_SECONDS = 3600
+# Import pomija pliki zmienione przed chwila - scraper moze je jeszcze pisac
+SETTLE_SECONDS = 60
+
+
+def _line_hash(line: bytes) -> int:
+    # Nie crc32 - jest liniowy, linie rozne tylko cyframi (ceny, godziny) dawalyby podobne bity
+    return int.from_bytes(hashlib.blake2b(line, digest_size=4).digest(), "little")
+
+
+def split_chunks(data: bytes) -> List[bytes]:
+    """Dzieli tekst na fragmenty z granicami wyznaczonymi przez tresc linii"""
+    chunks = []
+    start = 0
+    position = 0
+    length = len(data)
+    while position < length:
+        end = data.find(b"\n", position)
+        end = length if end < 0 else end + 1
+        size = end - start
+        if size >= MAX_CHUNK or (size >= MIN_CHUNK and _line_hash(data[position:end]) & BOUNDARY_MASK == 0):
+            chunks.append(data[start:end])
+            start = end
+        position = end
+    if start < length:
+        chunks.append(data[start:])
+    return chunks
+
+
+@dataclass
+class ArchiveStats:
+    """Zrzuty, bajty logiczne i unikalne, miejsce na dysku, fragmenty bez odwolan"""
+    captures: int = 0
+    logical_bytes: int = 0
+    chunk_refs: int = 0
+    unique_chunks: int = 0
+    unique_bytes: int = 0
+    stored_bytes: int = 0
+    unreferenced_chunks: int = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        return self.logical_bytes / self.unique_bytes if self.unique_bytes else 0.0
+
+    @property
+    def total_ratio(self) -> float:
+        return self.logical_bytes / self.stored_bytes if self.stored_bytes else 0.0
+
+
+class PageArchive:
+    """Archiwum zrzutow stron: unikalne fragmenty po sha1 + listy fragmentow per zrzut"""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR, level: int = 6):
+        self.archive_dir = archive_dir
+        self.level = level
+        self.chunks_dir = os.path.join(archive_dir, "chunks")
+        self.captures_dir = os.path.join(archive_dir, "captures")
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _put_chunk(self, chunk: bytes) -> str:
+        digest = hashlib.sha1(chunk).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            # Odswiez mtime - gc nie usunie fragmentu, ktory wlasnie zostal uzyty ponownie
+            os.utime(path)
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(chunk, self.level))
+        os.replace(tmp_path, path)
+        return digest
+
+    def _read_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # -----------------------------------------------------------------------
+    # Zrzuty
+    # -----------------------------------------------------------------------
+
+    def put(self, name: str, text: str, source: Optional[str] = None, stored_day: Optional[str] = None) -> dict:
+        """Zapisuje zrzut: nowe fragmenty na dysk, lista fragmentow do pliku dnia"""
+        data = text.encode('utf-8')
+        chunks = split_chunks(data)
+        record = {
+            "name": name,
+            "source": source,
+            "stored_at": datetime.now().isoformat(timespec="seconds"),
+            "size": len(data),
+            "sha1": hashlib.sha1(data).hexdigest(),
+            "chunks": [[self._put_chunk(chunk), len(chunk)] for chunk in chunks]
+        }
+        os.makedirs(self.captures_dir, exist_ok=True)
+        day = stored_day or date.today().isoformat()
+        with open(os.path.join(self.captures_dir, f"{day}.jsonl"), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def _days(self) -> List[str]:
+        if not os.path.isdir(self.captures_dir):
+            return []
+        return sorted(name[:-6] for name in os.listdir(self.captures_dir) if name.endswith(".jsonl"))
+
+    def _read_day(self, day: str) -> List[dict]:
+        records = []
+        try:
+            with open(os.path.join(self.captures_dir, f"{day}.jsonl"), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # urwana linia po przerwanym zapisie
+        except OSError:
+            pass
+        return records
+
+    def captures(self, day: Optional[str] = None) -> Iterator[dict]:
+        for current in ([day] if day else self._days()):
+            yield from self._read_day(current)
+
+    def find(self, name: str) -> Optional[dict]:
+        """Ostatni zapis zrzutu o tej nazwie (nazwa pliku bez rozszerzenia)"""
+        found = None
+        for record in self.captures():
+            if record["name"] == name:
+                found = record
+        return found
+
+    def rebuild(self, record: dict) -> str:
+        data = b"".join(self._read_chunk(digest) for digest, _ in record["chunks"])
+        if hashlib.sha1(data).hexdigest() != record["sha1"]:
+            raise ValueError(f"Uszkodzony zrzut w archiwum: {record['name']}")
+        return data.decode('utf-8')
+
+    def get(self, name: str) -> str:
+        record = self.find(name)
+        if not record:
+            raise KeyError(f"Brak zrzutu w archiwum: {name}")
+        return self.rebuild(record)
+
+    def add_folder(self, folder: str, remove: bool = False, logger=None) -> dict:
+        """Importuje zrzuty stron z folderu (wszystkie formaty); z remove - usuwa pliki po sprawdzeniu odczytu"""
+        known = {record["name"]: record for record in self.captures()}
+        added = skipped = removed = 0
+        for filename in list_pages(folder):
+            path = os.path.join(folder, filename)
+            if time.time() - os.path.getmtime(path) < SETTLE_SECONDS:
+                continue
+            name = page_stem(filename)
+            text = read_page_text(path)
+            if name in known:
+                skipped += 1
+            else:
+                known[name] = self.put(name, text, source=os.path.abspath(path))
+                added += 1
+            if remove:
+                if self.rebuild(known[name]) != text:
+                    raise ValueError(f"Odczyt z archiwum rozny od pliku: {filename}")
+                os.remove(path)
+                removed += 1
+        if logger:
+            logger.info(f"Archiwum: dodano {added}, juz bylo {skipped}, usunieto plikow {removed}")
+        return {"added": added, "skipped": skipped, "removed": removed}
+
+    def forget(self, older_than_days: int) -> int:
+        """Usuwa listy fragmentow zrzutow starszych niz N dni (fragmenty zwalnia dopiero gc)"""
+        cutoff = (date.today() - timedelta(days=older_than_days)).isoformat()
+        forgotten = 0
+        for day in self._days():
+            if day < cutoff:
+                forgotten += len(self._read_day(day))
+                os.remove(os.path.join(self.captures_dir, f"{day}.jsonl"))
+        return forgotten
+
+    # -----------------------------------------------------------------------
+    # gc i statystyki
+    # -----------------------------------------------------------------------
+
+    def _chunk_files(self) -> Iterator[tuple]:
+        if not os.path.isdir(self.chunks_dir):
+            return
+        for shard in sorted(os.listdir(self.chunks_dir)):
+            shard_dir = os.path.join(self.chunks_dir, shard)
+            for digest in os.listdir(shard_dir):
+                if not digest.endswith(".tmp"):
+                    yield digest, os.path.join(shard_dir, digest)
+
+    def _referenced(self) -> Dict[str, int]:
+        referenced = {}
+        for record in self.captures():
+            for digest, size in record["chunks"]:
+                referenced[digest] = size
+        return referenced
+
+    def gc(self, grace_seconds: float = GC_GRACE_SECONDS) -> dict:
+        """Usuwa fragmenty bez odwolan (starsze niz grace_seconds); zwraca liczbe i odzyskane bajty"""
+        referenced = self._referenced()
+        now = time.time()
+        deleted = reclaimed = 0
+        for digest, path in self._chunk_files():
+            if digest in referenced:
+                continue
+            stat = os.stat(path)
+            if now - stat.st_mtime < grace_seconds:
+                continue
+            os.remove(path)
+            deleted += 1
+            reclaimed += stat.st_size
+        return {"deleted_chunks": deleted, "reclaimed_bytes": reclaimed}
+
+    def stats(self) -> ArchiveStats:
+        stats = ArchiveStats()
+        referenced = {}
+        for record in self.captures():
+            stats.captures += 1
+            stats.logical_bytes += record["size"]
+            stats.chunk_refs += len(record["chunks"])
+            for digest, size in record["chunks"]:
+                referenced[digest] = size
+        stats.unique_chunks = len(referenced)
+        stats.unique_bytes = sum(referenced.values())
+        for digest, path in self._chunk_files():
+            stats.stored_bytes += os.path.getsize(path)
+            if digest not in referenced:
+                stats.unreferenced_chunks += 1
+        for day in self._days():
+            stats.stored_bytes += os.path.getsize(os.path.join(self.captures_dir, f"{day}.jsonl"))
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def print_stats(stats: ArchiveStats):
+    print(f"Zrzuty: {stats.captures}")
+    print(f"Tekst logicznie: {stats.logical_bytes / 1024 / 1024:,.1f} MB")
+    print(f"Fragmenty: {stats.chunk_refs} odwolan, {stats.unique_chunks} unikalnych "
+          f"({stats.unique_bytes / 1024 / 1024:,.1f} MB)")
+    print(f"Na dysku: {stats.stored_bytes / 1024 / 1024:,.1f} MB")
+    print(f"Deduplikacja: x{stats.dedup_ratio:.1f} | z kompresja: x{stats.total_ratio:.1f}")
+    if stats.unreferenced_chunks:
+        print(f"Fragmenty bez odwolan: {stats.unreferenced_chunks} (python src/page_archive.py gc)")
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    commands = ("add", "get", "list", "forget", "gc", "stats")
+    if not args or args[0] not in commands:
+        print(__doc__)
+        return 1
+
+    archive = PageArchive(_option(args, "--archive", ARCHIVE_DIR))
+    command = args.pop(0)
+
+    if command == "add":
+        remove = "--remove" in args
+        folders = [a for a in args if a != "--remove"]
+        if not folders:
+            print("Podaj folder ze zrzutami stron")
+            return 1
+        for folder in folders:
+            result = archive.add_folder(folder, remove)
+            print(f"{folder}: dodano {result['added']}, juz bylo {result['skipped']}, usunieto plikow {result['removed']}")
+        print_stats(archive.stats())
+    elif command == "get":
+        out = _option(args, "--out")
+        if not args:
+            print("Podaj nazwe zrzutu")
+            return 1
+        text = archive.get(page_stem(args[0]))
+        if out:
+            with open(out, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            print(text)
+    elif command == "list":
+        for record in archive.captures(_option(args, "--day")):
+            print(f"{record['stored_at']}  {record['size']:>9}  {len(record['chunks']):>4} fragm.  {record['name']}")
+    elif command == "forget":
+        days = _option(args, "--older-than")
+        if days is None:
+            print("Podaj --older-than DNI")
+            return 1
+        print(f"Zapomniano zrzutow: {archive.forget(int(days))} (miejsce zwolni gc)")
+    elif command == "gc":
+        result = archive.gc()
+        print(f"Usunieto fragmentow: {result['deleted_chunks']}, odzyskano {result['reclaimed_bytes'] / 1024 / 1024:,.1f} MB")
+    else:
+        print_stats(archive.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
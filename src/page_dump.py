@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Page Dump - zapis i odczyt zrzutow stron (plikow tekstowych ze scraperow)
+Scrapery pisza strone strumieniowo (naglowek, potem tekst strony) przez
+kompresor wybrany w scraping_config.page_compression:
+    - none: zwykly plik .txt (jak dotad, domyslnie),
+    - gzip: plik .txt.gz (biblioteka standardowa),
+    - zstd: plik .txt.zst (wymaga pakietu zstandard; bez niego - gzip).
+Poziom kompresji: page_compression_level (null = domyslny kompresora).
+
+Odczyt (read_page_text, list_pages) rozpoznaje format po rozszerzeniu, wiec
+ekstraktor i GUI czytaja stare pliki .txt i nowe skompresowane tak samo.
+Z page_store = segments strony trafiaja do segmentow (segment_store.py)
+zamiast do osobnych plikow - kompresja dotyczy wtedy tresci rekordu.
+Z page_layout = sharded plik / segment lezy w shardzie trasa / dzien / linia
+folderu sesji (page_shards.py).
+Statystyki zapisu (rozmiar przed/po, czas zapisu) liczone sa per sesja
+i trafiaja do logu oraz podsumowania sesji/rundy.
+"""
+
+import gzip
+import io
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd jest opcjonalny - bez pakietu zapis przechodzi na gzip
+    zstandard = None
+
+from page_shards import LAYOUTS, shard_dir
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+STORES = ("files", "segments")
+SUFFIXES = {"none": ".txt", "gzip": ".txt.gz", "zstd": ".txt.zst"}
+# Najpierw dluzsze rozszerzenia - ".txt.gz" nie moze zostac uznane za ".txt"
+PAGE_SUFFIXES = (".txt.zst", ".txt.gz", ".txt")
+
+# Kompresja tylko na zyczenie (page_compression) - domyslnie zwykle pliki .txt
+DEFAULT_COMPRESSION = "none"
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+# Tyle segmentow naraz otwartych przy page_layout = sharded (kazdy shard ma swoj segment)
+MAX_OPEN_SEGMENTS = 16
+
+
+def resolve_compression(compression: Optional[str], logger=None) -> str:
+    """Nazwa z configu -> dostepny kompresor (zstd bez pakietu zstandard -> gzip)"""
+    compression = (compression or "none").lower()
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Nieznana kompresja stron: {compression} (dostepne: {', '.join(COMPRESSIONS)})")
+    if compression == "zstd" and zstandard is None:
+        if logger:
+            logger.warning("Brak pakietu zstandard (pip install zstandard) - zrzuty stron kompresowane gzip")
+        return "gzip"
+    return compression
+
+
+def is_page_file(name: str) -> bool:
+    return name.endswith(PAGE_SUFFIXES)
+
+
+def page_stem(name: str) -> str:
+    """Nazwa pliku bez rozszerzenia zrzutu (.txt / .txt.gz / .txt.zst)"""
+    for suffix in PAGE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def list_pages(folder: str) -> List[str]:
+    """Nazwy zrzutow stron w folderze (wszystkie formaty), posortowane"""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if is_page_file(name))
+
+
+def compress_bytes(data: bytes, compression: str, level: Optional[int] = None) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=level if level is not None else DEFAULT_LEVELS["gzip"])
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level if level is not None else DEFAULT_LEVELS["zstd"]).compress(data)
+    return data
+
+
+def decompress_bytes(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Rekord wymaga pakietu zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def header_fields(text: str) -> dict:
+    """Pola naglowka zrzutu ('Route: WAW - ICN' ...) az do linii '====='"""
+    fields = {}
+    for line in text.splitlines():
+        if line.startswith("====="):
+            break
+        key, separator, value = line.partition(": ")
+        if separator:
+            fields[key.strip()] = value.strip()
+    return fields
+
+
+def read_page_text(path: str) -> str:
+    """Tekst zrzutu niezaleznie od formatu (zwykly, gzip, zstd)"""
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Plik {os.path.basename(path)} wymaga pakietu zstandard (pip install zstandard)")
+        with open(path, 'rb') as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                return io.TextIOWrapper(reader, encoding='utf-8').read()
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@contextmanager
+def open_page_bytes(path: str):
+    """Tresc zrzutu jako bajty UTF-8 bez dekodowania do str (wyszukiwanie regexami bajtowymi).
+
+    Zwykly .txt jest mapowany (mmap) - strony nie kopiuje sie do pamieci procesu,
+    skompresowany jest rozpakowywany do bytes. Bufor jest wazny tylko wewnatrz with.
+    """
+    if path.endswith((".gz", ".zst")):
+        if path.endswith(".gz"):
+            with gzip.open(path, 'rb') as f:
+                yield f.read()
+            return
+        if zstandard is None:
+            raise RuntimeError(f"Plik {os.path.basename(path)} wymaga pakietu zstandard (pip install zstandard)")
+        with open(path, 'rb') as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                yield reader.read()
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # pustego pliku nie da sie zmapowac
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+# ---------------------------------------------------------------------------
+# Zapis
+# ---------------------------------------------------------------------------
+
+@dataclass
+class DumpStats:
+    """Statystyki zapisu zrzutow: strony, bajty tekstu i na dysku, czas zapisu"""
+    pages: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    write_seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 0.0
+
+    def add(self, raw_bytes: int, stored_bytes: int, seconds: float):
+        self.pages += 1
+        self.raw_bytes += raw_bytes
+        self.stored_bytes += stored_bytes
+        self.write_seconds += seconds
+
+    def describe(self, compression: str, level: Optional[int]) -> dict:
+        return {
+            "compression": compression,
+            "level": level,
+            "pages": self.pages,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "ratio": round(self.ratio, 2),
+            "write_seconds": round(self.write_seconds, 3)
+        }
+
+
+class PageDumper:
+    """Strumieniowy zapis zrzutow stron z kompresja z configu i statystykami sesji"""
+
+    def __init__(self, compression: Optional[str] = DEFAULT_COMPRESSION, level: Optional[int] = None, logger=None,
+                 store: str = "files", segment_max_mb: Optional[float] = None, layout: str = "flat"):
+        self.compression = resolve_compression(compression, logger)
+        self.level = level if level is not None else DEFAULT_LEVELS.get(self.compression)
+        self.logger = logger
+        self.stats = DumpStats()
+        if store not in STORES:
+            raise ValueError(f"Nieznany page_store: {store} (dostepne: {', '.join(STORES)})")
+        self.store = store
+        self.segment_max_mb = segment_max_mb
+        if layout not in LAYOUTS:
+            raise ValueError(f"Nieznany page_layout: {layout} (dostepne: {', '.join(LAYOUTS)})")
+        self.layout = layout
+        # Otwarte segmenty per folder (page_store = segments)
+        self.segment_writers = {}
+
+    @classmethod
+    def from_config(cls, scraping_config: dict, logger=None) -> "PageDumper":
+        return cls(scraping_config.get("page_compression", DEFAULT_COMPRESSION),
+                   scraping_config.get("page_compression_level"), logger,
+                   scraping_config.get("page_store", "files"), scraping_config.get("segment_max_mb"),
+                   scraping_config.get("page_layout", "flat"))
+
+    def path_for(self, folder: str, base_name: str) -> str:
+        return os.path.join(folder, f"{base_name}{SUFFIXES[self.compression]}")
+
+    def _open(self, path: str):
+        if self.compression == "gzip":
+            return gzip.open(path, 'wt', encoding='utf-8', compresslevel=self.level)
+        if self.compression == "zstd":
+            raw = open(path, 'wb')
+            writer = zstandard.ZstdCompressor(level=self.level).stream_writer(raw, closefd=True)
+            return io.TextIOWrapper(writer, encoding='utf-8')
+        return open(path, 'w', encoding='utf-8')
+
+    def write(self, folder: str, base_name: str, parts: Iterable[str], route: Optional[str] = None,
+              airline: Optional[str] = None) -> str:
+        """Zapisuje czesci tekstu (naglowek, strona...) kolejno do jednego pliku; zwraca sciezke.
+
+        Przy page_layout = sharded strona z trasa trafia do shardu folder/trasa/dzien/linia.
+        """
+        if self.layout == "sharded" and route:
+            folder = shard_dir(folder, route, date.today(), airline)
+            os.makedirs(folder, exist_ok=True)
+        if self.store == "segments":
+            return self._write_segment(folder, base_name, parts)
+        path = self.path_for(folder, base_name)
+        started = time.monotonic()
+        raw_bytes = 0
+        with self._open(path) as f:
+            for part in parts:
+                f.write(part)
+                raw_bytes += len(part.encode('utf-8'))
+        self.stats.add(raw_bytes, os.path.getsize(path), time.monotonic() - started)
+        return path
+
+    def _write_segment(self, folder: str, base_name: str, parts: Iterable[str]) -> str:
+        from segment_store import SegmentWriter
+
+        writer = self.segment_writers.pop(folder, None)
+        if writer is None:
+            if len(self.segment_writers) >= MAX_OPEN_SEGMENTS:
+                # Najdawniej uzywany segment (shardy) - zamkniety, kolejny zapis otworzy nowy
+                self.segment_writers.pop(next(iter(self.segment_writers))).close()
+            writer = SegmentWriter(folder, self.segment_max_mb, self.compression, self.level, logger=self.logger)
+        self.segment_writers[folder] = writer
+        started = time.monotonic()
+        text = "".join(parts)
+        ref = writer.append(f"{base_name}.txt", text, header_fields(text))
+        self.stats.add(len(text.encode('utf-8')), ref.stored_bytes, time.monotonic() - started)
+        return ref.location
+
+    def close(self):
+        for writer in self.segment_writers.values():
+            writer.close()
+        self.segment_writers = {}
+
+    def take_stats(self) -> dict:
+        """Statystyki od poprzedniego wywolania (sesja / runda) - z logiem; licznik od zera"""
+        stats, self.stats = self.stats, DumpStats()
+        if self.logger and stats.pages:
+            self.logger.info(f"Zrzuty stron ({self.compression}): {stats.pages} plikow, "
+                             f"{stats.raw_bytes / 1024:,.0f} KB -> {stats.stored_bytes / 1024:,.0f} KB "
+                             f"(x{stats.ratio:.1f}), zapis {stats.write_seconds:.2f}s")
+        return dict(stats.describe(self.compression, self.level), store=self.store)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Page Shards - podzial folderu sesji na shardy trasa / dzien / linia
+Przy page_layout = sharded scrapery zapisuja strony nie do jednego folderu
+(rolling_mode ma po miesiacach setki tysiecy plikow), tylko do:
+
+    rolling_mode/WAW_ICN/2026-10-19/Turkish/R001_WAW_ICN_Turkish_..._20261019_143022_123.txt
+    rolling_mode/round_001_results.jsonl   logi i podsumowania zostaja w folderze sesji
+
+Dzien to dzien pobrania strony. Odczyt (page_folders) schodzi tylko do
+potrzebnych shardow: podany dzien / trasa / linia sa sprawdzane wprost,
+bez listowania reszty, wiec strony jednego dnia listuje sie w czasie
+zaleznym od tego dnia, a nie od calej historii. Strony zapisane wczesniej
+plasko (page_layout = flat) leza w folderze sesji i sa czytane jak dotad.
+
+Uzycie:
+    python src/page_shards.py days <folder_sesji> [--route WAW_ICN]
+    python src/page_shards.py list <folder_sesji> [--day 2026-10-19] [--since D] [--until D] [--route R] [--airline L]
+"""
+
+import os
+import re
+import sys
+from datetime import date
+from typing import Iterable, List, Optional, Union
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+LAYOUTS = ("flat", "sharded")
+
+# WAW_ICN, WAW-WMI_AKL (grupa lotnisk) - jak poczatek nazwy strony
+ROUTE_PATTERN = re.compile(r'^[A-Z]{3}(?:-[A-Z]{3})*_[A-Z]{3}(?:-[A-Z]{3})*$')
+DAY_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def shard_dir(folder: str, route: str, day: Union[date, str], airline: Optional[str]) -> str:
+    """Folder shardu strony: <folder>/<trasa>/<YYYY-MM-DD>/<linia>"""
+    day = day.isoformat() if isinstance(day, date) else day
+    return os.path.join(folder, route, day, airline or "ALL")
+
+
+def _subdirs(path: str, pattern=None, wanted: Optional[Iterable[str]] = None) -> List[str]:
+    """Nazwy podfolderow; podane wanted sa sprawdzane wprost (bez listowania folderu)"""
+    if wanted is not None:
+        return sorted(name for name in set(wanted) if os.path.isdir(os.path.join(path, name)))
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries
+                          if entry.is_dir() and (pattern is None or pattern.match(entry.name)))
+    except OSError:
+        return []
+
+
+def is_sharded(folder: str) -> bool:
+    return bool(_subdirs(folder, ROUTE_PATTERN))
+
+
+def shard_routes(folder: str) -> List[str]:
+    return _subdirs(folder, ROUTE_PATTERN)
+
+
+def shard_days(folder: str, routes: Optional[Iterable[str]] = None) -> List[str]:
+    """Dni z danymi (nazwy folderow dni wszystkich / podanych tras - bez czytania stron)"""
+    days = set()
+    for route in _subdirs(folder, ROUTE_PATTERN, routes):
+        days.update(_subdirs(os.path.join(folder, route), DAY_PATTERN))
+    return sorted(days)
+
+
+def shard_folders(folder: str, routes: Optional[Iterable[str]] = None, days: Optional[Iterable[str]] = None,
+                  since: Optional[str] = None, until: Optional[str] = None,
+                  airlines: Optional[Iterable[str]] = None) -> List[str]:
+    """Foldery shardow pasujace do filtrow (dni jako YYYY-MM-DD, since / until wlacznie)"""
+    folders = []
+    for route in _subdirs(folder, ROUTE_PATTERN, routes):
+        route_path = os.path.join(folder, route)
+        for day in _subdirs(route_path, DAY_PATTERN, days):
+            if (since and day < since) or (until and day > until):
+                continue
+            day_path = os.path.join(route_path, day)
+            folders.extend(os.path.join(day_path, airline) for airline in _subdirs(day_path, None, airlines))
+    return folders
+
+
+def page_folders(folder: str, routes: Optional[Iterable[str]] = None, days: Optional[Iterable[str]] = None,
+                 since: Optional[str] = None, until: Optional[str] = None,
+                 airlines: Optional[Iterable[str]] = None) -> List[str]:
+    """Foldery ze stronami sesji: sam folder (strony plaskie) i shardy.
+
+    Strony plaskie nie maja shardu dnia / trasy, wiec przy jakimkolwiek
+    filtrze zwracane sa tylko pasujace shardy.
+    """
+    filtered = any(value is not None for value in (routes, days, since, until, airlines))
+    flat = [] if filtered else [folder]
+    return flat + shard_folders(folder, routes, days, since, until, airlines)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def filters_from_args(args: list) -> dict:
+    """Filtry shardow z argumentow: --day, --since, --until, --route, --airline (None - bez filtra)"""
+    day, route, airline = _option(args, "--day"), _option(args, "--route"), _option(args, "--airline")
+    return {
+        "days": [day] if day else None,
+        "since": _option(args, "--since"),
+        "until": _option(args, "--until"),
+        "routes": [route] if route else None,
+        "airlines": [airline] if airline else None,
+    }
+
+
+def main(argv: list) -> int:
+    if len(argv) < 2 or argv[0] not in ("days", "list"):
+        print(__doc__)
+        return 1
+    folder = argv[1]
+
+    if argv[0] == "days":
+        route = _option(argv, "--route")
+        for day in shard_days(folder, [route] if route else None):
+            print(f"  {day}")
+        return 0
+
+    from segment_store import list_session_refs
+    refs = list_session_refs(folder, **filters_from_args(argv))
+    for ref in refs:
+        print(f"  {os.path.relpath(ref.location, folder)}")
+    print(f"Razem: {len(refs)} stron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Preflight - walidacja zadan przed uruchomieniem przegladarki
+Wspolny etap dla siatki extended, listy lotow z Excela i watchlisty URLi:
+kazde nieprawidlowe zadanie kosztowaloby pelne ladowanie strony (15-20s)
+tylko po to, zeby Kayak pokazal blad albo pusta liste.
+
+Reguly:
+    - kody lotnisk: format IATA i obecnosc we wbudowanym indeksie (+ extra_airports),
+    - daty: poprawny format, wylot nie w przeszlosci, powrot nie przed wylotem,
+      wylot nie dalej niz max_days_ahead (Kayak nie sprzedaje dalej niz ~11 miesiecy),
+    - linia: klucz znany w configu (Excel) albo kod IATA linii (URL).
+Bledy usuwaja zadanie, ostrzezenia (flagi) tylko je oznaczaja. Liczniki
+trafiaja do podsumowan sesji i rund.
+
+Konfiguracja (scraping_config.preflight albo klucz "preflight" w watchliscie):
+    "extra_airports": ["SZY"]     - kody spoza indeksu uznawane za poprawne
+    "unknown_airport": "drop"     - albo "flag" (zostaw, tylko oznacz)
+    "max_days_ahead": 361
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from offer_cards import AIRLINE_NAMES
+
+# ---------------------------------------------------------------------------
+# Wbudowany indeks lotnisk IATA (kraj -> kody lotnisk i kody miast Kayak)
+# ---------------------------------------------------------------------------
+
+_AIRPORT_DATA = """
+PL WAW WMI KRK GDN KTW WRO POZ RZE LUZ SZZ BZG LCJ SZY RDO IEG
+DE FRA MUC BER DUS HAM CGN STR HAJ NUE LEJ DRS BRE DTM FMM HHN NRN FKB PAD SCN FDH
+GB LON LHR LGW STN LTN LCY SEN MAN BHX EDI GLA BRS NCL LPL LBA EMA ABZ BFS BHD INV
+IE DUB ORK SNN NOC
+FR PAR CDG ORY BVA NCE LYS MRS TLS BOD NTE MPL BIQ AJA BIA
+NL AMS EIN RTM GRQ MST
+BE BRU CRL
+LU LUX
+CH ZRH GVA BSL
+AT VIE SZG INN GRZ LNZ
+DK CPH BLL AAL
+SE STO ARN GOT BMA NYO MMX
+NO OSL TRF BGO SVG TRD TOS BOO
+FI HEL RVN OUL TMP
+IS REK KEF
+EE TLL
+LV RIX
+LT VNO KUN PLQ
+ES MAD BCN AGP ALC PMI VLC SVQ IBZ TFS TFN LPA ACE FUE BIO GRX MAH SCQ
+PT LIS OPO FAO FNC PDL
+IT ROM FCO CIA MIL MXP LIN BGY VCE TSF NAP BLQ PSA FLR CTA PMO BRI CAG OLB TRN VRN
+GR ATH SKG HER RHO CFU CHQ JTR JMK KGS ZTH EFL
+MT MLA
+CY LCA PFO
+CZ PRG BRQ OSR
+SK BTS KSC
+HU BUD DEB
+SI LJU
+HR ZAG SPU DBV ZAD PUY
+RS BEG INI
+BA SJJ
+ME TGD TIV
+MK SKP OHD
+AL TIA
+XK PRN
+BG SOF VAR BOJ
+RO BUH OTP CLJ TSR IAS SBZ
+MD KIV
+UA KBP IEV LWO ODS
+BY MSQ
+TR IST SAW ESB AYT ADB DLM BJV
+GE TBS KUT BUS
+AM EVN
+AZ GYD
+RU MOW SVO DME VKO LED
+AE DXB DWC AUH SHJ
+QA DOH
+BH BAH
+KW KWI
+OM MCT SLL
+SA RUH JED DMM
+JO AMM AQJ
+IL TLV
+LB BEY
+EG CAI HRG SSH RMF LXR
+MA CMN RAK AGA TNG FEZ
+TN TUN DJE NBE MIR
+DZ ALG
+ET ADD
+KE NBO MBA
+TZ JRO ZNZ DAR
+UG EBB
+RW KGL
+ZA JNB CPT DUR
+NA WDH
+NG LOS ABV
+GH ACC
+SN DSS DKR
+MU MRU
+SC SEZ
+MG TNR
+AO LAD
+CV SID
+IN DEL BOM BLR MAA CCU HYD COK GOI AMD TRV
+LK CMB
+MV MLE
+NP KTM
+BD DAC
+PK ISB KHI LHE
+TH BKK DMK HKT CNX USM KBV
+VN SGN HAN DAD CXR PQC
+KH PNH REP
+LA VTE
+MM RGN
+MY KUL PEN BKI LGK
+SG SIN
+ID JKT CGK DPS
+PH MNL CEB
+HK HKG
+MO MFM
+TW TPE TSA KHH
+CN BJS PEK PKX SHA PVG CAN SZX CTU TFU CKG XIY KMG HGH NKG XMN WUH CSX TAO
+KR SEL ICN GMP PUS CJU
+JP TYO NRT HND OSA KIX ITM NGO CTS FUK OKA
+MN ULN
+KZ ALA NQZ
+UZ TAS
+AU SYD MEL BNE PER ADL CBR OOL CNS DRW HBA
+NZ AKL WLG CHC ZQN
+FJ NAN
+PF PPT
+NC NOU
+US NYC JFK EWR LGA BOS WAS IAD DCA BWI PHL ATL MIA FLL MCO TPA CHI ORD MDW DFW IAH DEN PHX LAS LAX SFO SJC OAK SAN SEA PDX SLC MSP DTW CLT MSY BNA AUS HNL OGG ANC
+CA YTO YYZ YMQ YUL YVR YYC YOW YEG YHZ
+MX MEX CUN GDL SJD PVR
+CU HAV VRA
+DO PUJ SDQ
+JM MBJ
+BS NAS
+PR SJU
+AW AUA
+CW CUR
+PA PTY
+CR SJO LIR
+GT GUA
+SV SAL
+CO BOG MDE CTG
+EC UIO GYE
+PE LIM CUZ
+CL SCL
+AR BUE EZE AEP
+UY MVD
+BR SAO GRU CGH RIO GIG BSB SSA REC FOR
+PY ASU
+BO VVI LPB
+VE CCS
+"""
+
+# Kod IATA -> kraj; wyszukiwanie O(1)
+AIRPORTS: Dict[str, str] = {
+    code: line.split()[0]
+    for line in _AIRPORT_DATA.strip().splitlines()
+    for code in line.split()[1:]
+}
+
+IATA_AIRPORT_PATTERN = re.compile(r'^[A-Z]{3}$')
+IATA_AIRLINE_PATTERN = re.compile(r'^[A-Z0-9]{2}$')
+
+# Kayak sprzedaje loty na ok. 11 miesiecy do przodu
+MAX_DAYS_AHEAD = 361
+
+
+# ---------------------------------------------------------------------------
+# Raport
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Issue:
+    """Problem z zadaniem: regula, opis i czy zadanie jest usuwane"""
+    rule: str
+    message: str
+    drop: bool = True
+
+
+class PreflightReport:
+    """Liczniki sprawdzonych, usunietych i oznaczonych zadan (per regula)"""
+
+    def __init__(self):
+        self.checked = 0
+        self.dropped: Counter = Counter()
+        self.flagged: Counter = Counter()
+        self.dropped_jobs = 0
+        self.flagged_jobs = 0
+
+    def add(self, issues: List[Issue], count: int = 1) -> bool:
+        """Zlicza wynik walidacji `count` zadan; True gdy zadania zostaja"""
+        self.checked += count
+        dropping = any(issue.drop for issue in issues)
+        for issue in issues:
+            (self.dropped if dropping else self.flagged)[issue.rule] += count
+        if dropping:
+            self.dropped_jobs += count
+        elif issues:
+            self.flagged_jobs += count
+        return not dropping
+
+    def describe(self) -> dict:
+        return {
+            "checked": self.checked,
+            "dropped": self.dropped_jobs,
+            "flagged": self.flagged_jobs,
+            "dropped_by_rule": dict(self.dropped),
+            "flagged_by_rule": dict(self.flagged)
+        }
+
+    @classmethod
+    def from_describe(cls, data: dict) -> "PreflightReport":
+        """Odtworzenie raportu z describe() (np. z cache skompilowanej listy)"""
+        report = cls()
+        report.checked = data.get("checked", 0)
+        report.dropped_jobs = data.get("dropped", 0)
+        report.flagged_jobs = data.get("flagged", 0)
+        report.dropped.update(data.get("dropped_by_rule") or {})
+        report.flagged.update(data.get("flagged_by_rule") or {})
+        return report
+
+    def log_line(self) -> str:
+        rules = ", ".join(f"{rule}: {count}" for rule, count in (self.dropped + self.flagged).most_common())
+        return (f"Walidacja: {self.checked} zadan, usunieto {self.dropped_jobs}, oznaczono {self.flagged_jobs}"
+                + (f" ({rules})" if rules else ""))
+
+
+# ---------------------------------------------------------------------------
+# Reguly
+# ---------------------------------------------------------------------------
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+class Preflight:
+    """Walidator zadan: lotniska z indeksu IATA, reguly dat i klucze linii"""
+
+    def __init__(self, extra_airports: Iterable[str] = (), unknown_airport: str = "drop",
+                 max_days_ahead: int = MAX_DAYS_AHEAD, today: Optional[date] = None):
+        self.extra_airports = {str(code).strip().upper() for code in extra_airports}
+        self.unknown_airport_drops = unknown_airport != "flag"
+        self.max_days_ahead = max_days_ahead
+        self.today = today
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> "Preflight":
+        cfg = cfg or {}
+        return cls(
+            extra_airports=cfg.get("extra_airports") or (),
+            unknown_airport=cfg.get("unknown_airport", "drop"),
+            max_days_ahead=cfg.get("max_days_ahead", MAX_DAYS_AHEAD)
+        )
+
+    def known_airport(self, code: str) -> bool:
+        return code in AIRPORTS or code in self.extra_airports
+
+    def check_airports(self, codes: Iterable[str], role: str) -> List[Issue]:
+        """Kody lotnisk (lista po rozwinieciu grup); role: wylot/przylot"""
+        issues = []
+        for code in codes:
+            code = str(code).strip().upper()
+            if not IATA_AIRPORT_PATTERN.match(code):
+                issues.append(Issue("airport_format", f"Nieprawidlowy kod lotniska ({role}): '{code}'"))
+            elif not self.known_airport(code):
+                issues.append(Issue("unknown_airport", f"Nieznane lotnisko ({role}): {code}", self.unknown_airport_drops))
+        return issues
+
+    def check_route(self, origin_codes: Iterable[str], destination_codes: Iterable[str]) -> List[Issue]:
+        origin_codes, destination_codes = list(origin_codes), list(destination_codes)
+        issues = self.check_airports(origin_codes, "wylot") + self.check_airports(destination_codes, "przylot")
+        for codes, role in ((origin_codes, "wylot"), (destination_codes, "przylot")):
+            if not codes:
+                issues.append(Issue("airport_format", f"Brak lotniska ({role})"))
+        if set(origin_codes) & set(destination_codes):
+            issues.append(Issue("same_airport", f"Lotnisko wylotu i przylotu takie samo: {origin_codes} - {destination_codes}"))
+        return issues
+
+    def check_dates(self, departure, return_day=None) -> List[Issue]:
+        """Daty lotu; return_day pusty/None - lot w jedna strone"""
+        today = self.today or date.today()
+        departure_date = _as_date(departure)
+        if departure_date is None:
+            return [Issue("date_format", f"Nieprawidlowa data wylotu: '{departure}'")]
+
+        issues = []
+        if departure_date < today:
+            issues.append(Issue("past_departure", f"Wylot w przeszlosci: {departure_date}"))
+        elif (departure_date - today).days > self.max_days_ahead:
+            issues.append(Issue("too_far_ahead", f"Wylot za {(departure_date - today).days} dni (limit {self.max_days_ahead})"))
+
+        if return_day not in (None, ""):
+            return_date = _as_date(return_day)
+            if return_date is None:
+                issues.append(Issue("date_format", f"Nieprawidlowa data powrotu: '{return_day}'"))
+            elif return_date < departure_date:
+                issues.append(Issue("return_before_departure", f"Powrot {return_date} przed wylotem {departure_date}"))
+        return issues
+
+    def date_rule_masks(self, departures, returns) -> Dict[str, object]:
+        """Reguly check_dates na kolumnach dat (pandas datetime64) - maska wierszy per regula"""
+        today = datetime.combine(self.today or date.today(), datetime.min.time())
+        days_ahead = (departures - today).dt.days
+        return {
+            "past_departure": departures < today,
+            "too_far_ahead": days_ahead > self.max_days_ahead,
+            "return_before_departure": returns < departures
+        }
+
+    def first_valid_departure(self, earliest_departure: str) -> str:
+        """Poczatek okna dat przesuniety na dzis, jesli okno zaczyna sie w przeszlosci"""
+        start = _as_date(earliest_departure)
+        today = self.today or date.today()
+        if start is None or start >= today:
+            return earliest_departure
+        return today.isoformat()
+
+    def last_valid_departure(self) -> date:
+        """Ostatni dzien wylotu w limicie max_days_ahead"""
+        return (self.today or date.today()) + timedelta(days=self.max_days_ahead)
+
+    def check_airline_key(self, airline_key: str, known_keys: Iterable[str]) -> List[Issue]:
+        if airline_key not in known_keys:
+            return [Issue("unknown_airline", f"Nieznana linia: '{airline_key}'")]
+        return []
+
+    def check_airline_code(self, code: str) -> List[Issue]:
+        """Kod linii z filtra URLa: zly format usuwa, kod spoza AIRLINE_NAMES tylko oznacza"""
+        if not code:
+            return []
+        if not IATA_AIRLINE_PATTERN.match(code):
+            return [Issue("airline_format", f"Nieprawidlowy kod linii: '{code}'")]
+        if code not in AIRLINE_NAMES:
+            return [Issue("unknown_airline", f"Linia {code} spoza listy znanych linii", drop=False)]
+        return []
+
+    def check_flight(self, origin_codes, destination_codes, departure, return_day=None,
+                     airline_key: Optional[str] = None, known_keys: Iterable[str] = ()) -> List[Issue]:
+        """Wszystkie reguly dla jednego lotu"""
+        issues = self.check_route(origin_codes, destination_codes) + self.check_dates(departure, return_day)
+        if airline_key is not None:
+            issues += self.check_airline_key(airline_key, known_keys)
+        return issues
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Price Store - lokalna historia cen w SQLite (output/price_history.sqlite)
+Wszystkie zrodla pisza do jednej bazy o znormalizowanym schemacie:
+    searches  jedno pobranie ceny: zrodlo, trasa, daty, dlugosc pobytu, filtr linii, czas
+    offers    oferty znalezione w pobraniu (cena, linia, pozycja na stronie)
+    legs      odcinki oferty (tam / powrot): godziny, czas podrozy i lotu w minutach
+    stops     przesiadki odcinka (lotnisko, minuty)
+Indeksy na trasie + datach, dlugosci pobytu, linii i czasie pobrania, wiec
+typowe pytania ("najtaniej WAW-ICN Turkish, pobyt 20 dni, ostatni miesiac")
+nie wymagaja ponownego parsowania CSV i plikow stron.
+
+Zapis idzie partiami: add_* dopisuje do bufora, a flush() zapisuje bufor
+w jednej transakcji (automatycznie co batch_size pobran). Blad SQLite
+(np. baza zablokowana przez inny proces dluzej niz timeout) nie przerywa
+scrapera: transakcja jest wycofana, a partia wraca do bufora. Zrodla:
+    - url_watcher:  backend "sqlite" w result_sink (partie z bufora wynikow),
+    - scrapery:     kazdy wynik z logu wynikow (scraping_config.price_history_db),
+    - ekstraktor:   oferty ze szczegolami odcinkow i przesiadek.
+Pobranie ma klucz (zrodlo, ref, filtr linii) - ponowny import tego samego
+pliku strony albo CSV nie dubluje danych.
+
+Uzycie:
+    python src/price_store.py import <folder|plik.csv|plik.jsonl> [--db PLIK]
+    python src/price_store.py cheapest WAW ICN [--airline Turkish] [--stay 20] [--days 30] [--limit 10]
+    python src/price_store.py stats [--db PLIK]
+"""
+
+import csv
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+DB_PATH = "output/price_history.sqlite"
+
+# Pobrania zapisywane jedna transakcja po tylu wpisach w buforze
+BATCH_SIZE = 200
+# Gdy baza jest zablokowana, bufor czeka na kolejny zapis - najwyzej tyle pobran (najstarsze odpadaja)
+MAX_PENDING = 50 * BATCH_SIZE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT,
+    return_date TEXT,
+    stay_days INTEGER,
+    passengers INTEGER,
+    airline_filter TEXT NOT NULL DEFAULT '',
+    success INTEGER NOT NULL,
+    error TEXT,
+    UNIQUE (source, ref, airline_filter)
+);
+CREATE INDEX IF NOT EXISTS searches_route ON searches (origin, destination, departure_date, return_date);
+CREATE INDEX IF NOT EXISTS searches_stay ON searches (origin, destination, stay_days, scraped_at);
+CREATE INDEX IF NOT EXISTS searches_scraped ON searches (scraped_at);
+
+CREATE TABLE IF NOT EXISTS offers (
+    id INTEGER PRIMARY KEY,
+    search_id INTEGER NOT NULL REFERENCES searches (id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL DEFAULT 1,
+    airline TEXT,
+    origin_airport TEXT,
+    destination_airport TEXT,
+    price_per_person REAL,
+    total_price REAL
+);
+CREATE INDEX IF NOT EXISTS offers_search ON offers (search_id);
+CREATE INDEX IF NOT EXISTS offers_airline ON offers (airline, total_price);
+CREATE INDEX IF NOT EXISTS offers_price ON offers (total_price);
+
+CREATE TABLE IF NOT EXISTS legs (
+    id INTEGER PRIMARY KEY,
+    offer_id INTEGER NOT NULL REFERENCES offers (id) ON DELETE CASCADE,
+    direction TEXT NOT NULL,
+    departure_time TEXT,
+    arrival_time TEXT,
+    travel_minutes INTEGER,
+    flight_minutes INTEGER,
+    stops INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS legs_offer ON legs (offer_id);
+
+CREATE TABLE IF NOT EXISTS stops (
+    leg_id INTEGER NOT NULL REFERENCES legs (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    airport TEXT NOT NULL,
+    minutes INTEGER
+);
+CREATE INDEX IF NOT EXISTS stops_leg ON stops (leg_id);
+CREATE INDEX IF NOT EXISTS stops_airport ON stops (airport);
+"""
+
+
+def duration_minutes(text: Optional[str]) -> Optional[int]:
+    """'15 h 05 min' -> 905; brak / inny format -> None"""
+    match = re.match(r'\s*(\d+)\s*h\s*(\d+)\s*min', text or "")
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+
+def stay_days(departure_date: Optional[str], return_date: Optional[str]) -> Optional[int]:
+    try:
+        return (datetime.strptime(return_date, "%Y-%m-%d") - datetime.strptime(departure_date, "%Y-%m-%d")).days
+    except (TypeError, ValueError):
+        return None
+
+
+def scrape_time(timestamp: Optional[str]) -> str:
+    """Czas pobrania jako 'YYYY-MM-DD HH:MM:SS' - ze scraperow (20250623_143022_123), watchera i ISO"""
+    if not timestamp:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stamp = re.match(r'(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})', timestamp)
+    if stamp:
+        return "{}-{}-{} {}:{}:{}".format(*stamp.groups())
+    return timestamp[:19].replace("T", " ")
+
+
+class PriceStore:
+    """Baza historii cen z buforem zapisu (jedna transakcja na partie)"""
+
+    def __init__(self, path: str = DB_PATH, batch_size: int = BATCH_SIZE, logger=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.logger = logger
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Kilka procesow (scrapery, watcher) pisze do tej samej bazy - WAL i czekanie na blokade
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.pending = []
+        self.written = 0
+        # Automatyczny zapis przy tylu pobraniach w buforze (po bledzie - dopiero po kolejnej partii)
+        self.flush_at = batch_size
+
+    # -- dopisywanie do bufora ----------------------------------------------
+
+    def add_search(self, source: str, ref: str, scraped_at: Optional[str], origin: str, destination: str,
+                   departure_date: Optional[str], return_date: Optional[str], passengers: Optional[int] = None,
+                   airline_filter: str = "", success: bool = True, error: Optional[str] = None,
+                   offers: Sequence[dict] = ()):
+        """Pobranie z ofertami; oferta: rank, airline, lotniska, ceny i legs [{direction, ..., stops}]"""
+        self.pending.append((
+            (source, ref, scrape_time(scraped_at), origin, destination, departure_date or None,
+             return_date or None, stay_days(departure_date, return_date), passengers or None,
+             airline_filter or "", int(bool(success)), error),
+            list(offers)))
+        if len(self.pending) >= self.flush_at:
+            self.flush()
+
+    def add_result(self, source: str, result, origin: str, destination: str, airline_key: str,
+                   departure_date: str, return_date: str):
+        """Wynik scrapera (TextResult): pobranie + oferta linii z filtra, jesli jest cena"""
+        offers = []
+        if result.success and (result.total_price or result.price_per_person):
+            offers.append({"airline": airline_key, "origin_airport": result.origin_airport,
+                           "destination_airport": result.destination_airport,
+                           "price_per_person": result.price_per_person, "total_price": result.total_price})
+        self.add_search(source, result.text_path or f"{result.url}@{result.timestamp}", result.timestamp,
+                        origin, destination, departure_date, return_date, result.request.passengers,
+                        airline_key, result.success, result.error_message, offers)
+
+    def add_watcher_row(self, row: dict):
+        """Wiersz url_watcher (jak w prices_YYYYMMDD.csv)"""
+        price = row.get("total_price") or row.get("price_per_person")
+        offers = []
+        if row.get("status") == "ok" and price not in (None, ""):
+            offers.append({"airline": row.get("airline_code") or None,
+                           "price_per_person": _float(row.get("price_per_person")),
+                           "total_price": _float(row.get("total_price"))})
+        self.add_search("url_watcher", f"{row.get('url')}@{row.get('timestamp')}", row.get("timestamp"),
+                        row.get("origin", ""), row.get("destination", ""), row.get("departure_date"),
+                        row.get("return_date"), _int(row.get("passengers")), row.get("airline_code") or "",
+                        row.get("status") == "ok", row.get("error") or None, offers)
+
+    def add_extracted(self, offers: Iterable, source: str = "extractor"):
+        """Oferty ekstraktora (SimpleOffer) - pobranie na plik strony, odcinki i przesiadki"""
+        by_page = {}
+        for offer in offers:
+            by_page.setdefault(offer.filename, []).append(offer)
+        for filename, page_offers in by_page.items():
+            first = page_offers[0]
+            stamp = re.search(r'_(\d{8}_\d{6})_\d+\.txt', filename)
+            self.add_search(source, filename, stamp.group(1) if stamp else None, first.departure_airport,
+                            first.destination_airport, first.departure_date, first.return_date, airline_filter=first.airline_filter,
+                            offers=[_extracted_offer(offer) for offer in page_offers])
+
+    # -- zapis -----------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Zapisuje bufor w jednej transakcji; zwraca liczbe nowych pobran (duplikaty pomijane).
+
+        Przy bledzie SQLite partia wraca do bufora (ponowienie przy kolejnym flush) i zwracane jest 0.
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return 0
+        try:
+            added = self._write(pending)
+        except sqlite3.Error as e:
+            self.pending = pending + self.pending
+            dropped = len(self.pending) - MAX_PENDING
+            if dropped > 0:
+                del self.pending[:dropped]
+            self.flush_at = len(self.pending) + self.batch_size
+            self._warn(f"Historia cen: zapis {len(pending)} pobran nieudany ({e}) - ponowie przy kolejnym zapisie"
+                       + (f", pominieto {dropped} najstarszych" if dropped > 0 else ""))
+            return 0
+        self.written += added
+        self.flush_at = self.batch_size
+        return added
+
+    def _warn(self, message: str):
+        if self.logger:
+            self.logger.warning(message)
+        else:
+            print(message, file=sys.stderr)
+
+    def _write(self, pending: list) -> int:
+        """Jedna transakcja (wycofana w calosci przy bledzie)"""
+        started = time.monotonic()
+        added = 0
+        with self.db:
+            for search, offers in pending:
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO searches (source, ref, scraped_at, origin, destination, departure_date, "
+                    "return_date, stay_days, passengers, airline_filter, success, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", search)
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                search_id = cursor.lastrowid
+                for rank, offer in enumerate(offers, 1):
+                    offer_id = self.db.execute(
+                        "INSERT INTO offers (search_id, rank, airline, origin_airport, destination_airport, "
+                        "price_per_person, total_price) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (search_id, offer.get("rank", rank), offer.get("airline"), offer.get("origin_airport"),
+                         offer.get("destination_airport"), offer.get("price_per_person"),
+                         offer.get("total_price"))).lastrowid
+                    for leg in offer.get("legs", ()):
+                        leg_id = self.db.execute(
+                            "INSERT INTO legs (offer_id, direction, departure_time, arrival_time, travel_minutes, "
+                            "flight_minutes, stops) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (offer_id, leg["direction"], leg.get("departure_time") or None,
+                             leg.get("arrival_time") or None, leg.get("travel_minutes"), leg.get("flight_minutes"),
+                             len(leg.get("stops", ())))).lastrowid
+                        self.db.executemany(
+                            "INSERT INTO stops (leg_id, position, airport, minutes) VALUES (?, ?, ?, ?)",
+                            [(leg_id, position, airport, minutes)
+                             for position, (airport, minutes) in enumerate(leg.get("stops", ()), 1)])
+        if self.logger:
+            self.logger.debug(f"Historia cen: {added}/{len(pending)} pobran w {time.monotonic() - started:.3f}s")
+        return added
+
+    def close(self):
+        self.flush()
+        if self.pending:
+            self._warn(f"Historia cen: {len(self.pending)} pobran niezapisanych (baza niedostepna)")
+        try:
+            # Statystyki indeksow dla planera (bez nich "najtansze na trasie" skanuje cala trase)
+            self.db.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        self.db.close()
+
+    # -- zapytania -------------------------------------------------------------
+
+    def cheapest(self, origin: str, destination: str, airline: Optional[str] = None, stay: Optional[int] = None,
+                 days: Optional[int] = None, limit: int = 10) -> List[sqlite3.Row]:
+        """Najtansze oferty na trasie (opcjonalnie linia, dlugosc pobytu, ostatnie N dni pobran)"""
+        query = ("SELECT o.total_price, o.price_per_person, o.airline, s.departure_date, s.return_date, "
+                 "s.stay_days, s.scraped_at, s.source FROM searches s JOIN offers o ON o.search_id = s.id "
+                 "WHERE s.origin = ? AND s.destination = ? AND o.total_price IS NOT NULL")
+        params = [origin, destination]
+        if stay is not None:
+            query += " AND s.stay_days = ?"
+            params.append(stay)
+        if days is not None:
+            query += " AND s.scraped_at >= ?"
+            params.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S"))
+        if airline:
+            query += " AND (o.airline = ? OR s.airline_filter = ?)"
+            params += [airline, airline]
+        query += " ORDER BY o.total_price LIMIT ?"
+        params.append(limit)
+        self.db.row_factory = sqlite3.Row
+        try:
+            return self.db.execute(query, params).fetchall()
+        finally:
+            self.db.row_factory = None
+
+    def stats(self) -> dict:
+        counts = {table: self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("searches", "offers", "legs", "stops")}
+        counts["sources"] = dict(self.db.execute("SELECT source, COUNT(*) FROM searches GROUP BY source").fetchall())
+        counts["db_bytes"] = os.path.getsize(self.path)
+        return counts
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _extracted_offer(offer) -> dict:
+    legs = []
+    for direction, prefix, times in (("out", "outbound", (offer.departure_time, offer.arrival_time)),
+                                     ("ret", "return", (offer.return_departure_time, offer.return_arrival_time))):
+        stops = [(getattr(offer, f"stop{i}_{prefix}_airport"),
+                  duration_minutes(getattr(offer, f"stop{i}_{prefix}_duration")))
+                 for i in range(1, 4) if getattr(offer, f"stop{i}_{prefix}_airport")]
+        travel = getattr(offer, f"total_travel_time_{prefix}")
+        if not (times[0] or travel or stops):
+            continue
+        legs.append({"direction": direction, "departure_time": times[0], "arrival_time": times[1],
+                     "travel_minutes": duration_minutes(travel),
+                     "flight_minutes": duration_minutes(getattr(offer, f"actual_flight_time_{prefix}")),
+                     "stops": stops})
+    return {"rank": offer.offer_rank, "airline": offer.airlines_outbound, "origin_airport": offer.departure_airport,
+            "destination_airport": offer.destination_airport, "price_per_person": offer.price_per_person,
+            "total_price": offer.total_price, "legs": legs}
+
+
+# ---------------------------------------------------------------------------
+# Import istniejacych plikow
+# ---------------------------------------------------------------------------
+
+def import_path(store: PriceStore, path: str) -> int:
+    """CSV url_watcher (prices_*.csv) albo logi wynikow scraperow (*_results.jsonl); folder - wszystkie"""
+    from session_log import RESULTS_SUFFIX, read_records
+
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "**", "prices_*.csv"), recursive=True)
+                       + glob.glob(os.path.join(path, "**", f"*{RESULTS_SUFFIX}"), recursive=True))
+    else:
+        files = [path]
+
+    added = 0
+    for file_path in files:
+        if file_path.endswith(".csv"):
+            with open(file_path, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    store.add_watcher_row(row)
+        else:
+            source = "excel" if "excel_session_" in file_path else "extended"
+            for record in read_records(file_path):
+                if record.get("type") == "result":
+                    _add_log_record(store, source, record)
+        added += store.flush()
+    return added
+
+
+def _add_log_record(store: PriceStore, source: str, record: dict):
+    combo = record.get("combo") or []
+    request = record.get("request") or {}
+    target = request.get("target") or request
+    origin = combo[0] if combo else target.get("origin") or target.get("origin_airport") or ""
+    destination = combo[1] if combo else target.get("destination") or target.get("destination_airport") or ""
+    departure_date = combo[3] if combo else target.get("departure_date")
+    return_date = combo[4] if combo else target.get("return_date")
+    airline_key = record.get("airline_key") or ""
+    offers = []
+    if record.get("success") and (record.get("total_price") or record.get("price_per_person")):
+        offers.append({"airline": airline_key, "origin_airport": record.get("origin_airport"),
+                       "destination_airport": record.get("destination_airport"),
+                       "price_per_person": record.get("price_per_person"), "total_price": record.get("total_price")})
+    store.add_search(source, record.get("text_path") or f"{record.get('url')}@{record.get('timestamp')}",
+                     record.get("timestamp"), origin, destination, departure_date, return_date,
+                     request.get("passengers"), airline_key, bool(record.get("success")),
+                     record.get("error_message"), offers)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def main(argv: list) -> int:
+    if not argv or argv[0] not in ("import", "cheapest", "stats"):
+        print(__doc__)
+        return 1
+
+    store = PriceStore(_option(argv, "--db", DB_PATH))
+    try:
+        if argv[0] == "import":
+            if len(argv) < 2:
+                print("Uzycie: price_store.py import <folder|plik>")
+                return 1
+            started = time.monotonic()
+            added = import_path(store, argv[1])
+            print(f"Zaimportowano {added} pobran w {time.monotonic() - started:.1f}s")
+        elif argv[0] == "cheapest":
+            if len(argv) < 3:
+                print("Uzycie: price_store.py cheapest ORIGIN DESTINATION [--airline X] [--stay N] [--days N]")
+                return 1
+            stay = _option(argv, "--stay")
+            days = _option(argv, "--days")
+            started = time.monotonic()
+            rows = store.cheapest(argv[1].upper(), argv[2].upper(), _option(argv, "--airline"),
+                                  int(stay) if stay else None, int(days) if days else None,
+                                  int(_option(argv, "--limit", 10)))
+            elapsed_ms = (time.monotonic() - started) * 1000
+            for row in rows:
+                print(f"  {row['total_price']:>10,.0f} PLN  {row['airline'] or '-':<12} {row['departure_date']} -> "
+                      f"{row['return_date']} ({row['stay_days']} dni)  pobrano {row['scraped_at']} [{row['source']}]")
+            print(f"{len(rows)} ofert ({elapsed_ms:.1f} ms)")
+        else:
+            for key, value in store.stats().items():
+                print(f"  {key}: {value}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
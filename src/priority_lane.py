@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Priority Lane - pilne sprawdzenie jednego URLa przez dzialajacy scheduler
+Zgloszenie trafia do kolejki plikowej (output/priority_lane/pending), a kazdy
+dzialajacy scraper (extended, Excel, URL watcher) przed kolejnym ladowaniem
+strony sprawdza kolejke i obsluguje zgloszenie w najblizszym wolnym slocie
+przegladarki - bez drugiego procesu z wlasnym Chrome. Wynik trafia do done/
+zaraz po zaladowaniu strony. Zgloszenie porzucone w running/ przez scheduler,
+ktory padl w trakcie, wraca do kolejki przy starcie (i co minute) kazdego
+schedulera; po MAX_ATTEMPTS przerwanych probach konczy sie bledem.
+
+Uzycie:
+    python src/priority_lane.py submit <url> [--wait SEKUNDY]
+    python src/priority_lane.py flight WAW ICN 2026-10-24 2026-11-12 [--passengers 2] [--airline TK] [--wait SEKUNDY]
+    python src/priority_lane.py status
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+from offer_cards import build_airlines_filter, find_offer_cards
+
+LANE_DIR = "output/priority_lane"
+
+# Scheduler uznawany za dzialajacy, jesli zglosil sie w ciagu tylu sekund
+HEARTBEAT_SECONDS = 300
+# Zgloszenie w running/ dluzej niz tyle sekund (albo przejete przez martwy proces) jest porzucone
+RUNNING_TIMEOUT_SECONDS = 600
+# Po tylu przerwanych probach zgloszenie konczy sie bledem zamiast wracac do kolejki
+MAX_ATTEMPTS = 3
+
+
+def _path(lane_dir: str, folder: str, name: str = "") -> str:
+    path = os.path.join(lane_dir, folder)
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, name) if name else path
+
+
+def _write_json(path: str, data: dict):
+    # Zapis przez plik tymczasowy - czytajacy nigdy nie widzi polowy JSONa
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Zgloszenia
+# ---------------------------------------------------------------------------
+
+def build_flight_url(origin: str, destination: str, departure_date: str, return_date: str = "",
+                     passengers: int = 2, airline_codes: Optional[list] = None) -> str:
+    """URL Kayak dla celu lotu (jak w scraperach: sort po cenie, opcjonalny filtr linii)"""
+    dates = f"{departure_date}/{return_date}" if return_date else departure_date
+    url = f"https://www.kayak.pl/flights/{origin}-{destination}/{dates}/{passengers}adults?sort=price_a"
+    if airline_codes:
+        url += f"&{build_airlines_filter(airline_codes)}"
+    return url
+
+
+def submit(url: str, label: str = "", lane_dir: str = LANE_DIR) -> str:
+    """Dodaje URL do kolejki priorytetowej; zwraca numer zgloszenia"""
+    # Numer zaczyna sie od czasu - sortowanie nazw plikow daje kolejnosc zgloszen
+    ticket = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}"
+    _write_json(_path(lane_dir, "pending", f"{ticket}.json"), {
+        "ticket": ticket,
+        "url": url.strip(),
+        "label": label,
+        "submitted_at": datetime.now().isoformat()
+    })
+    return ticket
+
+
+def has_pending(lane_dir: str = LANE_DIR) -> bool:
+    folder = os.path.join(lane_dir, "pending")
+    return os.path.isdir(folder) and any(name.endswith(".json") for name in os.listdir(folder))
+
+
+def claim_next(lane_dir: str = LANE_DIR) -> Optional[dict]:
+    """Najstarsze zgloszenie przeniesione do running/ (os.replace - wygrywa jeden scheduler)"""
+    if not has_pending(lane_dir):
+        return None
+    pending = _path(lane_dir, "pending")
+    for name in sorted(n for n in os.listdir(pending) if n.endswith(".json")):
+        running_path = _path(lane_dir, "running", name)
+        try:
+            os.replace(os.path.join(pending, name), running_path)
+        except OSError:
+            continue  # przejete przez inny scheduler
+        job = _read_json(running_path)
+        if job:
+            # Kto i kiedy przejal - nowy mtime i pid pozwalaja wykryc porzucone zgloszenie
+            job.update(pid=os.getpid(), claimed_at=datetime.now().isoformat(), attempts=job.get("attempts", 0) + 1)
+            _write_json(running_path, job)
+            return job
+    return None
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """Czy proces zyje; na Windows os.kill zamyka proces, wiec decyduje tylko wiek zgloszenia"""
+    if not pid or os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # brak uprawnien - proces istnieje
+    return True
+
+
+def requeue_stale(lane_dir: str = LANE_DIR, timeout: float = RUNNING_TIMEOUT_SECONDS, logger=None) -> int:
+    """Porzucone zgloszenia z running/ wracaja do pending/; zwraca liczbe przywroconych.
+
+    Porzucone: proces, ktory je przejal, nie zyje albo przejal je dawniej niz
+    timeout sekund. Po MAX_ATTEMPTS probach zgloszenie trafia do done/ z bledem,
+    zeby czekajacy na wynik nie czekal do konca swojego limitu.
+    """
+    running = os.path.join(lane_dir, "running")
+    if not os.path.isdir(running):
+        return 0
+    requeued = 0
+    now = time.time()
+    for name in sorted(n for n in os.listdir(running) if n.endswith(".json")):
+        path = os.path.join(running, name)
+        job = _read_json(path)
+        try:
+            age = now - os.path.getmtime(path)
+        except OSError:
+            continue  # wlasnie zakonczone
+        if not job or (age < timeout and _process_alive(job.get("pid"))):
+            continue
+
+        if job.get("attempts", 0) >= MAX_ATTEMPTS:
+            complete(job, {"served_by": "priority_lane", "status": "error", "price_per_person": None, "total_price": None,
+                           "offers_on_page": 0, "text_path": None, "load_seconds": None,
+                           "error": f"Przerwane {job['attempts']} razy - scheduler nie dokonczyl zgloszenia",
+                           "scraped_at": datetime.now().isoformat(),
+                           "wait_seconds": round((datetime.now() - datetime.fromisoformat(job["submitted_at"]))
+                                                 .total_seconds(), 1)}, lane_dir)
+            if logger:
+                logger.warning(f"PRIORYTET {job['ticket']}: porzucone {job['attempts']} razy - koncze z bledem")
+            continue
+        try:
+            os.replace(path, _path(lane_dir, "pending", name))
+        except OSError:
+            continue  # przywrocone przez inny scheduler
+        requeued += 1
+        if logger:
+            logger.warning(f"PRIORYTET {job['ticket']}: porzucone w running/ - wraca do kolejki")
+    return requeued
+
+
+def complete(job: dict, result: dict, lane_dir: str = LANE_DIR):
+    _write_json(_path(lane_dir, "done", f"{job['ticket']}.json"), dict(job, **result))
+    try:
+        os.remove(_path(lane_dir, "running", f"{job['ticket']}.json"))
+    except OSError:
+        pass
+
+
+def get_result(ticket: str, lane_dir: str = LANE_DIR) -> Optional[dict]:
+    return _read_json(os.path.join(lane_dir, "done", f"{ticket}.json"))
+
+
+def wait_for_result(ticket: str, timeout: float, lane_dir: str = LANE_DIR, poll: float = 2.0) -> Optional[dict]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = get_result(ticket, lane_dir)
+        if result:
+            return result
+        time.sleep(poll)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Strona schedulera
+# ---------------------------------------------------------------------------
+
+def check_in(served_by: str, lane_dir: str = LANE_DIR) -> bool:
+    """Znacznik zycia schedulera (CLI ostrzega, gdy nikt nie obsluguje kolejki); True, gdy odswiezony"""
+    path = _path(lane_dir, "schedulers", f"{served_by}.json")
+    try:
+        if time.time() - os.path.getmtime(path) < 60:
+            return False
+    except OSError:
+        pass
+    _write_json(path, {"served_by": served_by, "pid": os.getpid(), "last_seen": datetime.now().isoformat()})
+    return True
+
+
+def active_schedulers(lane_dir: str = LANE_DIR) -> list:
+    folder = os.path.join(lane_dir, "schedulers")
+    if not os.path.isdir(folder):
+        return []
+    now = time.time()
+    return [name[:-5] for name in os.listdir(folder)
+            if name.endswith(".json") and now - os.path.getmtime(os.path.join(folder, name)) < HEARTBEAT_SECONDS]
+
+
+def serve_next(fetch_text: Callable[[str], str], served_by: str, lane_dir: str = LANE_DIR, logger=None) -> Optional[dict]:
+    """Obsluguje jedno zgloszenie (jesli jest): laduje strone przez fetch_text(url) i zapisuje wynik.
+
+    Zwraca wynik albo None, gdy kolejka jest pusta.
+    """
+    if check_in(served_by, lane_dir):
+        # Start schedulera i potem co minute - zgloszenia porzucone przez inny (martwy) proces
+        requeue_stale(lane_dir, logger=logger)
+    job = claim_next(lane_dir)
+    if not job:
+        return None
+
+    if logger:
+        logger.info(f"PRIORYTET {job['ticket']}: {job.get('label') or job['url']}")
+    started = time.monotonic()
+    result = {"served_by": served_by, "status": "error", "price_per_person": None, "total_price": None,
+              "offers_on_page": 0, "text_path": None, "error": None}
+    try:
+        page_text = fetch_text(job["url"])
+        text_path = _path(lane_dir, "done", f"{job['ticket']}.txt")
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(f"URL: {job['url']}\nTicket: {job['ticket']}\n{'='*80}\n\n{page_text}\n")
+        cards = find_offer_cards(page_text)
+        card = min(cards, key=lambda c: c.total_price) if cards else None
+        result.update(
+            status="ok" if card else "no_price",
+            price_per_person=card.price_per_person if card else None,
+            total_price=card.total_price if card else None,
+            offers_on_page=len(cards),
+            text_path=text_path
+        )
+    except Exception as e:
+        result["error"] = str(e)
+
+    result["scraped_at"] = datetime.now().isoformat()
+    result["load_seconds"] = round(time.monotonic() - started, 1)
+    submitted = datetime.fromisoformat(job["submitted_at"])
+    result["wait_seconds"] = round((datetime.now() - submitted).total_seconds(), 1)
+    complete(job, result, lane_dir)
+
+    if logger:
+        if result["total_price"]:
+            logger.info(f"PRIORYTET {job['ticket']}: {result['total_price']:,.0f} PLN lacznie (czekalo {result['wait_seconds']:.0f}s)")
+        else:
+            logger.info(f"PRIORYTET {job['ticket']}: {result['status']} {result['error'] or ''}")
+    return result
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _print_result(result: dict):
+    print(f"Zgloszenie: {result['ticket']} ({result['served_by']})")
+    print(f"Status: {result['status']}")
+    if result.get("total_price"):
+        print(f"Cena: {result['price_per_person']:,.0f} PLN/os ({result['total_price']:,.0f} PLN lacznie)")
+    if result.get("error"):
+        print(f"Blad: {result['error']}")
+    print(f"Ofert na stronie: {result['offers_on_page']} | czekalo {result['wait_seconds']:.0f}s | plik: {result['text_path']}")
+
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if not args or args[0] not in ("submit", "flight", "status"):
+        print(__doc__)
+        return 1
+
+    command = args.pop(0)
+    if command == "status":
+        pending = os.path.join(LANE_DIR, "pending")
+        print(f"Schedulery: {', '.join(active_schedulers()) or 'brak'}")
+        print(f"Oczekujace: {len(os.listdir(pending)) if os.path.isdir(pending) else 0}")
+        running = os.path.join(LANE_DIR, "running")
+        print(f"W trakcie: {len(os.listdir(running)) if os.path.isdir(running) else 0}")
+        return 0
+
+    wait = float(_option(args, "--wait", 0))
+    if command == "submit":
+        if not args:
+            print("Podaj URL")
+            return 1
+        url, label = args[0], ""
+    else:
+        passengers = int(_option(args, "--passengers", 2))
+        airline = _option(args, "--airline")
+        if len(args) < 3:
+            print("Podaj: origin destination data_wylotu [data_powrotu]")
+            return 1
+        origin, destination, departure = args[0].upper(), args[1].upper(), args[2]
+        return_date = args[3] if len(args) > 3 else ""
+        url = build_flight_url(origin, destination, departure, return_date, passengers,
+                               airline.upper().split(",") if airline else None)
+        label = f"{origin}-{destination} {departure} {return_date} [{airline or 'ANY'}]".strip()
+
+    ticket = submit(url, label)
+    print(f"Zgloszono: {ticket}")
+    print(f"URL: {url}")
+    if not active_schedulers():
+        print("Uwaga: zaden scheduler nie obsluguje teraz kolejki - zgloszenie poczeka na start scrapera")
+
+    if wait:
+        print(f"Czekam na wynik (max {wait:.0f}s)...")
+        result = wait_for_result(ticket, wait)
+        if not result:
+            print("Brak wyniku w limicie czasu - zgloszenie zostaje w kolejce")
+            return 2
+        _print_result(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
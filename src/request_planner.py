@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Planner - mniej ladowan stron Kayak dla tej samej siatki zapytan
+- laczenie linii: zapytania rozniace sie tylko filtrem linii (ta sama trasa,
+  daty i liczba osob) sprawdzane jednym ladowaniem, ceny przypisywane z kart
+- elastyczne daty: jedno ladowanie "-flexible-Ndays" pokrywa blok siatki dat,
+  dokladne ladowania tylko dla najtanszych komorek
+- odcinki w jedna strone: N wylotow + M powrotow zamiast siatki N x M,
+  szacunek ceny w obie strony i potwierdzenie najtanszych par
+- grupy lotnisk: alternatywne lotniska wylotu/przylotu w jednym wyszukiwaniu
+  (WAW,WMI,KRK-AKL), oferty przypisywane do faktycznego lotniska
+- leniwa siatka zapytan: kombinacje dat i zapytania liczone z indeksu
+  w pseudolosowej kolejnosci, bez budowania listy w pamieci
+- tabela zapytan: kolumny w array (daty jako ordinale, linie i trasy jako id),
+  obiekt zapytania tworzony dopiero przy odczycie, podsumowania po request_id
+- podzbior zapytan: ta sama sekwencja bez wybranych kombinacji (np. swiezych)
+"""
+
+import random
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, field, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from offer_cards import OfferCard, build_airlines_filter, find_offer_cards, cheapest_per_airline, parse_filter_codes
+
+# Tryby laczenia zapytan po liniach lotniczych
+COALESCING_MODES = ("off", "unfiltered", "multi_filter")
+
+
+@dataclass
+class CoalescedLoad:
+    """Jedno ladowanie strony obslugujace kilka zapytan"""
+    search_key: Tuple
+    members: List[Any]
+    member_codes: List[List[str]]
+    member_multi: List[bool]
+    airline_filter: str
+    mode: str
+
+    @property
+    def is_direct(self) -> bool:
+        """Pojedyncze zapytanie - ladujemy je z wlasnym filtrem"""
+        return len(self.members) == 1
+
+    @property
+    def label(self) -> str:
+        return "ALL" if self.mode == "unfiltered" else "MULTI"
+
+
+@dataclass
+class Attribution:
+    """Wynik przypisania kart z jednej strony do zapytan"""
+    found: Dict[int, OfferCard] = field(default_factory=dict)
+    missing: List[int] = field(default_factory=list)
+    cards_on_page: int = 0
+
+
+def coalesce_airline_requests(requests: List[Any],
+                              key_fn: Callable[[Any], Tuple],
+                              filter_fn: Callable[[Any], str],
+                              mode: str = "unfiltered") -> List[CoalescedLoad]:
+    """Grupuje zapytania po (trasa, daty, pasazerowie) zachowujac kolejnosc pierwszego wystapienia.
+
+    mode:
+        unfiltered   - jedno ladowanie bez filtra linii
+        multi_filter - jedno ladowanie z filtrem obejmujacym wszystkie linie grupy
+    """
+    if mode not in COALESCING_MODES or mode == "off":
+        raise ValueError(f"Nieobslugiwany tryb laczenia: {mode}")
+
+    groups: Dict[Tuple, List[Any]] = {}
+    for request in requests:
+        groups.setdefault(key_fn(request), []).append(request)
+
+    loads = []
+    for key, members in groups.items():
+        parsed = [parse_filter_codes(filter_fn(m)) for m in members]
+        member_codes = [codes for codes, _ in parsed]
+        member_multi = [multi for _, multi in parsed]
+
+        # Filtry, ktorych nie umiemy rozlozyc na kody, ladujemy osobno
+        if len(members) > 1 and not all(member_codes):
+            for member, codes, multi in zip(members, member_codes, member_multi):
+                loads.append(CoalescedLoad(key, [member], [codes], [multi], filter_fn(member), mode))
+            continue
+
+        if len(members) == 1:
+            airline_filter = filter_fn(members[0])
+        elif mode == "unfiltered":
+            airline_filter = ""
+        else:
+            all_codes = [code for codes in member_codes for code in codes]
+            airline_filter = build_airlines_filter(all_codes, allow_multi=any(member_multi))
+
+        loads.append(CoalescedLoad(key, members, member_codes, member_multi, airline_filter, mode))
+
+    return loads
+
+
+def attribute_offers(load: CoalescedLoad, page_text: str) -> Attribution:
+    """Przypisuje kazdemu zapytaniu z grupy najtansza pasujaca karte ze strony"""
+    cards = find_offer_cards(page_text)
+    attribution = Attribution(cards_on_page=len(cards))
+
+    for index, (codes, multi) in enumerate(zip(load.member_codes, load.member_multi)):
+        best = cheapest_per_airline(cards, {code: multi for code in codes})
+        if best:
+            attribution.found[index] = min(best.values(), key=lambda c: c.total_price)
+        else:
+            attribution.missing.append(index)
+
+    return attribution
+
+
+def describe_savings(requests_count: int, loads: List[CoalescedLoad]) -> Optional[str]:
+    """Krotki opis oszczednosci do logow"""
+    if not loads:
+        return None
+    ratio = requests_count / len(loads)
+    return f"{requests_count} zapytan -> {len(loads)} ladowan stron (x{ratio:.1f} mniej)"
+
+
+# ---------------------------------------------------------------------------
+# Elastyczne daty - jedno ladowanie pokrywa blok siatki dat
+# ---------------------------------------------------------------------------
+
+# Kayak pozwala na +/- 1..3 dni wokol daty wylotu i powrotu
+MAX_FLEX_DAYS = 3
+
+
+@dataclass
+class FlexibleBlock:
+    """Ladowanie z elastycznymi datami: srodek bloku +/- flex_days"""
+    departure_center: date
+    return_center: date
+    flex_days: int
+    covered: List[Tuple[str, str, int]]
+
+    @property
+    def departure_dates(self) -> List[date]:
+        return [self.departure_center + timedelta(days=d) for d in range(-self.flex_days, self.flex_days + 1)]
+
+    @property
+    def return_dates(self) -> List[date]:
+        return [self.return_center + timedelta(days=d) for d in range(-self.flex_days, self.flex_days + 1)]
+
+
+def flexible_date_param(day: str, flex_days: int) -> str:
+    """Segment URLa Kayak dla daty elastycznej: 2026-10-24-flexible-3days"""
+    if flex_days <= 0:
+        return day
+    return f"{day}-flexible-{flex_days}day" + ("s" if flex_days > 1 else "")
+
+
+def plan_flexible_blocks(date_combinations: List[Tuple[str, str, int]], flex_days: int = MAX_FLEX_DAYS) -> List[FlexibleBlock]:
+    """Pokrywa kombinacje (wylot, powrot, dni) blokami elastycznych dat.
+
+    Zachlannie: bierze najwczesniejsza niepokryta kombinacje i stawia blok tak,
+    zeby byla w jego lewym gornym rogu - blok pokrywa wszystkie kombinacje
+    z wylotem i powrotem w zasiegu +/- flex_days od srodka.
+    """
+    flex_days = max(1, min(flex_days, MAX_FLEX_DAYS))
+    remaining = sorted(
+        (datetime.strptime(dep, "%Y-%m-%d").date(), datetime.strptime(ret, "%Y-%m-%d").date(), dep, ret, days)
+        for dep, ret, days in date_combinations
+    )
+    blocks = []
+
+    while remaining:
+        first_dep, first_ret = remaining[0][0], remaining[0][1]
+        dep_center = first_dep + timedelta(days=flex_days)
+        ret_center = first_ret + timedelta(days=flex_days)
+
+        covered, left = [], []
+        for item in remaining:
+            dep, ret = item[0], item[1]
+            if abs((dep - dep_center).days) <= flex_days and abs((ret - ret_center).days) <= flex_days:
+                covered.append(item[2:])
+            else:
+                left.append(item)
+
+        blocks.append(FlexibleBlock(dep_center, ret_center, flex_days, covered))
+        remaining = left
+
+    return blocks
+
+
+def pick_cells_to_confirm(prices: Dict[Tuple, float], top: int) -> List[Tuple]:
+    """Najtansze komorki siatki (para dat) do potwierdzenia dokladnym ladowaniem"""
+    return [cell for cell, _ in sorted(prices.items(), key=lambda item: item[1])[:top]]
+
+
+# ---------------------------------------------------------------------------
+# Odcinki w jedna strone - N + M ladowan zamiast N x M
+# ---------------------------------------------------------------------------
+
+def plan_oneway_legs(date_pairs) -> Tuple[List[str], List[str]]:
+    """Unikalne dni wylotu i dni powrotu z par (wylot, powrot), posortowane"""
+    pairs = list(date_pairs)
+    return sorted({dep for dep, _ in pairs}), sorted({ret for _, ret in pairs})
+
+
+def estimate_round_trips(date_pairs, outbound_prices: Dict[str, float], return_prices: Dict[str, float]) -> Dict[Tuple[str, str], float]:
+    """Szacowana cena w obie strony = najtanszy odcinek tam + najtanszy odcinek z powrotem.
+
+    Pary bez ceny ktoregos odcinka sa pomijane.
+    """
+    return {
+        (dep, ret): outbound_prices[dep] + return_prices[ret]
+        for dep, ret in date_pairs
+        if dep in outbound_prices and ret in return_prices
+    }
+
+# ---------------------------------------------------------------------------
+# Grupy lotnisk - jedno wyszukiwanie dla kilku alternatywnych lotnisk
+# ---------------------------------------------------------------------------
+
+def expand_airports(value: Any, groups: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """Kody z configu po rozwinieciu grup, bez walidacji (do preflight.check_route)"""
+    groups = {name.upper(): members for name, members in (groups or {}).items()}
+    items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+
+    codes = []
+    for item in items:
+        item = str(item).strip().upper()
+        for code in groups.get(item, [item]):
+            code = str(code).strip().upper()
+            if code and code not in codes:
+                codes.append(code)
+    return codes
+
+
+def resolve_airports(value: Any, groups: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """Zamienia lotnisko, liste lotnisk lub nazwe grupy na liste kodow IATA.
+
+    Akceptuje "WAW", "WAW,WMI,KRK", ["WAW", "WMI"] oraz nazwy z airport_groups
+    (takze wymieszane z kodami). Kolejnosc zachowana, duplikaty usuniete.
+    """
+    codes = expand_airports(value, groups)
+    invalid = [code for code in codes if len(code) != 3 or not code.isalpha()]
+    if not codes or invalid:
+        raise ValueError(f"Nieprawidlowe kody lotnisk: {value}")
+    return codes
+
+
+def airport_param(codes: List[str]) -> str:
+    """Segment trasy Kayak dla kilku lotnisk: WAW,WMI,KRK"""
+    return ",".join(codes)
+
+
+def airport_label(airports: str) -> str:
+    """Wersja do nazw plikow: WAW,WMI,KRK -> WAW-WMI-KRK"""
+    return airports.replace(",", "-")
+
+
+# ---------------------------------------------------------------------------
+# Leniwa siatka zapytan - elementy liczone z indeksu, bez listy w pamieci
+# ---------------------------------------------------------------------------
+
+class IndexPermutation:
+    """Pseudolosowa permutacja [0, size) liczona dla pojedynczego indeksu.
+
+    Siec Feistela na domenie 2^k >= size; wyniki spoza zakresu sa szyfrowane
+    ponownie (cycle walking), wiec kazdy indeks trafia w unikalna pozycje.
+    Ten sam seed daje te sama kolejnosc.
+    """
+
+    def __init__(self, size: int, seed: int, rounds: int = 4):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(rounds)]
+
+    def _round(self, value: int, key: int) -> int:
+        value = ((value * 0x9E3779B1) ^ key) & 0xFFFFFFFF
+        value = (value * 0x85EBCA6B) & 0xFFFFFFFF
+        return (value ^ (value >> 13)) & self.mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half) | right
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+class DateGrid:
+    """Kombinacje (wylot, powrot, dni) z okna dat - liczone z indeksu na ordinalach.
+
+    Kolejnosc jak w generate_date_combinations_standard: dlugosc pobytu,
+    potem dzien wylotu. Pamiec stala niezaleznie od szerokosci okna.
+    latest_departure - ostatni dozwolony dzien wylotu (None - bez limitu).
+    """
+
+    def __init__(self, earliest_departure: date, latest_return: date, min_days: int, max_days: int,
+                 latest_departure: Optional[date] = None):
+        self.first = earliest_departure.toordinal()
+        self.last = latest_return.toordinal()
+        last_departure = self.last if latest_departure is None else latest_departure.toordinal()
+        self.counts = [(days, max(0, min(self.last - days, last_departure) - self.first + 1))
+                       for days in range(min_days, max_days + 1)]
+        self.size = sum(count for _, count in self.counts)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def ordinals(self, index: int) -> Tuple[int, int]:
+        """(wylot, powrot) jako ordinale dat"""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        for days, count in self.counts:
+            if index < count:
+                return self.first + index, self.first + index + days
+            index -= count
+
+    def __getitem__(self, index: int) -> Tuple[str, str, int]:
+        departure, return_day = self.ordinals(index)
+        return date.fromordinal(departure).isoformat(), date.fromordinal(return_day).isoformat(), return_day - departure
+
+    def __iter__(self) -> Iterator[Tuple[str, str, int]]:
+        for index in range(self.size):
+            yield self[index]
+
+
+class RequestSequence(ABC):
+    """Wspolny interfejs sekwencji zapytan (tylko do odczytu, jak lista).
+
+    Zapytania maja stale request_id; widok (obiekt zapytania) tworzy funkcja
+    view(request_id, (origin, destination), airline_key, wylot, powrot, pasazerowie)
+    dopiero przy odczycie. Podklasy definiuja _id_at(index) i _fields(request_id).
+    """
+
+    view: Callable[..., Any]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def _id_at(self, index: int) -> int:
+        ...
+
+    @abstractmethod
+    def _fields(self, request_id: int) -> Tuple[Tuple[str, str], str, date, date, int]:
+        ...
+
+    def get(self, request_id: int) -> Any:
+        """Widok zapytania o danym request_id"""
+        return self.view(request_id, *self._fields(request_id))
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.get(self._id_at(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class LazyRequests(RequestSequence):
+    """Zapytania dla siatki daty x linie jednej trasy - nic nie jest przechowywane.
+
+    request_id = pozycja w siatce (kombinacja dat * liczba linii + linia),
+    niezalezna od kolejnosci. Z seedem kolejnosc jest pseudolosowa
+    (IndexPermutation), bez - kolejno jak w siatce.
+    """
+
+    def __init__(self, dates: DateGrid, airline_keys: List[str], route: Tuple[str, str], passengers: int,
+                 view: Callable[..., Any], seed: Optional[int] = None):
+        self.dates = dates
+        self.airline_keys = list(airline_keys)
+        self.route = route
+        self.passengers = passengers
+        self.view = view
+        self.seed = seed
+        self.size = len(dates) * len(self.airline_keys)
+        self.permutation = IndexPermutation(self.size, seed) if seed is not None and self.size else None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def shuffle(self, seed: Optional[int] = None):
+        """Pseudolosowa kolejnosc z seedem (None - kolejno jak w siatce)"""
+        self.seed = seed
+        self.permutation = IndexPermutation(self.size, seed) if seed is not None and self.size else None
+
+    def route_totals(self) -> Dict[str, int]:
+        return {f"{self.route[0]}-{self.route[1]}": self.size}
+
+    def _id_at(self, index: int) -> int:
+        return self.permutation[index] if self.permutation else index
+
+    def _fields(self, request_id: int):
+        combination, airline = divmod(request_id, len(self.airline_keys))
+        departure, return_day = self.dates.ordinals(combination)
+        return (self.route, self.airline_keys[airline], date.fromordinal(departure),
+                date.fromordinal(return_day), self.passengers)
+
+
+class ChainedRequests(RequestSequence):
+    """Kilka sekwencji (np. siatki kilku tras) jako jedna kolejka.
+
+    request_id = przesuniecie czesci + request_id w czesci. Z seedem
+    kolejnosc jest pseudolosowa po calosci, wiec trasy sa przeplatane
+    i dziela te same opoznienia miedzy ladowaniami.
+    """
+
+    def __init__(self, parts: List[RequestSequence], seed: Optional[int] = None):
+        self.parts = list(parts)
+        self.offsets = []
+        total = 0
+        for part in self.parts:
+            self.offsets.append(total)
+            total += len(part)
+        self.size = total
+        self.shuffle(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def shuffle(self, seed: Optional[int] = None):
+        self.seed = seed
+        self.permutation = IndexPermutation(self.size, seed) if seed is not None and self.size else None
+
+    def route_totals(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for part in self.parts:
+            for label, count in part.route_totals().items():
+                totals[label] = totals.get(label, 0) + count
+        return totals
+
+    def _id_at(self, index: int) -> int:
+        return self.permutation[index] if self.permutation else index
+
+    def _part(self, request_id: int) -> Tuple[RequestSequence, int]:
+        position = bisect_right(self.offsets, request_id) - 1
+        return self.parts[position], request_id - self.offsets[position]
+
+    def _fields(self, request_id: int):
+        part, local_id = self._part(request_id)
+        return part._fields(local_id)
+
+    def get(self, request_id: int) -> Any:
+        part, local_id = self._part(request_id)
+        return part.view(request_id, *part._fields(local_id))
+
+
+class RequestTable(RequestSequence):
+    """Kolumnowa tabela zapytan dla list lotow (np. z Excel).
+
+    Daty przechowywane jako ordinale w array, linie i trasy jako id
+    w slownikach (kazda nazwa/trasa zapisana raz). order trzyma kolejnosc
+    wykonania - przemieszanie nie rusza kolumn.
+    """
+
+    def __init__(self, view: Callable[..., Any]):
+        self.view = view
+        self.airlines: List[str] = []
+        self.routes: List[Tuple[str, str]] = []
+        self._airline_ids: Dict[str, int] = {}
+        self._route_ids: Dict[Tuple[str, str], int] = {}
+        self.departure = array('l')
+        self.return_day = array('l')
+        self.airline = array('H')
+        self.route = array('H')
+        self.passengers = array('B')
+        self.order = array('l')
+
+    @staticmethod
+    def _intern(value, values: list, ids: dict) -> int:
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+
+    def add(self, origin: str, destination: str, airline_key: str, departure_date: str, return_date: str,
+            passengers: int) -> int:
+        """Dodaje wiersz i zwraca jego request_id"""
+        request_id = len(self.departure)
+        self.departure.append(datetime.strptime(departure_date, "%Y-%m-%d").toordinal())
+        self.return_day.append(datetime.strptime(return_date, "%Y-%m-%d").toordinal())
+        self.airline.append(self._intern(airline_key, self.airlines, self._airline_ids))
+        self.route.append(self._intern((origin, destination), self.routes, self._route_ids))
+        self.passengers.append(passengers)
+        self.order.append(request_id)
+        return request_id
+
+    def shuffle(self, seed: Optional[int] = None):
+        """Losowa kolejnosc wykonania (tylko tablica order)"""
+        random.Random(seed).shuffle(self.order)
+
+    def route_totals(self) -> Dict[str, int]:
+        counts = [0] * len(self.routes)
+        for route_id in self.route:
+            counts[route_id] += 1
+        return {f"{origin}-{destination}": count for (origin, destination), count in zip(self.routes, counts)}
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _id_at(self, index: int) -> int:
+        return self.order[index]
+
+    def _fields(self, request_id: int):
+        return (self.routes[self.route[request_id]], self.airlines[self.airline[request_id]],
+                date.fromordinal(self.departure[request_id]), date.fromordinal(self.return_day[request_id]),
+                self.passengers[request_id])
+
+
+class SubsetRequests(RequestSequence):
+    """Wybrane zapytania innej sekwencji (np. bez swiezych kombinacji).
+
+    request_id i widoki pochodza z bazowej sekwencji, kolejnosc zostaje
+    taka jak w bazie; przechowywane sa tylko id w array.
+    """
+
+    def __init__(self, base: RequestSequence, request_ids):
+        self.base = base
+        self.ids = array('q', request_ids)
+        self._route_totals: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def route_totals(self) -> Dict[str, int]:
+        if self._route_totals is None:
+            totals: Dict[str, int] = {}
+            for request_id in self.ids:
+                origin, destination = self._fields(request_id)[0]
+                label = f"{origin}-{destination}"
+                totals[label] = totals.get(label, 0) + 1
+            self._route_totals = totals
+        return self._route_totals
+
+    def _id_at(self, index: int) -> int:
+        return self.ids[index]
+
+    def _fields(self, request_id: int):
+        return self.base._fields(request_id)
+
+    def get(self, request_id: int) -> Any:
+        return self.base.get(request_id)
+
+
+def result_record(result: Any) -> dict:
+    """Wynik do podsumowania JSON: pola wyniku + request_id zamiast pelnego zapytania.
+
+    Zapytania spoza tabeli (request_id < 0, np. ladowania laczone) sa
+    zapisywane w calosci.
+    """
+    record = {f.name: getattr(result, f.name) for f in fields(result) if f.name != "request"}
+    request_id = getattr(result.request, "request_id", -1)
+    record["request_id"] = request_id
+    if request_id < 0:
+        record["request"] = asdict(result.request)
+    return record
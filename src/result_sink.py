@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Result Sink - buforowany zapis wynikow url_watcher do wymiennych backendow
+Wyniki trafiaja najpierw do bufora w pamieci, a do backendow (CSV, JSONL...)
+ida partiami - gdy spelniony jest ktorykolwiek warunek z configu:
+    - flush_rows:    tyle wierszy w buforze,
+    - flush_seconds: tyle sekund od najstarszego niezapisanego wiersza,
+    - flush_kb:      tyle KB danych w buforze.
+Zamkniecie (koniec --once, Ctrl+C, koniec procesu) zawsze zapisuje bufor.
+Wiersze, ktorych backend nie przyjal, czekaja na kolejny zapis - najwyzej
+max_pending_rows na backend (potem najstarsze sa pomijane z ostrzezeniem).
+
+Backend trzyma otwarty plik dnia (prices_YYYYMMDD.csv) zamiast otwierac go
+dla kazdego wiersza. Dzien wiersza bierze sie z jego timestampu, wiec wiersze
+sprzed polnocy zapisane po polnocy trafiaja do pliku swojego dnia, a plik
+poprzedniego dnia jest zamykany przy pierwszym wierszu nowego dnia.
+
+Nowy backend: klasa z write_rows(day, rows) i close(), dopisana do SINK_TYPES.
+Config (config/url_watchlist.json, klucz "output"):
+    {"sinks": ["csv"], "flush_rows": 20, "flush_seconds": 60, "flush_kb": 256, "max_pending_rows": 10000}
+"""
+
+import csv
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from price_store import PriceStore
+
+
+# ---------------------------------------------------------------------------
+# Backendy
+# ---------------------------------------------------------------------------
+
+class DayFileSink(ABC):
+    """Backend plikowy: jeden otwarty plik na dzien, rotacja przy zmianie dnia"""
+
+    suffix = ".txt"
+
+    def __init__(self, output_dir: str, fields: Sequence[str], prefix: str = "prices"):
+        self.output_dir = output_dir
+        self.fields = list(fields)
+        self.prefix = prefix
+        self.day = None
+        self.file = None
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.output_dir, f"{self.prefix}_{day}{self.suffix}")
+
+    def _open(self, day: str):
+        self.close()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = self.path_for(day)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.day = day
+        self._opened(new_file)
+
+    def _opened(self, new_file: bool):
+        pass
+
+    def write_rows(self, day: str, rows: List[dict]):
+        if self.file is None or day != self.day:
+            self._open(day)
+        self._write(rows)
+        self.file.flush()
+
+    @abstractmethod
+    def _write(self, rows: List[dict]):
+        """Dopisuje wiersze do otwartego pliku dnia"""
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.day = None
+
+
+class CsvDaySink(DayFileSink):
+    """prices_YYYYMMDD.csv - naglowek tylko w nowym pliku"""
+
+    suffix = ".csv"
+
+    def _opened(self, new_file: bool):
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+
+    def _write(self, rows: List[dict]):
+        self.writer.writerows(rows)
+
+
+class JsonlDaySink(DayFileSink):
+    """prices_YYYYMMDD.jsonl - wiersz JSON na wynik (tylko pola z listy)"""
+
+    suffix = ".jsonl"
+
+    def _write(self, rows: List[dict]):
+        self.file.writelines(json.dumps({key: row.get(key) for key in self.fields}, ensure_ascii=False) + "\n"
+                             for row in rows)
+
+
+class SqliteSink:
+    """Historia cen (price_store.py) - partia z bufora to jedna transakcja"""
+
+    def __init__(self, output_dir: str, fields: Sequence[str]):
+        self.store = PriceStore()
+
+    def write_rows(self, day: str, rows: List[dict]):
+        for row in rows:
+            self.store.add_watcher_row(row)
+        self.store.flush()
+
+    def close(self):
+        self.store.close()
+
+
+class ColumnSink:
+    """Pliki kolumnowe (offer_columns.py) - partia z bufora to nowa czesc partycji trasa / miesiac"""
+
+    def __init__(self, output_dir: str, fields: Sequence[str]):
+        # pandas / numpy ladowane tylko, gdy backend jest wlaczony
+        from offer_columns import ColumnWriter, row_from_watcher
+        self.writer = ColumnWriter()
+        self.row_from_watcher = row_from_watcher
+
+    def write_rows(self, day: str, rows: List[dict]):
+        self.writer.extend(self.row_from_watcher(row) for row in rows)
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+SINK_TYPES = {
+    "csv": CsvDaySink,
+    "jsonl": JsonlDaySink,
+    "sqlite": SqliteSink,
+    "columns": ColumnSink,
+}
+
+
+# ---------------------------------------------------------------------------
+# Bufor i polityka zapisu
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FlushPolicy:
+    """Kiedy zapisac bufor: liczba wierszy, wiek najstarszego wiersza, rozmiar (0 = warunek wylaczony).
+
+    max_pending: limit wierszy czekajacych na ponowienie dla jednego backendu (0 = bez limitu).
+    """
+    rows: int = 20
+    seconds: float = 60.0
+    kb: float = 256.0
+    max_pending: int = 10000
+
+    @classmethod
+    def from_config(cls, output_cfg: Optional[dict]) -> "FlushPolicy":
+        output_cfg = output_cfg or {}
+        return cls(output_cfg.get("flush_rows", cls.rows), output_cfg.get("flush_seconds", cls.seconds),
+                   output_cfg.get("flush_kb", cls.kb), output_cfg.get("max_pending_rows", cls.max_pending))
+
+
+class BatchedSink:
+    """Bufor wynikow przed backendami; add() dopisuje, flush() zapisuje partie do wszystkich.
+
+    Dostarczenie co najmniej raz: grupa dnia, ktorej backend nie przyjal, jest
+    ponawiana w calosci, wiec wiersze zapisane przed bledem w srodku grupy
+    moga sie powtorzyc. Grupy zapisane w calosci nie sa ponawiane.
+    """
+
+    def __init__(self, sinks: Dict[str, object], policy: Optional[FlushPolicy] = None, logger=None):
+        self.sinks = sinks
+        self.policy = policy or FlushPolicy()
+        self.logger = logger
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.oldest = None
+        # Partie, ktorych backend nie przyjal - ponawiane przy kolejnym flush, tylko dla tego backendu
+        self.pending = {name: [] for name in sinks}
+        # Wiersze przyjete przez backend i pominiete po przekroczeniu limitu ponowien
+        self.rows_written = {name: 0 for name in sinks}
+        self.rows_dropped = {name: 0 for name in sinks}
+        self.flushes = 0
+
+    def add(self, row: dict):
+        if not self.buffer:
+            self.oldest = time.monotonic()
+        self.buffer.append(row)
+        self.buffer_bytes += sum(len(str(value)) for value in row.values() if value is not None)
+        self.tick()
+
+    def due(self) -> bool:
+        if not self.buffer:
+            return False
+        policy = self.policy
+        return ((policy.rows and len(self.buffer) >= policy.rows)
+                or (policy.seconds and time.monotonic() - self.oldest >= policy.seconds)
+                or (policy.kb and self.buffer_bytes >= policy.kb * 1024))
+
+    def tick(self):
+        """Zapis, jesli polityka tego wymaga - wolane po add() i w przerwach miedzy rundami"""
+        if self.due():
+            self.flush()
+
+    def flush(self):
+        batch, self.buffer, self.buffer_bytes, self.oldest = self.buffer, [], 0, None
+        for name, sink in self.sinks.items():
+            rows = self.pending[name] + batch
+            if not rows:
+                continue
+            attempted = len(rows)
+            try:
+                for day, day_rows in _split_days(rows):
+                    sink.write_rows(day, day_rows)
+                    # Dopiero po calej grupie - blad w srodku ponawia cala grupe
+                    rows = rows[len(day_rows):]
+            except Exception as exc:
+                if self.logger:
+                    self.logger.error("Zapis wynikow (%s) nieudany, ponowie przy kolejnym zapisie: %s", name, exc)
+            self.rows_written[name] += attempted - len(rows)
+            dropped = len(rows) - self.policy.max_pending if self.policy.max_pending else 0
+            if dropped > 0:
+                rows = rows[dropped:]
+                self.rows_dropped[name] += dropped
+                if self.logger:
+                    self.logger.warning("Limit %d wierszy do ponowienia (%s) - pominieto %d najstarszych",
+                                        self.policy.max_pending, name, dropped)
+            self.pending[name] = rows
+        if batch:
+            self.flushes += 1
+            if self.logger:
+                self.logger.debug("Zapisano partie %d wierszy (%s)", len(batch), ", ".join(self.sinks))
+
+    def close(self):
+        self.flush()
+        for name, sink in self.sinks.items():
+            if self.pending[name] and self.logger:
+                self.logger.error("Niezapisane wiersze (%s): %d", name, len(self.pending[name]))
+            sink.close()
+
+
+def _split_days(rows: List[dict]):
+    """Kolejne grupy wierszy z tego samego dnia (dzien z timestampu wiersza: YYYYMMDD)"""
+    start = 0
+    for index in range(1, len(rows) + 1):
+        if index == len(rows) or _row_day(rows[index]) != _row_day(rows[start]):
+            yield _row_day(rows[start]), rows[start:index]
+            start = index
+
+
+def _row_day(row: dict) -> str:
+    return str(row.get("timestamp") or "")[:10].replace("-", "") or time.strftime("%Y%m%d")
+
+
+def open_sink(output_cfg: Optional[dict], output_dir: str, fields: Sequence[str], logger=None) -> BatchedSink:
+    """BatchedSink z backendami z configu (domyslnie tylko CSV)"""
+    output_cfg = output_cfg or {}
+    names = output_cfg.get("sinks") or ["csv"]
+    unknown = [name for name in names if name not in SINK_TYPES]
+    if unknown:
+        raise ValueError(f"Nieznany backend wynikow: {', '.join(unknown)} (dostepne: {', '.join(SINK_TYPES)})")
+    sinks = {name: SINK_TYPES[name](output_dir, fields) for name in names}
+    return BatchedSink(sinks, FlushPolicy.from_config(output_cfg), logger)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Results Expander - rozwijanie listy wynikow Kayak przed skopiowaniem tekstu
+Domyslnie strona pokazuje kilkanascie kart; przycisk "Pokaz wiecej wynikow"
+dokleja kolejne. Klikamy go az do N ofert albo do wyczerpania budzetu czasu,
+zeby jedno ladowanie strony (15-20s) dawalo caly zestaw top-N ofert.
+"""
+
+import time
+import random
+from dataclasses import dataclass
+from typing import Iterable
+
+from selenium.webdriver.common.by import By
+
+from offer_cards import find_offer_cards
+
+# Teksty przycisku "pokaz wiecej" (Kayak.pl i wersja angielska)
+SHOW_MORE_LABELS = ("Pokaż więcej wyników", "Pokaż więcej", "Show more results")
+
+SHOW_MORE_XPATH = " | ".join(
+    f"//*[self::button or self::a or @role='button'][contains(normalize-space(.), '{label}')]"
+    for label in SHOW_MORE_LABELS
+)
+
+
+@dataclass
+class ExpansionStats:
+    """Wynik rozwijania listy: liczba klikniec, czas i liczba widocznych ofert"""
+    clicks: int = 0
+    seconds: float = 0.0
+    offers: int = 0
+    stop_reason: str = "disabled"
+
+
+def _visible_offers(driver, limit: int) -> int:
+    text = driver.find_element(By.TAG_NAME, "body").text
+    return len(find_offer_cards(text, limit=limit))
+
+
+def _show_more_button(driver):
+    for button in driver.find_elements(By.XPATH, SHOW_MORE_XPATH):
+        try:
+            if button.is_displayed():
+                return button
+        except Exception:
+            continue
+    return None
+
+
+def expand_results(driver, max_offers: int, time_budget: float,
+                   click_pause: Iterable[float] = (1.5, 3.0), logger=None) -> ExpansionStats:
+    """Klika "Pokaz wiecej wynikow" az strona pokaze max_offers ofert albo minie time_budget sekund.
+
+    stop_reason: max_offers, time_budget, no_button (koniec listy) albo error.
+    max_offers <= 0 wylacza rozwijanie.
+    """
+    stats = ExpansionStats()
+    if max_offers <= 0:
+        return stats
+
+    pause_min, pause_max = click_pause
+    started = time.monotonic()
+    try:
+        while True:
+            stats.offers = _visible_offers(driver, max_offers)
+            if stats.offers >= max_offers:
+                stats.stop_reason = "max_offers"
+                break
+            if time.monotonic() - started >= time_budget:
+                stats.stop_reason = "time_budget"
+                break
+
+            button = _show_more_button(driver)
+            if button is None:
+                stats.stop_reason = "no_button"
+                break
+
+            # Klik przez JS - przycisk bywa przykryty przez naglowek albo baner
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", button)
+            stats.clicks += 1
+            time.sleep(random.uniform(pause_min, pause_max))
+    except Exception as e:
+        stats.stop_reason = "error"
+        if logger:
+            logger.warning(f"Rozwijanie wynikow przerwane: {e}")
+
+    stats.seconds = round(time.monotonic() - started, 2)
+    if logger:
+        logger.info(f"Rozwinieto wyniki: {stats.offers} ofert, {stats.clicks} klikniec, {stats.seconds:.1f}s ({stats.stop_reason})")
+    return stats
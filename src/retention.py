@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retention - retencja i kompaktowanie zrzutow stron w folderach scraperow
+Bez retencji output/kayak_text_data i output/kayak_excel_data rosna bez konca.
+Polityka (scraping_config.retention):
+    - strony mlodsze niz keep_raw_days dni zostaja bez zmian,
+    - starsze zostaja tylko, jesli ich cena byla nowym minimum kombinacji
+      (trasa, linia, daty) albo jesli ceny nie udalo sie odczytac,
+    - zachowane strony trafiaja do paczek bundle_*.seg (format segmentow,
+      segment_store.py), reszta jest usuwana.
+Paczki leza w tym samym folderze, wiec ekstraktor i GUI widza zachowane
+strony jak dotad (list_page_refs). Zwykle segmenty (seg_*.seg) sa
+przetwarzane w calosci, gdy ostatni zapis jest starszy niz keep_raw_days.
+Przy page_layout = sharded paczki powstaja w shardach, a przegladane sa tylko
+shardy dni do granicy retencji (page_shards.py).
+
+Cena strony pochodzi z logow wynikow (*_results.jsonl, rekord z text_path),
+a dla stron bez logu - z pierwszej karty oferty w tekscie. Minima kombinacji
+i licznik odzyskanych bajtow sa w <folder wyjsciowy>/.retention_state.json.
+
+Jedno przejscie (run_once) obsluguje najstarsze pages_per_run stron, wiec
+retencja dziala przyrostowo: w rolling mode watek w tle powtarza przejscia,
+a gdy nie ma nic do zrobienia - czeka idle_minutes.
+
+Uzycie:
+    python src/retention.py run <folder_wyjsciowy> --keep-days 30 [--pages 500] [--all]
+    python src/retention.py status <folder_wyjsciowy> [--keep-days 30]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+from offer_cards import cheapest_card
+from page_dump import MAX_OPEN_SEGMENTS, list_pages, page_stem, read_page_text
+from page_shards import shard_folders
+from segment_store import INDEX_SUFFIX, SEGMENT_SUFFIX, SegmentWriter, list_segments, read_index
+from session_log import RESULTS_SUFFIX, read_records
+
+STATE_FILE = ".retention_state.json"
+BUNDLE_PREFIX = "bundle"
+
+DEFAULT_RETENTION = {
+    "keep_raw_days": 0,
+    "pages_per_run": 500,
+    "bundle_compression": "gzip",
+    "bundle_max_mb": 256,
+    "idle_minutes": 60
+}
+
+# Odstep miedzy przejsciami, gdy zostaly jeszcze stare strony
+BUSY_PAUSE_SECONDS = 5
+
+
+@dataclass
+class RetentionReport:
+    """Wynik jednego przejscia retencji"""
+    pages: int = 0
+    kept_minimum: int = 0
+    kept_unparsed: int = 0
+    dropped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    seconds: float = 0.0
+    remaining: bool = False
+
+    @property
+    def reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def describe(self) -> dict:
+        return dict(asdict(self), reclaimed_bytes=self.reclaimed)
+
+
+@dataclass
+class _Unit:
+    """Plik strony albo caly segment - jednostka retencji"""
+    session: str
+    folder: str
+    path: str
+    mtime: float
+    segment: bool
+
+
+def _combo_key(name: str) -> str:
+    """R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250623_143022_123 -> WAW_ICN_Turkish_2025-10-22_2025-11-10"""
+    stem = re.sub(r'^R\d+_', '', page_stem(name))
+    return re.sub(r'_\d{8}_\d{6}(?:_\d+)?$', '', stem)
+
+
+class RetentionEngine:
+    """Retencja jednego folderu wyjsciowego scrapera (podfoldery sesji i rolling mode)"""
+
+    def __init__(self, root: str, keep_raw_days: float, pages_per_run: int = 500,
+                 bundle_compression: str = "gzip", bundle_max_mb: Optional[float] = None, logger=None):
+        self.root = root
+        self.keep_raw_days = keep_raw_days
+        self.pages_per_run = pages_per_run
+        self.bundle_compression = bundle_compression
+        self.bundle_max_mb = bundle_max_mb
+        self.logger = logger
+        self.state_path = os.path.join(root, STATE_FILE)
+        self.state = self._load_state()
+
+    @classmethod
+    def from_config(cls, root: str, retention_cfg: Optional[dict], logger=None) -> Optional["RetentionEngine"]:
+        """Silnik z configu; keep_raw_days = 0 (domyslnie) - retencja wylaczona, None"""
+        cfg = dict(DEFAULT_RETENTION, **(retention_cfg or {}))
+        if not cfg["keep_raw_days"]:
+            return None
+        return cls(root, cfg["keep_raw_days"], cfg["pages_per_run"], cfg["bundle_compression"],
+                   cfg["bundle_max_mb"], logger)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("minimums", {})
+        state.setdefault("runs", 0)
+        state.setdefault("pages", 0)
+        state.setdefault("reclaimed_bytes", 0)
+        return state
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    # -- wybor stron -------------------------------------------------------------
+
+    def page_folders(self, until: Optional[str] = None) -> List[Tuple[str, str]]:
+        """(folder sesji, folder stron): sesje i ich shardy (page_shards.py) do dnia until wlacznie"""
+        if not os.path.isdir(self.root):
+            return []
+        sessions = [os.path.join(self.root, name) for name in sorted(os.listdir(self.root))
+                    if os.path.isdir(os.path.join(self.root, name))]
+        return [(session, folder) for session in sessions for folder in [session] + shard_folders(session, until=until)]
+
+    def candidates(self, now: Optional[float] = None) -> List[_Unit]:
+        """Strony i segmenty starsze niz keep_raw_days, od najstarszych (tylko listowanie, bez czytania)"""
+        cutoff = (now or time.time()) - self.keep_raw_days * 86400
+        units = []
+        # Shardy mlodszych dni nie maja starych stron - nie sa listowane
+        for session, folder in self.page_folders(until=date.fromtimestamp(cutoff).isoformat()):
+            for name in list_pages(folder):
+                path = os.path.join(folder, name)
+                mtime = os.path.getmtime(path)
+                if mtime < cutoff:
+                    units.append(_Unit(session, folder, path, mtime, False))
+            for path in list_segments(folder):
+                if os.path.basename(path).startswith(f"{BUNDLE_PREFIX}_"):
+                    continue
+                mtime = os.path.getmtime(path)
+                if mtime < cutoff:
+                    units.append(_Unit(session, folder, path, mtime, True))
+        return sorted(units, key=lambda unit: unit.mtime)
+
+    # -- ceny stron ---------------------------------------------------------------
+
+    def _folder_prices(self, folder: str) -> Dict[str, list]:
+        """Z logow wynikow folderu: nazwa strony / 'segment#offset' -> [(kombinacja, cena albo None)]"""
+        prices = {}
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(RESULTS_SUFFIX):
+                continue
+            for record in read_records(os.path.join(folder, name)):
+                if record.get("type") != "result" or not record.get("success") or not record.get("text_path"):
+                    continue
+                # Ten sam klucz co z nazwy strony (origin_destination_linia_wylot_powrot)
+                combo = "_".join(record["combo"]) if record.get("combo") else None
+                prices.setdefault(os.path.basename(record["text_path"]), []).append(
+                    (combo, record.get("total_price")))
+        return prices
+
+    def _page_prices(self, key: str, name: str, read_text, prices: Dict[str, list]) -> list:
+        known = prices.get(key)
+        if known:
+            return [(combo or _combo_key(name), price) for combo, price in known]
+        card = cheapest_card(read_text())
+        return [(_combo_key(name), card.total_price if card else None)]
+
+    def _decide(self, page_prices: list, report: RetentionReport) -> bool:
+        """Zachowac strone? Nowe minimum kombinacji albo brak ceny; minima aktualizowane"""
+        minimums = self.state["minimums"]
+        unparsed = new_minimum = False
+        for combo, price in page_prices:
+            if price is None:
+                unparsed = True
+            elif combo not in minimums or price < minimums[combo]:
+                minimums[combo] = price
+                new_minimum = True
+        if new_minimum:
+            report.kept_minimum += 1
+        elif unparsed:
+            report.kept_unparsed += 1
+        else:
+            report.dropped += 1
+        return new_minimum or unparsed
+
+    # -- przejscie ---------------------------------------------------------------
+
+    def run_once(self, now: Optional[float] = None, limit: Optional[int] = None) -> RetentionReport:
+        """Przetwarza najstarsze strony (do pages_per_run); zachowane do paczek, reszta usuwana"""
+        started = time.monotonic()
+        report = RetentionReport()
+        units = self.candidates(now)
+        budget = limit or self.pages_per_run
+        prices_by_session = {}
+        writers = {}
+        bundled = {}
+
+        try:
+            for unit in units:
+                if report.pages >= budget:
+                    report.remaining = True
+                    break
+                if unit.session not in prices_by_session:
+                    # Logi wynikow leza w folderze sesji, takze dla stron z shardow
+                    prices_by_session[unit.session] = self._folder_prices(unit.session)
+                if unit.folder not in bundled:
+                    bundled[unit.folder] = {ref.name for path in list_segments(unit.folder)
+                                            if os.path.basename(path).startswith(f"{BUNDLE_PREFIX}_")
+                                            for ref in read_index(path)}
+                if unit.folder not in writers:
+                    if len(writers) >= MAX_OPEN_SEGMENTS:
+                        # Strony z wielu shardow naraz - najdawniej otwarta paczka jest zamykana
+                        writers.pop(next(iter(writers))).close()
+                    writers[unit.folder] = SegmentWriter(unit.folder, self.bundle_max_mb, self.bundle_compression,
+                                                         logger=self.logger, prefix=BUNDLE_PREFIX)
+                self._process_unit(unit, prices_by_session[unit.session], writers[unit.folder],
+                                   bundled[unit.folder], report)
+        except Exception:
+            # Minima z przerwanego przejscia nie trafiaja do stanu: strona, ktorej nie udalo
+            # sie dopisac do paczki, przy ponowieniu znow jest nowym minimum
+            self.state = self._load_state()
+            raise
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        report.seconds = round(time.monotonic() - started, 2)
+        if report.pages:
+            self.state["runs"] += 1
+            self.state["pages"] += report.pages
+            self.state["reclaimed_bytes"] += report.reclaimed
+            self.state["last_run"] = datetime.now().isoformat(timespec="seconds")
+            self._save_state()
+            if self.logger:
+                more = " - ciag dalszy w kolejnym przejsciu" if report.remaining else ""
+                self.logger.info(f"Retencja {os.path.basename(self.root)}: {report.pages} stron "
+                                 f"(minimum {report.kept_minimum}, bez ceny {report.kept_unparsed}, "
+                                 f"usuniete {report.dropped}), odzyskano {report.reclaimed / 1024 / 1024:.1f} MB "
+                                 f"w {report.seconds:.1f}s{more}")
+        return report
+
+    def _process_unit(self, unit: _Unit, prices: Dict[str, list], writer: SegmentWriter, bundled: set,
+                      report: RetentionReport):
+        day = date.fromtimestamp(unit.mtime)
+        if not unit.segment:
+            name = f"{page_stem(os.path.basename(unit.path))}.txt"
+            report.bytes_before += os.path.getsize(unit.path)
+            text = []
+
+            def read_text():
+                # Tekst czytany raz i tylko, gdy potrzebny (brak ceny w logu albo strona zachowana)
+                if not text:
+                    text.append(read_page_text(unit.path))
+                return text[0]
+
+            keep = self._decide(self._page_prices(os.path.basename(unit.path), name, read_text, prices), report)
+            report.pages += 1
+            if keep:
+                report.bytes_after += self._bundle(writer, bundled, name, read_text(), day)
+            os.remove(unit.path)
+            return
+
+        report.bytes_before += os.path.getsize(unit.path)
+        segment_name = os.path.basename(unit.path)
+        for ref in read_index(unit.path):
+            keep = self._decide(self._page_prices(f"{segment_name}#{ref.offset}", ref.name, ref.read, prices), report)
+            report.pages += 1
+            if keep:
+                report.bytes_after += self._bundle(writer, bundled, ref.name, ref.read(), day, ref.meta)
+        # Segment usuwany dopiero po skopiowaniu zachowanych rekordow do paczki
+        index_path = unit.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        os.remove(unit.path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    @staticmethod
+    def _bundle(writer: SegmentWriter, bundled: set, name: str, text: str, day: date,
+                meta: Optional[dict] = None) -> int:
+        """Dopisuje strone do paczki (sprawdzajac odczyt); strona juz w paczce (przerwane przejscie) - pomijana"""
+        if name in bundled:
+            return 0
+        ref = writer.append(name, text, meta, day)
+        if ref.read() != text:
+            raise ValueError(f"Odczyt z paczki rozny od strony: {name}")
+        bundled.add(name)
+        return ref.stored_bytes
+
+    def status(self, now: Optional[float] = None) -> dict:
+        units = self.candidates(now)
+        return {
+            "keep_raw_days": self.keep_raw_days,
+            "pending_files": sum(1 for unit in units if not unit.segment),
+            "pending_segments": sum(1 for unit in units if unit.segment),
+            "pending_bytes": sum(os.path.getsize(unit.path) for unit in units),
+            "runs": self.state["runs"],
+            "pages": self.state["pages"],
+            "combinations": len(self.state["minimums"]),
+            "reclaimed_bytes": self.state["reclaimed_bytes"],
+            "last_run": self.state.get("last_run"),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Watek w tle (rolling mode)
+# ---------------------------------------------------------------------------
+
+class RetentionWorker(threading.Thread):
+    """Powtarza przejscia retencji w tle; po wyczerpaniu starych stron czeka idle_minutes"""
+
+    def __init__(self, engine: RetentionEngine, idle_minutes: float = 60, logger=None):
+        super().__init__(name="retention", daemon=True)
+        self.engine = engine
+        self.idle_seconds = idle_minutes * 60
+        self.logger = logger
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                report = self.engine.run_once()
+                pause = BUSY_PAUSE_SECONDS if report.remaining else self.idle_seconds
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Blad retencji: {e}")
+                pause = self.idle_seconds
+            self.stopping.wait(pause)
+
+    def stop(self, timeout: float = 60):
+        self.stopping.set()
+        self.join(timeout)
+
+
+def start_retention(root: str, retention_cfg: Optional[dict], logger=None) -> Optional[RetentionWorker]:
+    """Watek retencji dla folderu wyjsciowego (None, gdy retencja wylaczona)"""
+    engine = RetentionEngine.from_config(root, retention_cfg, logger)
+    if engine is None:
+        return None
+    cfg = dict(DEFAULT_RETENTION, **(retention_cfg or {}))
+    if logger:
+        logger.info(f"Retencja stron: surowe {cfg['keep_raw_days']} dni, potem nowe minima i strony bez ceny "
+                    f"w paczkach ({cfg['pages_per_run']} stron na przejscie)")
+    worker = RetentionWorker(engine, cfg["idle_minutes"], logger)
+    worker.start()
+    return worker
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
+
+
+def main(argv: list) -> int:
+    if len(argv) < 2 or argv[0] not in ("run", "status"):
+        print(__doc__)
+        return 1
+
+    keep_days = float(_option(argv, "--keep-days", 0))
+    engine = RetentionEngine(argv[1], keep_days, int(_option(argv, "--pages", DEFAULT_RETENTION["pages_per_run"])))
+    if argv[0] == "status":
+        for key, value in engine.status().items():
+            print(f"  {key}: {value}")
+        return 0
+
+    if not keep_days:
+        print("Podaj --keep-days N (strony mlodsze niz N dni zostaja bez zmian)")
+        return 1
+    total = RetentionReport()
+    while True:
+        report = engine.run_once()
+        print(f"  {report.pages} stron: minimum {report.kept_minimum}, bez ceny {report.kept_unparsed}, "
+              f"usuniete {report.dropped}, odzyskano {report.reclaimed / 1024:,.0f} KB ({report.seconds:.1f}s)")
+        for field_name in ("pages", "kept_minimum", "kept_unparsed", "dropped", "bytes_before", "bytes_after"):
+            setattr(total, field_name, getattr(total, field_name) + getattr(report, field_name))
+        if not report.remaining or "--all" not in argv:
+            break
+    print(f"Razem: {total.pages} stron, odzyskano {total.reclaimed / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -18,9 +18,10 @@ import time
 import random
 import os
 import json
-from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from array import array
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
 import logging
 
 # Selenium imports
@@ -30,6 +31,26 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
 
+from adaptive_grid import AdaptiveGridSearch
+from freshness import FreshnessIndex, FreshnessPolicy
+from load_budget import LoadBudget
+from page_dump import PageDumper
+from price_store import DB_PATH, PriceStore
+from retention import start_retention
+from session_log import LoggedResults, ResultLog, rebuild_summary
+from pacing import PacingClock, default_loads_per_hour
+from preflight import Issue, Preflight, PreflightReport
+from priority_lane import has_pending, serve_next
+from offer_cards import cheapest_per_airport, detect_airport, find_offer_cards, parse_flexible_prices
+from request_planner import (COALESCING_MODES, airport_label, airport_param, attribute_offers, coalesce_airline_requests,
+                             describe_savings, estimate_round_trips, flexible_date_param, pick_cells_to_confirm,
+                             plan_flexible_blocks, plan_oneway_legs, expand_airports, resolve_airports, DateGrid,
+                             ChainedRequests, LazyRequests)
+from results_expander import expand_results
+
+# Klucze okna dat w scraping_config (obie struktury)
+DATE_KEYS = ("departure_start", "departure_end", "return_start", "return_end", "earliest_departure", "latest_return")
+
 @dataclass
 class ScrapingRequest:
     """Struktura pojedynczego zapytania"""
@@ -42,6 +63,7 @@ class ScrapingRequest:
     duration_days: int
     origin: str
     destination: str
+    request_id: int = -1  # pozycja w siatce zapytan, -1 dla ladowan spoza siatki
 
 @dataclass
 class TextResult:
@@ -54,6 +76,16 @@ class TextResult:
     text_path: Optional[str]
     page_title: Optional[str]
     text_length: int
+    price_per_person: Optional[float] = None
+    total_price: Optional[float] = None
+    source: str = "direct"
+    origin_airport: Optional[str] = None
+    destination_airport: Optional[str] = None
+    airport_prices: Optional[Dict[str, float]] = None
+    offers_captured: int = 0
+    page_seconds: float = 0.0
+    expand_seconds: float = 0.0
+    expand_clicks: int = 0
 
 class SimpleDriver:
     """Prosta klasa driver bez fajerwerków"""
@@ -100,6 +132,24 @@ class KayakTextScraper:
         # Airlines config jest w airlines_config (słownik z filtrami)
         self.airlines = self.config.get("airlines_config", {})
 
+        # Czas ostatniego udanego wyniku per kombinacja (rolling mode)
+        self.freshness = FreshnessIndex()
+        # Zegar tempa w trybie ciaglym (None - opoznienia z delay_between_requests)
+        self.pacing = None
+        # Udzial w dziennej puli ladowan (config/load_budget.json)
+        self.budget = LoadBudget("extended", logger=self.logger)
+        # Licznik faktycznych ladowan stron (driver.get) - planery licza z niego page_loads
+        self.page_fetches = 0
+        # Wynik walidacji ostatnio wygenerowanych zapytan (do podsumowan)
+        self.preflight_report = None
+        # Zapis zrzutow stron (page_compression) ze statystykami per sesja
+        self.page_dump = PageDumper.from_config(self.config.get("scraping_config", {}), logger=self.logger)
+        # Log wynikow biezacej sesji / rundy (JSONL, rekord dopisywany po kazdym wyniku)
+        self.result_log = None
+        # Historia cen w SQLite (price_history_db, null = wylaczona) - zapis partiami
+        db_path = self.config.get("scraping_config", {}).get("price_history_db", DB_PATH)
+        self.price_store = PriceStore(db_path, logger=self.logger) if db_path else None
+
         self._create_session_folder()
 
     def _load_config(self, config_path: str) -> dict:
@@ -122,6 +172,8 @@ class KayakTextScraper:
         default_config = {
             "_comment_scraping": "Konfiguracja scrapingu lotów",
             "_comment_route": "origin/destination - kody IATA lotnisk", 
+            "_comment_routes": "routes - opcjonalna lista tras [{origin, destination, ...}], kazda moze nadpisac daty, min_days/max_days, passengers i selected_airlines; wszystkie trasy ida jedna kolejka z tym samym tempem",
+            "_comment_airport_groups": "origin/destination moga tez byc lista ('WAW,WMI,KRK') albo nazwa grupy z airport_groups - jedno wyszukiwanie obejmuje wszystkie lotniska grupy",
             "_comment_dates": "earliest_departure - najwcześniejszy dzień wylotu (YYYY-MM-DD)",
             "_comment_dates2": "latest_return - najpóźniejszy dzień powrotu (YYYY-MM-DD)",
             "_comment_duration": "min_days/max_days - długość pobytu w dniach",
@@ -130,6 +182,18 @@ class KayakTextScraper:
             "_comment_delays": "delay_between_requests - opóźnienie między zapytaniami w sekundach [min, max]",
             "_comment_rolling": "rolling_mode - true: działa w kółko sprawdzając wszystkie kombinacje w każdej rundzie, false: jedna sesja",
             "_comment_rolling_break": "rolling_break_minutes - przerwa między rundami w rolling mode [min, max]",
+            "_comment_rolling_schedule": "rolling_schedule - rounds: runda + przerwa, continuous: ladowania w kolko w rownym tempie loads_per_hour (null = tyle co w trybie rund), podsumowanie co summary_interval_minutes",
+            "_comment_coalescing": "airline_coalescing - off: osobne ladowanie per linia, unfiltered: jedno ladowanie bez filtra linii, multi_filter: jedno ladowanie z filtrem wszystkich wybranych linii",
+            "_comment_order": "randomize_order - losowa kolejnosc zapytan (permutacja liczona z indeksu), shuffle_seed - staly seed dla powtarzalnej kolejnosci (null = nowy co sesje)",
+            "_comment_date_search": "date_search - exact: kazda para dat osobno, flexible: ladowania z elastycznymi datami (+/- flex_days, max 3) i potwierdzenie flex_confirm_top najtanszych par, oneway: N+M ladowan w jedna strone, szacunek sumy i potwierdzenie oneway_confirm_top najtanszych par, adaptive: szukanie najtanszej pary dat w budzecie adaptive_budget ladowan",
+            "_comment_freshness": "freshness - rolling mode pomija kombinacje z udanym wynikiem mlodszym niz: routes {'WAW-AKL': minuty}, potem departure_distance [[dni do wylotu, minuty], ...], potem max_age_minutes (0 = zawsze sprawdzaj)",
+            "_comment_preflight": "preflight - walidacja przed uruchomieniem przegladarki: lotniska z wbudowanego indeksu IATA (+ extra_airports; unknown_airport: drop albo flag), wyloty nie w przeszlosci i nie dalej niz max_days_ahead dni",
+            "_comment_expand": "expand_max_offers - klikanie 'Pokaz wiecej wynikow' az strona pokaze tyle ofert (0 = wylaczone), expand_time_budget - limit czasu rozwijania w sekundach",
+            "_comment_page_compression": "page_compression - zapis stron: none (.txt, domyslnie), gzip (.txt.gz), zstd (.txt.zst, wymaga pakietu zstandard), page_compression_level - poziom kompresji (null = domyslny)",
+            "_comment_page_store": "page_store - files: plik na strone, segments: strony dopisywane do segmentow seg_*.seg z indeksem .idx (nowy segment po segment_max_mb MB albo o polnocy); import starych folderow: python src/segment_store.py import <folder>",
+            "_comment_retention": "retention - rolling mode w tle: strony starsze niz keep_raw_days dni (0 = wylaczone) zostaja tylko jako nowe minimum ceny albo strona bez ceny, w paczkach bundle_*.seg (bundle_compression, bundle_max_mb); pages_per_run stron na przejscie, idle_minutes przerwy gdy nie ma starych stron; recznie: python src/retention.py run output/kayak_text_data --keep-days 30 --all",
+            "_comment_page_layout": "page_layout - flat: strony w folderze sesji (jak dotad), sharded: podfoldery trasa / dzien / linia (WAW_ICN/2026-10-19/Turkish/), ekstraktor czyta wybrane shardy: --day 2026-10-19 --route WAW_ICN --airline Turkish; logi i podsumowania zostaja w folderze sesji",
+            "_comment_price_history": "price_history_db - baza historii cen SQLite (kazdy wynik z cena, zapis partiami; null = wylaczona), zapytania: python src/price_store.py cheapest WAW ICN --stay 20 --days 30",
 
             "scraping_config": {
                 "origin": "WAW",
@@ -146,7 +210,34 @@ class KayakTextScraper:
                 "selected_airlines": ["LOT", "Turkish", "Emirates", "Qatar", "China_Air"],
                 "delay_between_requests": [30, 45],
                 "rolling_mode": False,
-                "rolling_break_minutes": [45, 90]
+                "rolling_break_minutes": [45, 90],
+                "rolling_schedule": "rounds",
+                "loads_per_hour": None,
+                "summary_interval_minutes": 30,
+                "randomize_order": True,
+                "shuffle_seed": None,
+                "airline_coalescing": "off",
+                "date_search": "exact",
+                "flex_days": 3,
+                "flex_confirm_top": 3,
+                "oneway_confirm_top": 3,
+                "adaptive_budget": 40,
+                "freshness": {"max_age_minutes": 0, "routes": {}, "departure_distance": []},
+                "preflight": {"extra_airports": [], "unknown_airport": "drop", "max_days_ahead": 361},
+                "expand_max_offers": 0,
+                "expand_time_budget": 20,
+                "page_compression": "none",
+                "page_compression_level": None,
+                "page_store": "files",
+                "segment_max_mb": 256,
+                "page_layout": "flat",
+                "price_history_db": DB_PATH,
+                "retention": {"keep_raw_days": 0, "pages_per_run": 500, "bundle_compression": "gzip", "bundle_max_mb": 256, "idle_minutes": 60},
+                "routes": [],
+                "airport_groups": {
+                    "WARSZAWA": ["WAW", "WMI"],
+                    "POLSKA": ["WAW", "WMI", "KRK", "GDN"]
+                }
             },
             
             "route": {
@@ -302,32 +393,15 @@ class KayakTextScraper:
             return []
 
     def generate_date_combinations_standard(self, earliest_departure: str, latest_return: str,
-                                          min_days: int, max_days: int) -> List[tuple]:
-        """Generuje kombinacje dat w trybie standardowym"""
+                                          min_days: int, max_days: int,
+                                          latest_departure: date = None) -> Sequence[tuple]:
+        """Kombinacje dat w trybie standardowym - leniwa siatka (DateGrid), bez listy w pamieci.
+        latest_departure - ostatni dzien wylotu (preflight max_days_ahead), None - bez limitu"""
         try:
             earliest_dep = datetime.strptime(earliest_departure, "%Y-%m-%d").date()
             latest_ret = datetime.strptime(latest_return, "%Y-%m-%d").date()
 
-            combinations = []
-
-            for duration in range(min_days, max_days + 1):
-                latest_possible_departure = latest_ret - timedelta(days=duration)
-
-                if latest_possible_departure < earliest_dep:
-                    continue
-
-                current_departure = earliest_dep
-                while current_departure <= latest_possible_departure:
-                    return_date = current_departure + timedelta(days=duration)
-
-                    if return_date <= latest_ret:
-                        combinations.append((
-                            current_departure.strftime("%Y-%m-%d"),
-                            return_date.strftime("%Y-%m-%d"),
-                            duration
-                        ))
-
-                    current_departure += timedelta(days=1)
+            combinations = DateGrid(earliest_dep, latest_ret, min_days, max_days, latest_departure)
 
             self.logger.info(f"{len(combinations)} kombinacji dat (standard mode)")
             return combinations
@@ -336,88 +410,250 @@ class KayakTextScraper:
             self.logger.error(f"Blad dat standard: {e}")
             return []
 
-    def generate_requests(self) -> List[ScrapingRequest]:
-        """Generuje zapytania na podstawie config - obsługuje obie struktury"""
+    def _coalescing_enabled(self) -> bool:
+        """Czy wlaczone laczenie zapytan po liniach (airline_coalescing w scraping_config)"""
+        mode = self.config["scraping_config"].get("airline_coalescing", "off")
+        if mode not in COALESCING_MODES:
+            self.logger.warning(f"Nieznany tryb airline_coalescing: {mode} - wylaczam")
+            return False
+        return mode != "off"
+
+    def _plan_mode(self) -> Optional[str]:
+        """Tryb planowania ladowan stron lub None dla zwyklego 1 zapytanie = 1 ladowanie"""
+        date_search = self.config["scraping_config"].get("date_search", "exact")
+        if date_search in ("flexible", "oneway", "adaptive"):
+            return date_search
+        if self._coalescing_enabled():
+            return "coalesced"
+        return None
+
+    def run_planned_requests(self, requests: List[ScrapingRequest], round_number: int = None) -> tuple:
+        """Wykonuje zapytania wedlug planu (_plan_mode). Zwraca (wyniki, liczba ladowan stron)"""
+        mode = self._plan_mode()
+        if mode == "flexible":
+            return self.run_flexible_search(requests, round_number)
+        if mode == "oneway":
+            return self.run_oneway_search(requests, round_number)
+        if mode == "adaptive":
+            return self.run_adaptive_search(requests, round_number)
+        return self.run_coalesced_requests(requests, round_number)
+
+    def _route_configs(self) -> List[dict]:
+        """Ustawienia kazdej trasy: wpis z listy routes nadpisuje wartosci z scraping_config.
+
+        Bez routes - jedna trasa z origin/destination. Trasa z wlasnym oknem dat
+        nie dziedziczy dat globalnych (ani departure_start/return_end, ani
+        earliest_departure/latest_return).
+        """
         cfg = self.config["scraping_config"]
-        
-        # Obsługa różnych struktur dat w config
+        base = {key: value for key, value in cfg.items() if key != "routes"}
+        routes = cfg.get("routes") or []
+        if not routes:
+            return [base]
+
+        merged = []
+        for route in routes:
+            route_base = base
+            if any(key in route for key in DATE_KEYS):
+                route_base = {key: value for key, value in base.items() if key not in DATE_KEYS}
+            merged.append({**route_base, **route})
+        return merged
+
+    def _route_airports(self, route_cfg: dict = None) -> tuple:
+        """Lotniska trasy w formacie Kayak - grupa daje jedno wyszukiwanie (WAW,WMI,KRK)"""
+        cfg = route_cfg or self._route_configs()[0]
+        groups = self.config["scraping_config"].get("airport_groups", {})
+        return (airport_param(resolve_airports(cfg["origin"], groups)),
+                airport_param(resolve_airports(cfg["destination"], groups)))
+
+    def _route_text(self, route_cfg: dict) -> str:
+        """Trasa do logow; bledne kody z configu pokazane jak sa (odrzuca je preflight w generate_requests)"""
+        try:
+            return "{}->{}".format(*self._route_airports(route_cfg))
+        except ValueError:
+            return f"{route_cfg.get('origin')}->{route_cfg.get('destination')}"
+
+    def _route_label(self) -> str:
+        return ", ".join(self._route_text(route_cfg) for route_cfg in self._route_configs())
+
+    def _date_window(self, cfg: dict) -> tuple:
+        """(najwczesniejszy wylot, najpozniejszy powrot) - obsługuje obie struktury dat w config"""
         if "departure_start" in cfg and "departure_end" in cfg:
             # Nowa struktura GUI - użyj departure_start/end i return_start/end
-            earliest_departure = cfg["departure_start"]
-            latest_return = cfg["return_end"]
-        else:
-            # Stara struktura - użyj earliest_departure/latest_return
-            earliest_departure = cfg.get("earliest_departure", "2025-10-20")
-            latest_return = cfg.get("latest_return", "2025-11-15")
-
-        # Generuj kombinacje dat
-        date_combinations = self.generate_date_combinations_standard(
-            earliest_departure, latest_return,
-            cfg["min_days"], cfg["max_days"]
-        )
+            return cfg["departure_start"], cfg["return_end"]
+        # Stara struktura - użyj earliest_departure/latest_return
+        return cfg.get("earliest_departure", "2025-10-20"), cfg.get("latest_return", "2025-11-15")
+
+    def _log_routes(self):
+        """Parametry kazdej trasy w naglowku sesji"""
+        for route_cfg in self._route_configs():
+            earliest_departure, latest_return = self._date_window(route_cfg)
+            self.logger.info(f"Trasa: {self._route_text(route_cfg)} | "
+                             f"{earliest_departure} -> {latest_return} | "
+                             f"{route_cfg['min_days']}-{route_cfg['max_days']} dni | "
+                             f"{route_cfg['passengers']} pax | linie: {route_cfg['selected_airlines']}")
+
+    def _card_airports(self, request: ScrapingRequest, card) -> tuple:
+        """Faktyczne lotniska wylotu i przylotu oferty (wazne przy grupach lotnisk)"""
+        if card is None:
+            return None, None
+        return (detect_airport(card.text, request.origin.split(",")),
+                detect_airport(card.text, request.destination.split(",")))
+
+    def generate_requests(self) -> Sequence[ScrapingRequest]:
+        """Generuje zapytania na podstawie config - obsługuje obie struktury dat i liste routes.
+
+        Zwraca leniwa sekwencje (LazyRequests, dla kilku tras ChainedRequests):
+        zapytanie powstaje dopiero przy odczycie, a pseudolosowa kolejnosc jest
+        liczona z indeksu (shuffle_seed), wiec pamiec nie rosnie z wielkoscia
+        siatki. Trasy sa przemieszane miedzy soba w jednej kolejce.
+        """
+        cfg = self.config["scraping_config"]
+        preflight = Preflight.from_config(cfg.get("preflight"))
+        self.preflight_report = PreflightReport()
 
-        requests = []
-        origin = cfg["origin"]
-        destination = cfg["destination"]
+        parts = []
+        for route_cfg in self._route_configs():
+            earliest_departure, latest_return = self._date_window(route_cfg)
 
-        for dep_date, ret_date, duration in date_combinations:
-            for airline_key in cfg["selected_airlines"]:
-                if airline_key not in self.airlines:
+            # Wyloty przed dzisiaj i dalej niz max_days_ahead dni odpadaja
+            departure_start = preflight.first_valid_departure(earliest_departure)
+            departure_limit = preflight.last_valid_departure()
+
+            # Generuj kombinacje dat
+            date_combinations = self.generate_date_combinations_standard(
+                departure_start, latest_return,
+                route_cfg["min_days"], route_cfg["max_days"], departure_limit
+            )
+            past_combinations = far_combinations = 0
+            try:
+                first, start, last = (datetime.strptime(day, "%Y-%m-%d").date()
+                                      for day in (earliest_departure, departure_start, latest_return))
+                from_start = len(DateGrid(start, last, route_cfg["min_days"], route_cfg["max_days"]))
+                past_combinations = len(DateGrid(first, last, route_cfg["min_days"], route_cfg["max_days"])) - from_start
+                far_combinations = from_start - len(date_combinations)
+            except ValueError:
+                pass  # blad dat zglosi generate_date_combinations_standard
+            skipped_combinations = past_combinations + far_combinations
+
+            # Walidacja przed przegladarka: kody z configu (po rozwinieciu grup) z indeksu IATA i linie z config
+            groups = cfg.get("airport_groups", {})
+            origin_codes = expand_airports(route_cfg.get("origin", ""), groups)
+            destination_codes = expand_airports(route_cfg.get("destination", ""), groups)
+            origin, destination = airport_param(origin_codes), airport_param(destination_codes)
+            route_issues = preflight.check_route(origin_codes, destination_codes)
+            for issue in route_issues:
+                self.logger.warning(f"Trasa {origin}->{destination}: {issue.message}")
+            if any(issue.drop for issue in route_issues):
+                self.preflight_report.add(route_issues, (len(date_combinations) + skipped_combinations) * len(route_cfg["selected_airlines"]))
+                self.logger.warning(f"Pomijam trase {origin}->{destination}")
+                continue
+
+            airline_keys = []
+            for airline_key in route_cfg["selected_airlines"]:
+                issues = preflight.check_airline_key(airline_key, self.airlines)
+                if issues:
+                    self.preflight_report.add(issues, len(date_combinations) + skipped_combinations)
                     self.logger.warning(f"Nieznana linia: {airline_key}")
                     continue
+                airline_keys.append(airline_key)
+
+            if past_combinations:
+                self.preflight_report.add([Issue("past_departure", f"Wyloty przed {departure_start}")],
+                                          past_combinations * len(airline_keys))
+                self.logger.info(f"Pominieto {past_combinations} kombinacji dat z wylotem w przeszlosci")
+            if far_combinations:
+                self.preflight_report.add([Issue("too_far_ahead", f"Wyloty po {departure_limit}")],
+                                          far_combinations * len(airline_keys))
+                self.logger.info(f"Pominieto {far_combinations} kombinacji dat z wylotem dalej niz "
+                                 f"{preflight.max_days_ahead} dni")
+            self.preflight_report.add(route_issues, len(date_combinations) * len(airline_keys))
+
+            if not date_combinations or not airline_keys:
+                self.logger.warning(f"Brak zapytan dla trasy {origin}->{destination}")
+                continue
+
+            parts.append(LazyRequests(date_combinations, airline_keys, (origin, destination),
+                                      route_cfg["passengers"], self._request_view))
+            self.logger.info(f"{len(parts[-1])} zapytan dla trasy {origin}->{destination} (wszystkie kombinacje)")
+
+        if not parts:
+            return []
 
-                airline_data = self.airlines[airline_key]
-
-                request = ScrapingRequest(
-                    departure_date=dep_date,
-                    return_date=ret_date,
-                    airline_key=airline_key,
-                    airline_name=airline_data['name'],
-                    airline_filter=airline_data['filter'],
-                    passengers=cfg["passengers"],
-                    duration_days=duration,
-                    origin=origin,
-                    destination=destination
-                )
-                requests.append(request)
-
-        # Randomizuj kolejność
-        random.shuffle(requests)
-
-        self.logger.info(f"{len(requests)} zapytan dla trasy {origin}->{destination} (wszystkie kombinacje)")
+        # Randomizuj kolejność - permutacja liczona z indeksu, nowy seed co sesje/runde
+        seed = None
+        if cfg.get("randomize_order", True):
+            seed = cfg.get("shuffle_seed")
+            if seed is None:
+                seed = random.randrange(2 ** 32)
+            self.logger.info(f"Losowa kolejnosc zapytan (seed {seed})")
+
+        if len(parts) == 1:
+            requests = parts[0]
+            requests.shuffle(seed)
+        else:
+            requests = ChainedRequests(parts, seed)
+            self.logger.info(f"{len(requests)} zapytan dla {len(parts)} tras we wspolnej kolejce")
         return requests
 
-    def build_kayak_url(self, request: ScrapingRequest) -> str:
-        """Buduje URL Kayak"""
+    def _request_view(self, request_id: int, route: tuple, airline_key: str, departure, return_day, passengers: int) -> ScrapingRequest:
+        """Obiekt zapytania tworzony z wiersza siatki dopiero gdy jest potrzebny"""
+        airline_data = self.airlines[airline_key]
+        return ScrapingRequest(
+            departure_date=departure.isoformat(),
+            return_date=return_day.isoformat(),
+            airline_key=airline_key,
+            airline_name=airline_data['name'],
+            airline_filter=airline_data['filter'],
+            passengers=passengers,
+            duration_days=(return_day - departure).days,
+            origin=route[0],
+            destination=route[1],
+            request_id=request_id
+        )
+
+    def build_kayak_url(self, request: ScrapingRequest, flex_days: int = 0) -> str:
+        """Buduje URL Kayak (flex_days > 0 - elastyczne daty, pusty return_date - lot w jedna strone)"""
         base_url = "https://www.kayak.pl/flights"
         route = f"{request.origin}-{request.destination}"
-        dates = f"{request.departure_date}/{request.return_date}"
+        dates = flexible_date_param(request.departure_date, flex_days)
+        if request.return_date:
+            dates += f"/{flexible_date_param(request.return_date, flex_days)}"
         passengers = f"{request.passengers}adults"
 
-        url = f"{base_url}/{route}/{dates}/{passengers}?sort=price_a&{request.airline_filter}"
+        url = f"{base_url}/{route}/{dates}/{passengers}?sort=price_a"
+        if request.airline_filter:
+            url += f"&{request.airline_filter}"
         return url
 
     def scrape_text_only(self, request: ScrapingRequest, round_number: int = None) -> TextResult:
         """GLOWNA FUNKCJA - tylko otworz i skopiuj tekst"""
+        return self._scrape_page(request, round_number)[0]
+
+    def _scrape_page(self, request: ScrapingRequest, round_number: int = None, flex_days: int = 0) -> tuple:
+        """Otwiera strone, zapisuje tekst i zwraca (TextResult, tekst strony)"""
         driver = None
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
 
         # NOWY FORMAT NAZWY PLIKU: podobnie jak w kayak_excel_scraper
         # Zawiera teraz kody lotnisk na początku nazwy
         if round_number:
-            base_name = f"R{round_number:03d}_{request.origin}_{request.destination}_{request.airline_key}_{request.departure_date}_{request.return_date}_{timestamp}"
+            base_name = f"R{round_number:03d}_{airport_label(request.origin)}_{airport_label(request.destination)}_{request.airline_key}_{request.departure_date}_{request.return_date or request.departure_date}_{timestamp}"
         else:
-            base_name = f"{request.origin}_{request.destination}_{request.airline_key}_{request.departure_date}_{request.return_date}_{timestamp}"
+            base_name = f"{airport_label(request.origin)}_{airport_label(request.destination)}_{request.airline_key}_{request.departure_date}_{request.return_date or request.departure_date}_{timestamp}"
 
         try:
             self.logger.info(f"{request.airline_name} | {request.origin}->{request.destination} | {request.departure_date}->{request.return_date}")
 
+            if not self._draw_budget():
+                raise RuntimeError("Dzienny budzet ladowan wyczerpany")
+
             # Utworz driver
             driver = SimpleDriver.create_driver()
             driver.set_page_load_timeout(45)
 
             # URL
-            url = self.build_kayak_url(request)
+            url = self.build_kayak_url(request, flex_days)
 
             # Krotkie opoznienie przed otwarciem
             delay = random.uniform(2, 5)
@@ -425,6 +661,8 @@ class KayakTextScraper:
 
             # Otworz strone
             self.logger.info(f"Otwieram strone...")
+            page_started = time.monotonic()
+            self.page_fetches += 1
             driver.get(url)
 
             # DLUGIE CZEKANIE - 12s + losowy skladnik (3-8s)
@@ -432,6 +670,10 @@ class KayakTextScraper:
             self.logger.info(f"Czekam {wait_time:.1f}s na zaladowanie...")
             time.sleep(wait_time)
 
+            # Rozwin liste wynikow ("Pokaz wiecej wynikow") przed kopiowaniem tekstu
+            cfg = self.config["scraping_config"]
+            expansion = expand_results(driver, cfg.get("expand_max_offers", 0), cfg.get("expand_time_budget", 20), logger=self.logger)
+
             # Pobierz tytul
             page_title = driver.title
 
@@ -439,9 +681,10 @@ class KayakTextScraper:
             self.logger.info(f"Kopiuje tekst...")
             body = driver.find_element(By.TAG_NAME, "body")
             page_text = body.text
+            page_seconds = round(time.monotonic() - page_started, 2)
 
             # Dodatkowe informacje na gorze (NOWY FORMAT jak w kayak_excel_scraper)
-            full_text = f"""URL: {url}
+            header = f"""URL: {url}
 Title: {page_title}
 Timestamp: {timestamp}
 Round: {round_number if round_number else "Single"}
@@ -449,19 +692,33 @@ Route: {request.origin} - {request.destination}
 Flight: {request.airline_name} | {request.departure_date} - {request.return_date} | {request.passengers} pax
 Duration: {request.duration_days} days
 Airline Filter: {request.airline_filter}
+Flexible Days: {flex_days}
 {'='*80}
 
-{page_text}
 """
 
-            # Zapisz do pliku
-            text_path = os.path.join(self.session_dir, f"{base_name}.txt")
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(full_text)
+            # Zapisz do pliku (strumieniowo, z kompresja z configu)
+            text_path = self.page_dump.write(self.session_dir, base_name, (header, page_text, "\n"),
+                                             route=f"{airport_label(request.origin)}_{airport_label(request.destination)}",
+                                             airline=request.airline_key)
 
             text_length = len(page_text)
             self.logger.info(f"Zapisano: {text_length} znakow -> {os.path.basename(text_path)}")
 
+            cards = find_offer_cards(page_text)
+            card = min(cards, key=lambda c: c.total_price) if cards else None
+            origin_airport, destination_airport = self._card_airports(request, card)
+            self.budget.observe(f"{request.origin}-{request.destination}-{request.airline_key}-{request.departure_date}-{request.return_date}",
+                                card.total_price if card else None, request.departure_date)
+            self.logger.info(f"Ofert na stronie: {len(cards)} (strona {page_seconds:.1f}s, rozwijanie {expansion.seconds:.1f}s)")
+
+            airport_prices = None
+            if "," in request.origin or "," in request.destination:
+                per_airport = cheapest_per_airport(cards, request.origin.split(","), request.destination.split(","))
+                airport_prices = {route: c.total_price for route, c in sorted(per_airport.items(), key=lambda item: item[1].total_price)}
+                for route, price in airport_prices.items():
+                    self.logger.info(f"   {route}: {price:,.0f} PLN lacznie")
+
             return TextResult(
                 request=request,
                 timestamp=timestamp,
@@ -470,8 +727,17 @@ Airline Filter: {request.airline_filter}
                 error_message=None,
                 text_path=text_path,
                 page_title=page_title,
-                text_length=text_length
-            )
+                text_length=text_length,
+                price_per_person=card.price_per_person if card else None,
+                total_price=card.total_price if card else None,
+                origin_airport=origin_airport,
+                destination_airport=destination_airport,
+                airport_prices=airport_prices,
+                offers_captured=len(cards),
+                page_seconds=page_seconds,
+                expand_seconds=expansion.seconds,
+                expand_clicks=expansion.clicks
+            ), page_text
 
         except Exception as e:
             self.logger.error(f"Blad: {str(e)}")
@@ -485,7 +751,7 @@ Airline Filter: {request.airline_filter}
                 text_path=None,
                 page_title=None,
                 text_length=0
-            )
+            ), None
 
         finally:
             if driver:
@@ -494,20 +760,501 @@ Airline Filter: {request.airline_filter}
                 except:
                     pass
 
-    def save_session_summary(self, requests: List[ScrapingRequest], results: List[TextResult]):
+    def run_coalesced_requests(self, requests: List[ScrapingRequest], round_number: int = None) -> tuple:
+        """Sprawdza zapytania laczac linie lotnicze - jedno ladowanie na trase i daty.
+
+        Ceny sa przypisywane liniom z kart wynikow; linia bez karty na wspolnej
+        stronie jest sprawdzana osobnym ladowaniem ze swoim filtrem.
+        Zwraca (wyniki per zapytanie, liczba ladowan stron).
+        """
+        cfg = self.config["scraping_config"]
+        mode = cfg.get("airline_coalescing", "off")
+        prefix = f"R{round_number} " if round_number else ""
+
+        loads = coalesce_airline_requests(
+            requests,
+            key_fn=lambda r: (r.origin, r.destination, r.departure_date, r.return_date, r.passengers),
+            filter_fn=lambda r: r.airline_filter,
+            mode=mode
+        )
+        self.logger.info(f"Laczenie linii ({mode}): {describe_savings(len(requests), loads)}")
+
+        results = self._results()
+        fetches_before = self.page_fetches
+        page_loads = 0
+
+        def pause():
+            if page_loads:
+                self._pause_between_loads()
+
+        for i, load in enumerate(loads, 1):
+            if getattr(self, 'stop_rolling', False):
+                self.logger.info("Zatrzymano podczas rundy")
+                break
+
+            pause()
+            first = load.members[0]
+            self.logger.info(f"\n{prefix}[{i}/{len(loads)}] {first.origin}->{first.destination} | {first.departure_date}->{first.return_date} | {len(load.members)} linii")
+
+            if load.is_direct:
+                results.append(self.scrape_text_only(first, round_number))
+                page_loads += 1
+                continue
+
+            combined_request = replace(
+                first,
+                airline_key=load.label,
+                airline_name=", ".join(m.airline_key for m in load.members),
+                airline_filter=load.airline_filter,
+                request_id=-1
+            )
+            combined, page_text = self._scrape_page(combined_request, round_number)
+            page_loads += 1
+
+            if not combined.success:
+                # Strona sie nie zaladowala - kazda linia osobno
+                missing = list(range(len(load.members)))
+            else:
+                attribution = attribute_offers(load, page_text)
+                missing = attribution.missing
+                self.logger.info(f"Karty na stronie: {attribution.cards_on_page} | przypisano {len(attribution.found)}/{len(load.members)} linii")
+
+                for index, card in attribution.found.items():
+                    member = load.members[index]
+                    origin_airport, destination_airport = self._card_airports(member, card)
+                    self.logger.info(f"   {member.airline_key}: {card.price_per_person:,.0f} PLN/os ({card.total_price:,.0f} PLN lacznie) {origin_airport}->{destination_airport}")
+                    results.append(replace(
+                        combined,
+                        request=member,
+                        price_per_person=card.price_per_person,
+                        total_price=card.total_price,
+                        source="combined",
+                        origin_airport=origin_airport,
+                        destination_airport=destination_airport
+                    ))
+
+            for index in missing:
+                if getattr(self, 'stop_rolling', False):
+                    break
+                member = load.members[index]
+                self.logger.info(f"Brak {member.airline_key} na wspolnej stronie - osobne ladowanie")
+                pause()
+                fallback = self.scrape_text_only(member, round_number)
+                fallback.source = "fallback"
+                results.append(fallback)
+                page_loads += 1
+
+            successful = len([r for r in results if r.success])
+            failed = len([r for r in results if not r.success])
+            self.logger.info(f"{prefix}Progress: {successful} sukces | {failed} bledow | {page_loads} ladowan stron")
+
+        # Proby odrzucone przez budzet nie ladowaly strony
+        page_loads = self.page_fetches - fetches_before
+        self.logger.info(f"Laczenie linii: {len(results)} wynikow z {page_loads} ladowan stron")
+        return results, page_loads
+
+    def _group_requests(self, requests) -> Dict[tuple, array]:
+        """Pozycje zapytan pogrupowane po (trasa, linia) - planery dzialaja na siatce jednej trasy i linii.
+
+        Grupy trzymaja tylko pozycje w sekwencji (array), nie obiekty zapytan -
+        leniwa sekwencja nie jest rozwijana w liste.
+        """
+        groups = {}
+        for position, request in enumerate(requests):
+            groups.setdefault((f"{request.origin}-{request.destination}", request.airline_key), array('L')).append(position)
+        return groups
+
+    @staticmethod
+    def _group_items(requests, groups: Dict[tuple, array]):
+        """(klucz grupy, zapytania grupy) - zapytania tworzone dla jednej grupy naraz"""
+        for key, positions in groups.items():
+            yield key, [requests[position] for position in positions]
+
+    def _wait_slot(self):
+        """Losowe opoznienie miedzy ladowaniami stron (delay_between_requests), w trybie ciaglym zegar tempa"""
+        if getattr(self, 'stop_rolling', False):
+            return
+        if not hasattr(self, 'stop_rolling') and self.budget.remaining() == 0:
+            return  # budzet na dzis wyczerpany - kolejne zapytania nie zaladuja strony
+        if self.pacing:
+            self.pacing.wait(lambda: self.stop_rolling)
+            return
+        delay_range = self.config["scraping_config"]["delay_between_requests"]
+        delay = random.uniform(delay_range[0], delay_range[1])
+        self.logger.info(f"Opoznienie: {delay:.1f}s")
+        time.sleep(delay)
+
+    def _draw_budget(self) -> bool:
+        """Ladowanie z dziennego udzialu; w rolling mode czeka na nowa pule, w pojedynczej sesji odmawia"""
+        if hasattr(self, 'stop_rolling'):
+            return self.budget.wait_for_draw(lambda: self.stop_rolling)
+        return self.budget.draw()
+
+    def _pause_between_loads(self):
+        """Czekanie na slot przed kolejnym ladowaniem; slot najpierw dostaja zgloszenia z priority lane"""
+        self._wait_slot()
+        self._serve_priority()
+
+    def _serve_priority(self):
+        """Obsluguje zgloszenia z priority lane - kazde zajmuje jeden slot przegladarki"""
+        while not getattr(self, 'stop_rolling', False) and serve_next(self._fetch_url_text, "extended", logger=self.logger):
+            # Zaplanowane ladowanie dostaje kolejny slot, nie zaraz po zgloszeniu
+            self._wait_slot()
+
+    def _fetch_url_text(self, url: str) -> str:
+        """Tekst strony dowolnego URLa (priority lane) - ten sam driver i czas czekania co zwykle ladowanie"""
+        self.budget.record_priority()
+        driver = SimpleDriver.create_driver()
+        try:
+            driver.set_page_load_timeout(45)
+            driver.get(url)
+            time.sleep(12 + random.uniform(3, 8))
+            return driver.find_element(By.TAG_NAME, "body").text
+        finally:
+            try:
+                driver.quit()
+            except:
+                pass
+
+    def _confirm_cells(self, airline_key: str, lookup: dict, estimates: dict, top: int,
+                       round_number: int = None, estimate_label: str = "estimated", route: str = None) -> tuple:
+        """Potwierdza dokladnym ladowaniem top najtanszych par dat z szacunkow.
+
+        Zwraca (wyniki, wpisy do raportu). Zaczyna od opoznienia - wywolywana
+        zawsze po wczesniejszych ladowaniach.
+        """
+        prefix = f"R{round_number} " if round_number else ""
+        results, entries = [], []
+        for dep, ret in pick_cells_to_confirm(estimates, top):
+            if getattr(self, 'stop_rolling', False):
+                break
+            self._pause_between_loads()
+            self.logger.info(f"\n{prefix}Potwierdzenie {airline_key} {dep}->{ret} ({estimate_label}: {estimates[(dep, ret)]:,.0f} PLN)")
+            confirmed = self.scrape_text_only(lookup[(dep, ret)], round_number)
+            confirmed.source = "confirmed"
+            results.append(confirmed)
+            entries.append({
+                "route": route,
+                "airline": airline_key,
+                "departure_date": dep,
+                "return_date": ret,
+                f"{estimate_label}_total_price": estimates[(dep, ret)],
+                "confirmed_total_price": confirmed.total_price,
+                "success": confirmed.success
+            })
+        return results, entries
+
+    def _save_plan_report(self, kind: str, report: dict, round_number: int = None):
+        """Zapisuje raport planu ladowan: {kind}_summary.json / round_XXX_{kind}.json"""
+        name = f"round_{round_number:03d}_{kind}.json" if round_number else f"{kind}_summary.json"
+        try:
+            with open(os.path.join(self.session_dir, name), 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            self.logger.error(f"Blad zapisu raportu {name}: {e}")
+
+    def run_flexible_search(self, requests: List[ScrapingRequest], round_number: int = None) -> tuple:
+        """Sprawdza siatke dat ladowaniami z elastycznymi datami (+/- flex_days).
+
+        Kazde ladowanie pokrywa blok kombinacji; z wyniku czytane sa najtansze
+        ceny per para dat, a dokladne ladowania ida tylko dla flex_confirm_top
+        najtanszych komorek kazdej linii. Raport pokrycia trafia do
+        flexible_summary.json (w rolling mode round_XXX_flexible.json).
+        """
+        cfg = self.config["scraping_config"]
+        flex_days = cfg.get("flex_days", 3)
+        confirm_top = cfg.get("flex_confirm_top", 3)
+        prefix = f"R{round_number} " if round_number else ""
+
+        groups = self._group_requests(requests)
+
+        results = self._results()
+        fetches_before = self.page_fetches
+        report = {"flex_days": flex_days, "confirm_top": confirm_top, "flexible_loads": [], "confirmed": []}
+
+        for (route, airline_key), airline_requests in self._group_items(requests, groups):
+            lookup = {(r.departure_date, r.return_date): r for r in airline_requests}
+            blocks = plan_flexible_blocks(list((r.departure_date, r.return_date, r.duration_days) for r in airline_requests), flex_days)
+            self.logger.info(f"{route} {airline_key}: {len(airline_requests)} kombinacji dat -> {len(blocks)} ladowan elastycznych")
+
+            cell_prices = {}
+            for i, block in enumerate(blocks, 1):
+                if getattr(self, 'stop_rolling', False):
+                    break
+                if results:
+                    self._pause_between_loads()
+
+                center = replace(
+                    airline_requests[0],
+                    airline_key=f"{airline_key}_FLEX",
+                    departure_date=block.departure_center.isoformat(),
+                    return_date=block.return_center.isoformat(),
+                    duration_days=(block.return_center - block.departure_center).days,
+                    request_id=-1
+                )
+                self.logger.info(f"\n{prefix}[{airline_key} {i}/{len(blocks)}] {center.departure_date}->{center.return_date} +/-{block.flex_days} dni")
+                result, page_text = self._scrape_page(center, round_number, flex_days=block.flex_days)
+                result.source = "flexible"
+                results.append(result)
+
+                covered = {(dep, ret) for dep, ret, _ in block.covered}
+                priced = {}
+                if result.success:
+                    prices = parse_flexible_prices(page_text, block.departure_dates, block.return_dates, center.passengers)
+                    priced = {(d.isoformat(), r.isoformat()): price for (d, r), price in prices.items()
+                              if (d.isoformat(), r.isoformat()) in covered}
+                for cell, price in priced.items():
+                    if cell not in cell_prices or price < cell_prices[cell]:
+                        cell_prices[cell] = price
+
+                self.logger.info(f"Ladowanie elastyczne pokrywa {len(covered)} kombinacji, ceny odczytane dla {len(priced)}")
+                report["flexible_loads"].append({
+                    "route": route,
+                    "airline": airline_key,
+                    "departure_center": center.departure_date,
+                    "return_center": center.return_date,
+                    "covered_combinations": len(covered),
+                    "priced_combinations": len(priced),
+                    "success": result.success,
+                    "text_path": result.text_path
+                })
+
+            # Potwierdz najtansze komorki dokladnym ladowaniem
+            confirmed, entries = self._confirm_cells(airline_key, lookup, cell_prices, confirm_top, round_number, "flexible", route)
+            results.extend(confirmed)
+            report["confirmed"].extend(entries)
+
+        page_loads = self.page_fetches - fetches_before
+        report["total_combinations"] = len(requests)
+        report["page_loads"] = page_loads
+        self._save_plan_report("flexible", report, round_number)
+
+        self.logger.info(f"Elastyczne daty: {len(requests)} kombinacji sprawdzonych {page_loads} ladowaniami stron")
+        return results, page_loads
+
+    def run_oneway_search(self, requests: List[ScrapingRequest], round_number: int = None) -> tuple:
+        """Rozklada siatke N x M na N + M ladowan w jedna strone.
+
+        Dla kazdej linii: jedno ladowanie tam na kazdy dzien wylotu i jedno
+        z powrotem na kazdy dzien powrotu. Suma najtanszych odcinkow to
+        szacowana cena w obie strony; oneway_confirm_top najtanszych par
+        jest potwierdzane prawdziwym ladowaniem w obie strony. Szacunki
+        i potwierdzenia trafiaja do oneway_summary.json.
+        """
+        cfg = self.config["scraping_config"]
+        confirm_top = cfg.get("oneway_confirm_top", 3)
+        prefix = f"R{round_number} " if round_number else ""
+
+        groups = self._group_requests(requests)
+
+        results = self._results()
+        fetches_before = self.page_fetches
+        report = {"confirm_top": confirm_top, "legs": [], "estimates": [], "confirmed": []}
+
+        for (route, airline_key), airline_requests in self._group_items(requests, groups):
+            lookup = {(r.departure_date, r.return_date): r for r in airline_requests}
+            departure_days, return_days = plan_oneway_legs(lookup.keys())
+            self.logger.info(f"{route} {airline_key}: {len(lookup)} kombinacji dat -> {len(departure_days)}+{len(return_days)} ladowan w jedna strone")
+
+            template = airline_requests[0]
+            legs = [("outbound", day, replace(template, airline_key=f"{airline_key}_OW", departure_date=day,
+                                               return_date="", duration_days=0, request_id=-1))
+                    for day in departure_days]
+            legs += [("return", day, replace(template, airline_key=f"{airline_key}_OW", departure_date=day,
+                                             return_date="", duration_days=0, request_id=-1,
+                                             origin=template.destination, destination=template.origin))
+                     for day in return_days]
+
+            leg_prices = {"outbound": {}, "return": {}}
+            for i, (direction, day, leg) in enumerate(legs, 1):
+                if getattr(self, 'stop_rolling', False):
+                    break
+                if results:
+                    self._pause_between_loads()
+
+                self.logger.info(f"\n{prefix}[{airline_key} {i}/{len(legs)}] {direction} {leg.origin}->{leg.destination} {day}")
+                result = self.scrape_text_only(leg, round_number)
+                result.source = f"oneway_{direction}"
+                results.append(result)
+                if result.total_price is not None:
+                    leg_prices[direction][day] = result.total_price
+
+                report["legs"].append({
+                    "route": route,
+                    "airline": airline_key,
+                    "direction": direction,
+                    "date": day,
+                    "total_price": result.total_price,
+                    "success": result.success
+                })
+
+            estimates = estimate_round_trips(lookup.keys(), leg_prices["outbound"], leg_prices["return"])
+            self.logger.info(f"{airline_key}: szacunki dla {len(estimates)}/{len(lookup)} kombinacji")
+            report["estimates"].extend(
+                {"route": route, "airline": airline_key, "departure_date": dep, "return_date": ret, "estimated_total_price": price}
+                for (dep, ret), price in sorted(estimates.items(), key=lambda item: item[1])
+            )
+
+            confirmed, entries = self._confirm_cells(airline_key, lookup, estimates, confirm_top, round_number, "estimated", route)
+            results.extend(confirmed)
+            report["confirmed"].extend(entries)
+
+        page_loads = self.page_fetches - fetches_before
+        report["total_combinations"] = len(requests)
+        report["page_loads"] = page_loads
+        self._save_plan_report("oneway", report, round_number)
+
+        self.logger.info(f"Odcinki w jedna strone: {len(requests)} kombinacji sprawdzonych {page_loads} ladowaniami stron")
+        return results, page_loads
+
+    def run_adaptive_search(self, requests: List[ScrapingRequest], round_number: int = None) -> tuple:
+        """Szuka najtanszej kombinacji dat bez ladowania calej siatki.
+
+        Budzet adaptive_budget (ladowania stron) jest dzielony rowno miedzy
+        linie. Dla kazdej linii AdaptiveGridSearch wybiera komorki (dzien
+        wylotu x dlugosc pobytu): rzadka probka, potem najtansze i najmniej
+        pewne okolice, stop po zbieznosci. Wynik z pewnoscia znalezienia
+        minimum trafia do adaptive_summary.json.
+        """
+        cfg = self.config["scraping_config"]
+        prefix = f"R{round_number} " if round_number else ""
+
+        groups = self._group_requests(requests)
+        airline_budget = max(1, cfg.get("adaptive_budget", 40) // max(1, len(groups)))
+
+        results = self._results()
+        fetches_before = self.page_fetches
+        report = {"budget": cfg.get("adaptive_budget", 40), "airlines": []}
+
+        for (route, airline_key), airline_requests in self._group_items(requests, groups):
+            lookup = {(r.departure_date, r.return_date): r for r in airline_requests}
+            first_departure = min(datetime.strptime(r.departure_date, "%Y-%m-%d") for r in airline_requests)
+            coords = {
+                (r.departure_date, r.return_date): ((datetime.strptime(r.departure_date, "%Y-%m-%d") - first_departure).days, r.duration_days)
+                for r in airline_requests
+            }
+            search = AdaptiveGridSearch(coords, airline_budget)
+            self.logger.info(f"{route} {airline_key}: siatka {len(coords)} kombinacji, budzet {search.budget} ladowan")
+
+            while not getattr(self, 'stop_rolling', False):
+                cell = search.next_cell()
+                if cell is None:
+                    break
+                if results:
+                    self._pause_between_loads()
+
+                estimate = search.estimate(cell)
+                hint = f" (szacunek {estimate.price:,.0f} +/- {estimate.sigma:,.0f} PLN)" if estimate else ""
+                self.logger.info(f"\n{prefix}[{airline_key} {len(search.prices) + 1}/{search.budget}] {cell[0]}->{cell[1]}{hint}")
+                result = self.scrape_text_only(lookup[cell], round_number)
+                result.source = "adaptive"
+                results.append(result)
+                search.record(cell, result.total_price)
+
+            summary = search.summary()
+            summary["route"] = route
+            summary["airline"] = airline_key
+            summary["samples"] = [{"departure_date": dep, "return_date": ret, "total_price": price}
+                                  for (dep, ret), price in search.prices.items()]
+            report["airlines"].append(summary)
+
+            if summary["best_price"] is not None:
+                dep, ret = summary["best_cell"]
+                self.logger.info(f"{route} {airline_key}: najtaniej {summary['best_price']:,.0f} PLN {dep}->{ret} | "
+                                 f"{summary['page_loads']}/{len(coords)} komorek | pewnosc minimum {summary['confidence']:.0%} | stop: {summary['stop_reason']}")
+            else:
+                self.logger.warning(f"{route} {airline_key}: brak cen w probkach ({summary['stop_reason']})")
+
+        page_loads = self.page_fetches - fetches_before
+        report["total_combinations"] = len(requests)
+        report["page_loads"] = page_loads
+        self._save_plan_report("adaptive", report, round_number)
+
+        self.logger.info(f"Adaptacyjne szukanie: {len(requests)} kombinacji, {page_loads} ladowan stron")
+        return results, page_loads
+
+    def _open_result_log(self, name: str, **meta):
+        """Nowy log wynikow (session / round_NNN) - poprzedni zamykany"""
+        if self.result_log:
+            self.result_log.close()
+            self.page_dump.close()
+        self.result_log = ResultLog(self.session_dir, name, self.config, **meta)
+
+    def _log_result(self, result: TextResult):
+        request = result.request
+        if self.result_log:
+            combo = (request.origin, request.destination, request.airline_key, request.departure_date, request.return_date)
+            self.result_log.add(result, request.airline_key, combo if request.request_id >= 0 else None)
+        if self.price_store:
+            self.price_store.add_result("extended", result, request.origin, request.destination, request.airline_key,
+                                        request.departure_date, request.return_date)
+
+    def _results(self) -> LoggedResults:
+        """Lista wynikow dopisujaca kazdy wynik do biezacego logu"""
+        return LoggedResults(self._log_result)
+
+    def _finish_result_log(self, name: str, requests, results: List[TextResult]) -> dict:
+        """Zamyka log i sklada z niego podsumowanie (bez logu - np. wywolanie spoza sesji - log z listy wynikow)"""
+        if self.result_log is None:
+            self._open_result_log(name)
+            for result in results:
+                self._log_result(result)
+        self.result_log.close()
+        # Segmenty stron sesji / rundy domkniete razem z logiem (indeks zapisany na dysk)
+        self.page_dump.close()
+        path, self.result_log = self.result_log.path, None
+        if self.price_store:
+            self.price_store.flush()
+        return rebuild_summary(path, requests.route_totals() if hasattr(requests, "route_totals") else None)
+
+    def _route_summary(self, requests, results: List[TextResult]) -> dict:
+        """Postep i najtansza cena per trasa (liczone tylko z zapytan siatki, request_id >= 0)"""
+        totals = requests.route_totals() if hasattr(requests, "route_totals") else {}
+        routes = {label: {"total_requests": total, "results": 0, "successful": 0, "failed": 0,
+                          "cheapest_total_price": None, "cheapest_request_id": None}
+                  for label, total in totals.items()}
+        for result in results:
+            if result.request.request_id < 0:
+                continue
+            route = routes.setdefault(f"{result.request.origin}-{result.request.destination}", {
+                "total_requests": 0, "results": 0, "successful": 0, "failed": 0,
+                "cheapest_total_price": None, "cheapest_request_id": None})
+            route["results"] += 1
+            route["successful" if result.success else "failed"] += 1
+            if result.total_price is not None and (route["cheapest_total_price"] is None
+                                                   or result.total_price < route["cheapest_total_price"]):
+                route["cheapest_total_price"] = result.total_price
+                route["cheapest_request_id"] = result.request.request_id
+        return routes
+
+    def _route_progress(self, requests, results: List[TextResult]) -> str:
+        """Dopisek do logu postepu z licznikami per trasa (tylko przy kilku trasach)"""
+        routes = self._route_summary(requests, results)
+        if len(routes) < 2:
+            return ""
+        return " | " + " | ".join(f"{label} {route['results']}/{route['total_requests']}" for label, route in routes.items())
+
+    def save_session_summary(self, requests: List[ScrapingRequest], results: List[TextResult], page_loads: int = None):
         """Zapisz podsumowanie sesji"""
         try:
+            stream = self._finish_result_log("session", requests, results)
             summary = {
                 "session_timestamp": datetime.now().isoformat(),
-                "config_used": self.config,
+                "config_hash": stream["config_hash"],
                 "total_requests": len(requests),
-                "successful": len([r for r in results if r.success]),
-                "failed": len([r for r in results if not r.success]),
-                "airlines": list(set([r.request.airline_key for r in results])),
-                "route": f"{self.config['scraping_config']['origin']}->{self.config['scraping_config']['destination']}",
+                "page_loads": page_loads if page_loads is not None else stream["results_count"],
+                "successful": stream["successful"],
+                "failed": stream["failed"],
+                "airlines": stream["airlines"],
+                "route": self._route_label(),
                 "rolling_mode": self.config['scraping_config'].get('rolling_mode', False),
-                "total_text_length": sum([r.text_length for r in results if r.success]),
-                "results": [asdict(res) for res in results]
+                "total_text_length": stream["total_text_length"],
+                "capture": stream["capture"],
+                "page_dump": self.page_dump.take_stats(),
+                "preflight": self.preflight_report.describe() if self.preflight_report else None,
+                "routes": stream["routes"],
+                "results_count": stream["results_count"],
+                "results_log": stream["results_log"]
             }
 
             summary_path = os.path.join(self.session_dir, "session_summary.json")
@@ -531,17 +1278,7 @@ Airline Filter: {request.airline_filter}
         # Tryb standardowy - jedna sesja
         self.logger.info("" + "="*60)
         self.logger.info("KAYAK TEXT SCRAPER - SESJA ROZPOCZETA")
-        self.logger.info(f"Trasa: {cfg['origin']} -> {cfg['destination']}")
-        
-        # Obsługa różnych struktur dat w config
-        if "departure_start" in cfg and "departure_end" in cfg:
-            self.logger.info(f"Zakres dat: {cfg['departure_start']} -> {cfg['return_end']}")
-        else:
-            self.logger.info(f"Zakres dat: {cfg['earliest_departure']} -> {cfg['latest_return']}")
-            
-        self.logger.info(f"Dlugosc pobytu: {cfg['min_days']}-{cfg['max_days']} dni")
-        self.logger.info(f"Pasazerowie: {cfg['passengers']}")
-        self.logger.info(f"Linie: {cfg['selected_airlines']}")
+        self._log_routes()
         self.logger.info(f"Tryb: Standard")
         self.logger.info(f"Dane: {self.session_dir}")
         self.logger.info("="*60)
@@ -553,30 +1290,32 @@ Airline Filter: {request.airline_filter}
             self.logger.error("Brak zapytan do wykonania!")
             return
 
-        results = []
-        delay_range = cfg["delay_between_requests"]
+        self._open_result_log("session")
+        results = self._results()
+        page_loads = None
 
-        for i, request in enumerate(requests, 1):
-            self.logger.info(f"\n[{i}/{len(requests)}] {request.airline_name} | {request.departure_date}->{request.return_date}")
+        if self._plan_mode():
+            results, page_loads = self.run_planned_requests(requests)
+        else:
+            for i, request in enumerate(requests, 1):
+                self.logger.info(f"\n[{i}/{len(requests)}] {request.origin}->{request.destination} | {request.airline_name} | {request.departure_date}->{request.return_date}")
 
-            # Wykonaj zapytanie
-            result = self.scrape_text_only(request)
-            results.append(result)
+                # Wykonaj zapytanie
+                result = self.scrape_text_only(request)
+                results.append(result)
 
-            # Statystyki na biezaco
-            successful = len([r for r in results if r.success])
-            failed = len([r for r in results if not r.success])
+                # Statystyki na biezaco
+                successful = len([r for r in results if r.success])
+                failed = len([r for r in results if not r.success])
 
-            self.logger.info(f"Progress: {successful} sukces | {failed} bledow | {len(requests)-i} pozostalo")
+                self.logger.info(f"Progress: {successful} sukces | {failed} bledow | {len(requests)-i} pozostalo{self._route_progress(requests, results)}")
 
-            # Opoznienie miedzy zapytaniami (wazne!)
-            if i < len(requests):
-                delay = random.uniform(delay_range[0], delay_range[1])
-                self.logger.info(f"Opoznienie: {delay:.1f}s")
-                time.sleep(delay)
+                # Opoznienie miedzy zapytaniami (wazne!) + zgloszenia priorytetowe
+                if i < len(requests):
+                    self._pause_between_loads()
 
         # Zapisz podsumowanie sesji
-        self.save_session_summary(requests, results)
+        self.save_session_summary(requests, results, page_loads)
 
         # Podsumowanie
         successful = len([r for r in results if r.success])
@@ -590,7 +1329,7 @@ Airline Filter: {request.airline_filter}
         self.logger.info(f"   Bledy: {failed}")
         self.logger.info(f"   Skutecznosc: {(successful/len(results)*100):.1f}%")
         self.logger.info(f"   Zebranych znakow: {total_chars:,}")
-        self.logger.info(f"Trasa: {cfg['origin']}->{cfg['destination']}")
+        self.logger.info(f"Trasa: {self._route_label()}")
         self.logger.info(f"Dane zapisane w: {self.session_dir}")
         self.logger.info("="*60)
 
@@ -613,7 +1352,7 @@ Airline Filter: {request.airline_filter}
 
         self.logger.info("" + "="*60)
         self.logger.info("KAYAK ROLLING MODE - URUCHOMIONY")
-        self.logger.info(f"Trasa: {cfg['origin']} -> {cfg['destination']}")
+        self._log_routes()
         self.logger.info(f"Wszystkie pliki w: {self.session_dir}")
         self.logger.info(f"Zatrzymanie: Ctrl+C")
         self.logger.info("="*60)
@@ -623,6 +1362,18 @@ Airline Filter: {request.airline_filter}
         total_failed = 0
         start_time = datetime.now()
 
+        if FreshnessPolicy.from_config(cfg.get("freshness")).enabled:
+            files = self.freshness.load_summaries(self.session_dir)
+            self.logger.info(f"Swiezosc wynikow: {len(self.freshness)} kombinacji z {files} podsumowan rund")
+
+        retention = start_retention(self.output_dir, cfg.get("retention"), self.logger)
+        if cfg.get("rolling_schedule", "rounds") == "continuous":
+            try:
+                return self.run_continuous_mode()
+            finally:
+                if retention:
+                    retention.stop()
+
         try:
             while not self.stop_rolling:
                 self.logger.info(f"\nRUNDA {round_number} - {datetime.now().strftime('%H:%M:%S')}")
@@ -630,7 +1381,7 @@ Airline Filter: {request.airline_filter}
                 # Wykonaj jedna runde scrapingu
                 results = self.run_single_round(round_number)
 
-                if results:
+                if results is not None:
                     successful = len([r for r in results if r.success])
                     failed = len([r for r in results if not r.success])
 
@@ -652,10 +1403,12 @@ Airline Filter: {request.airline_filter}
                     self.logger.info(f"Przerwa miedzy rundami: {break_minutes:.1f} minut")
                     self.logger.info(f"Nastepna runda okolo: {(datetime.now() + timedelta(minutes=break_minutes)).strftime('%H:%M:%S')}")
 
-                    # Czekaj w malych kawalkach zeby moc przerwac
+                    # Czekaj w malych kawalkach zeby moc przerwac; przerwa to wolne sloty dla priority lane
                     for _ in range(int(break_minutes * 60)):
                         if self.stop_rolling:
                             break
+                        if has_pending():
+                            self._serve_priority()
                         time.sleep(1)
 
             # Podsumowanie koncowe
@@ -674,6 +1427,101 @@ Airline Filter: {request.airline_filter}
         except Exception as e:
             self.logger.error(f"Blad rolling mode: {e}")
 
+        if retention:
+            retention.stop()
+
+    def run_continuous_mode(self):
+        """Rolling bez rund: kombinacje w kolko w rownym tempie, podsumowania co summary_interval_minutes.
+
+        Podsumowania okien czasowych maja format rund (round_XXX_summary.json).
+        """
+        cfg = self.config["scraping_config"]
+        summary_seconds = cfg.get("summary_interval_minutes", 30) * 60
+
+        window, cycle = 1, 0
+        window_results, window_loads = [], 0
+        window_started = time.monotonic()
+        total_successful = 0
+        total_failed = 0
+        start_time = datetime.now()
+
+        def close_window(requests, freshness):
+            nonlocal window, window_results, window_loads, window_started, total_successful, total_failed
+            total_successful += len([r for r in window_results if r.success])
+            total_failed += len([r for r in window_results if not r.success])
+            schedule = dict(self.pacing.describe(), mode="continuous", cycle=cycle,
+                            window_minutes=round((time.monotonic() - window_started) / 60, 1),
+                            mean_price_age_minutes=self.freshness.mean_age_minutes())
+            self.save_round_summary(window, requests, window_results, window_loads, freshness, schedule)
+            self.logger.info(f"Okno {window}: {len([r for r in window_results if r.success])} sukces, "
+                             f"{len([r for r in window_results if not r.success])} bledow, sredni wiek cen {schedule['mean_price_age_minutes']} min")
+            window += 1
+            window_results, window_loads = [], 0
+            window_started = time.monotonic()
+            self._open_result_log(f"round_{window:03d}", window=window)
+
+        self._open_result_log(f"round_{window:03d}", window=window)
+
+        try:
+            while not self.stop_rolling:
+                requests = self.generate_requests()
+                if not requests:
+                    self.logger.error("Brak zapytan do wykonania!")
+                    return
+
+                if self.pacing is None:
+                    loads_per_hour = cfg.get("loads_per_hour") or default_loads_per_hour(
+                        len(requests), cfg["delay_between_requests"], cfg.get("rolling_break_minutes", [30, 60]))
+                    self.pacing = PacingClock(loads_per_hour)
+                    self.logger.info(f"Tryb ciagly: {loads_per_hour:.1f} ladowan/h (co {self.pacing.interval:.0f}s), podsumowanie co {summary_seconds / 60:.0f} min")
+
+                cycle += 1
+                requests, freshness = self._skip_fresh(requests)
+                self.logger.info(f"\nCYKL {cycle} - {len(requests)} kombinacji - {datetime.now().strftime('%H:%M:%S')}")
+
+                if not requests:
+                    # Wszystko swieze - jeden pusty slot zamiast petli bez czekania
+                    self._pause_between_loads()
+                elif self._plan_mode():
+                    # Planery czekaja przez _pause_between_loads (zegar tempa) od drugiego ladowania
+                    self._pause_between_loads()
+                    results, page_loads = self.run_planned_requests(requests, window)
+                    self.freshness.add_results(requests, results)
+                    window_results += results
+                    window_loads += page_loads
+                else:
+                    for i, request in enumerate(requests, 1):
+                        self._pause_between_loads()
+                        if self.stop_rolling:
+                            break
+
+                        self.logger.info(f"C{cycle} [{i}/{len(requests)}] {request.origin}->{request.destination} | {request.airline_name} | {request.departure_date}->{request.return_date}")
+                        result = self.scrape_text_only(request, window)
+                        self.freshness.add_results(requests, [result])
+                        window_results.append(result)
+                        self._log_result(result)
+                        window_loads += 1
+
+                        if time.monotonic() - window_started >= summary_seconds:
+                            close_window(requests, freshness)
+
+                if window_results and (self.stop_rolling or time.monotonic() - window_started >= summary_seconds):
+                    close_window(requests, freshness)
+
+            self.logger.info("\n" + "="*60)
+            self.logger.info("TRYB CIAGLY ZAKONCZONY!")
+            self.logger.info(f"STATYSTYKI KONCOWE:")
+            self.logger.info(f"   Cykle: {cycle}")
+            self.logger.info(f"   Okna podsumowan: {window - 1}")
+            self.logger.info(f"   Sukces: {total_successful}")
+            self.logger.info(f"   Bledy: {total_failed}")
+            self.logger.info(f"   Czas dzialania: {datetime.now() - start_time}")
+            self.logger.info(f"Wszystkie pliki w: {self.session_dir}")
+            self.logger.info("="*60)
+
+        except Exception as e:
+            self.logger.error(f"Blad trybu ciaglego: {e}")
+
     def run_single_round(self, round_number: int):
         """Wykonuje jedna runde scrapingu"""
         try:
@@ -684,15 +1532,27 @@ Airline Filter: {request.airline_filter}
                 self.logger.error("Brak zapytan do wykonania!")
                 return None
 
-            results = []
-            delay_range = self.config["scraping_config"]["delay_between_requests"]
+            self._open_result_log(f"round_{round_number:03d}", round_number=round_number)
+            requests, freshness = self._skip_fresh(requests)
+            if not requests:
+                self.logger.info(f"R{round_number} Wszystkie kombinacje maja swieze wyniki - nic do sprawdzenia")
+                self.save_round_summary(round_number, requests, [], freshness=freshness)
+                return []
+
+            if self._plan_mode():
+                results, page_loads = self.run_planned_requests(requests, round_number)
+                self.freshness.add_results(requests, results)
+                self.save_round_summary(round_number, requests, results, page_loads, freshness)
+                return results
+
+            results = self._results()
 
             for i, request in enumerate(requests, 1):
                 if hasattr(self, 'stop_rolling') and self.stop_rolling:
                     self.logger.info("Zatrzymano podczas rundy")
                     break
 
-                self.logger.info(f"R{round_number} [{i}/{len(requests)}] {request.airline_name} | {request.departure_date}->{request.return_date}")
+                self.logger.info(f"R{round_number} [{i}/{len(requests)}] {request.origin}->{request.destination} | {request.airline_name} | {request.departure_date}->{request.return_date}")
 
                 # Wykonaj zapytanie
                 result = self.scrape_text_only(request, round_number)
@@ -702,15 +1562,15 @@ Airline Filter: {request.airline_filter}
                 if i % 5 == 0:
                     successful = len([r for r in results if r.success])
                     failed = len([r for r in results if not r.success])
-                    self.logger.info(f"R{round_number} Progress: {successful} sukces | {failed} bledow | {len(requests)-i} pozostalo")
+                    self.logger.info(f"R{round_number} Progress: {successful} sukces | {failed} bledow | {len(requests)-i} pozostalo{self._route_progress(requests, results)}")
 
-                # Opoznienie miedzy zapytaniami
+                # Opoznienie miedzy zapytaniami + zgloszenia priorytetowe
                 if i < len(requests) and not (hasattr(self, 'stop_rolling') and self.stop_rolling):
-                    delay = random.uniform(delay_range[0], delay_range[1])
-                    time.sleep(delay)
+                    self._pause_between_loads()
 
             # Zapisz podsumowanie rundy
-            self.save_round_summary(round_number, requests, results)
+            self.freshness.add_results(requests, results)
+            self.save_round_summary(round_number, requests, results, freshness=freshness)
 
             return results
 
@@ -718,20 +1578,43 @@ Airline Filter: {request.airline_filter}
             self.logger.error(f"Blad rundy {round_number}: {e}")
             return None
 
-    def save_round_summary(self, round_number: int, requests: List[ScrapingRequest], results: List[TextResult]):
+    def _skip_fresh(self, requests) -> tuple:
+        """Pomija kombinacje ze swiezym udanym wynikiem (scraping_config.freshness).
+
+        Zwraca (zapytania do sprawdzenia, raport do podsumowania rundy albo None).
+        """
+        policy = FreshnessPolicy.from_config(self.config["scraping_config"].get("freshness"))
+        if not policy.enabled:
+            return requests, None
+        total = len(requests)
+        requests, skipped = self.freshness.filter(requests, policy)
+        self.logger.info(f"Swieze wyniki: pominieto {skipped}/{total} kombinacji, do sprawdzenia {len(requests)}")
+        return requests, {"combinations": total, "skipped_fresh": skipped, "scraped": len(requests)}
+
+    def save_round_summary(self, round_number: int, requests: List[ScrapingRequest], results: List[TextResult],
+                           page_loads: int = None, freshness: dict = None, schedule: dict = None):
         """Zapisuje podsumowanie pojedynczej rundy"""
         try:
+            stream = self._finish_result_log(f"round_{round_number:03d}", requests, results)
             summary = {
                 "round_number": round_number,
                 "round_timestamp": datetime.now().isoformat(),
-                "config_used": self.config,
+                "config_hash": stream["config_hash"],
                 "total_requests": len(requests),
-                "successful": len([r for r in results if r.success]),
-                "failed": len([r for r in results if not r.success]),
-                "airlines": list(set([r.request.airline_key for r in results])),
-                "route": f"{self.config['scraping_config']['origin']}->{self.config['scraping_config']['destination']}",
-                "total_text_length": sum([r.text_length for r in results if r.success]),
-                "results": [asdict(res) for res in results]
+                "freshness": freshness,
+                "schedule": schedule,
+                "page_loads": page_loads if page_loads is not None else stream["results_count"],
+                "successful": stream["successful"],
+                "failed": stream["failed"],
+                "airlines": stream["airlines"],
+                "route": self._route_label(),
+                "total_text_length": stream["total_text_length"],
+                "capture": stream["capture"],
+                "page_dump": self.page_dump.take_stats(),
+                "preflight": self.preflight_report.describe() if self.preflight_report else None,
+                "routes": stream["routes"],
+                "results_count": stream["results_count"],
+                "results_log": stream["results_log"]
             }
 
             summary_path = os.path.join(self.session_dir, f"round_{round_number:03d}_summary.json")
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Segment Store - zrzuty stron dopisywane do duzych plikow segmentow
+Zamiast jednego pliku na zapytanie (rolling_mode rosnie bez konca, a glob
+i listdir zwalniaja z tygodnia na tydzien) strony trafiaja do segmentow:
+
+    seg_20261019_143022_4711.seg   rekordy: [KSG1][dl. naglowka][dl. tresci][naglowek JSON][tresc]
+    seg_20261019_143022_4711.idx   indeks: jedna linia JSON na rekord (nazwa, offset, dlugosci, pola naglowka)
+
+Segment jest tylko dopisywany; nowy zaczyna sie po przekroczeniu
+segment_max_mb albo o polnocy. Indeks pozwala wylistowac strony bez
+czytania segmentu - a gdy jest urwany (przerwany proces), brakujace
+rekordy odczytuje sie skanujac segment od konca indeksu.
+
+Ekstraktor i GUI czytaja strony przez list_page_refs(folder) - zwykle pliki
+(.txt / .txt.gz / .txt.zst) i rekordy segmentow tak samo; list_session_refs
+dochodzi do tego strony z shardow sesji (page_shards.py).
+
+Uzycie:
+    python src/segment_store.py import <folder> [--remove] [--compression gzip] [--max-mb 256]
+    python src/segment_store.py list <folder>
+    python src/segment_store.py cat <folder> <nazwa>
+    python src/segment_store.py stats <folder>
+    python src/segment_store.py reindex <folder>
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+from page_dump import (compress_bytes, decompress_bytes, header_fields, list_pages, open_page_bytes, page_stem,
+                       read_page_text, resolve_compression)
+from page_shards import page_folders
+
+MAGIC = b"KSG1"
+# magic, dlugosc naglowka JSON, dlugosc tresci
+RECORD_HEADER = struct.Struct("<4sIQ")
+
+SEGMENT_MAX_MB = 256
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+@dataclass
+class PageRef:
+    """Jedna strona: osobny plik (offset None) albo rekord segmentu"""
+    name: str
+    path: str
+    offset: Optional[int] = None
+    header_len: int = 0
+    body_len: int = 0
+    encoding: str = "none"
+    size: int = 0
+    meta: dict = field(default_factory=dict)
+
+    @property
+    def location(self) -> str:
+        """Sciezka pliku albo 'segment#offset' (text_path w wynikach)"""
+        return self.path if self.offset is None else f"{self.path}#{self.offset}"
+
+    @property
+    def stored_bytes(self) -> int:
+        if self.offset is None:
+            return os.path.getsize(self.path)
+        return RECORD_HEADER.size + self.header_len + self.body_len
+
+    def read(self) -> str:
+        if self.offset is None:
+            return read_page_text(self.path)
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset + RECORD_HEADER.size + self.header_len)
+            body = f.read(self.body_len)
+        return decompress_bytes(body, self.encoding).decode('utf-8')
+
+    def open_bytes(self):
+        """Tresc jako bajty UTF-8 (context manager): plik - open_page_bytes, rekord bez kompresji - widok mmap"""
+        if self.offset is None:
+            return open_page_bytes(self.path)
+        return self._record_bytes()
+
+    @contextmanager
+    def _record_bytes(self):
+        start = self.offset + RECORD_HEADER.size + self.header_len
+        if self.encoding != "none" or not self.body_len:
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                yield decompress_bytes(f.read(self.body_len), self.encoding)
+            return
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)[start:start + self.body_len]
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+    def index_entry(self) -> dict:
+        return {"name": self.name, "offset": self.offset, "header_len": self.header_len, "body_len": self.body_len,
+                "encoding": self.encoding, "size": self.size, "meta": self.meta}
+
+
+# ---------------------------------------------------------------------------
+# Odczyt
+# ---------------------------------------------------------------------------
+
+def list_segments(folder: str) -> List[str]:
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(SEGMENT_SUFFIX))
+
+
+def _index_path(segment_path: str) -> str:
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def scan_segment(segment_path: str, start: int = 0) -> List[PageRef]:
+    """Rekordy segmentu od offsetu start (bez indeksu); urwany ostatni rekord jest pomijany"""
+    refs = []
+    size = os.path.getsize(segment_path)
+    with open(segment_path, 'rb') as f:
+        offset = start
+        while offset + RECORD_HEADER.size <= size:
+            f.seek(offset)
+            magic, header_len, body_len = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            end = offset + RECORD_HEADER.size + header_len + body_len
+            if magic != MAGIC or end > size:
+                break
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            refs.append(PageRef(header["name"], segment_path, offset, header_len, body_len,
+                                header.get("encoding", "none"), header.get("size", 0), header.get("meta", {})))
+            offset = end
+    return refs
+
+
+def read_index(segment_path: str) -> List[PageRef]:
+    """Rekordy z indeksu; rekordy dopisane po ostatniej linii indeksu - ze skanu segmentu"""
+    refs = []
+    try:
+        with open(_index_path(segment_path), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # urwana linia - reszta ze skanu
+                refs.append(PageRef(entry["name"], segment_path, entry["offset"], entry["header_len"], entry["body_len"],
+                                    entry.get("encoding", "none"), entry.get("size", 0), entry.get("meta", {})))
+    except OSError:
+        pass
+    indexed_end = refs[-1].offset + refs[-1].stored_bytes if refs else 0
+    if os.path.getsize(segment_path) > indexed_end:
+        refs.extend(scan_segment(segment_path, indexed_end))
+    return refs
+
+
+def list_page_refs(folder: str) -> List[PageRef]:
+    """Wszystkie strony folderu: pliki zrzutow i rekordy segmentow, posortowane po nazwie"""
+    refs = [PageRef(name, os.path.join(folder, name)) for name in list_pages(folder)]
+    for segment_path in list_segments(folder):
+        refs.extend(read_index(segment_path))
+    return sorted(refs, key=lambda ref: ref.name)
+
+
+def list_session_refs(folder: str, **filters) -> List[PageRef]:
+    """Strony sesji: folder i shardy trasa / dzien / linia (filtry: page_shards.page_folders)"""
+    refs = []
+    for page_folder in page_folders(folder, **filters):
+        refs.extend(list_page_refs(page_folder))
+    return sorted(refs, key=lambda ref: ref.name)
+
+
+def read_location(location: str) -> str:
+    """Tekst strony z text_path wyniku ('plik' albo 'segment#offset')"""
+    path, separator, offset = location.rpartition("#")
+    if not separator or not path.endswith(SEGMENT_SUFFIX):
+        return read_page_text(location)
+    for ref in scan_segment(path, int(offset))[:1]:
+        return ref.read()
+    raise ValueError(f"Brak rekordu: {location}")
+
+
+# ---------------------------------------------------------------------------
+# Zapis
+# ---------------------------------------------------------------------------
+
+class SegmentWriter:
+    """Dopisuje strony do biezacego segmentu folderu; nowy segment po segment_max_mb albo o polnocy"""
+
+    def __init__(self, folder: str, max_mb: Optional[float] = None, compression: str = "none",
+                 level: Optional[int] = None, logger=None, prefix: str = "seg"):
+        self.folder = folder
+        self.prefix = prefix
+        self.max_bytes = int((max_mb or SEGMENT_MAX_MB) * 1024 * 1024)
+        self.compression = resolve_compression(compression, logger)
+        self.level = level
+        self.logger = logger
+        self.segment_path = None
+        self.segment_day = None
+        self.segment = None
+        self.index = None
+
+    def _open_segment(self, day: date):
+        self.close()
+        os.makedirs(self.folder, exist_ok=True)
+        # pid w nazwie - dwa procesy piszace do jednego folderu nie dziela segmentu
+        stamp = datetime.now().strftime("%H%M%S")
+        base = os.path.join(self.folder, f"{self.prefix}_{day.strftime('%Y%m%d')}_{stamp}_{os.getpid()}")
+        self.segment_path = f"{base}{SEGMENT_SUFFIX}"
+        sequence = 1
+        while os.path.exists(self.segment_path):
+            sequence += 1
+            self.segment_path = f"{base}_{sequence}{SEGMENT_SUFFIX}"
+        self.segment_day = day
+        self.segment = open(self.segment_path, 'ab')
+        self.index = open(_index_path(self.segment_path), 'a', encoding='utf-8')
+        if self.logger:
+            self.logger.info(f"Nowy segment: {os.path.basename(self.segment_path)}")
+
+    def append(self, name: str, text: str, meta: Optional[dict] = None, day: Optional[date] = None) -> PageRef:
+        """Dopisuje rekord (naglowek + tresc) i linie indeksu; zwraca odwolanie do rekordu"""
+        day = day or date.today()
+        data = text.encode('utf-8')
+        body = compress_bytes(data, self.compression, self.level)
+        header = json.dumps({"name": name, "stored_at": datetime.now().isoformat(timespec="seconds"),
+                             "encoding": self.compression, "size": len(data), "meta": meta or {}},
+                            ensure_ascii=False).encode('utf-8')
+
+        if self.segment is None or day != self.segment_day or \
+                (self.segment.tell() and self.segment.tell() + len(header) + len(body) > self.max_bytes):
+            self._open_segment(day)
+
+        offset = self.segment.tell()
+        self.segment.write(RECORD_HEADER.pack(MAGIC, len(header), len(body)) + header + body)
+        self.segment.flush()
+        ref = PageRef(name, self.segment_path, offset, len(header), len(body), self.compression, len(data), meta or {})
+        # Indeks po rekordzie - urwany indeks uzupelnia skan, odwrotnie bylby wpis bez rekordu
+        self.index.write(json.dumps(ref.index_entry(), ensure_ascii=False) + "\n")
+        self.index.flush()
+        return ref
+
+    def close(self):
+        for handle in (self.segment, self.index):
+            if handle:
+                handle.close()
+        self.segment = self.index = None
+
+
+def reindex(segment_path: str) -> int:
+    """Odbudowuje indeks segmentu ze skanu rekordow"""
+    refs = scan_segment(segment_path)
+    tmp_path = f"{_index_path(segment_path)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for ref in refs:
+            f.write(json.dumps(ref.index_entry(), ensure_ascii=False) + "\n")
+    os.replace(tmp_path, _index_path(segment_path))
+    return len(refs)
+
+
+def import_folder(folder: str, compression: str = "none", level: Optional[int] = None,
+                  max_mb: Optional[float] = None, remove: bool = False, logger=None) -> dict:
+    """Przenosi zrzuty stron z osobnych plikow folderu do segmentow (segment dnia wg mtime pliku)"""
+    existing = {ref.name for segment_path in list_segments(folder) for ref in read_index(segment_path)}
+    files = list_pages(folder)
+    # Kolejnosc dni - segmenty dnia nie przeplataja sie przy imporcie
+    files.sort(key=lambda name: (os.path.getmtime(os.path.join(folder, name)), name))
+    writer = SegmentWriter(folder, max_mb, compression, level, logger)
+    imported = skipped = removed = 0
+    try:
+        for filename in files:
+            path = os.path.join(folder, filename)
+            name = f"{page_stem(filename)}.txt"
+            text = read_page_text(path)
+            if name in existing:
+                skipped += 1
+            else:
+                ref = writer.append(name, text, header_fields(text), date.fromtimestamp(os.path.getmtime(path)))
+                existing.add(name)
+                imported += 1
+                if remove and ref.read() != text:
+                    raise ValueError(f"Odczyt z segmentu rozny od pliku: {filename}")
+            if remove:
+                os.remove(path)
+                removed += 1
+    finally:
+        writer.close()
+    return {"imported": imported, "skipped": skipped, "removed": removed}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _option(args: list, name: str, default=None):
+    if name in args:
+        index = args.index(name)
+        value = args[index + 1]
+        del args[index:index + 2]
+        return value
+    return default
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("import", "list", "cat", "stats", "reindex"):
+        print(__doc__)
+        return 1
+
+    command = args.pop(0)
+    if command == "import":
+        compression = _option(args, "--compression", "none")
+        max_mb = _option(args, "--max-mb")
+        remove = "--remove" in args
+        folder = [a for a in args if a != "--remove"][0]
+        result = import_folder(folder, compression, None, float(max_mb) if max_mb else None, remove)
+        print(f"Zaimportowano {result['imported']}, juz bylo {result['skipped']}, usunieto plikow {result['removed']}")
+        print(f"Segmenty: {len(list_segments(folder))}")
+        return 0
+
+    folder = args[0]
+    if command == "list":
+        for ref in list_page_refs(folder):
+            where = os.path.basename(ref.path) + (f"#{ref.offset}" if ref.offset is not None else "")
+            print(f"{ref.name}  ({where})")
+    elif command == "cat":
+        if len(args) < 2:
+            print("Podaj nazwe strony")
+            return 1
+        name = f"{page_stem(args[1])}.txt"
+        matches = [ref for ref in list_page_refs(folder) if ref.name == name]
+        if not matches:
+            print(f"Brak strony: {name}")
+            return 1
+        print(matches[-1].read())
+    elif command == "reindex":
+        for segment_path in list_segments(folder):
+            print(f"{os.path.basename(segment_path)}: {reindex(segment_path)} rekordow")
+    else:
+        refs = list_page_refs(folder)
+        in_segments = [ref for ref in refs if ref.offset is not None]
+        raw = sum(ref.size for ref in in_segments)
+        stored = sum(ref.stored_bytes for ref in in_segments)
+        print(f"Strony: {len(refs)} ({len(in_segments)} w {len(list_segments(folder))} segmentach, "
+              f"{len(refs) - len(in_segments)} osobnych plikow)")
+        if in_segments:
+            print(f"Segmenty: {raw / 1024 / 1024:,.1f} MB tekstu -> {stored / 1024 / 1024:,.1f} MB na dysku")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
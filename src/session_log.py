@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session Log - przyrostowy log wynikow sesji / rundy (JSONL)
+Kazdy wynik jest dopisywany jako jedna linia JSON i od razu zapisywany
+(flush), gdy tylko sie pojawi - przerwany proces nie traci wynikow, a
+podsumowanie nie trzyma w pamieci listy wszystkich rekordow:
+
+    round_001_results.jsonl    start (hash configu, runda) + jeden rekord na wynik
+    config_3f2a9c1b7d4e.json   config sesji zapisany raz, logi odwoluja sie do hasha
+
+Podsumowanie (session_summary.json, round_NNN_summary.json) jest skladane
+z logu strumieniowo (rebuild_summary) - liczniki, linie, trasy, oferty na
+ladowanie - i wskazuje plik logu zamiast powielac wyniki i config.
+Rekord wyniku ma pola wyniku, request_id i kombinacje (trasa, linia, daty),
+wiec freshness odczytuje udane wyniki bezposrednio z logow.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+from request_planner import result_record
+
+RESULTS_SUFFIX = "_results.jsonl"
+
+
+def store_config(config: dict, folder: str) -> str:
+    """Zapisuje config raz (config_<hash>.json w folderze sesji); zwraca hash"""
+    data = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    config_hash = hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+    path = os.path.join(folder, f"config_{config_hash}.json")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    return config_hash
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class ResultLog:
+    """Log JSONL jednej sesji / rundy: rekord start + rekord na kazdy wynik (flush po kazdym)"""
+
+    def __init__(self, folder: str, name: str, config: dict, **meta):
+        self.path = os.path.join(folder, f"{name}{RESULTS_SUFFIX}")
+        self.config_hash = store_config(config, folder)
+        # Ten sam numer rundy po restarcie (rolling mode) dopisuje do logu - wyniki
+        # sprzed restartu zostaja, kolejny rekord start oddziela czesci
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self.file.tell() and not _ends_with_newline(self.path):
+            self.file.write("\n")  # urwana ostatnia linia przerwanego zapisu
+        self._write(dict(type="start", started_at=datetime.now().isoformat(), config_hash=self.config_hash, **meta))
+
+    def _write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.file.flush()
+
+    def add(self, result, airline_key: str, combo: Optional[Sequence[str]] = None):
+        """Dopisuje wynik; combo (origin, destination, linia, wylot, powrot) dla zapytan siatki"""
+        record = dict(type="result", **result_record(result))
+        record["airline_key"] = airline_key
+        if combo is not None:
+            record["combo"] = list(combo)
+        self._write(record)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class LoggedResults(list):
+    """Lista wynikow, ktora kazdy dodany wynik od razu przekazuje do logu"""
+
+    def __init__(self, log_result: Callable):
+        super().__init__()
+        self.log_result = log_result
+
+    def append(self, result):
+        super().append(result)
+        self.log_result(result)
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+
+# ---------------------------------------------------------------------------
+# Odczyt
+# ---------------------------------------------------------------------------
+
+def read_records(path: str) -> Iterator[dict]:
+    """Rekordy logu po kolei; urwana ostatnia linia (przerwany zapis) jest pomijana"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except OSError:
+        return
+
+
+def rebuild_summary(path: str, route_totals: Optional[Dict[str, int]] = None) -> dict:
+    """Podsumowanie z logu w jednym przejsciu: liczniki, linie, trasy i oferty na ladowanie.
+
+    Wyniki z tej samej strony (laczenie linii) maja ten sam text_path i sa
+    kolejno w logu - do statystyk ladowan liczone raz.
+    """
+    summary = {"results_log": os.path.basename(path), "config_hash": None, "results_count": 0,
+               "successful": 0, "failed": 0, "airlines": [], "total_text_length": 0}
+    airlines = set()
+    routes = {label: {"total_requests": total, "results": 0, "successful": 0, "failed": 0,
+                      "cheapest_total_price": None, "cheapest_request_id": None}
+              for label, total in (route_totals or {}).items()}
+    loads = offers = 0
+    page_seconds = expand_seconds = 0.0
+    last_text_path = None
+
+    for record in read_records(path):
+        if record.get("type") == "start":
+            summary["config_hash"] = record.get("config_hash")
+            continue
+        summary["results_count"] += 1
+        success = bool(record.get("success"))
+        summary["successful" if success else "failed"] += 1
+        if record.get("airline_key"):
+            airlines.add(record["airline_key"])
+        if success:
+            summary["total_text_length"] += record.get("text_length") or 0
+            text_path = record.get("text_path")
+            if text_path and text_path != last_text_path:
+                loads += 1
+                offers += record.get("offers_captured") or 0
+                page_seconds += record.get("page_seconds") or 0.0
+                expand_seconds += record.get("expand_seconds") or 0.0
+                last_text_path = text_path
+
+        combo = record.get("combo")
+        if combo and record.get("request_id", -1) >= 0:
+            route = routes.setdefault(f"{combo[0]}-{combo[1]}", {
+                "total_requests": 0, "results": 0, "successful": 0, "failed": 0,
+                "cheapest_total_price": None, "cheapest_request_id": None})
+            route["results"] += 1
+            route["successful" if success else "failed"] += 1
+            price = record.get("total_price")
+            if price is not None and (route["cheapest_total_price"] is None or price < route["cheapest_total_price"]):
+                route["cheapest_total_price"] = price
+                route["cheapest_request_id"] = record["request_id"]
+
+    summary["airlines"] = sorted(airlines)
+    summary["routes"] = routes
+    base_seconds = page_seconds - expand_seconds
+    summary["capture"] = {
+        "page_loads": loads,
+        "offers_captured": offers,
+        "offers_per_load": round(offers / loads, 1),
+        "page_seconds": round(page_seconds, 1),
+        "expand_seconds": round(expand_seconds, 1),
+        "offers_per_second": round(offers / page_seconds, 3) if page_seconds else None,
+        "baseline_offers_per_second": round(loads / base_seconds, 3) if base_seconds > 0 else None
+    } if loads else None
+    return summary
+
+
+def result_logs(folder: str, prefix: str = "round_") -> list:
+    return sorted(glob.glob(os.path.join(folder, f"{prefix}*{RESULTS_SUFFIX}")))
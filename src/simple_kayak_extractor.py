@@ -3,6 +3,10 @@
 """
 Simple Kayak Data Extractor
 Wyciaga pierwsza (najtansza) oferte z kazdego pliku .txt i zapisuje do Excel
+Czyta zwykle .txt, skompresowane zrzuty stron (.txt.gz, .txt.zst) i segmenty (.seg)
+Z --top N wyciaga N pierwszych ofert z kazdej strony (np. po rozwinieciu listy wynikow)
+Strony sa czytane jako bajty (nieskompresowane przez mmap), ceny szukane regexami bajtowymi,
+a do str dekodowane jest tylko okno oferty
 """
 
 import os
@@ -14,12 +18,69 @@ from dataclasses import dataclass
 from typing import Optional, List
 import sys
 
+from offer_cards import detect_airport, find_offer_cards
+from offer_columns import ROOT as COLUMNS_ROOT, ColumnWriter, rows_from_extracted
+from price_store import DB_PATH, PriceStore
+from page_shards import filters_from_args, is_sharded, shard_days, shard_routes
+from segment_store import list_page_refs, list_session_refs
+
 # Fix dla Windows - ustaw kodowanie UTF-8 dla stdout
 if sys.platform.startswith('win'):
     import codecs
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
+# Wzorce cen na bajtach UTF-8 - strona nie jest dekodowana do str (twarde spacje Kayak: \xa0, \u202f)
+_SPACE = '(?:\\s|\xa0|\u202f)'
+
+
+def _bytes_pattern(pattern: str, flags: int = 0):
+    if flags & re.IGNORECASE:
+        # IGNORECASE na bajtach sklada tylko ASCII - polskie litery w obu wielkosciach wprost ("ZŁ", "ŁĄCZNIE")
+        pattern = re.sub(r'[^\x00-\x7f]', lambda m: f'(?:{m.group()}|{m.group().upper()})'
+                         if m.group().upper() != m.group() else m.group(), pattern)
+    return re.compile(pattern.replace(r'\s', _SPACE).encode('utf-8'), flags)
+
+
+PRICE_PATTERNS = [_bytes_pattern(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba\s+(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',  # Oryginalny
+    r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba.*?(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',  # Z dowolnym tekstem między
+    r'(\d+(?:\s+\d{3})*)\s*zł.*?osoba.*?(\d+(?:\s+\d{3})*)\s*zł.*?łącznie',  # Bardzo elastyczny
+)]
+ZL_PATTERN = _bytes_pattern(r'(\d+(?:\s+\d{3})*)\s*zl')
+
+# Kazda cena konczy sie na "zł" ("zl") - szukanie literalu jest wielokrotnie szybsze niz wzorca od poczatku strony
+PRICE_ANCHORS = [re.compile(re.escape(anchor.encode('utf-8'))) for anchor in ('zł', 'Zł', 'zŁ', 'ZŁ')]
+ZL_ANCHORS = [re.compile(b'zl')]
+_PRICE_RUN_BYTES = frozenset(b'0123456789 \t\n\r\x0b\x0c' + '\xa0\u202f'.encode('utf-8'))
+
+# Tekst oferty to tyle znakow przed cena (+ sama cena)
+OFFER_WINDOW_CHARS = 1000
+
+
+def _digits(raw: bytes) -> str:
+    """b'4 512' / b'4\\xc2\\xa0512' -> '4512'"""
+    return re.sub(rb'\D', b'', raw).decode('ascii')
+
+
+def _scan_start(content, anchors) -> Optional[int]:
+    """Offset, od ktorego moze zaczac sie cena: ciag cyfr i spacji przed pierwszym "zł" (None - brak ceny)"""
+    found = [match.start() for match in (anchor.search(content) for anchor in anchors) if match]
+    if not found:
+        return None
+    start = min(found)
+    while start > 0 and content[start - 1] in _PRICE_RUN_BYTES:
+        start -= 1
+    return start
+
+
+def _decode_window(content, start: int, end: int, chars_before: int = OFFER_WINDOW_CHARS) -> str:
+    """Dekoduje tylko okno oferty: chars_before znakow przed start i bajty start:end"""
+    # Znak UTF-8 ma do 4 bajtow; urwany pierwszy znak okna (ignore) i tak wypada poza chars_before
+    before = bytes(content[max(0, start - 4 * chars_before):start]).decode('utf-8', errors='ignore')
+    return before[-chars_before:] + bytes(content[start:end]).decode('utf-8', errors='ignore')
+
+
 @dataclass
 class SimpleOffer:
     """Rozszerzona struktura oferty z detalami przesiadek"""
@@ -67,19 +128,24 @@ class SimpleOffer:
     stop2_return_duration: str
     stop3_return_airport: str
     stop3_return_duration: str
+    
+    # Pozycja oferty na stronie (1 = pierwsza/najtansza)
+    offer_rank: int = 1
 
 class SimpleKayakExtractor:
-    def __init__(self):
-        pass
+    def __init__(self, top_offers: int = 1):
+        # Ile ofert brac z kazdej strony (1 = tylko pierwsza, jak dotad)
+        self.top_offers = max(1, top_offers)
     
     def parse_filename(self, filename: str) -> dict:
         """Parsuje nazwe pliku dla pewnych danych - obsługuje standard i rolling mode"""
         
         # Standard mode: WAW_ICN_Turkish_2025-10-22_2025-11-10_20250623_143022_123.txt
-        standard_pattern = r'([A-Z]{3})_([A-Z]{3})_([A-Za-z_]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})_(\d{8})_(\d{6})_(\d+)\.txt'
+        # Grupa lotnisk: WAW-WMI-KRK_AKL_Turkish_... (jedno wyszukiwanie dla kilku lotnisk)
+        standard_pattern = r'([A-Z]{3}(?:-[A-Z]{3})*)_([A-Z]{3}(?:-[A-Z]{3})*)_([A-Za-z_]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})_(\d{8})_(\d{6})_(\d+)\.txt'
         
         # Rolling mode: R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250623_143022_123.txt
-        rolling_pattern = r'R\d+_([A-Z]{3})_([A-Z]{3})_([A-Za-z_]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})_(\d{8})_(\d{6})_(\d+)\.txt'
+        rolling_pattern = r'R\d+_([A-Z]{3}(?:-[A-Z]{3})*)_([A-Z]{3}(?:-[A-Z]{3})*)_([A-Za-z_]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})_(\d{8})_(\d{6})_(\d+)\.txt'
         
         # Spróbuj wzorzec rolling mode
         match = re.match(rolling_pattern, filename)
@@ -167,21 +233,23 @@ class SimpleKayakExtractor:
         print(f"Lotniska z tekstu (fallback): {departure_airport} -> {destination_airport}")
         return departure_airport, destination_airport
     
-    def extract_first_offer_simple(self, content: str) -> Optional[dict]:
-        """Wyciaga pierwsza oferte z tekstu Kayak"""
+    def extract_first_offer_simple(self, content) -> Optional[tuple]:
+        """Wyciaga pierwsza oferte z tekstu Kayak.
+
+        content to bajty UTF-8 strony (bytes / mmap / memoryview, patrz open_bytes) albo str.
+        Ceny sa szukane na bajtach, do str dekodowane jest tylko okno oferty.
+        """
         try:
-            # Poprawione wzorce cen dla formatu z pliku
-            price_patterns = [
-                r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba\s+(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',  # Oryginalny
-                r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba.*?(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',  # Z dowolnym tekstem między
-                r'(\d+(?:\s+\d{3})*)\s*zł.*?osoba.*?(\d+(?:\s+\d{3})*)\s*zł.*?łącznie',  # Bardzo elastyczny
-            ]
+            if isinstance(content, str):
+                content = content.encode('utf-8')
             
             price_match = None
             pattern_used = ""
             
-            for i, pattern in enumerate(price_patterns):
-                price_match = re.search(pattern, content, re.IGNORECASE | re.DOTALL)
+            # Wzorce szukane od pierwszej mozliwej ceny zamiast od naglowka strony
+            start = _scan_start(content, PRICE_ANCHORS)
+            for i, pattern in enumerate(PRICE_PATTERNS if start is not None else []):
+                price_match = pattern.search(content, start)
                 if price_match:
                     pattern_used = f"Pattern {i+1}"
                     print(f"Znaleziono ceny uzywajac {pattern_used}")
@@ -191,24 +259,24 @@ class SimpleKayakExtractor:
                 print(f"DEBUG: Nie znaleziono standardowych wzorcow, sprawdzam zawartosc...")
                 
                 # Znajdz wszystkie wystapienia z "zl"
-                zl_pattern = r'(\d+(?:\s+\d{3})*)\s*zl'
-                zl_matches = list(re.finditer(zl_pattern, content))
+                start = _scan_start(content, ZL_ANCHORS)
+                zl_matches = list(ZL_PATTERN.finditer(content, start)) if start is not None else []
                 
                 if zl_matches:
                     print(f"Znaleziono {len(zl_matches)} cen w zl:")
                     for j, match in enumerate(zl_matches[:8]):  # Pokaz pierwsze 8
-                        price_value = match.group(1).replace(' ', '')
+                        price_value = _digits(match.group(1))
                         context_start = max(0, match.start() - 30)
                         context_end = min(len(content), match.end() + 30)
-                        context = content[context_start:context_end].replace('\n', ' ').replace('\r', ' ')
+                        context = bytes(content[context_start:context_end]).decode('utf-8', errors='replace')
+                        context = context.replace('\n', ' ').replace('\r', ' ')
                         print(f"    {j+1}. {price_value} zl - ...{context}...")
                     
                     # Sprobuj znalezc pare cen (na osobe + lacznie)
                     prices = []
                     for match in zl_matches:
-                        price_str = match.group(1).replace(' ', '')
                         try:
-                            price_val = int(price_str)
+                            price_val = int(_digits(match.group(1)))
                             if 1000 <= price_val <= 50000:  # Rozsadny zakres cen
                                 prices.append((price_val, match.start(), match.end()))
                         except:
@@ -228,10 +296,8 @@ class SimpleKayakExtractor:
                                 per_person = float(price1)
                                 total = float(price2)
                                 
-                                # Znajdz tekst oferty
-                                offer_start = max(0, pos1 - 1000)  # 1000 znakow przed pierwsza cena
-                                offer_end = end2
-                                offer_text = content[offer_start:offer_end]
+                                # Tekst oferty: 1000 znakow przed pierwsza cena
+                                offer_text = _decode_window(content, pos1, end2)
                                 
                                 return offer_text, per_person, total
                 
@@ -239,18 +305,13 @@ class SimpleKayakExtractor:
                 return None
             
             # Standardowe parsowanie gdy znaleziono wzorzec
-            per_person_str = price_match.group(1).replace(' ', '')
-            total_str = price_match.group(2).replace(' ', '')
-            
-            per_person = float(per_person_str)
-            total = float(total_str)
+            per_person = float(_digits(price_match.group(1)))
+            total = float(_digits(price_match.group(2)))
             
             print(f"Ceny: {per_person} PLN/os -> {total} PLN lacznie ({pattern_used})")
             
-            # Znajdz tekst oferty
-            price_pos = price_match.start()
-            offer_start = max(0, price_pos - 1000)
-            offer_text = content[offer_start:price_match.end()]
+            # Tekst oferty: 1000 znakow przed cena
+            offer_text = _decode_window(content, price_match.start(), price_match.end())
             
             return offer_text, per_person, total
             
@@ -260,6 +321,24 @@ class SimpleKayakExtractor:
             traceback.print_exc()
             return None
     
+    def extract_offers(self, content, limit: int) -> List[tuple]:
+        """Wyciaga do limit ofert (offer_text, per_person, total) w kolejnosci ze strony"""
+        if limit <= 1:
+            result = self.extract_first_offer_simple(content)
+            return [result] if result else []
+        
+        # Podzial na karty potrzebuje calej strony jako str; uszkodzony bajt nie przerywa ekstrakcji
+        if not isinstance(content, str):
+            content = bytes(content).decode('utf-8', errors='ignore')
+        cards = find_offer_cards(content, limit=limit)
+        if not cards:
+            # Nietypowy format strony - zostaje heurystyka dla pierwszej oferty
+            result = self.extract_first_offer_simple(content)
+            return [result] if result else []
+        
+        print(f"Znaleziono {len(cards)} ofert (limit {limit})")
+        return [(card.text, card.price_per_person, card.total_price) for card in cards]
+    
     def parse_offer_from_text(self, offer_text: str, per_person: float, total: float, file_info: dict) -> dict:
         """Parsuje szczegolowe dane oferty z tekstu - używa danych z nazwy pliku"""
         try:
@@ -275,6 +354,13 @@ class SimpleKayakExtractor:
             departure_airport = file_info['departure_airport']
             destination_airport = file_info['destination_airport']
             
+            # Grupa lotnisk (WAW-WMI-KRK) - faktyczne lotnisko z tekstu oferty
+            if '-' in departure_airport:
+                departure_airport = detect_airport(offer_text, departure_airport.split('-')) or departure_airport
+            if '-' in destination_airport:
+                destination_airport = detect_airport(offer_text, destination_airport.split('-')) or destination_airport
+            print(f"Lotniska oferty: {departure_airport} -> {destination_airport}")
+            
             # Znajdz czasy lotow
             time_matches = re.findall(r'(\d{2}:\d{2})\s*[–-]\s*(\d{2}:\d{2}(?:\+\d)?)', offer_text)
             
@@ -508,15 +594,15 @@ class SimpleKayakExtractor:
         
         return departure_airport, destination_airport
     
-    def process_session_folder(self, session_folder: str) -> List[SimpleOffer]:
-        """Przetwarza wszystkie pliki w folderze sesji"""
+    def process_session_folder(self, session_folder: str, **filters) -> List[SimpleOffer]:
+        """Przetwarza wszystkie pliki w folderze sesji (z filtrami - tylko wybrane shardy trasa / dzien / linia)"""
         folder_path = Path(session_folder)
         
         if not folder_path.exists():
             print(f"Folder nie istnieje: {session_folder}")
             return []
         
-        txt_files = list(folder_path.glob("*.txt"))
+        txt_files = list_session_refs(str(folder_path), **filters)
         print(f"Znaleziono {len(txt_files)} plikow .txt")
         
         offers = []
@@ -525,16 +611,14 @@ class SimpleKayakExtractor:
             print(f"\nPrzetwarzanie: {txt_file.name}")
             
             try:
-                with open(txt_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
                 file_info = self.parse_filename(txt_file.name)
                 print(f"Z nazwy pliku: {file_info['airline_filter']} | {file_info['departure_airport']}->{file_info['destination_airport']} | {file_info['departure_date']} -> {file_info['return_date']}")
                 
-                result = self.extract_first_offer_simple(content)
+                # Bajty strony (mmap dla nieskompresowanych) - do str trafia tylko okno oferty
+                with txt_file.open_bytes() as content:
+                    results = self.extract_offers(content, self.top_offers)
                 
-                if result and len(result) == 3:  # offer_text, per_person, total
-                    offer_text, per_person, total = result
+                for rank, (offer_text, per_person, total) in enumerate(results, 1):
                     offer_data = self.parse_offer_from_text(offer_text, per_person, total, file_info)
                     
                     if offer_data:
@@ -543,14 +627,16 @@ class SimpleKayakExtractor:
                             airline_filter=file_info['airline_filter'],
                             departure_date=file_info['departure_date'],
                             return_date=file_info['return_date'],
+                            offer_rank=rank,
                             **offer_data
                         )
                         offers.append(offer)
                         # Użyj normalnych znaków zamiast emoji
-                        print(f"OK {offer.total_price:,.0f} PLN - {offer.airlines_outbound} ({offer.departure_airport}->{offer.destination_airport})")
+                        print(f"OK #{rank} {offer.total_price:,.0f} PLN - {offer.airlines_outbound} ({offer.departure_airport}->{offer.destination_airport})")
                     else:
-                        print(f"BLAD Blad parsowania szczegolow oferty")
-                else:
+                        print(f"BLAD Blad parsowania szczegolow oferty #{rank}")
+                
+                if not results:
                     print(f"BLAD Nie znaleziono oferty")
                     
             except Exception as e:
@@ -570,6 +656,7 @@ class SimpleKayakExtractor:
             data.append({
                 # PODSTAWOWE INFORMACJE
                 'Plik': offer.filename,
+                'Pozycja na stronie': offer.offer_rank,
                 'Filtr linii': offer.airline_filter,
                 'Data wylotu': offer.departure_date,
                 'Data powrotu': offer.return_date,
@@ -693,6 +780,19 @@ class SimpleKayakExtractor:
         
         return output_file
 
+def describe_session(session: str) -> str:
+    """Opis sesji do listy: strony plaskie, a dla shardow - trasy, zakres dni i strony ostatniego dnia"""
+    description = f"{len(list_page_refs(session))} plikow"
+    if is_sharded(session):
+        days = shard_days(session)
+        if days:
+            # Liczone tylko shardy ostatniego dnia - nie cala historia
+            last_day = len(list_session_refs(session, days=[days[-1]]))
+            description += (f", shardy: {len(shard_routes(session))} tras, dni {days[0]}..{days[-1]}, "
+                            f"{days[-1]}: {last_day} stron")
+    return description
+
+
 def main():
     """Glowna funkcja"""
     import sys
@@ -701,7 +801,13 @@ def main():
         print("SIMPLE KAYAK DATA EXTRACTOR")
         print("=" * 40)
         print("Uzycie:")
-        print(f"  python {sys.argv[0]} <folder_sesji>")
+        print(f"  python {sys.argv[0]} <folder_sesji> [--top N] [--no-db] [--columns]")
+        print(f"       [--day YYYY-MM-DD | --since YYYY-MM-DD --until YYYY-MM-DD] [--route WAW_ICN] [--airline Turkish]")
+        print()
+        print("  --top N  - N pierwszych ofert z kazdej strony (domyslnie 1)")
+        print(f"  --no-db  - bez zapisu ofert do historii cen ({DB_PATH})")
+        print(f"  --columns - oferty takze do plikow kolumnowych ({COLUMNS_ROOT}, trasa / miesiac)")
+        print("  --day / --since / --until / --route / --airline - tylko te shardy sesji (page_layout = sharded)")
         print()
         print("Przyklad:")
         print(f"  python {sys.argv[0]} kayak_text_data/txt_session_20250616_194500")
@@ -710,26 +816,31 @@ def main():
         # Pokaz dostepne foldery
         base_dir = Path("output/kayak_text_data")
         if base_dir.exists():
-            sessions = [d for d in base_dir.iterdir() if d.is_dir() and d.name.startswith('txt_session_')]
+            sessions = [d for d in base_dir.iterdir() if d.is_dir() and (d.name.startswith('txt_session_') or d.name == 'rolling_mode')]
             if sessions:
                 print("Dostepne sesje:")
                 for session in sorted(sessions, reverse=True):
-                    txt_count = len(list(session.glob("*.txt")))
-                    print(f"  {session.name} ({txt_count} plikow)")
+                    print(f"  {session.name} ({describe_session(str(session))})")
         
         # Sprawdź też excel_session
         excel_base_dir = Path("output/kayak_excel_data")
         if excel_base_dir.exists():
-            excel_sessions = [d for d in excel_base_dir.iterdir() if d.is_dir() and d.name.startswith('excel_session_')]
+            excel_sessions = [d for d in excel_base_dir.iterdir() if d.is_dir() and (d.name.startswith('excel_session_') or d.name == 'rolling_mode')]
             if excel_sessions:
                 print("\nDostepne sesje Excel:")
                 for session in sorted(excel_sessions, reverse=True):
-                    txt_count = len(list(session.glob("*.txt")))
-                    print(f"  {session.name} ({txt_count} plikow)")
+                    print(f"  {session.name} ({describe_session(str(session))})")
         
         return 1
     
     session_folder = sys.argv[1]
+    top_offers = 1
+    if "--top" in sys.argv:
+        try:
+            top_offers = int(sys.argv[sys.argv.index("--top") + 1])
+        except (IndexError, ValueError):
+            print("Uzycie: --top N (liczba ofert na strone)")
+            return 1
     
     print(f"Przetwarzanie sesji: {session_folder}")
     
@@ -738,12 +849,29 @@ def main():
         print(f"Folder nie istnieje: {session_folder}")
         return 1
     
-    extractor = SimpleKayakExtractor()
-    offers = extractor.process_session_folder(session_folder)
+    filters = {key: value for key, value in filters_from_args(sys.argv).items() if value is not None}
+    if filters:
+        print(f"Shardy: {', '.join(f'{key}={value}' for key, value in filters.items())}")
+    
+    extractor = SimpleKayakExtractor(top_offers)
+    offers = extractor.process_session_folder(session_folder, **filters)
     
     if offers:
         output_file = extractor.export_to_excel(offers)
         print(f"Gotowe! Sprawdz plik: {output_file}")
+        
+        if "--no-db" not in sys.argv:
+            # Oferty z odcinkami i przesiadkami do historii cen - jedna transakcja
+            store = PriceStore()
+            store.add_extracted(offers)
+            store.close()
+            print(f"Historia cen: {store.written} nowych stron w {DB_PATH}")
+        
+        if "--columns" in sys.argv:
+            writer = ColumnWriter()
+            writer.extend(rows_from_extracted(offers))
+            writer.close()
+            print(f"Pliki kolumnowe: {writer.written} ofert w {COLUMNS_ROOT} ({writer.engine})")
     else:
         print("Brak ofert do eksportu")
     
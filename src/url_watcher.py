@@ -8,14 +8,15 @@ Użycie:
     python src/url_watcher.py --once       # jednorazowe sprawdzenie
 
 Dodaj linki do config/url_watchlist.json i uruchom skrypt.
-Wyniki zapisywane do output/url_watcher/prices_YYYYMMDD.csv
+Wyniki zapisywane do output/url_watcher/prices_YYYYMMDD.csv - partiami przez
+bufor (result_sink.py), zawsze też przy zakończeniu.
 """
 
 import sys
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
 
-import csv
+import atexit
 import json
 import logging
 import os
@@ -23,8 +24,14 @@ import random
 import re
 import time
 from datetime import datetime
-from typing import Optional
-from urllib.parse import parse_qs, urlparse
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+from load_budget import LoadBudget
+from preflight import Issue, Preflight, PreflightReport
+from priority_lane import has_pending, serve_next
+from request_planner import attribute_offers, coalesce_airline_requests, describe_savings
+from result_sink import BatchedSink, open_sink
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,6 +43,14 @@ logger = logging.getLogger(__name__)
 CONFIG_PATH = "config/url_watchlist.json"
 OUTPUT_DIR = "output/url_watcher"
 
+# Udział w dziennej puli ładowań (ustawiany w run_watcher); w rolling mode
+# po wyczerpaniu udziału czekamy na nową pulę, w --once ładowanie jest odrzucane
+budget: Optional[LoadBudget] = None
+budget_waits = False
+
+# Bufor wyników przed zapisem do CSV (i innych backendów z configu "output")
+sink: Optional[BatchedSink] = None
+
 CSV_FIELDS = [
     "timestamp",
     "origin",
@@ -100,8 +115,8 @@ def parse_kayak_url(url: str) -> dict:
         fs = qs.get("fs", [""])[0]
 
         # Wyciągnij kod linii lotniczej z parametru fs
-        airline_match = re.search(r"airlines[%3D=]+([A-Z]+)", fs.upper())
-        airline_code = airline_match.group(1) if airline_match else ""
+        airline_match = re.search(r"airlines(?:=|%3D)([A-Z0-9]+)", fs, re.IGNORECASE)
+        airline_code = airline_match.group(1).upper() if airline_match else ""
 
         return {
             "origin": origin.upper(),
@@ -117,6 +132,30 @@ def parse_kayak_url(url: str) -> dict:
         return {}
 
 
+def preflight_urls(urls: list, preflight: Preflight) -> tuple:
+    """Walidacja URLi przed uruchomieniem Chrome: lotniska, daty i kod linii.
+
+    URL, którego nie da się sparsować, jest tylko oznaczany (nie ma czego sprawdzić).
+    Zwraca (URLe do sprawdzenia, PreflightReport).
+    """
+    report = PreflightReport()
+    valid = []
+    for url in urls:
+        info = parse_kayak_url(url)
+        if not info:
+            issues = [Issue("url_format", "Nierozpoznany format URLa Kayak", drop=False)]
+        else:
+            issues = preflight.check_flight(info["origin"].split(","), info["destination"].split(","),
+                                            info["departure_date"], info["return_date"])
+            issues += preflight.check_airline_code(info["airline_code"])
+        keep = report.add(issues)
+        for issue in issues:
+            logger.warning("%s: %s%s", url[:90], issue.message, "" if keep else " — pomijam")
+        if keep:
+            valid.append(url)
+    return valid, report
+
+
 # ---------------------------------------------------------------------------
 # Chrome driver
 # ---------------------------------------------------------------------------
@@ -196,14 +235,9 @@ def extract_price(text: str) -> tuple[Optional[float], Optional[float]]:
 # Single URL scrape
 # ---------------------------------------------------------------------------
 
-def scrape_url(url: str, wait_min: int = 12, wait_max: int = 18) -> dict:
-    """Otwiera URL i zwraca słownik z ceną i metadanymi."""
-    driver = None
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    info = parse_kayak_url(url)
-
-    result = {
-        "timestamp": timestamp,
+def _empty_result(url: str, info: dict) -> dict:
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "url": url,
         "origin": info.get("origin", ""),
         "destination": info.get("destination", ""),
@@ -217,13 +251,18 @@ def scrape_url(url: str, wait_min: int = 12, wait_max: int = 18) -> dict:
         "error": None,
     }
 
+
+def fetch_page_text(url: str, label: str, wait_min: int = 12, wait_max: int = 18,
+                    priority: bool = False) -> str:
+    """Otwiera URL w nowym Chrome i zwraca tekst strony (wyjątki przechodzą dalej)."""
+    if budget and priority:
+        budget.record_priority()
+    elif budget and not (budget.wait_for_draw() if budget_waits else budget.draw()):
+        raise RuntimeError("Dzienny budżet ładowań wyczerpany")
+
+    driver = None
     try:
         driver = create_driver()
-
-        label = (
-            f"{info.get('origin','?')}-{info.get('destination','?')} "
-            f"{info.get('departure_date','')} [{info.get('airline_code','ANY')}]"
-        )
         logger.info("Otwieram: %s", label)
         driver.get(url)
 
@@ -231,7 +270,26 @@ def scrape_url(url: str, wait_min: int = 12, wait_max: int = 18) -> dict:
         logger.info("Czekam %.0fs na załadowanie cen...", wait)
         time.sleep(wait)
 
-        page_text = driver.execute_script("return document.body.innerText") or ""
+        return driver.execute_script("return document.body.innerText") or ""
+    finally:
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def scrape_url(url: str, wait_min: int = 12, wait_max: int = 18) -> dict:
+    """Otwiera URL i zwraca słownik z ceną i metadanymi."""
+    info = parse_kayak_url(url)
+    result = _empty_result(url, info)
+
+    try:
+        label = (
+            f"{info.get('origin','?')}-{info.get('destination','?')} "
+            f"{info.get('departure_date','')} [{info.get('airline_code','ANY')}]"
+        )
+        page_text = fetch_page_text(url, label, wait_min, wait_max)
         per_person, total = extract_price(page_text)
 
         if per_person is not None:
@@ -249,33 +307,121 @@ def scrape_url(url: str, wait_min: int = 12, wait_max: int = 18) -> dict:
     except Exception as exc:
         result["error"] = str(exc)
         logger.error("  Błąd scrapingu: %s", exc)
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
 
     return result
 
 
+# ---------------------------------------------------------------------------
+# Airline coalescing
+# ---------------------------------------------------------------------------
+
+def strip_airline_filter(url: str) -> str:
+    """Usuwa parametr fs (filtr linii) z URLa Kayak."""
+    parsed = urlparse(url.strip())
+    query = {k: v for k, v in parse_qs(parsed.query).items() if k != "fs"}
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+
+def plan_url_loads(urls: list) -> list:
+    """Grupuje URLe różniące się tylko filtrem linii w jedno ładowanie bez filtra."""
+    def key_fn(url):
+        info = parse_kayak_url(url)
+        if not info:
+            return ("?", url)
+        return (info["origin"], info["destination"], info["departure_date"],
+                info["return_date"], info["passengers"])
+
+    return coalesce_airline_requests(
+        urls,
+        key_fn=key_fn,
+        filter_fn=lambda url: parse_kayak_url(url).get("airline_filter", ""),
+        mode="unfiltered",
+    )
+
+
+def scrape_url_group(load, wait_min: int = 12, wait_max: int = 18,
+                     pause: Optional[Callable[[], None]] = None) -> tuple:
+    """Sprawdza grupę URLi jednym ładowaniem strony bez filtra linii.
+
+    Linie bez karty na wspólnej stronie są sprawdzane osobno (fallback);
+    przed każdym osobnym ładowaniem wołane jest pause() - zwykły odstęp
+    między URLami i slot dla priority lane.
+    Zwraca (lista wyników w kolejności URLi, liczba ładowań stron).
+    """
+    if load.is_direct:
+        return [scrape_url(load.members[0], wait_min, wait_max)], 1
+
+    combined_url = strip_airline_filter(load.members[0])
+    origin, destination, departure_date = load.search_key[0], load.search_key[1], load.search_key[2]
+    codes = ",".join(c for codes in load.member_codes for c in codes)
+    label = f"{origin}-{destination} {departure_date} [ALL: {codes}]"
+
+    results = [None] * len(load.members)
+    page_loads = 1
+    try:
+        page_text = fetch_page_text(combined_url, label, wait_min, wait_max)
+        attribution = attribute_offers(load, page_text)
+        logger.info("  Karty na stronie: %d | przypisano %d/%d linii",
+                    attribution.cards_on_page, len(attribution.found), len(load.members))
+        for index, card in attribution.found.items():
+            url = load.members[index]
+            result = _empty_result(url, parse_kayak_url(url))
+            result["price_per_person"] = card.price_per_person
+            result["total_price"] = card.total_price
+            result["status"] = "ok"
+            results[index] = result
+            logger.info("  %s: %.0f PLN/os  (łącznie: %.0f PLN)",
+                        result["airline_code"], card.price_per_person, card.total_price)
+        missing = attribution.missing
+    except Exception as exc:
+        logger.error("  Błąd wspólnego ładowania: %s", exc)
+        missing = list(range(len(load.members)))
+
+    for index in missing:
+        url = load.members[index]
+        if pause:
+            pause()
+        logger.info("  Brak linii na wspólnej stronie - osobne ładowanie")
+        results[index] = scrape_url(url, wait_min, wait_max)
+        page_loads += 1
+
+    return results, page_loads
+
+
 # ---------------------------------------------------------------------------
 # CSV output
 # ---------------------------------------------------------------------------
 
 def save_result(result: dict, output_dir: str = OUTPUT_DIR):
-    os.makedirs(output_dir, exist_ok=True)
-    date_str = datetime.now().strftime("%Y%m%d")
-    csv_path = os.path.join(output_dir, f"prices_{date_str}.csv")
+    global sink
+    if budget and result["status"] == "ok":
+        budget.observe(result["url"], result["total_price"] or result["price_per_person"], result["departure_date"])
+
+    if sink is None:
+        # Wywołanie spoza run_watcher - domyślny bufor CSV, zapis przy końcu procesu
+        sink = open_sink(None, output_dir, CSV_FIELDS, logger=logger)
+        atexit.register(sink.close)
+    sink.add(result)
+
+
+# ---------------------------------------------------------------------------
+# Priority lane
+# ---------------------------------------------------------------------------
+
+def serve_priority_lane(delay_min: float, delay_max: float):
+    """Zgłoszenia z priority lane dostają najbliższy wolny slot przeglądarki."""
+    fetch = lambda url: fetch_page_text(url, "zgłoszenie priorytetowe", priority=True)
+    while serve_next(fetch, "url_watcher", logger=logger):
+        # Kolejne ładowanie (zgłoszenie albo watchlista) dopiero po zwykłym odstępie
+        time.sleep(delay_min + random.uniform(0, delay_max - delay_min))
 
-    write_header = not os.path.exists(csv_path)
-    with open(csv_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
-        if write_header:
-            writer.writeheader()
-        writer.writerow(result)
 
-    logger.debug("Zapisano do: %s", csv_path)
+def pause_between_urls(delay_min: float, delay_max: float):
+    """Zwykły odstęp przed kolejnym ładowaniem, potem wolny slot dla priority lane."""
+    delay = delay_min + random.uniform(0, delay_max - delay_min)
+    logger.info("Czekam %.0fs przed kolejnym URLem...\n", delay)
+    time.sleep(delay)
+    serve_priority_lane(delay_min, delay_max)
 
 
 # ---------------------------------------------------------------------------
@@ -295,33 +441,88 @@ def run_watcher(config: dict, once: bool = False):
     interval_min = config.get("check_interval_minutes", 60)
     rolling = not once and config.get("rolling_mode", True)
 
+    coalesce = config.get("coalesce_airlines", False)
+
+    global budget, budget_waits
+    budget = LoadBudget("url_watcher", logger=logger)
+    budget_waits = rolling
+
+    preflight = Preflight.from_config(config.get("preflight"))
+
     logger.info("Watchlist: %d URLi | interwał: %dmin | rolling: %s",
                 len(urls), interval_min, rolling)
     logger.info("=" * 60)
 
+    global sink
+    sink = open_sink(config.get("output"), OUTPUT_DIR, CSV_FIELDS, logger=logger)
+    try:
+        _watch_rounds(urls, preflight, coalesce, rolling, interval_min, delay_min, delay_max)
+    finally:
+        sink.close()
+        logger.info("Zapisano wyniki: %s (%d zapisów partii)",
+                    ", ".join(f"{name} {count}" for name, count in sink.rows_written.items()), sink.flushes)
+        for name, count in sink.rows_dropped.items():
+            if count:
+                logger.warning("Pominięte wyniki (%s): %d - backend długo niedostępny", name, count)
+        sink = None
+
+
+def _watch_rounds(urls: list, preflight: Preflight, coalesce: bool, rolling: bool,
+                  interval_min: int, delay_min: float, delay_max: float):
+    """Rundy sprawdzania watchlisty (w rolling mode bez końca)."""
     round_num = 1
+    planned = None
     while True:
         logger.info("\n%s", "=" * 60)
         logger.info("RUNDA %d — %s", round_num, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         logger.info("%s\n", "=" * 60)
 
-        for i, url in enumerate(urls, 1):
-            logger.info("[%d/%d]", i, len(urls))
-            result = scrape_url(url, wait_min=12, wait_max=18)
-            save_result(result)
+        # Walidacja co rundę - w rolling mode daty wylotu z czasem przechodzą do przeszłości
+        active, report = preflight_urls(urls, preflight)
+        logger.info("%s", report.log_line())
+        if active != planned:
+            planned = active
+            loads = plan_url_loads(active) if coalesce and active else None
+            if loads:
+                logger.info("Łączenie linii: %s", describe_savings(len(active), loads))
+
+        if not active:
+            logger.warning("Brak poprawnych URLi do sprawdzenia w tej rundzie")
+        elif loads:
+            page_loads = 0
+            for i, load in enumerate(loads, 1):
+                logger.info("[%d/%d] %d URLi", i, len(loads), len(load.members))
+                results, used = scrape_url_group(load, wait_min=12, wait_max=18,
+                                                 pause=lambda: pause_between_urls(delay_min, delay_max))
+                page_loads += used
+                for result in results:
+                    save_result(result)
+
+                if i < len(loads):
+                    pause_between_urls(delay_min, delay_max)
+            logger.info("Ładowań stron: %d dla %d URLi", page_loads, len(active))
+        else:
+            for i, url in enumerate(active, 1):
+                logger.info("[%d/%d]", i, len(active))
+                result = scrape_url(url, wait_min=12, wait_max=18)
+                save_result(result)
 
-            if i < len(urls):
-                delay = delay_min + random.uniform(0, delay_max - delay_min)
-                logger.info("Czekam %.0fs przed kolejnym URLem...\n", delay)
-                time.sleep(delay)
+                if i < len(active):
+                    pause_between_urls(delay_min, delay_max)
 
-        logger.info("\nRunda %d zakończona.", round_num)
+        logger.info("\nRunda %d zakończona (pominięto w walidacji: %d z %d URLi).",
+                    round_num, report.dropped_jobs, report.checked)
 
         if not rolling:
             break
 
         logger.info("Następne sprawdzenie za %d minut...", interval_min)
-        time.sleep(interval_min * 60)
+        # Odliczanie po sekundzie - przerwa to wolne sloty dla priority lane
+        for _ in range(int(interval_min * 60)):
+            if has_pending():
+                serve_priority_lane(delay_min, delay_max)
+            sink.tick()
+            time.sleep(1)
         round_num += 1
 
 
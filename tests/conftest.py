@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduly z src/ importuja sie po samej nazwie (jak przy python src/<modul>.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,77 @@
+from adaptive_grid import AdaptiveGridSearch
+
+# Dzien wylotu (30 dni) x dlugosc pobytu (5 wariantow)
+COORDS = {(x, y): (x, y) for x in range(30) for y in range(5)}
+
+
+def bowl(cell):
+    """Gladka powierzchnia cen z minimum 5000 PLN w (17, 3)"""
+    x, y = cell
+    return 5000 + 10 * (x - 17) ** 2 + 50 * (y - 3) ** 2
+
+
+def run(search, price):
+    loaded = []
+    while True:
+        cell = search.next_cell()
+        if cell is None:
+            return loaded
+        loaded.append(cell)
+        search.record(cell, price(cell))
+
+
+def test_finds_minimum_within_budget_without_revisits():
+    search = AdaptiveGridSearch(COORDS, budget=40)
+
+    loaded = run(search, bowl)
+
+    assert len(loaded) == len(set(loaded)) == 40
+    assert search.best() == ((17, 3), 5000)
+    summary = search.summary()
+    assert summary["stop_reason"] == "budget"
+    assert summary["best_cell"] == [17, 3]
+    assert 0.0 < summary["confidence"] <= 1.0
+
+
+def test_initial_sample_spread_over_grid():
+    search = AdaptiveGridSearch(COORDS, budget=40)
+    initial = run(search, lambda cell: 5000)[:len(search._initial)]
+
+    assert len(set(initial)) == len(initial) == int(40 * search.initial_fraction)
+    xs = [x for x, _ in initial]
+    assert min(xs) < 5 and max(xs) > 24
+
+
+def test_budget_capped_at_grid_size():
+    cells = {"a": (0, 0), "b": (1, 0)}
+    search = AdaptiveGridSearch(cells, budget=10)
+
+    loaded = run(search, lambda cell: 100 if cell == "a" else 90)
+
+    assert search.budget == 2
+    assert sorted(loaded) == ["a", "b"]
+    assert search.best() == ("b", 90)
+
+
+def test_stops_when_initial_sample_has_no_prices():
+    search = AdaptiveGridSearch(COORDS, budget=20)
+
+    loaded = run(search, lambda cell: None)
+
+    assert len(loaded) == len(search._initial)
+    assert search.stop_reason == "no_prices"
+    assert search.best() is None
+    assert search.confidence() == 0.0
+
+
+def test_estimate_exact_for_observed_cells():
+    search = AdaptiveGridSearch(COORDS, budget=40)
+    assert search.estimate((0, 0)) is None
+
+    search.record((0, 0), 6000)
+    search.record((29, 4), 7000)
+
+    assert search.estimate((0, 0)).price == 6000 and search.estimate((0, 0)).sigma == 0.0
+    between = search.estimate((15, 2))
+    assert 6000 < between.price < 7000
+    assert between.sigma > 0
@@ -0,0 +1,95 @@
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import flight_list
+from flight_list import REQUIRED_COLUMNS, compile_flights, load_flight_list, read_flight_sheet
+from preflight import Preflight
+
+AIRLINES = {"Turkish": "fs=airlines%3DTK%3Bbfc%3D1", "KLM": "fs=airlines%3DKL%3Bbfc%3D1"}
+GROUPS = {"poland": ["WAW", "KRK"]}
+
+
+def day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def sheet_rows():
+    return [
+        ["WAW", "ICN", "Turkish", day(10), day(30)],
+        ["poland", "NRT", "KLM", day(20), day(35)],
+        ["WAW", "ICN", "Wizz", day(10), day(30)],     # nieznana linia
+        ["WAW", "ICN", "Turkish", day(-5), day(10)],  # wylot w przeszlosci
+        ["WAW", "WAW", "KLM", day(10), day(30)],      # to samo lotnisko
+        ["WAW", "ICN", "KLM", "jutro", day(30)],      # zla data
+        ["WAW", None, "KLM", day(10), day(30)],       # brak pola
+        ["WAW", "QQQ", "KLM", day(10), day(30)],      # lotnisko spoza indeksu
+    ]
+
+
+def write_sheet(path, rows):
+    pd.DataFrame(rows, columns=REQUIRED_COLUMNS).to_excel(path, index=False)
+
+
+def test_compile_keeps_valid_rows_and_counts_rules():
+    df = pd.DataFrame(sheet_rows(), columns=REQUIRED_COLUMNS)
+
+    compiled = compile_flights(df, AIRLINES, GROUPS, Preflight())
+
+    assert compiled.rows == [2, 3]
+    assert compiled.origins == ["WAW", "WAW,KRK"]
+    assert compiled.airline_keys == ["Turkish", "KLM"]
+    assert compiled.durations == [20, 15]
+    assert compiled.report.describe() == {
+        "checked": 8, "dropped": 6, "flagged": 0, "flagged_by_rule": {},
+        "dropped_by_rule": {"unknown_airline": 1, "past_departure": 1, "same_airport": 1, "date_format": 1,
+                            "missing_fields": 1, "unknown_airport": 1}}
+
+
+def test_unknown_airport_only_flagged():
+    df = pd.DataFrame(sheet_rows(), columns=REQUIRED_COLUMNS)
+
+    compiled = compile_flights(df, AIRLINES, GROUPS, Preflight(unknown_airport="flag"))
+
+    assert compiled.rows == [2, 3, 9]
+    assert compiled.report.flagged == {"unknown_airport": 1}
+
+
+@pytest.mark.parametrize("streaming_mb", [5, 0])
+def test_sheet_read_whole_or_streaming(tmp_path, streaming_mb):
+    path = str(tmp_path / "loty.xlsx")
+    write_sheet(path, sheet_rows()[:2])
+
+    df = read_flight_sheet(path, streaming_mb)
+
+    assert list(df.columns) == REQUIRED_COLUMNS
+    assert df["Lotnisko wylotu"].tolist() == ["WAW", "poland"]
+
+
+def test_cache_reused_until_sheet_or_settings_change(tmp_path, monkeypatch):
+    path = str(tmp_path / "loty.xlsx")
+    cache_dir = str(tmp_path / "cache")
+    write_sheet(path, sheet_rows())
+    reads = []
+    original = flight_list.read_flight_sheet
+    monkeypatch.setattr(flight_list, "read_flight_sheet", lambda *args: reads.append(args) or original(*args))
+
+    first = load_flight_list(path, AIRLINES, GROUPS, cache_dir=cache_dir)
+    second = load_flight_list(path, AIRLINES, GROUPS, cache_dir=cache_dir)
+
+    assert len(reads) == 1
+    assert not first.cached and second.cached
+    assert second.to_dict() == first.to_dict()
+
+    # Inne ustawienia walidacji - nowa kompilacja
+    load_flight_list(path, AIRLINES, GROUPS, {"unknown_airport": "flag"}, cache_dir=cache_dir)
+    assert len(reads) == 2
+
+    write_sheet(path, sheet_rows()[:1])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    changed = load_flight_list(path, AIRLINES, GROUPS, cache_dir=cache_dir)
+    assert len(reads) == 3
+    assert not changed.cached and len(changed) == 1
@@ -0,0 +1,61 @@
+import json
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from freshness import FreshnessIndex, FreshnessPolicy
+from request_planner import DateGrid, LazyRequests
+from session_log import RESULTS_SUFFIX
+
+NOW = datetime(2026, 11, 19, 12, 0)
+GRID = DateGrid(date(2026, 12, 1), date(2026, 12, 12), 10, 10)
+
+
+def view(request_id, route, airline_key, departure, return_day, passengers):
+    return SimpleNamespace(request_id=request_id, airline_key=airline_key, departure=departure)
+
+
+def stamp(minutes_ago):
+    return (NOW - timedelta(minutes=minutes_ago)).strftime("%Y%m%d_%H%M%S_000")
+
+
+def test_policy_route_then_departure_distance_then_default():
+    policy = FreshnessPolicy.from_config({"max_age_minutes": 120, "routes": {"WAW-AKL": 240},
+                                          "departure_distance": [[60, 180], [14, 60]]})
+    today = date(2026, 11, 19)
+
+    assert policy.enabled
+    assert policy.max_age("WAW-AKL", date(2026, 11, 20), today) == timedelta(minutes=240)
+    assert policy.max_age("WAW-ICN", date(2026, 11, 25), today) == timedelta(minutes=60)
+    assert policy.max_age("WAW-ICN", date(2026, 12, 30), today) == timedelta(minutes=180)
+    assert policy.max_age("WAW-ICN", date(2027, 6, 1), today) == timedelta(minutes=120)
+    assert not FreshnessPolicy.from_config(None).enabled
+    assert FreshnessPolicy().max_age("WAW-ICN", date(2026, 12, 1), today) is None
+
+
+def test_filter_skips_only_fresh_combinations():
+    requests = LazyRequests(GRID, ["Turkish", "KLM"], ("WAW", "ICN"), 2, view)
+    index = FreshnessIndex()
+    results = [SimpleNamespace(request=requests.get(0), success=True, timestamp=stamp(30)),
+               SimpleNamespace(request=requests.get(1), success=True, timestamp=stamp(300)),
+               SimpleNamespace(request=requests.get(2), success=False, timestamp=stamp(10))]
+    index.add_results(requests, results)
+
+    left, skipped = index.filter(requests, FreshnessPolicy(max_age_minutes=120), NOW)
+
+    assert len(index) == 2
+    assert skipped == 1
+    assert [request.request_id for request in left] == list(range(1, len(requests)))
+    assert index.mean_age_minutes(NOW) == 165.0
+
+
+def test_round_logs_feed_index(tmp_path):
+    with open(tmp_path / f"round_001{RESULTS_SUFFIX}", "w", encoding="utf-8") as f:
+        for success, minutes_ago in ((True, 300), (True, 20), (False, 5)):
+            f.write(json.dumps({"type": "result", "success": success, "timestamp": stamp(minutes_ago),
+                                "combo": ["WAW", "ICN", "Turkish", "2026-12-01", "2026-12-11"]}) + "\n")
+        f.write('{"type": "result", "success": tr')  # przerwana runda - urwana ostatnia linia
+
+    index = FreshnessIndex()
+
+    assert index.load_summaries(str(tmp_path)) == 1
+    assert index.latest == {("WAW", "ICN", "Turkish", "2026-12-01", "2026-12-11"): NOW - timedelta(minutes=20)}
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from load_budget import ConsumerLedger, LoadBudget, allocate, budget_report, read_ledger
+
+WEIGHTS = {"extended": 2.0, "excel": 1.0, "url_watcher": 1.0}
+
+
+def config(loads, value_weight=0.0, weights=WEIGHTS):
+    return {"daily_page_loads": loads, "weights": dict(weights), "value_weight": value_weight}
+
+
+@pytest.mark.parametrize("quota", [0, 1, 7, 100, 1001])
+def test_allocate_uses_whole_quota(quota):
+    shares = allocate(quota, WEIGHTS, {"extended": 1.2, "excel": None, "url_watcher": 3.0}, 0.5)
+
+    assert sum(shares.values()) == quota
+    assert set(shares) == set(WEIGHTS)
+
+
+def test_allocate_weights_and_values():
+    assert allocate(100, WEIGHTS, {}, 0.0) == {"extended": 50, "excel": 25, "url_watcher": 25}
+    # Sama wartosc: udzial proporcjonalny do waga * wartosc
+    assert allocate(100, WEIGHTS, {"extended": 1.0, "excel": 3.0, "url_watcher": 4.0}, 1.0) == {
+        "extended": 22, "excel": 33, "url_watcher": 45}
+    # Scheduler bez obserwacji - srednia wartosc pozostalych
+    assert allocate(90, {"a": 1.0, "b": 1.0, "c": 1.0}, {"a": 2.0, "b": None, "c": 2.0}, 1.0) == {
+        "a": 30, "b": 30, "c": 30}
+    assert allocate(10, {"a": 1.0, "b": 0.0}, {}, 0.5) == {"a": 10, "b": 0}
+
+
+def test_draw_until_share_spent_priority_outside_share(tmp_path):
+    budget = LoadBudget("excel", config(8), str(tmp_path))
+
+    assert budget.remaining() == 2
+    budget.record_priority()
+    assert [budget.draw() for _ in range(3)] == [True, True, False]
+
+    ledger = read_ledger(str(tmp_path), date.today().isoformat(), "excel")
+    assert (ledger.spent, ledger.priority) == (3, 1)
+    # Inny proces tego samego schedulera czyta licznik z pliku dnia
+    assert LoadBudget("excel", config(8), str(tmp_path)).draw() is False
+
+
+def test_disabled_budget_never_blocks(tmp_path):
+    budget = LoadBudget("extended", config(0), str(tmp_path))
+
+    assert all(budget.draw() for _ in range(5))
+    assert budget.remaining() is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_observations_raise_value(tmp_path):
+    budget = LoadBudget("url_watcher", config(100, value_weight=1.0), str(tmp_path))
+    soon = (date.today() + timedelta(days=3)).isoformat()
+    for price in (4000, 4400, 4000):
+        budget.observe("WAW-ICN", price, soon)
+
+    ledger = read_ledger(str(tmp_path), date.today().isoformat(), "url_watcher")
+    assert ledger.observations == 3 and ledger.price_changes == 2
+    assert ledger.volatility == pytest.approx((0.1 + 400 / 4400) / 2)
+    assert ledger.value > ConsumerLedger(observations=1).value
+
+    shares = budget_report(config(100, value_weight=1.0), budget_dir=str(tmp_path))["consumers"]
+    # Pozostali bez obserwacji dostaja srednia wartosc - podzial jak wedlug samych wag
+    assert {consumer: row["share"] for consumer, row in shares.items()} == {
+        "extended": 50, "excel": 25, "url_watcher": 25}
+    assert shares["url_watcher"]["value"] == round(ledger.value, 2)
@@ -0,0 +1,100 @@
+import pytest
+
+from offer_cards import (build_airlines_filter, cheapest_card, cheapest_per_airline, cheapest_per_airport,
+                         detect_airport, find_offer_cards, parse_filter_codes)
+from request_planner import airport_label, airport_param, attribute_offers, coalesce_airline_requests, resolve_airports
+
+TK = "fs=airlines%3DTK%3Bbfc%3D1"
+KL_MULT = "fs=airlines%3DKL%2CMULT%3Bbfc%3D1"
+LO = "fs=airlines%3DLO%3Bbfc%3D1"
+# Strona bez filtra linii: karty w kolejnosci sort=price_a (twarde spacje jak na Kayak)
+PAGE = ("Route: WAW - ICN\n" + "=" * 80 + "\n"
+        "Turkish Airlines\n06:15 – 05:40+1\n2\xa0000 zł / osoba 4\xa0000 zł łącznie\n"
+        "KLM, Korean Air\n07:00 – 09:10+1\n2 100 zł / osoba 4 200 zł łącznie\n"
+        "Turkish Airlines\n22:15 – 18:40+1\n2 050 zł / osoba 4 100 zł łącznie\n"
+        "KLM\n07:00 – 09:10+1\n2 300 zł / osoba 4 600 zł łącznie\n")
+
+
+def test_cards_split_between_price_pairs():
+    cards = find_offer_cards(PAGE)
+
+    assert [card.total_price for card in cards] == [4000, 4200, 4100, 4600]
+    assert [card.position for card in cards] == [1, 2, 3, 4]
+    # Opis karty to tekst od poprzedniej ceny
+    assert cards[1].text.strip().startswith("KLM, Korean Air")
+    assert "Turkish" not in cards[1].text
+    assert [card.total_price for card in find_offer_cards(PAGE, limit=2)] == [4000, 4200]
+    assert cheapest_card(PAGE).total_price == 4000
+
+
+def test_single_passenger_price_lines():
+    cards = find_offer_cards("LOT\n10:00 – 12:00\n1 999 zł\nKLM\n11:00 – 14:00\n2 150 zł\n")
+
+    assert [(card.price_per_person, card.total_price) for card in cards] == [(1999, 1999), (2150, 2150)]
+
+
+def test_filter_codes_round_trip():
+    assert parse_filter_codes(KL_MULT) == (["KL"], True)
+    assert parse_filter_codes("") == ([], False)
+    assert parse_filter_codes(build_airlines_filter(["TK", "KL", "TK"], allow_multi=True)) == (["TK", "KL"], True)
+
+
+def test_cheapest_per_airline_respects_multi():
+    cards = find_offer_cards(PAGE)
+
+    best = cheapest_per_airline(cards, {"TK": False, "KL": False})
+    assert {code: card.total_price for code, card in best.items()} == {"TK": 4000, "KL": 4600}
+    # Z MULT linia dostaje tez karte laczona z inna linia
+    assert cheapest_per_airline(cards, {"KL": True})["KL"].total_price == 4200
+
+
+def test_requests_coalesced_per_route_and_dates():
+    requests = [("WAW", "ICN", "2026-11-02", TK), ("WAW", "ICN", "2026-11-02", KL_MULT),
+                ("WAW", "ICN", "2026-11-03", TK), ("WAW", "ICN", "2026-11-02", LO)]
+
+    loads = coalesce_airline_requests(requests, lambda r: r[:3], lambda r: r[3])
+
+    assert [len(load.members) for load in loads] == [3, 1]
+    assert loads[0].airline_filter == "" and loads[0].label == "ALL"
+    assert loads[1].is_direct and loads[1].airline_filter == TK
+
+    multi = coalesce_airline_requests(requests, lambda r: r[:3], lambda r: r[3], mode="multi_filter")
+    assert parse_filter_codes(multi[0].airline_filter) == (["TK", "KL", "LO"], True)
+
+
+def test_attribute_offers_from_one_page():
+    requests = [("WAW", "ICN", TK), ("WAW", "ICN", KL_MULT), ("WAW", "ICN", LO)]
+    [load] = coalesce_airline_requests(requests, lambda r: r[:2], lambda r: r[2])
+
+    attribution = attribute_offers(load, PAGE)
+
+    assert attribution.cards_on_page == 4
+    assert {index: card.total_price for index, card in attribution.found.items()} == {0: 4000, 1: 4200}
+    # Linii bez karty na wspolnej stronie nie zgadujemy - osobne ladowanie
+    assert attribution.missing == [2]
+
+
+def test_airport_groups_resolved_to_codes():
+    groups = {"poland": ["WAW", "WMI", "KRK"]}
+
+    assert resolve_airports("WAW") == ["WAW"]
+    assert resolve_airports("poland,ktw,WAW", groups) == ["WAW", "WMI", "KRK", "KTW"]
+    assert resolve_airports(["wmi", "Poland"], groups) == ["WMI", "WAW", "KRK"]
+    assert airport_param(["WAW", "WMI"]) == "WAW,WMI"
+    assert airport_label("WAW,WMI,KRK") == "WAW-WMI-KRK"
+    with pytest.raises(ValueError):
+        resolve_airports("WAW,ICN1")
+
+
+def test_cheapest_card_per_airport_pair():
+    page = ("Turkish Airlines\nWAW IST AKL\n3 000 zł / osoba 6 000 zł łącznie\n"
+            "LOT\nKRK DOH AKL\n2 900 zł / osoba 5 800 zł łącznie\n"
+            "Qatar Airways\nWAW DOH AKL\n2 950 zł / osoba 5 900 zł łącznie\n"
+            "Emirates\nKTW DXB AKL\n2 000 zł / osoba 4 000 zł łącznie\n")
+    cards = find_offer_cards(page)
+
+    assert detect_airport(cards[1].text, ["WAW", "WMI", "KRK"]) == "KRK"
+    assert detect_airport("dowolny tekst", ["AKL"]) == "AKL"
+    best = cheapest_per_airport(cards, ["WAW", "WMI", "KRK"], ["AKL"])
+    # Karta z lotniska spoza grupy (KTW) nie jest przypisywana
+    assert {route: card.total_price for route, card in best.items()} == {"WAW-AKL": 5900, "KRK-AKL": 5800}
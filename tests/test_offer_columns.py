@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import offer_columns
+from offer_columns import ColumnWriter, compact, list_partitions, list_parts, load_offers, offer_row
+
+ENGINES = ["npy"] + (["parquet"] if offer_columns.pyarrow is not None else [])
+LEGS = {"out": {"departure_time": "06:15", "arrival_time": "05:40+1", "travel_minutes": 1165,
+                "flight_minutes": 1010, "stops": ["IST"]}}
+
+
+def row(total, airline="Turkish", route=("WAW", "ICN"), scraped_at="20261119_101500_000", rank=1, legs=None):
+    return offer_row("extractor", scraped_at, route[0], route[1], airline, airline, "2026-12-01", "2026-12-21",
+                     total // 2, total, rank, legs)
+
+
+def write(root, engine, rows):
+    writer = ColumnWriter(str(root), engine)
+    writer.extend(rows)
+    writer.close()
+    return writer
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_writer_partitions_and_load_round_trip(tmp_path, engine):
+    writer = write(tmp_path, engine, [row(5000, legs=LEGS), row(4800, "KLM", rank=300), None,
+                                      row(3900, route=("KRK", "NRT")),
+                                      row(4700, scraped_at="20261201_080000_000")])
+
+    assert writer.written == 4
+    assert [(route, month) for route, month, _ in list_partitions(str(tmp_path))] == [
+        ("KRK-NRT", "2026-11"), ("WAW-ICN", "2026-11"), ("WAW-ICN", "2026-12")]
+
+    frame = load_offers(str(tmp_path), ["WAW-ICN"], "2026-11", "2026-11")
+    assert list(frame["total_price"]) == [5000, 4800]
+    assert list(frame["airline"]) == ["Turkish", "KLM"]
+    assert list(frame["rank"]) == [1, 300]
+    assert frame["stay_days"].tolist() == [20, 20]
+    assert frame["out_stop_airports"].tolist() == ["IST", ""]
+    # Brak odcinka: -1 w pliku, NA w loaderze
+    assert frame["out_travel_minutes"].iloc[0] == 1165 and frame["out_travel_minutes"].isna().iloc[1]
+    assert frame["out_departure_minute"].iloc[0] == 6 * 60 + 15
+
+
+def test_load_selected_columns_and_unknown_column(tmp_path):
+    write(tmp_path, "npy", [row(5000), row(3900, route=("KRK", "NRT"))])
+
+    frame = load_offers(str(tmp_path), columns=["origin", "total_price"])
+
+    assert list(frame.columns) == ["origin", "total_price"]
+    assert sorted(frame["total_price"]) == [3900, 5000]
+    with pytest.raises(ValueError):
+        load_offers(str(tmp_path), columns=["price"])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_compact_merges_parts(tmp_path, engine):
+    for total in (5000, 4800, 4900):
+        write(tmp_path, engine, [row(total)])
+    [(_, _, folder)] = list_partitions(str(tmp_path))
+    assert len(list_parts(folder)) == 3
+
+    assert compact(str(tmp_path), engine) == 3
+
+    assert len(list_parts(folder)) == 1
+    assert sorted(load_offers(str(tmp_path))["total_price"]) == [4800, 4900, 5000]
+
+
+def test_compact_keeps_part_written_during_compaction(tmp_path, monkeypatch):
+    write(tmp_path, "npy", [row(5000)])
+    write(tmp_path, "npy", [row(4800)])
+    [(_, _, folder)] = list_partitions(str(tmp_path))
+    original = offer_columns.read_part
+    late = []
+
+    def read_part(path, columns):
+        # Inny proces dopisuje czesc, gdy compact czyta migawke czesci
+        if not late:
+            late.append(write(tmp_path, "npy", [row(4700)]))
+        return original(path, columns)
+
+    monkeypatch.setattr(offer_columns, "read_part", read_part)
+    assert compact(str(tmp_path), "npy") == 2
+    monkeypatch.setattr(offer_columns, "read_part", original)
+
+    parts = list_parts(folder)
+    assert len(parts) == 2
+    assert any(os.path.basename(path).endswith("-compact.cols") for path in parts)
+    # Dopisana czesc nie jest ani zdublowana w scalonej, ani usunieta
+    assert sorted(load_offers(str(tmp_path))["total_price"]) == [4700, 4800, 5000]
@@ -0,0 +1,105 @@
+import os
+import time
+import zlib
+
+import pytest
+
+from page_archive import MAX_CHUNK, MIN_CHUNK, PageArchive, split_chunks
+
+# Strona z duza stala czescia (nawigacja, filtry) i krotka lista wynikow
+CHROME = "".join(f"Filtr {i}: linie, przesiadki, godziny wylotu {i * 7}\n" for i in range(600))
+
+
+def page(totals):
+    results = "".join(f"Turkish Airlines\n{t // 2} zł / osoba {t} zł łącznie\n" for t in totals)
+    return f"Route: WAW - ICN\n{'=' * 80}\n\n{results}{CHROME}"
+
+
+def age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_chunks_cover_text_and_survive_insertion():
+    data = page([4000, 4200]).encode("utf-8")
+    chunks = split_chunks(data)
+
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= MAX_CHUNK + 200 for chunk in chunks)
+    assert all(len(chunk) >= MIN_CHUNK for chunk in chunks[:-1])
+    # Dodatkowe wyniki na poczatku strony nie przesuwaja granic w dalszej czesci
+    shifted = split_chunks(page([3900, 4000, 4100, 4200]).encode("utf-8"))
+    assert len(set(chunks) & set(shifted)) >= len(chunks) - 2
+
+
+def test_one_line_longer_than_max_chunk():
+    data = b"x" * (3 * MAX_CHUNK) + b"\nkoniec\n"
+
+    assert b"".join(split_chunks(data)) == data
+
+
+def test_put_get_and_dedup(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    first = archive.put("R001_WAW_ICN", page([4000, 4200]))
+    second = archive.put("R002_WAW_ICN", page([3900, 4200]))
+
+    assert archive.get("R001_WAW_ICN") == page([4000, 4200])
+    assert archive.get("R002_WAW_ICN") == page([3900, 4200])
+    stats = archive.stats()
+    assert stats.captures == 2
+    assert stats.unique_chunks < len(first["chunks"]) + len(second["chunks"])
+    assert stats.dedup_ratio > 1.5
+    with pytest.raises(KeyError):
+        archive.get("R003_WAW_ICN")
+
+
+def test_corrupted_chunk_detected(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    record = archive.put("R001_WAW_ICN", page([4000]))
+    digest = record["chunks"][0][0]
+    with open(archive._chunk_path(digest), "wb") as f:
+        f.write(zlib.compress(b"inna tresc"))
+
+    with pytest.raises(ValueError):
+        archive.get("R001_WAW_ICN")
+
+
+def test_forget_then_gc_keeps_shared_chunks(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.put("R001_WAW_ICN", page([4000]), stored_day="2020-01-01")
+    archive.put("R002_WAW_ICN", page([3900]))
+    for _, path in archive._chunk_files():
+        age(path, 7200)
+
+    assert archive.forget(30) == 1
+    assert archive.stats().unreferenced_chunks > 0
+    result = archive.gc()
+
+    assert result["deleted_chunks"] > 0
+    assert archive.stats().unreferenced_chunks == 0
+    # Fragmenty wspolne z zachowanym zrzutem zostaja
+    assert archive.get("R002_WAW_ICN") == page([3900])
+
+
+def test_gc_spares_fresh_chunks(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.put("R001_WAW_ICN", page([4000]), stored_day="2020-01-01")
+    archive.forget(30)
+
+    assert archive.gc()["deleted_chunks"] == 0
+    assert archive.gc(grace_seconds=0)["deleted_chunks"] > 0
+
+
+def test_add_folder_skips_unsettled_and_removes_checked(tmp_path):
+    folder = tmp_path / "session"
+    folder.mkdir()
+    for name, totals, seconds in (("R001_WAW_ICN", [4000], 600), ("R002_WAW_ICN", [3900], 0)):
+        path = folder / f"{name}.txt"
+        path.write_text(page(totals), encoding="utf-8")
+        age(str(path), seconds)
+    archive = PageArchive(str(tmp_path / "archive"))
+
+    assert archive.add_folder(str(folder), remove=True) == {"added": 1, "skipped": 0, "removed": 1}
+    # Plik zmieniony przed chwila zostaje na kolejny import
+    assert sorted(os.listdir(folder)) == ["R002_WAW_ICN.txt"]
+    assert archive.get("R001_WAW_ICN") == page([4000])
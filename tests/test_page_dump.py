@@ -0,0 +1,33 @@
+import os
+
+from page_dump import PageDumper, read_page_text
+from segment_store import list_page_refs, list_segments
+
+HEADER = "Route: WAW - ICN\n" + "=" * 80 + "\n\n"
+
+
+def test_segments_closed_between_rounds_and_reopened(tmp_path):
+    dumper = PageDumper("gzip", store="segments")
+    folder = str(tmp_path)
+
+    dumper.write(folder, "R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_100000_000", (HEADER, "strona 1", "\n"))
+    dumper.close()
+    assert dumper.segment_writers == {}
+    # Kolejna runda dopisuje do nowego segmentu
+    dumper.write(folder, "R002_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_110000_000", (HEADER, "strona 2", "\n"))
+    dumper.close()
+
+    assert len(list_segments(folder)) == 2
+    assert [ref.read() for ref in list_page_refs(folder)] == [HEADER + "strona 1\n", HEADER + "strona 2\n"]
+    assert dumper.take_stats()["pages"] == 2
+
+
+def test_file_pages_compressed(tmp_path):
+    dumper = PageDumper("gzip")
+
+    path = dumper.write(str(tmp_path), "WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_100000_000",
+                        (HEADER, "ł" * 500, "\n"))
+
+    assert path.endswith(".txt.gz") and os.path.exists(path)
+    assert read_page_text(path) == HEADER + "ł" * 500 + "\n"
+    dumper.close()
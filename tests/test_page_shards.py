@@ -0,0 +1,80 @@
+import os
+from datetime import date
+
+import pytest
+
+from page_dump import PageDumper
+from page_shards import (filters_from_args, is_sharded, page_folders, shard_days, shard_dir, shard_folders,
+                         shard_routes)
+from segment_store import SegmentWriter, list_session_refs
+
+SHARDS = [("WAW_ICN", "2026-10-18", "Turkish"), ("WAW_ICN", "2026-10-19", "Turkish"),
+          ("WAW_ICN", "2026-10-19", "KLM"), ("WAW-WMI_AKL", "2026-10-19", "ALL"), ("KRK_NRT", "2026-10-20", "LOT")]
+
+
+@pytest.fixture
+def session(tmp_path):
+    folder = str(tmp_path / "rolling_mode")
+    for route, day, airline in SHARDS:
+        path = shard_dir(folder, route, day, airline if airline != "ALL" else None)
+        os.makedirs(path)
+        with open(os.path.join(path, f"R001_{route}_{airline}_{day}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{route} {day} {airline}\n")
+    # Strona sprzed shardow i pliki sesji w folderze glownym
+    with open(os.path.join(folder, "R000_WAW_ICN_Turkish_flat.txt"), "w", encoding="utf-8") as f:
+        f.write("plaska\n")
+    os.makedirs(os.path.join(folder, "logs"))
+    return folder
+
+
+def names(refs):
+    return [ref.name for ref in refs]
+
+
+def test_routes_and_days_from_folder_names(session):
+    assert is_sharded(session)
+    assert shard_routes(session) == ["KRK_NRT", "WAW-WMI_AKL", "WAW_ICN"]
+    assert shard_days(session) == ["2026-10-18", "2026-10-19", "2026-10-20"]
+    assert shard_days(session, ["WAW_ICN", "LHR_JFK"]) == ["2026-10-18", "2026-10-19"]
+    assert shard_dir("s", "WAW_ICN", date(2026, 10, 19), None) == os.path.join("s", "WAW_ICN", "2026-10-19", "ALL")
+
+
+def test_shard_filters(session):
+    def relative(folders):
+        return [os.path.relpath(folder, session).replace(os.sep, "/") for folder in folders]
+
+    assert relative(shard_folders(session, days=["2026-10-19"])) == [
+        "WAW-WMI_AKL/2026-10-19/ALL", "WAW_ICN/2026-10-19/KLM", "WAW_ICN/2026-10-19/Turkish"]
+    assert relative(shard_folders(session, routes=["WAW_ICN"], airlines=["Turkish"])) == [
+        "WAW_ICN/2026-10-18/Turkish", "WAW_ICN/2026-10-19/Turkish"]
+    assert relative(shard_folders(session, since="2026-10-19", until="2026-10-19", airlines=["LOT"])) == []
+    assert relative(shard_folders(session, since="2026-10-20")) == ["KRK_NRT/2026-10-20/LOT"]
+    # Bez filtrow - takze strony plaskie z folderu sesji
+    assert page_folders(session)[0] == session
+    assert session not in page_folders(session, days=["2026-10-19"])
+
+
+def test_session_refs_flat_and_sharded(session):
+    assert len(list_session_refs(session)) == len(SHARDS) + 1
+    assert names(list_session_refs(session, **filters_from_args(["--day", "2026-10-19", "--route", "WAW_ICN"]))) == [
+        "R001_WAW_ICN_KLM_2026-10-19.txt", "R001_WAW_ICN_Turkish_2026-10-19.txt"]
+
+
+def test_segments_inside_shards(tmp_path):
+    folder = str(tmp_path)
+    writer = SegmentWriter(shard_dir(folder, "WAW_ICN", "2026-10-19", "Turkish"))
+    writer.append("R001_WAW_ICN_Turkish.txt", "strona w segmencie\n")
+    writer.close()
+
+    [ref] = list_session_refs(folder, days=["2026-10-19"])
+    assert ref.read() == "strona w segmencie\n"
+
+
+def test_dumper_writes_to_todays_shard(tmp_path):
+    dumper = PageDumper(layout="sharded")
+
+    path = dumper.write(str(tmp_path), "R001_WAW_ICN_Turkish", ("strona\n",), route="WAW_ICN", airline="Turkish")
+
+    assert os.path.dirname(path) == shard_dir(str(tmp_path), "WAW_ICN", date.today(), "Turkish")
+    assert filters_from_args([]) == {"days": None, "since": None, "until": None, "routes": None, "airlines": None}
+    assert names(list_session_refs(str(tmp_path), days=[date.today().isoformat()])) == ["R001_WAW_ICN_Turkish.txt"]
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+
+from preflight import Issue, Preflight, PreflightReport
+
+TODAY = date(2026, 11, 19)
+
+
+def rules(issues):
+    return [(issue.rule, issue.drop) for issue in issues]
+
+
+def test_airports_from_index_extra_and_flag_mode():
+    preflight = Preflight(extra_airports=["xyz"], today=TODAY)
+
+    assert rules(preflight.check_route(["WAW", "KRK"], ["ICN"])) == []
+    assert rules(preflight.check_route(["WAW"], ["XYZ"])) == []
+    assert rules(preflight.check_route(["WA1"], ["QQQ"])) == [("airport_format", True), ("unknown_airport", True)]
+    assert rules(preflight.check_route(["WAW"], ["WAW", "ICN"])) == [("same_airport", True)]
+    assert rules(preflight.check_route([], ["ICN"])) == [("airport_format", True)]
+    assert rules(Preflight(unknown_airport="flag").check_airports(["QQQ"], "przylot")) == [("unknown_airport", False)]
+
+
+def test_date_rules():
+    preflight = Preflight(max_days_ahead=30, today=TODAY)
+
+    assert preflight.check_dates("2026-11-19", "2026-12-01") == []
+    assert preflight.check_dates("2026-12-01") == []
+    assert rules(preflight.check_dates("2026-11-18", "2026-12-01")) == [("past_departure", True)]
+    assert rules(preflight.check_dates("2026-12-20")) == [("too_far_ahead", True)]
+    assert rules(preflight.check_dates("2026-12-01", "2026-11-30")) == [("return_before_departure", True)]
+    assert rules(preflight.check_dates("2026-13-01")) == [("date_format", True)]
+    assert preflight.first_valid_departure("2026-11-01") == "2026-11-19"
+    assert preflight.first_valid_departure("2026-11-25") == "2026-11-25"
+    assert preflight.last_valid_departure() == date(2026, 12, 19)
+
+
+def test_date_masks_match_row_checks():
+    preflight = Preflight(max_days_ahead=30, today=TODAY)
+    rows = [("2026-11-20", "2026-12-01"), ("2026-11-10", "2026-11-20"), ("2027-01-05", "2027-01-20"),
+            ("2026-12-01", "2026-11-25")]
+    departures = pd.to_datetime(pd.Series([d for d, _ in rows]))
+    returns = pd.to_datetime(pd.Series([r for _, r in rows]))
+
+    masks = preflight.date_rule_masks(departures, returns)
+
+    for index, (departure, return_day) in enumerate(rows):
+        row_rules = {issue.rule for issue in preflight.check_dates(departure, return_day)}
+        assert {rule for rule, mask in masks.items() if mask.iloc[index]} == row_rules
+
+
+def test_airline_checks_and_from_config():
+    preflight = Preflight.from_config({"max_days_ahead": 100, "unknown_airport": "flag"})
+
+    assert preflight.max_days_ahead == 100 and not preflight.unknown_airport_drops
+    assert rules(preflight.check_airline_key("Turkish", ["Turkish", "KLM"])) == []
+    assert rules(preflight.check_airline_key("Wizz", ["Turkish"])) == [("unknown_airline", True)]
+    assert rules(preflight.check_airline_code("TK")) == []
+    assert rules(preflight.check_airline_code("ZZ")) == [("unknown_airline", False)]
+    assert rules(preflight.check_airline_code("T")) == [("airline_format", True)]
+
+
+def test_report_counts_jobs_and_round_trips():
+    report = PreflightReport()
+
+    assert report.add([]) is True
+    assert report.add([Issue("unknown_airline", "", drop=False)], count=3) is True
+    assert report.add([Issue("past_departure", ""), Issue("unknown_airline", "", drop=False)], count=2) is False
+
+    described = report.describe()
+    assert described == {"checked": 6, "dropped": 2, "flagged": 3,
+                         "dropped_by_rule": {"past_departure": 2, "unknown_airline": 2},
+                         "flagged_by_rule": {"unknown_airline": 3}}
+    assert PreflightReport.from_describe(described).describe() == described
+    assert "usunieto 2" in report.log_line()
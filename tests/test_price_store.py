@@ -0,0 +1,54 @@
+import sqlite3
+
+from price_store import PriceStore
+
+
+def add(store, ref, total, airline="Turkish", departure="2026-11-02", return_day="2026-11-22"):
+    offers = [{"airline": airline, "total_price": total, "price_per_person": total / 2}] if total else []
+    store.add_search("extended", ref, "20260601_100000_000", "WAW", "ICN", departure, return_day, 2,
+                     airline, bool(total), None, offers)
+
+
+def test_duplicate_refs_written_once_and_cheapest(tmp_path):
+    store = PriceStore(str(tmp_path / "history.sqlite"))
+    add(store, "a.txt", 5000)
+    add(store, "b.txt", 4200, departure="2026-11-05", return_day="2026-11-20")
+    add(store, "c.txt", 4800, airline="KLM")
+    add(store, "d.txt", None)
+
+    assert store.flush() == 4
+    # Ponowny import tych samych plikow stron nie dubluje pobran
+    add(store, "a.txt", 5000)
+    add(store, "b.txt", 4200)
+    assert store.flush() == 0
+
+    assert [row["total_price"] for row in store.cheapest("WAW", "ICN")] == [4200, 4800, 5000]
+    assert [row["total_price"] for row in store.cheapest("WAW", "ICN", airline="Turkish")] == [4200, 5000]
+    assert [row["total_price"] for row in store.cheapest("WAW", "ICN", stay=20)] == [4800, 5000]
+    assert store.stats()["searches"] == 4
+    store.close()
+
+
+def test_locked_database_keeps_batch_until_next_flush(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    store = PriceStore(path, batch_size=2)
+    store.db.execute("PRAGMA busy_timeout=0")
+    # Inny proces trzyma blokade zapisu
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+
+    add(store, "a.txt", 5000)
+    add(store, "b.txt", 4800)  # automatyczny zapis przy batch_size - bez wyjatku
+
+    assert store.written == 0
+    assert [search[1] for search, _ in store.pending] == ["a.txt", "b.txt"]
+    # Kolejna proba dopiero po nastepnej partii, nie przy kazdym wyniku
+    add(store, "c.txt", 4900)
+    assert len(store.pending) == 3
+
+    other.rollback()
+    other.close()
+    assert store.flush() == 3
+    assert store.pending == []
+    assert [row["total_price"] for row in store.cheapest("WAW", "ICN")] == [4800, 4900, 5000]
+    store.close()
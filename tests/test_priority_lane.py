@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import priority_lane
+from priority_lane import MAX_ATTEMPTS, claim_next, get_result, has_pending, requeue_stale, serve_next, submit
+
+PAGE = "Turkish Airlines\n2 100 zł / osoba 4 200 zł łącznie\nKLM\n2 000 zł / osoba 4 000 zł łącznie\n"
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def running_job(lane, ticket, **fields):
+    path = os.path.join(lane, "running", f"{ticket}.json")
+    with open(path, "r", encoding="utf-8") as f:
+        job = json.load(f)
+    job.update(fields)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    return path
+
+
+def test_claim_in_submission_order(tmp_path):
+    lane = str(tmp_path)
+    first = submit("https://www.kayak.pl/flights/WAW-ICN/2026-11-02/2026-11-20/2adults", "pierwsze", lane)
+    second = submit("https://www.kayak.pl/flights/WAW-NRT/2026-11-02/2026-11-20/2adults", lane_dir=lane)
+
+    job = claim_next(lane)
+
+    assert job["ticket"] == first and job["attempts"] == 1 and job["pid"] == os.getpid()
+    assert os.path.exists(os.path.join(lane, "running", f"{first}.json"))
+    assert claim_next(lane)["ticket"] == second
+    assert not has_pending(lane) and claim_next(lane) is None
+
+
+def test_serve_next_writes_cheapest_card(tmp_path):
+    lane = str(tmp_path)
+    ticket = submit("https://www.kayak.pl/flights/WAW-ICN/2026-11-02/2026-11-20/2adults", lane_dir=lane)
+
+    result = serve_next(lambda url: PAGE, "test", lane)
+
+    assert (result["status"], result["total_price"], result["offers_on_page"]) == ("ok", 4000, 2)
+    assert get_result(ticket, lane)["total_price"] == 4000
+    assert os.listdir(os.path.join(lane, "running")) == []
+    assert serve_next(lambda url: PAGE, "test", lane) is None
+
+
+def test_serve_next_records_load_error(tmp_path):
+    lane = str(tmp_path)
+    ticket = submit("https://www.kayak.pl/flights/WAW-ICN/2026-11-02/2026-11-20/2adults", lane_dir=lane)
+
+    def fetch_text(url):
+        raise TimeoutError("strona nie zaladowana")
+
+    assert serve_next(fetch_text, "test", lane)["status"] == "error"
+    assert get_result(ticket, lane)["error"] == "strona nie zaladowana"
+
+
+def test_requeue_stale_jobs(tmp_path):
+    lane = str(tmp_path)
+    tickets = [submit(f"https://www.kayak.pl/flights/WAW-ICN/2026-11-0{i}/2026-11-20/2adults", lane_dir=lane)
+               for i in range(1, 5)]
+    for _ in tickets:
+        claim_next(lane)
+    # Proces padl / przejete dawno temu / proces padl przy ostatniej probie
+    running_job(lane, tickets[0], pid=dead_pid())
+    old = running_job(lane, tickets[1])
+    os.utime(old, (time.time() - 2 * priority_lane.RUNNING_TIMEOUT_SECONDS,) * 2)
+    running_job(lane, tickets[2], pid=dead_pid(), attempts=MAX_ATTEMPTS)
+    # tickets[3]: zywy proces, swiezo przejete - zostaje w running/
+
+    assert requeue_stale(lane) == 2
+
+    assert sorted(os.listdir(os.path.join(lane, "pending"))) == [f"{ticket}.json" for ticket in tickets[:2]]
+    assert os.listdir(os.path.join(lane, "running")) == [f"{tickets[3]}.json"]
+    assert get_result(tickets[2], lane)["status"] == "error"
+    # Kolejne przejecie liczy proby dalej
+    assert claim_next(lane)["attempts"] == 2
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+import pytest
+
+from request_planner import (ChainedRequests, DateGrid, IndexPermutation, LazyRequests, RequestSequence,
+                             RequestTable, SubsetRequests)
+
+
+def view(request_id, route, airline_key, departure, return_day, passengers):
+    return request_id, route, airline_key, departure.isoformat(), return_day.isoformat(), passengers
+
+
+def brute_force_grid(first, last, min_days, max_days, latest_departure=None):
+    """Kolejnosc jak w DateGrid: dlugosc pobytu, potem dzien wylotu"""
+    combinations = []
+    for days in range(min_days, max_days + 1):
+        departure = first
+        while departure + timedelta(days=days) <= last:
+            if latest_departure is None or departure <= latest_departure:
+                combinations.append((departure.isoformat(), (departure + timedelta(days=days)).isoformat(), days))
+            departure += timedelta(days=1)
+    return combinations
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000, 4099])
+def test_permutation_is_bijection(size):
+    permutation = IndexPermutation(size, seed=42)
+
+    assert sorted(permutation[i] for i in range(size)) == list(range(size))
+
+
+def test_permutation_depends_only_on_seed():
+    assert [IndexPermutation(500, 7)[i] for i in range(500)] == [IndexPermutation(500, 7)[i] for i in range(500)]
+    assert [IndexPermutation(500, 7)[i] for i in range(500)] != [IndexPermutation(500, 8)[i] for i in range(500)]
+    with pytest.raises(IndexError):
+        IndexPermutation(5, 1)[5]
+
+
+@pytest.mark.parametrize("latest_departure", [None, date(2026, 1, 10), date(2025, 12, 1)])
+def test_date_grid_matches_brute_force(latest_departure):
+    first, last = date(2026, 1, 1), date(2026, 2, 5)
+    grid = DateGrid(first, last, 3, 9, latest_departure)
+
+    assert list(grid) == brute_force_grid(first, last, 3, 9, latest_departure)
+    assert len(grid) == len(brute_force_grid(first, last, 3, 9, latest_departure))
+
+
+def test_lazy_requests_stable_ids_in_shuffled_order():
+    grid = DateGrid(date(2026, 1, 1), date(2026, 1, 31), 5, 7)
+    plain = LazyRequests(grid, ["Turkish", "KLM"], ("WAW", "ICN"), 2, view)
+    shuffled = LazyRequests(grid, ["Turkish", "KLM"], ("WAW", "ICN"), 2, view, seed=3)
+
+    assert len(plain) == len(grid) * 2
+    assert [request[0] for request in plain] == list(range(len(plain)))
+    # Ta sama kombinacja pod tym samym request_id niezaleznie od kolejnosci
+    assert sorted(shuffled) == list(plain)
+    assert list(shuffled) != list(plain)
+    assert plain.get(3) == (3, ("WAW", "ICN"), "KLM", grid[1][0], grid[1][1], 2)
+    assert plain[-1] == plain[len(plain) - 1]
+    with pytest.raises(IndexError):
+        plain[len(plain)]
+
+
+def test_chained_and_subset_keep_request_ids():
+    grid = DateGrid(date(2026, 1, 1), date(2026, 1, 20), 5, 6)
+    first = LazyRequests(grid, ["Turkish"], ("WAW", "ICN"), 2, view)
+    second = LazyRequests(grid, ["KLM", "LOT"], ("WAW", "NRT"), 1, view)
+    chained = ChainedRequests([first, second], seed=11)
+
+    assert sorted(request[0] for request in chained) == list(range(len(first) + len(second)))
+    assert chained.get(len(first))[1:] == second.get(0)[1:]
+    assert chained.route_totals() == {"WAW-ICN": len(first), "WAW-NRT": len(second)}
+
+    subset = SubsetRequests(chained, [0, len(first) + 1])
+    assert [request[0] for request in subset] == [0, len(first) + 1]
+    assert subset.route_totals() == {"WAW-ICN": 1, "WAW-NRT": 1}
+
+
+def test_request_table_round_trip_and_shuffle():
+    table = RequestTable(view)
+    rows = [("WAW", "ICN", "Turkish", "2026-01-05", "2026-01-25", 2),
+            ("WAW", "ICN", "KLM", "2026-01-05", "2026-01-25", 2),
+            ("KRK", "NRT", "Turkish", "2026-02-01", "2026-02-20", 1)]
+    ids = [table.add(*row) for row in rows]
+
+    assert ids == [0, 1, 2]
+    # Linie i trasy zapisane raz, wiersze odwoluja sie po id
+    assert table.airlines == ["Turkish", "KLM"]
+    assert table.routes == [("WAW", "ICN"), ("KRK", "NRT")]
+    assert [table.get(i) for i in ids] == [(i, (o, d), a, dep, ret, p) for i, (o, d, a, dep, ret, p) in zip(ids, rows)]
+    assert table.route_totals() == {"WAW-ICN": 2, "KRK-NRT": 1}
+
+    before = list(table)
+    table.shuffle(5)
+    assert sorted(table) == before
+    assert [table.get(i) for i in ids] == before
+
+
+def test_request_sequence_is_abstract():
+    with pytest.raises(TypeError):
+        RequestSequence()
@@ -0,0 +1,83 @@
+import csv
+
+from result_sink import BatchedSink, CsvDaySink, FlushPolicy
+
+FIELDS = ["timestamp", "url", "total_price"]
+
+
+class MemorySink:
+    """Backend w pamieci; failing=True - kazdy zapis konczy sie bledem"""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self.rows = []
+        self.closed = False
+
+    def write_rows(self, day, rows):
+        if self.failing:
+            raise OSError("backend niedostepny")
+        self.rows += [(day, row["url"]) for row in rows]
+
+    def close(self):
+        self.closed = True
+
+
+def row(i, day="2026-11-19"):
+    return {"timestamp": f"{day}T10:00:{i:02d}", "url": f"u{i}", "total_price": 4000 + i}
+
+
+def test_failed_sink_retries_only_its_rows():
+    good, bad = MemorySink(), MemorySink(failing=True)
+    sink = BatchedSink({"csv": good, "sqlite": bad}, FlushPolicy(rows=2, seconds=0, kb=0))
+
+    for i in range(4):
+        sink.add(row(i))
+
+    assert [url for _, url in good.rows] == ["u0", "u1", "u2", "u3"]
+    assert [r["url"] for r in sink.pending["sqlite"]] == ["u0", "u1", "u2", "u3"]
+    # Liczone sa tylko wiersze przyjete przez backend
+    assert sink.rows_written == {"csv": 4, "sqlite": 0}
+
+    bad.failing = False
+    sink.add(row(4, day="2026-11-20"))
+    sink.close()
+
+    assert bad.rows == [("20261119", "u0"), ("20261119", "u1"), ("20261119", "u2"), ("20261119", "u3"),
+                        ("20261120", "u4")]
+    assert good.rows[-1] == ("20261120", "u4")
+    assert sink.rows_written == {"csv": 5, "sqlite": 5}
+    assert sink.pending == {"csv": [], "sqlite": []}
+    assert good.closed and bad.closed
+
+
+def test_pending_rows_capped_per_sink():
+    bad = MemorySink(failing=True)
+    sink = BatchedSink({"sqlite": bad}, FlushPolicy(rows=1, seconds=0, kb=0, max_pending=3))
+
+    for i in range(5):
+        sink.add(row(i))
+
+    # Najstarsze wiersze odpadaja, najnowsze czekaja na ponowienie
+    assert [r["url"] for r in sink.pending["sqlite"]] == ["u2", "u3", "u4"]
+    assert sink.rows_dropped == {"sqlite": 2}
+    assert sink.rows_written == {"sqlite": 0}
+
+
+def test_policy_from_config():
+    policy = FlushPolicy.from_config({"flush_rows": 5, "max_pending_rows": 100})
+
+    assert (policy.rows, policy.seconds, policy.kb, policy.max_pending) == (5, 60.0, 256.0, 100)
+
+
+def test_csv_day_files_header_once(tmp_path):
+    sink = BatchedSink({"csv": CsvDaySink(str(tmp_path), FIELDS)}, FlushPolicy(rows=0, seconds=0, kb=0))
+    sink.add(row(0))
+    sink.add(row(1, day="2026-11-20"))
+    sink.flush()
+    sink.add(row(2))
+    sink.close()
+
+    with open(tmp_path / "prices_20261119.csv", encoding="utf-8") as f:
+        assert [r["url"] for r in csv.DictReader(f)] == ["u0", "u2"]
+    with open(tmp_path / "prices_20261120.csv", encoding="utf-8") as f:
+        assert [r["url"] for r in csv.DictReader(f)] == ["u1"]
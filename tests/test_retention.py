@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from datetime import date
+
+import pytest
+
+from retention import BUNDLE_PREFIX, STATE_FILE, RetentionEngine
+from segment_store import SegmentWriter, list_page_refs, list_segments, read_index
+from session_log import RESULTS_SUFFIX
+
+NOW = time.time()
+OLD = NOW - 40 * 86400
+COMBO = ["WAW", "ICN", "Turkish", "2025-10-22", "2025-11-10"]
+
+
+def page_text(total):
+    """Strona z jedna karta oferty (None - strona bez ceny)"""
+    body = "Brak wynikow" if total is None else f"Turkish Airlines\n{total // 2:,} zł / osoba {total:,} zł łącznie"
+    return f"Route: WAW - ICN\n{'=' * 80}\n\n{body.replace(',', ' ')}\n"
+
+
+def write_page(folder, name, total, mtime=OLD):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page_text(total))
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def write_log(session, records):
+    with open(os.path.join(session, f"round_001{RESULTS_SUFFIX}"), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "start"}) + "\n")
+        for text_path, total in records:
+            f.write(json.dumps({"type": "result", "success": True, "text_path": text_path,
+                                "combo": COMBO, "total_price": total}) + "\n")
+
+
+def bundle_names(folder):
+    return [ref.name for path in list_segments(folder) if os.path.basename(path).startswith(f"{BUNDLE_PREFIX}_")
+            for ref in read_index(path)]
+
+
+def old_segment(folder, totals):
+    writer = SegmentWriter(folder)
+    names = []
+    for i, total in enumerate(totals):
+        name = f"R004_WAW_HND_LOT_2025-10-22_2025-11-10_20250603_1{i}0000_000.txt"
+        writer.append(name, page_text(total))
+        names.append(name)
+    writer.close()
+    for path in os.listdir(folder):
+        if path.startswith("seg_"):
+            os.utime(os.path.join(folder, path), (OLD, OLD))
+    return names, list_segments(folder)[0]
+
+
+@pytest.fixture
+def session(tmp_path):
+    folder = tmp_path / "rolling_mode"
+    folder.mkdir()
+    return str(folder)
+
+
+def test_flat_pages_keep_new_minimum_and_unparsed(tmp_path, session):
+    logged = [write_page(session, f"R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_10000{i}_000", total, OLD + i)
+              for i, total in enumerate([5000, 4800, 4900, None])]
+    write_log(session, zip(logged, [5000, 4800, 4900, None]))
+    # Bez logu: cena z karty na stronie, strona bez karty zostaje
+    write_page(session, "R002_WAW_NRT_LOT_2025-10-22_2025-11-10_20250602_100000_000", None, OLD + 10)
+    fresh = write_page(session, "R003_WAW_NRT_LOT_2025-10-22_2025-11-10_20250602_130000_000", 1000, NOW)
+
+    report = RetentionEngine(str(tmp_path), 30).run_once(NOW)
+
+    assert (report.pages, report.kept_minimum, report.kept_unparsed, report.dropped) == (5, 2, 2, 1)
+    assert sorted(bundle_names(session)) == sorted(
+        f"{os.path.splitext(os.path.basename(path))[0]}.txt" for path in [logged[0], logged[1], logged[3]]
+    ) + ["R002_WAW_NRT_LOT_2025-10-22_2025-11-10_20250602_100000_000.txt"]
+    assert not any(os.path.exists(path) for path in logged)
+    assert os.path.exists(fresh)
+    state = json.load(open(os.path.join(str(tmp_path), STATE_FILE), encoding="utf-8"))
+    assert state["minimums"]["_".join(COMBO)] == 4800
+
+
+def test_bundled_page_reads_back(tmp_path, session):
+    path = write_page(session, "R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_100000_000", 4800)
+
+    RetentionEngine(str(tmp_path), 30).run_once(NOW)
+
+    refs = list_page_refs(session)
+    assert [ref.name for ref in refs] == [f"{os.path.splitext(os.path.basename(path))[0]}.txt"]
+    assert refs[0].read() == page_text(4800)
+
+
+def test_segment_removed_after_its_records_are_bundled(tmp_path, session):
+    names, segment = old_segment(session, [2000, 2500, 1900])
+
+    report = RetentionEngine(str(tmp_path), 30).run_once(NOW)
+
+    assert (report.kept_minimum, report.dropped) == (2, 1)
+    assert sorted(bundle_names(session)) == sorted([names[0], names[2]])
+    assert not os.path.exists(segment)
+    assert not os.path.exists(segment[:-len(".seg")] + ".idx")
+
+
+def test_interrupted_segment_pass_keeps_segment_and_resumes(tmp_path, session, monkeypatch):
+    names, segment = old_segment(session, [2000, 1900, 1800])
+    original = RetentionEngine._bundle
+    calls = []
+
+    def failing_bundle(writer, bundled, name, text, day, meta=None):
+        calls.append(name)
+        if len(calls) == 2:
+            raise OSError("dysk pelny")
+        return original(writer, bundled, name, text, day, meta)
+
+    monkeypatch.setattr(RetentionEngine, "_bundle", staticmethod(failing_bundle))
+    engine = RetentionEngine(str(tmp_path), 30)
+    with pytest.raises(OSError):
+        engine.run_once(NOW)
+
+    # Segment zostaje, dopoki wszystkie zachowane rekordy nie sa w paczce
+    assert os.path.exists(segment)
+    assert bundle_names(session) == [names[0]]
+
+    monkeypatch.setattr(RetentionEngine, "_bundle", staticmethod(original))
+    report = engine.run_once(NOW)
+
+    # Rekord juz w paczce (bundled) nie jest dopisywany drugi raz
+    assert report.kept_minimum == 3
+    assert sorted(bundle_names(session)) == sorted(names)
+    assert not os.path.exists(segment)
+
+
+def test_sharded_pages_only_old_days_are_listed(tmp_path, session):
+    old_day = date.fromtimestamp(OLD).isoformat()
+    old_shard = os.path.join(session, "WAW_ICN", old_day, "Turkish")
+    new_shard = os.path.join(session, "WAW_ICN", date.fromtimestamp(NOW).isoformat(), "Turkish")
+    kept = write_page(old_shard, "R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_100000_000", 4800)
+    dropped = write_page(old_shard, "R001_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_110000_000", 4900, OLD + 1)
+    fresh = write_page(new_shard, "R002_WAW_ICN_Turkish_2025-10-22_2025-11-10_20250602_100000_000", 5000, NOW)
+    # Logi wynikow leza w folderze sesji, text_path wskazuje strone w shardzie
+    write_log(session, [(kept, 4800), (dropped, 4900), (fresh, 5000)])
+
+    engine = RetentionEngine(str(tmp_path), 30)
+    assert all(old_day in unit.folder for unit in engine.candidates(NOW))
+
+    report = engine.run_once(NOW)
+
+    assert (report.kept_minimum, report.dropped) == (1, 1)
+    assert bundle_names(old_shard) == [f"{os.path.splitext(os.path.basename(kept))[0]}.txt"]
+    assert not os.path.exists(dropped)
+    assert os.path.exists(fresh)
+
+
+def test_disabled_without_keep_raw_days(tmp_path):
+    assert RetentionEngine.from_config(str(tmp_path), None) is None
+    assert RetentionEngine.from_config(str(tmp_path), {"keep_raw_days": 30}).keep_raw_days == 30
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from segment_store import (INDEX_SUFFIX, SegmentWriter, list_page_refs, list_segments, read_index, read_location,
+                           reindex, scan_segment)
+
+PAGES = [(f"WAW_ICN_Turkish_2025-10-22_2025-11-10_20250601_10000{i}_000.txt", f"strona {i}\n" + "ł" * 50 * (i + 1))
+         for i in range(4)]
+
+
+def write_segment(folder, compression="none", pages=PAGES):
+    writer = SegmentWriter(str(folder), compression=compression)
+    refs = [writer.append(name, text, {"route": "WAW_ICN"}) for name, text in pages]
+    writer.close()
+    return refs
+
+
+def index_path(segment_path):
+    return segment_path[:-len(".seg")] + INDEX_SUFFIX
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_append_and_read_back(tmp_path, compression):
+    write_segment(tmp_path, compression)
+
+    refs = list_page_refs(str(tmp_path))
+
+    assert [ref.name for ref in refs] == [name for name, _ in PAGES]
+    assert [ref.read() for ref in refs] == [text for _, text in PAGES]
+    assert all(ref.meta == {"route": "WAW_ICN"} and ref.encoding == compression for ref in refs)
+    with refs[1].open_bytes() as content:
+        assert bytes(content).decode("utf-8") == PAGES[1][1]
+
+
+def test_index_matches_scan(tmp_path):
+    refs = write_segment(tmp_path)
+    segment = list_segments(str(tmp_path))[0]
+
+    assert read_index(segment) == refs
+    assert scan_segment(segment) == refs
+    assert read_location(refs[2].location) == PAGES[2][1]
+
+
+def test_truncated_index_scans_rest_of_segment(tmp_path):
+    refs = write_segment(tmp_path)
+    segment = list_segments(str(tmp_path))[0]
+    # Przerwany zapis: pierwsza linia indeksu cala, druga urwana, reszty brak
+    with open(index_path(segment), "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(index_path(segment), "w", encoding="utf-8") as f:
+        f.write(lines[0] + lines[1][:20])
+
+    recovered = read_index(segment)
+
+    assert recovered == refs
+    assert [ref.read() for ref in recovered] == [text for _, text in PAGES]
+
+
+def test_missing_index_and_torn_last_record(tmp_path):
+    refs = write_segment(tmp_path)
+    segment = list_segments(str(tmp_path))[0]
+    os.remove(index_path(segment))
+    with open(segment, "ab") as f:
+        f.write(b"KSG1\x10\x00")  # urwany naglowek kolejnego rekordu
+
+    assert read_index(segment) == refs
+    assert reindex(segment) == len(PAGES)
+    assert read_index(segment) == refs
+
+
+def test_new_segment_after_max_size(tmp_path):
+    writer = SegmentWriter(str(tmp_path), max_mb=0.0001)
+    for name, text in PAGES:
+        writer.append(name, text)
+    writer.close()
+
+    assert len(list_segments(str(tmp_path))) > 1
+    assert [ref.read() for ref in list_page_refs(str(tmp_path))] == [text for _, text in PAGES]
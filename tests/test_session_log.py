@@ -0,0 +1,96 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from session_log import LoggedResults, ResultLog, read_records, rebuild_summary, result_logs
+
+CONFIG = {"scraping_config": {"passengers": 2}}
+
+
+@dataclass
+class Request:
+    request_id: int
+    url: str = ""
+
+
+@dataclass
+class Result:
+    request: Any
+    success: bool
+    total_price: Optional[float] = None
+    text_path: Optional[str] = None
+    text_length: int = 0
+    offers_captured: int = 0
+    page_seconds: float = 0.0
+    expand_seconds: float = 0.0
+
+
+def combo(destination, airline):
+    return ("WAW", destination, airline, "2026-12-01", "2026-12-21")
+
+
+def log_results(folder):
+    log = ResultLog(str(folder), "round_001", CONFIG, round_number=1)
+    # Dwie linie z jednej strony (laczenie linii) - jedno ladowanie
+    log.add(Result(Request(0), True, 4000, "p1.txt", 100, 10, 20.0, 5.0), "Turkish", combo("ICN", "Turkish"))
+    log.add(Result(Request(1), True, 4200, "p1.txt", 100, 10, 20.0, 5.0), "KLM", combo("ICN", "KLM"))
+    log.add(Result(Request(2), False), "Turkish", combo("NRT", "Turkish"))
+    log.add(Result(Request(3), True, 5100, "p2.txt", 80, 6, 10.0, 0.0), "Turkish", combo("NRT", "Turkish"))
+    log.add(Result(Request(-1, "https://www.kayak.pl/x"), True, 3000, "p3.txt", 50, 2, 5.0), "LOT")
+    log.close()
+    return log
+
+
+def test_summary_rebuilt_from_log(tmp_path):
+    log = log_results(tmp_path)
+
+    summary = rebuild_summary(log.path, {"WAW-ICN": 10, "WAW-NRT": 10, "WAW-HND": 4})
+
+    assert (summary["results_count"], summary["successful"], summary["failed"]) == (5, 4, 1)
+    assert summary["airlines"] == ["KLM", "LOT", "Turkish"]
+    assert summary["config_hash"] == log.config_hash
+    assert os.path.exists(tmp_path / f"config_{log.config_hash}.json")
+    assert summary["routes"]["WAW-ICN"] == {"total_requests": 10, "results": 2, "successful": 2, "failed": 0,
+                                            "cheapest_total_price": 4000, "cheapest_request_id": 0}
+    assert summary["routes"]["WAW-NRT"]["cheapest_request_id"] == 3
+    assert summary["routes"]["WAW-HND"]["results"] == 0
+    assert summary["capture"]["page_loads"] == 3
+    assert summary["capture"]["offers_captured"] == 18
+    assert summary["capture"]["offers_per_load"] == 6.0
+
+
+def test_reopened_log_appends_after_torn_line(tmp_path):
+    log = log_results(tmp_path)
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "result", "succ')  # przerwany zapis
+
+    # Restart z tym samym numerem rundy dopisuje do logu
+    reopened = ResultLog(str(tmp_path), "round_001", CONFIG, round_number=1)
+    reopened.add(Result(Request(4), True, 3900, "p4.txt", 90, 5, 8.0), "Turkish", combo("ICN", "Turkish"))
+    reopened.close()
+
+    records = list(read_records(log.path))
+    assert [record["type"] for record in records].count("start") == 2
+    summary = rebuild_summary(log.path)
+    assert summary["results_count"] == 6
+    assert summary["routes"]["WAW-ICN"]["cheapest_total_price"] == 3900
+    assert result_logs(str(tmp_path)) == [log.path]
+
+
+def test_logged_results_forward_every_append():
+    logged = []
+    results = LoggedResults(logged.append)
+
+    results.append(1)
+    results.extend([2, 3])
+
+    assert list(results) == logged == [1, 2, 3]
+
+
+def test_request_outside_table_stored_in_full(tmp_path):
+    log = log_results(tmp_path)
+
+    last = list(read_records(log.path))[-1]
+
+    assert last["request_id"] == -1 and last["request"] == {"request_id": -1, "url": "https://www.kayak.pl/x"}
+    assert "combo" not in last
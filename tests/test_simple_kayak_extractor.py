@@ -0,0 +1,78 @@
+import mmap
+import re
+
+import pytest
+
+from segment_store import SegmentWriter, list_page_refs
+from simple_kayak_extractor import PRICE_PATTERNS, SimpleKayakExtractor
+
+# Wzorce sprzed czytania stron jako bajty (re na str)
+STR_PATTERNS = [
+    r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba\s+(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',
+    r'(\d+(?:\s+\d{3})*)\s*zł\s*/\s*osoba.*?(\d+(?:\s+\d{3})*)\s*zł\s*łącznie',
+    r'(\d+(?:\s+\d{3})*)\s*zł.*?osoba.*?(\d+(?:\s+\d{3})*)\s*zł.*?łącznie',
+]
+SAMPLES = [
+    "100 zł / osoba 200 zł łącznie",
+    "100 zł / osoba 200 zł ŁĄCZNIE",
+    "2\xa0256 ZŁ / OSOBA 4 512 ZŁ Łącznie",
+    "Turkish Airlines\n4 512 Zł / osoba\nCena\n9 024 zł łącznie\n",
+    "1 999 zł za osobę, razem 3 998 zł łącznie",
+    "2 000 zl / osoba 4 000 zl lacznie",
+    "Brak wynikow",
+]
+PAGE = ("Route: WAW - ICN\n" + "=" * 80 + "\n\nNajtansze\nTurkish Airlines\n06:15 – 05:40+1\n"
+        "WAW-ICN\n1 przesiadka IST\n2\xa0256 zł / osoba\n4\xa0512 zł łącznie\n")
+
+
+def str_match(text):
+    for pattern in STR_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            return [re.sub(r'\D', '', group) for group in match.groups()]
+    return None
+
+
+def bytes_match(text):
+    for pattern in PRICE_PATTERNS:
+        match = pattern.search(text.encode("utf-8"))
+        if match:
+            return [re.sub(rb'\D', b'', group).decode("ascii") for group in match.groups()]
+    return None
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_byte_patterns_match_like_str_patterns(text):
+    assert bytes_match(text) == str_match(text)
+
+
+def test_upper_case_price_words():
+    result = SimpleKayakExtractor().extract_first_offer_simple("100 zł / osoba 200 zł ŁĄCZNIE")
+
+    assert result[1:] == (100.0, 200.0)
+
+
+def test_str_bytes_and_mmap_give_same_offer(tmp_path):
+    extractor = SimpleKayakExtractor()
+    path = tmp_path / "WAW_ICN_Turkish_2025-10-22_2025-11-10_20250623_143022_123.txt"
+    path.write_text(PAGE, encoding="utf-8")
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        from_mmap = extractor.extract_first_offer_simple(content)
+
+    assert from_mmap == extractor.extract_first_offer_simple(PAGE)
+    assert from_mmap == extractor.extract_first_offer_simple(PAGE.encode("utf-8"))
+    assert from_mmap[1:] == (2256.0, 4512.0)
+    assert "Turkish Airlines" in from_mmap[0]
+
+
+def test_segment_page_read_as_bytes(tmp_path):
+    writer = SegmentWriter(str(tmp_path))
+    writer.append("WAW_ICN_Turkish_2025-10-22_2025-11-10_20250623_143022_123.txt", PAGE)
+    writer.close()
+    [ref] = list_page_refs(str(tmp_path))
+
+    with ref.open_bytes() as content:
+        offers = SimpleKayakExtractor().extract_offers(content, 1)
+
+    assert [offer[1:] for offer in offers] == [(2256.0, 4512.0)]
@@ -0,0 +1,28 @@
+import url_watcher
+from priority_lane import build_flight_url
+
+URLS = [build_flight_url("WAW", "ICN", "2026-11-02", "2026-11-20", 2, [code]) for code in ("TK", "KL", "LO")]
+
+
+def test_group_fallbacks_wait_between_loads(monkeypatch):
+    events = []
+
+    def fetch_page_text(url, label, wait_min=12, wait_max=18, priority=False):
+        events.append("combined")
+        return "Turkish Airlines\n2 000 zł / osoba 4 000 zł łącznie\n"
+
+    def scrape_url(url, wait_min=12, wait_max=18):
+        events.append("fallback")
+        return url_watcher._empty_result(url, url_watcher.parse_kayak_url(url))
+
+    monkeypatch.setattr(url_watcher, "fetch_page_text", fetch_page_text)
+    monkeypatch.setattr(url_watcher, "scrape_url", scrape_url)
+    [load] = url_watcher.plan_url_loads(URLS)
+
+    results, page_loads = url_watcher.scrape_url_group(load, pause=lambda: events.append("pause"))
+
+    # Linia z karta na wspolnej stronie bez osobnego ladowania, kazdy fallback po odstepie
+    assert events == ["combined", "pause", "fallback", "pause", "fallback"]
+    assert page_loads == 3
+    assert results[0]["total_price"] == 4000
+    assert [result["url"] for result in results] == URLS